@@ -213,6 +213,8 @@ def main():
   import gslib.boto_translation
   import gslib.command
   import gslib.utils.parallelism_framework_util
+  import gslib.utils.rate_limiter
+  import gslib.utils.retry_util
   # pylint: disable=unused-variable
   from gcs_oauth2_boto_plugin import oauth2_client
   from apitools.base.py import credentials_lib
@@ -223,8 +225,12 @@ def main():
     # called from within an "if __name__ == '__main__':" block.
     gslib.command.InitializeMultiprocessingVariables()
     gslib.boto_translation.InitializeMultiprocessingVariables()
+    gslib.utils.rate_limiter.InitializeMultiprocessingVariables()
+    gslib.utils.retry_util.InitializeMultiprocessingVariables()
   else:
     gslib.command.InitializeThreadingVariables()
+    gslib.utils.rate_limiter.InitializeThreadingVariables()
+    gslib.utils.retry_util.InitializeThreadingVariables()
 
   # This needs to be done after InitializeMultiprocessingVariables(), since
   # otherwise we can't call CreateLock.
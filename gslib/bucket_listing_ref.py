@@ -35,7 +35,8 @@ class BucketListingRef(object):
   It is populated by the calling iterator, which may only request certain
   fields to reduce the number of server requests.
 
-  For filesystem URLs, root_object is not populated.
+  For filesystem URLs, root_object is not populated, but objects (files) may
+  carry the os.stat result the iterator got for them in stat_result.
   """
 
   class _BucketListingRefType(object):
@@ -102,15 +103,17 @@ class BucketListingPrefix(BucketListingRef):
 class BucketListingObject(BucketListingRef):
   """BucketListingRef subclass for objects."""
 
-  def __init__(self, storage_url, root_object=None):
+  def __init__(self, storage_url, root_object=None, stat_result=None):
     """Creates a BucketListingRef of type object.
 
     Args:
       storage_url: StorageUrl containing an object.
       root_object: Underlying object metadata, if available.
+      stat_result: For files, os.stat result for the file, if available.
     """
     super(BucketListingObject, self).__init__()
     self._ref_type = self._BucketListingRefType.OBJECT
     self._url_string = storage_url.url_string
     self.storage_url = storage_url
     self.root_object = root_object
+    self.stat_result = stat_result
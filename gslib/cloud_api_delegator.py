@@ -19,6 +19,9 @@ from __future__ import print_function
 from __future__ import division
 from __future__ import unicode_literals
 
+import io
+import threading
+
 import boto
 from boto import config
 from gslib.cloud_api import ArgumentException
@@ -26,6 +29,15 @@ from gslib.cloud_api import CloudApi
 from gslib.cs_api_map import ApiMapConstants
 from gslib.cs_api_map import ApiSelector
 from gslib.exception import CommandException
+from gslib.utils.boto_util import GetCircuitBreakerThreshold
+from gslib.utils.boto_util import GetHedgeRequests
+from gslib.utils.boto_util import GetMaxBucketRequestRate
+from gslib.utils.hedging_util import GetHedgePolicy
+from gslib.utils.hedging_util import HedgedCall
+from gslib.utils.hedging_util import MAX_HEDGED_DOWNLOAD_SIZE
+from gslib.utils.rate_limiter import LimitBucketRequestRate
+from gslib.utils.retry_util import WaitForBucketBackoff
+from gslib.utils.text_util import write_to_fd
 
 
 class CloudApiDelegator(CloudApi):
@@ -84,6 +96,13 @@ class CloudApiDelegator(CloudApi):
     self.api_map = gsutil_api_map
     self.prefer_api = boto.config.get('GSUtil', 'prefer_api', '').upper()
     self.loaded_apis = {}
+    self.max_bucket_request_rate = GetMaxBucketRequestRate()
+    self.circuit_breaker_threshold = GetCircuitBreakerThreshold()
+    self.hedge_requests = GetHedgeRequests()
+    # Maps (provider, api_selector) to idle API instances available for
+    # hedged requests, which need an API of their own.
+    self.spare_apis = {}
+    self.spare_apis_lock = threading.Lock()
 
     if not self.api_map[ApiMapConstants.API_MAP]:
       raise ArgumentException('No apiclass supplied for gsutil Cloud API map.')
@@ -118,6 +137,20 @@ class CloudApiDelegator(CloudApi):
       self._LoadApi(provider, api_selector)
     return self.loaded_apis[provider][api_selector]
 
+  def _LimitRequestRate(self, bucket_name):
+    """Waits as needed before an object request to a bucket.
+
+    Keeps requests to the bucket under its rate limit, and holds them off while
+    its circuit breaker is open.
+
+    Args:
+      bucket_name: Name of the bucket the caller is about to make a request to.
+    """
+    if self.circuit_breaker_threshold:
+      WaitForBucketBackoff(bucket_name)
+    if self.max_bucket_request_rate:
+      LimitBucketRequestRate(bucket_name, self.max_bucket_request_rate)
+
   def _LoadApi(self, provider, api_selector):
     """Loads a CloudApi into the loaded_apis map for this class.
 
@@ -125,6 +158,16 @@ class CloudApiDelegator(CloudApi):
       provider: Provider to load the API for.
       api_selector: cs_api_map.ApiSelector defining the API type.
     """
+    self.loaded_apis[provider][api_selector] = self._CreateApi(
+        provider, api_selector)
+
+  def _CreateApi(self, provider, api_selector):
+    """Returns a new CloudApi instance.
+
+    Args:
+      provider: Provider to create the API for.
+      api_selector: cs_api_map.ApiSelector defining the API type.
+    """
     if provider not in self.api_map[ApiMapConstants.API_MAP]:
       raise ArgumentException(
           'gsutil Cloud API map contains no entry for provider %s.' % provider)
@@ -132,16 +175,84 @@ class CloudApiDelegator(CloudApi):
       raise ArgumentException(
           'gsutil Cloud API map does not support API %s for provider %s.' %
           (api_selector, provider))
-    self.loaded_apis[provider][api_selector] = (
-        self.api_map[ApiMapConstants.API_MAP][provider][api_selector](
-            self.bucket_storage_uri_class,
-            self.logger,
-            self.status_queue,
-            provider=provider,
-            debug=self.debug,
-            trace_token=self.trace_token,
-            perf_trace_token=self.perf_trace_token,
-            user_project=self.user_project))
+    return self.api_map[ApiMapConstants.API_MAP][provider][api_selector](
+        self.bucket_storage_uri_class,
+        self.logger,
+        self.status_queue,
+        provider=provider,
+        debug=self.debug,
+        trace_token=self.trace_token,
+        perf_trace_token=self.perf_trace_token,
+        user_project=self.user_project)
+
+  def _TakeSpareApi(self, provider, api_selector):
+    with self.spare_apis_lock:
+      spare_apis = self.spare_apis.get((provider, api_selector))
+      if spare_apis:
+        return spare_apis.pop()
+    return self._CreateApi(provider, api_selector)
+
+  def _ReturnSpareApi(self, provider, api_selector, api):
+    with self.spare_apis_lock:
+      self.spare_apis.setdefault((provider, api_selector), []).append(api)
+
+  def _HedgedApiCall(self, provider, kind, func):
+    """Calls func with an API, hedging the call if it's slow.
+
+    The hedge is made with a spare API instance, since an API instance can't
+    be used from two threads at once. In-flight requests can't be cancelled,
+    so whichever attempt loses keeps running in the background; its API is
+    returned to the spare pool once it finishes. If the hedge wins, its API
+    replaces the loaded one, which is still busy with the losing attempt.
+
+    Args:
+      provider: Provider to make the call to. If None, class-wide default is
+          used.
+      kind: Kind of the call, for learning the hedge delay; calls of the same
+          kind should have similar latencies.
+      func: Function taking a CloudApi and making the call with it. It is
+          called a second time, from another thread, if the call is hedged.
+
+    Returns:
+      The result of func.
+    """
+    api = self._GetApi(provider)
+    provider = str(provider or self.provider)
+    api_selector = self.GetApiSelector(provider)
+    # Once the call is decided, APIs of attempts that aren't the winner go
+    # back to the spare pool as soon as those attempts finish.
+    state = {'decided': False, 'winner_api': api, 'finished_apis': []}
+    state_lock = threading.Lock()
+
+    def _Attempt(attempt_api):
+      try:
+        return func(attempt_api), attempt_api
+      finally:
+        with state_lock:
+          if not state['decided']:
+            state['finished_apis'].append(attempt_api)
+          elif attempt_api is not state['winner_api']:
+            self._ReturnSpareApi(provider, api_selector, attempt_api)
+
+    def _Decide(winner_api):
+      with state_lock:
+        state['decided'] = True
+        state['winner_api'] = winner_api
+        for finished_api in state['finished_apis']:
+          if finished_api is not winner_api:
+            self._ReturnSpareApi(provider, api_selector, finished_api)
+
+    try:
+      (result, winner_api), _ = HedgedCall(
+          GetHedgePolicy(), kind, lambda: _Attempt(api),
+          lambda: _Attempt(self._TakeSpareApi(provider, api_selector)))
+    except:  # pylint: disable=bare-except
+      _Decide(api)
+      raise
+    if winner_api is not api:
+      self.loaded_apis[provider][api_selector] = winner_api
+    _Decide(winner_api)
+    return result
 
   def GetApiSelector(self, provider=None):
     """Returns a cs_api_map.ApiSelector based on input and configuration.
@@ -299,6 +410,14 @@ class CloudApiDelegator(CloudApi):
                         generation=None,
                         provider=None,
                         fields=None):
+    self._LimitRequestRate(bucket_name)
+    if self.hedge_requests:
+      return self._HedgedApiCall(
+          provider, 'GetObjectMetadata',
+          lambda api: api.GetObjectMetadata(bucket_name,
+                                            object_name,
+                                            generation=generation,
+                                            fields=fields))
     return self._GetApi(provider).GetObjectMetadata(bucket_name,
                                                     object_name,
                                                     generation=generation,
@@ -313,6 +432,7 @@ class CloudApiDelegator(CloudApi):
                           preconditions=None,
                           provider=None,
                           fields=None):
+    self._LimitRequestRate(bucket_name)
     return self._GetApi(provider).PatchObjectMetadata(
         bucket_name,
         object_name,
@@ -337,6 +457,22 @@ class CloudApiDelegator(CloudApi):
                      serialization_data=None,
                      digesters=None,
                      decryption_tuple=None):
+    self._LimitRequestRate(bucket_name)
+    if (self.hedge_requests and object_size is not None and
+        object_size <= MAX_HEDGED_DOWNLOAD_SIZE and
+        download_strategy == CloudApi.DownloadStrategy.ONE_SHOT and
+        not start_byte and end_byte is None):
+      return self._HedgedGetObjectMedia(bucket_name,
+                                        object_name,
+                                        download_stream,
+                                        provider=provider,
+                                        generation=generation,
+                                        object_size=object_size,
+                                        compressed_encoding=compressed_encoding,
+                                        progress_callback=progress_callback,
+                                        serialization_data=serialization_data,
+                                        digesters=digesters,
+                                        decryption_tuple=decryption_tuple)
     return self._GetApi(provider).GetObjectMedia(
         bucket_name,
         object_name,
@@ -352,6 +488,52 @@ class CloudApiDelegator(CloudApi):
         digesters=digesters,
         decryption_tuple=decryption_tuple)
 
+  def _HedgedGetObjectMedia(self, bucket_name, object_name, download_stream,
+                            provider, generation, object_size,
+                            compressed_encoding, progress_callback,
+                            serialization_data, digesters, decryption_tuple):
+    """Downloads a small object in full, hedging the download if it's slow.
+
+    Each attempt downloads into its own buffer and digesters, and only the
+    winner's are passed on to the caller, so a losing attempt still running in
+    the background can't interleave its bytes with the winner's.
+
+    Args:
+      See GetObjectMedia.
+
+    Returns:
+      See GetObjectMedia.
+    """
+
+    def _Download(api):
+      buf = io.BytesIO()
+      attempt_digesters = None
+      if digesters is not None:
+        attempt_digesters = dict(
+            (alg, digester.copy()) for alg, digester in digesters.items())
+      server_encoding = api.GetObjectMedia(
+          bucket_name,
+          object_name,
+          buf,
+          compressed_encoding=compressed_encoding,
+          download_strategy=CloudApi.DownloadStrategy.ONE_SHOT,
+          generation=generation,
+          object_size=object_size,
+          serialization_data=serialization_data,
+          digesters=attempt_digesters,
+          decryption_tuple=decryption_tuple)
+      return server_encoding, buf, attempt_digesters
+
+    server_encoding, buf, attempt_digesters = self._HedgedApiCall(
+        provider, 'GetObjectMedia', _Download)
+    # The stream may be a text-mode file such as sys.stdout, e.g., for cat.
+    write_to_fd(download_stream, buf.getvalue())
+    if digesters is not None:
+      digesters.update(attempt_digesters)
+    if progress_callback:
+      progress_callback(object_size, object_size)
+    return server_encoding
+
   def UploadObject(self,
                    upload_stream,
                    object_metadata,
@@ -363,6 +545,7 @@ class CloudApiDelegator(CloudApi):
                    provider=None,
                    fields=None,
                    gzip_encoded=False):
+    self._LimitRequestRate(object_metadata.bucket)
     return self._GetApi(provider).UploadObject(
         upload_stream,
         object_metadata,
@@ -384,6 +567,7 @@ class CloudApiDelegator(CloudApi):
                             provider=None,
                             fields=None,
                             gzip_encoded=False):
+    self._LimitRequestRate(object_metadata.bucket)
     return self._GetApi(provider).UploadObjectStreaming(
         upload_stream,
         object_metadata,
@@ -407,6 +591,7 @@ class CloudApiDelegator(CloudApi):
                             provider=None,
                             fields=None,
                             gzip_encoded=False):
+    self._LimitRequestRate(object_metadata.bucket)
     return self._GetApi(provider).UploadObjectResumable(
         upload_stream,
         object_metadata,
@@ -432,6 +617,7 @@ class CloudApiDelegator(CloudApi):
                  decryption_tuple=None,
                  provider=None,
                  fields=None):
+    self._LimitRequestRate(dst_obj_metadata.bucket)
     return self._GetApi(provider).CopyObject(
         src_obj_metadata,
         dst_obj_metadata,
@@ -451,6 +637,7 @@ class CloudApiDelegator(CloudApi):
                     encryption_tuple=None,
                     provider=None,
                     fields=None):
+    self._LimitRequestRate(dst_obj_metadata.bucket)
     return self._GetApi(provider).ComposeObject(
         src_objs_metadata,
         dst_obj_metadata,
@@ -464,6 +651,7 @@ class CloudApiDelegator(CloudApi):
                    preconditions=None,
                    generation=None,
                    provider=None):
+    self._LimitRequestRate(bucket_name)
     return self._GetApi(provider).DeleteObject(bucket_name,
                                                object_name,
                                                preconditions=preconditions,
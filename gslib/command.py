@@ -30,7 +30,6 @@ import codecs
 from collections import namedtuple
 import copy
 import getopt
-import json
 import logging
 import multiprocessing
 import os
@@ -40,6 +39,7 @@ import textwrap
 import threading
 import time
 import traceback
+import zlib
 
 import boto
 from boto.storage_uri import StorageUri
@@ -70,7 +70,9 @@ from gslib.storage_url import HaveFileUrls
 from gslib.storage_url import HaveProviderUrls
 from gslib.storage_url import StorageUrlFromString
 from gslib.storage_url import UrlsAreForSingleProvider
+from gslib.telemetry import DEFAULT_TELEMETRY_INTERVAL
 from gslib.third_party.storage_apitools import storage_v1_messages as apitools_messages
+from gslib.thread_message import CoalescingStatusQueue
 from gslib.thread_message import FinalMessage
 from gslib.thread_message import MetadataMessage
 from gslib.thread_message import PerformanceSummaryMessage
@@ -89,6 +91,7 @@ from gslib.utils.parallelism_framework_util import ProcessAndThreadSafeInt
 from gslib.utils.parallelism_framework_util import PutToQueueWithTimeout
 from gslib.utils.parallelism_framework_util import SEEK_AHEAD_JOIN_TIMEOUT
 from gslib.utils.parallelism_framework_util import ShouldProhibitMultiprocessing
+from gslib.utils.parallelism_framework_util import TaskLanes
 from gslib.utils.parallelism_framework_util import UI_THREAD_JOIN_TIMEOUT
 from gslib.utils.parallelism_framework_util import ZERO_TASKS_TO_DO_ARGUMENT
 from gslib.utils.rsync_util import RsyncDiffToApply
@@ -96,7 +99,9 @@ from gslib.utils.system_util import GetTermLines
 from gslib.utils.system_util import IS_WINDOWS
 from gslib.utils.translation_helper import AclTranslation
 from gslib.utils.translation_helper import PRIVATE_DEFAULT_OBJ_ACL
+from gslib.utils.unit_util import ONE_MIB
 from gslib.wildcard_iterator import CreateWildcardIterator
+import six
 from six.moves import queue as Queue
 
 # pylint: disable=g-import-not-at-top
@@ -192,12 +197,23 @@ def _CryptoRandomAtFork():
     CryptoRandom.atfork()
 
 
-def _NewMultiprocessingQueue():
-  new_queue = multiprocessing.Queue(MAX_QUEUE_SIZE)
+def _NewMultiprocessingQueue(maxsize=None):
+  new_queue = multiprocessing.Queue(maxsize or MAX_QUEUE_SIZE)
   queues.append(new_queue)
   return new_queue
 
 
+def _NewMultiprocessingTaskQueue(process_count):
+  """Returns a task queue for a pool of process_count worker processes."""
+  if process_count > 1 and _GetTaskScheduler() == TASK_SCHEDULER_WORK_STEALING:
+    return WorkStealingTaskQueue(
+        [
+            _NewMultiprocessingQueue(max(1, MAX_QUEUE_SIZE // process_count))
+            for _ in range(process_count)
+        ], _GetTaskAffinityKey)
+  return _NewMultiprocessingQueue()
+
+
 def _NewThreadsafeQueue():
   new_queue = Queue.Queue(MAX_QUEUE_SIZE)
   queues.append(new_queue)
@@ -221,6 +237,119 @@ def _GetTaskEstimationThreshold():
                             DEFAULT_TASK_ESTIMATION_THRESHOLD)
 
 
+# When tasks are distributed to multiple processes, the ProducerThread groups
+# up to this many tasks into each TaskBatch it puts on the task queue, to cut
+# the per-item pickling and pipe/lock overhead of the multiprocessing queue.
+DEFAULT_TASK_BATCH_SIZE = 10
+
+# A TaskBatch is put on the task queue as soon as the known sizes of its
+# tasks add up to this many bytes, so that large transfers are not held back
+# by (or hold back) the other tasks in their batch.
+TASK_BATCH_MAX_BYTES = ONE_MIB
+
+# A TaskBatch is put on the task queue once its first task has waited this
+# long, in seconds, even if no further task has been produced by then. Only
+# the most recently produced task is still held back (see ProducerThread.run).
+TASK_BATCH_MAX_DELAY = 0.1
+
+# Tasks are only batched while at least this many tasks per worker thread are
+# waiting to start, since otherwise a batch could leave the other workers idle
+# while one process works through it.
+TASK_BATCH_MIN_WAITING_PER_THREAD = 2
+
+
+def _GetTaskBatchSize():
+  return max(
+      1,
+      boto.config.getint('GSUtil', 'task_batch_size', DEFAULT_TASK_BATCH_SIZE))
+
+
+# Values for the GSUtil:task_scheduler option. With the default "fifo"
+# scheduler, all worker processes take tasks from one shared queue in the
+# order they were produced. With "work_stealing", each worker process has its
+# own queue (see WorkStealingTaskQueue), and tasks are reordered largest first
+# within windows of task_reorder_window tasks.
+TASK_SCHEDULER_FIFO = 'fifo'
+TASK_SCHEDULER_WORK_STEALING = 'work_stealing'
+DEFAULT_TASK_SCHEDULER = TASK_SCHEDULER_FIFO
+
+DEFAULT_TASK_REORDER_WINDOW = 100
+
+# How long a work-stealing worker process waits on its own queue before it
+# looks for tasks to steal again, in seconds.
+WORK_STEALING_POLL_INTERVAL = 0.05
+
+
+def _GetTaskScheduler():
+  task_scheduler = boto.config.get('GSUtil', 'task_scheduler',
+                                   DEFAULT_TASK_SCHEDULER)
+  if task_scheduler not in (TASK_SCHEDULER_FIFO, TASK_SCHEDULER_WORK_STEALING):
+    raise CommandException(
+        'Invalid value for GSUtil:task_scheduler: "%s". Valid values are '
+        '"%s" and "%s".' %
+        (task_scheduler, TASK_SCHEDULER_FIFO, TASK_SCHEDULER_WORK_STEALING))
+  return task_scheduler
+
+
+def _GetTaskReorderWindow():
+  return boto.config.getint('GSUtil', 'task_reorder_window',
+                            DEFAULT_TASK_REORDER_WINDOW)
+
+
+# Lanes of tasks for fair-share scheduling (see TaskLanes). Tasks of Apply
+# calls made with ParallelOverrideReason.SLICE (components of sliced downloads
+# and parallel composite uploads) are in COMPONENT_LANE, all others are in
+# OBJECT_LANE.
+OBJECT_LANE = 0
+COMPONENT_LANE = 1
+NUM_LANES = 2
+LANE_NAMES = ('object_lane', 'component_lane')
+
+
+def _GetComponentTaskShare():
+  """Returns GSUtil:component_task_share, or None if it isn't set."""
+  component_task_share = boto.config.get('GSUtil', 'component_task_share',
+                                         None)
+  if component_task_share is None:
+    return None
+  try:
+    component_task_share = float(component_task_share)
+  except ValueError:
+    component_task_share = None
+  if component_task_share is None or not 0 < component_task_share < 1:
+    raise CommandException(
+        'Invalid value for GSUtil:component_task_share: "%s". It must be a '
+        'number between 0 and 1, exclusive.' %
+        boto.config.get('GSUtil', 'component_task_share'))
+  return component_task_share
+
+
+def _GetLaneLimits(process_count, thread_count):
+  """Returns the TaskLanes limits for a pool of the given size.
+
+  If GSUtil:component_task_share is set, component tasks get that share of the
+  pool's process_count * thread_count workers while whole-object tasks are
+  waiting, and whole-object tasks get the rest while component tasks are
+  waiting. Otherwise, the lanes are unlimited.
+
+  Args:
+    process_count: The number of processes in the pool.
+    thread_count: The number of threads per process.
+
+  Returns:
+    List of limits, indexed by lane.
+  """
+  component_task_share = _GetComponentTaskShare()
+  if component_task_share is None:
+    return [0] * NUM_LANES
+  capacity = process_count * thread_count
+  component_limit = max(1, int(round(component_task_share * capacity)))
+  limits = [0] * NUM_LANES
+  limits[OBJECT_LANE] = max(1, capacity - component_limit)
+  limits[COMPONENT_LANE] = component_limit
+  return limits
+
+
 # That maximum depth of the tree of recursive calls to command.Apply. This is
 # an arbitrary limit put in place to prevent developers from accidentally
 # causing problems with infinite recursion, and it can be increased if needed.
@@ -257,6 +386,7 @@ global need_pool_or_done_cond, caller_id_finished_count, new_pool_needed
 global current_max_recursive_level, shared_vars_map, shared_vars_list_map
 global class_map, worker_checking_level_lock, failure_count, thread_stats
 global glob_status_queue, ui_controller, concurrent_compressed_upload_lock
+global task_lanes
 
 
 def InitializeMultiprocessingVariables():
@@ -330,7 +460,7 @@ def InitializeMultiprocessingVariables():
   global need_pool_or_done_cond, caller_id_finished_count, new_pool_needed
   global current_max_recursive_level, shared_vars_map, shared_vars_list_map
   global class_map, worker_checking_level_lock, failure_count, glob_status_queue
-  global concurrent_compressed_upload_lock
+  global concurrent_compressed_upload_lock, task_lanes
 
   manager = multiprocessing.Manager()
 
@@ -408,6 +538,9 @@ def InitializeMultiprocessingVariables():
   concurrent_compressed_upload_lock = manager.BoundedSemaphore(
       GetMaxConcurrentCompressedUploads())
 
+  # Fair-share admission of tasks in OBJECT_LANE and COMPONENT_LANE.
+  task_lanes = TaskLanes(True, NUM_LANES)
+
 
 def TeardownMultiprocessingProcesses():
   """Should be called by signal handlers prior to shut down."""
@@ -435,7 +568,7 @@ def InitializeThreadingVariables():
   global need_pool_or_done_cond, call_completed_map, class_map, thread_stats
   global task_queues, caller_id_lock, caller_id_counter, glob_status_queue
   global worker_checking_level_lock, current_max_recursive_level
-  global concurrent_compressed_upload_lock
+  global concurrent_compressed_upload_lock, task_lanes
   caller_id_counter = ProcessAndThreadSafeInt(False)
   caller_id_finished_count = AtomicDict()
   caller_id_lock = threading.Lock()
@@ -454,6 +587,7 @@ def InitializeThreadingVariables():
   worker_checking_level_lock = threading.Lock()
   concurrent_compressed_upload_lock = threading.BoundedSemaphore(
       GetMaxConcurrentCompressedUploads())
+  task_lanes = TaskLanes(False, NUM_LANES)
 
 
 # Each subclass of Command must define a property named 'command_spec' that is
@@ -641,10 +775,14 @@ class Command(HelpProvider):
                              'command_spec definition.' % self.command_name)
 
     quiet_mode = not self.logger.isEnabledFor(logging.INFO)
-    ui_controller = UIController(quiet_mode=quiet_mode,
-                                 dump_status_messages_file=boto.config.get(
-                                     'GSUtil', 'dump_status_messages_file',
-                                     None))
+    ui_controller = UIController(
+        quiet_mode=quiet_mode,
+        dump_status_messages_file=boto.config.get('GSUtil',
+                                                  'dump_status_messages_file',
+                                                  None),
+        telemetry_file=boto.config.get('GSUtil', 'telemetry_file', None),
+        telemetry_interval=boto.config.getint('GSUtil', 'telemetry_interval',
+                                              DEFAULT_TELEMETRY_INTERVAL))
 
     # Parse and validate args.
     self.args = self._TranslateDeprecatedAliases(args)
@@ -769,7 +907,7 @@ class Command(HelpProvider):
       raise CommandException('"%s" command does not support provider-only '
                              'URLs.' % self.command_name)
 
-  def WildcardIterator(self, url_string, all_versions=False):
+  def WildcardIterator(self, url_string, all_versions=False, gsutil_api=None):
     """Helper to instantiate gslib.WildcardIterator.
 
     Args are same as gslib.WildcardIterator interface, but this method fills in
@@ -780,16 +918,36 @@ class Command(HelpProvider):
       all_versions: If true, the iterator yields all versions of objects
                     matching the wildcard.  If false, yields just the live
                     object version.
+      gsutil_api: gsutil Cloud API instance to iterate with, for iterating on
+                  other threads. Defaults to the command's instance.
 
     Returns:
       WildcardIterator for use by caller.
     """
     return CreateWildcardIterator(url_string,
-                                  self.gsutil_api,
+                                  gsutil_api or self.gsutil_api,
                                   all_versions=all_versions,
                                   project_id=self.project_id,
                                   logger=self.logger)
 
+  def CreateGsutilApi(self):
+    """Returns a new gsutil Cloud API instance.
+
+    Cloud API instances are not thread-safe, so threads that a command starts
+    itself, rather than through Apply, each need their own.
+
+    Returns:
+      Cloud API instance configured like the command's own.
+    """
+    return CloudApiDelegator(self.bucket_storage_uri_class,
+                             self.gsutil_api_map,
+                             self.logger,
+                             self.gsutil_api.status_queue,
+                             debug=self.debug,
+                             trace_token=self.trace_token,
+                             perf_trace_token=self.perf_trace_token,
+                             user_project=self.user_project)
+
   def GetSeekAheadGsutilApi(self):
     """Helper to instantiate a Cloud API instance for a seek-ahead iterator.
 
@@ -1367,17 +1525,18 @@ class Command(HelpProvider):
   def _CreateNewConsumerPool(self, num_processes, num_threads, status_queue):
     """Create a new pool of processes that call _ApplyThreads."""
     processes = []
-    task_queue = _NewMultiprocessingQueue()
+    task_queue = _NewMultiprocessingTaskQueue(num_processes)
     task_queues.append(task_queue)
 
     current_max_recursive_level.Increment()
     if current_max_recursive_level.GetValue() > MAX_RECURSIVE_DEPTH:
       raise CommandException('Recursion depth of Apply calls is too great.')
-    for _ in range(num_processes):
+    for process_index in range(num_processes):
       recursive_apply_level = len(consumer_pools)
       p = multiprocessing.Process(target=self._ApplyThreads,
                                   args=(num_threads, num_processes,
-                                        recursive_apply_level, status_queue))
+                                        recursive_apply_level, status_queue,
+                                        process_index))
       p.daemon = True
       processes.append(p)
       _CryptoRandomAtFork()
@@ -1496,6 +1655,11 @@ class Command(HelpProvider):
     usable_processes_count = (process_count
                               if self.multiprocessing_is_available else 1)
     if thread_count * usable_processes_count > 1:
+      current_thread = threading.current_thread()
+      if isinstance(current_thread, WorkerThread):
+        # Messages this task already produced (e.g., the start of a sliced
+        # download) must be posted before those of the tasks it spawns.
+        current_thread.FlushStatusMessages()
       self._ParallelApply(
           func,
           args_iterator,
@@ -1582,7 +1746,8 @@ class Command(HelpProvider):
       if arg_checker(self, args):
         # Now that we actually have the next argument, perform the task.
         task = Task(func, args, caller_id, exception_handler,
-                    should_return_results, arg_checker, fail_on_error)
+                    should_return_results, arg_checker, fail_on_error,
+                    OBJECT_LANE)
         worker_thread.PerformTask(task, self)
 
     if sequential_call_count >= GetTermLines():
@@ -1687,7 +1852,7 @@ class Command(HelpProvider):
       # one more queue than we know we need. OTOH, if we don't create a new
       # process, the existing process still needs a task queue to use.
       if process_count > 1:
-        task_queues.append(_NewMultiprocessingQueue())
+        task_queues.append(_NewMultiprocessingTaskQueue(process_count))
       else:
         task_queue = _NewThreadsafeQueue()
         task_queues.append(task_queue)
@@ -1755,6 +1920,11 @@ class Command(HelpProvider):
     if seek_ahead_iterator and not is_main_thread:
       seek_ahead_iterator = None
 
+    if is_main_thread:
+      task_lanes.SetLimits(_GetLaneLimits(process_count, thread_count))
+    lane = (COMPONENT_LANE if parallel_operations_override
+            == self.ParallelOverrideReason.SLICE else OBJECT_LANE)
+
     # Kick off a producer thread to throw tasks in the global task queue. We
     # do this asynchronously so that the main thread can be free to create new
     # consumer pools when needed (otherwise, any thread with a task that needs
@@ -1772,12 +1942,21 @@ class Command(HelpProvider):
         arg_checker,
         fail_on_error,
         seek_ahead_iterator=seek_ahead_iterator,
-        status_queue=(glob_status_queue if is_main_thread else None))
+        status_queue=(glob_status_queue if is_main_thread else None),
+        task_batch_size=(_GetTaskBatchSize() if process_count > 1 else 1),
+        task_batch_min_waiting=(TASK_BATCH_MIN_WAITING_PER_THREAD *
+                                process_count * thread_count),
+        task_reorder_window=(_GetTaskReorderWindow() if isinstance(
+            task_queue, WorkStealingTaskQueue) else 0),
+        lane=lane)
 
     # Start the UI thread that is responsible for displaying operation status
     # (aggregated across processes and threads) to the user.
     ui_thread = None
     if is_main_thread:
+      ui_controller.TrackQueueDepth('task_queue', task_queue)
+      for lane_index, lane_name in enumerate(LANE_NAMES):
+        ui_controller.TrackQueueDepth(lane_name, _LaneDepth(lane_index))
       ui_thread = UIThread(glob_status_queue, sys.stderr, ui_controller)
 
     # Wait here until either:
@@ -1790,21 +1969,31 @@ class Command(HelpProvider):
     # At most one of these can be true, because the main thread is blocked on
     # its call to Apply, and a thread will not ask for a new consumer pool
     # unless it had more work to do.
-    while True:
-      with need_pool_or_done_cond:
-        if call_completed_map[caller_id]:
-          break
-        elif (process_count > 1 and is_main_thread and
-              new_pool_needed.GetValue()):
-          new_pool_needed.Reset()
-          self._CreateNewConsumerPool(process_count, thread_count,
-                                      glob_status_queue)
-          need_pool_or_done_cond.notify_all()
-
-        # Note that we must check the above conditions before the wait() call;
-        # otherwise, the notification can happen before we start waiting, in
-        # which case we'll block forever.
-        need_pool_or_done_cond.wait()
+    #
+    # If this is a WorkerThread running a task, the task doesn't count
+    # against its lane's share while it waits for the tasks of this call.
+    paused_lane = getattr(threading.current_thread(), 'running_lane', None)
+    if paused_lane is not None:
+      task_lanes.Finish(paused_lane)
+    try:
+      while True:
+        with need_pool_or_done_cond:
+          if call_completed_map[caller_id]:
+            break
+          elif (process_count > 1 and is_main_thread and
+                new_pool_needed.GetValue()):
+            new_pool_needed.Reset()
+            self._CreateNewConsumerPool(process_count, thread_count,
+                                        glob_status_queue)
+            need_pool_or_done_cond.notify_all()
+
+          # Note that we must check the above conditions before the wait()
+          # call; otherwise, the notification can happen before we start
+          # waiting, in which case we'll block forever.
+          need_pool_or_done_cond.wait()
+    finally:
+      if paused_lane is not None:
+        task_lanes.Resume(paused_lane)
 
     # We've completed all tasks (or excepted), so signal the UI thread to
     # terminate.
@@ -1838,8 +2027,12 @@ class Command(HelpProvider):
                                 has_cloud_src=args_iterator.has_cloud_src,
                                 provider_types=args_iterator.provider_types)
 
-  def _ApplyThreads(self, thread_count, process_count, recursive_apply_level,
-                    status_queue):
+  def _ApplyThreads(self,
+                    thread_count,
+                    process_count,
+                    recursive_apply_level,
+                    status_queue,
+                    process_index=0):
     """Assigns the work from the multi-process global task queue.
 
     Work is assigned to an individual process for later consumption either by
@@ -1853,6 +2046,8 @@ class Command(HelpProvider):
                              of this thread.
       status_queue: Multiprocessing/threading queue for progress reporting and
           performance aggregation.
+      process_index: Index of this process within its consumer pool, which
+          selects its own queue if the task queue is a WorkStealingTaskQueue.
     """
     assert process_count > 1, (
         'Invalid state, calling command._ApplyThreads with only one process.')
@@ -1890,17 +2085,22 @@ class Command(HelpProvider):
 
     num_enqueued = 0
     while True:
-      while not worker_semaphore.acquire(blocking=False):
-        # Because Python signal handlers are only called in between atomic
-        # instructions, if we block the main thread on an available worker
-        # thread, we won't be able to respond to signals such as a
-        # user-initiated CTRL-C until a worker thread completes a task.
-        # We poll the semaphore periodically as a compromise between
-        # efficiency and user responsiveness.
-        time.sleep(0.01)
-      task = task_queue.get()
-
-      if task.args != ZERO_TASKS_TO_DO_ARGUMENT:
+      _AcquireWorkerSemaphore(worker_semaphore)
+      if isinstance(task_queue, WorkStealingTaskQueue):
+        task = task_queue.GetForConsumer(process_index)
+      else:
+        task = task_queue.get()
+
+      if isinstance(task, TaskBatch):
+        # The semaphore is already held for the first task; acquire it for
+        # each of the others too, so that this process never takes on more
+        # tasks at once than it has WorkerThreads.
+        for i, batched_task in enumerate(task.tasks):
+          if i:
+            _AcquireWorkerSemaphore(worker_semaphore)
+          worker_pool.AddTask(batched_task)
+          num_enqueued += 1
+      elif task.args != ZERO_TASKS_TO_DO_ARGUMENT:
         # If we have no tasks to do and we're performing a blocking call, we
         # need a special signal to tell us to stop - otherwise, we block on
         # the call to task_queue.get() forever.
@@ -1928,7 +2128,7 @@ class _ConsumerPool(object):
 class Task(
     namedtuple('Task', (
         'func args caller_id exception_handler should_return_results arg_checker '
-        'fail_on_error'))):
+        'fail_on_error lane'))):
   """Task class representing work to be completed.
 
   Args:
@@ -1944,10 +2144,151 @@ class Task(
     fail_on_error: If true, then raise any exceptions encountered when
                    executing func. This is only applicable in the case of
                    process_count == thread_count == 1.
+    lane: OBJECT_LANE or COMPONENT_LANE.
+  """
+  pass
+
+
+class _LaneDepth(object):
+  """Reports the number of waiting tasks in a lane as a queue depth."""
+
+  def __init__(self, lane):
+    self.lane = lane
+
+  def qsize(self):
+    return max(0, task_lanes.GetWaiting(self.lane))
+
+
+class TaskBatch(namedtuple('TaskBatch', 'tasks')):
+  """Several Tasks put on a multiprocessing task queue as a single item.
+
+  Command._ApplyThreads unpacks the batch and hands each Task to its
+  WorkerPool individually, so each Task's exception handling and completion
+  accounting is the same as if it had been queued on its own. A batch never
+  contains a ZERO_TASKS_TO_DO_ARGUMENT Task.
+
+  Args:
+    tasks: List of Tasks, in the order they were produced.
   """
   pass
 
 
+def _GetTaskArgsSize(args):
+  """Returns the number of bytes a task will transfer, or 0 if unknown."""
+  if isinstance(args, NameExpansionResult) or isinstance(args, CopyObjectInfo):
+    if args.object_summary and args.object_summary.size:
+      return int(args.object_summary.size)
+  elif isinstance(args, RsyncDiffToApply):
+    if args.copy_size:
+      return int(args.copy_size)
+  return 0
+
+
+def _GetUrlStringPrefix(url_str):
+  """Returns url_str up to its last path delimiter."""
+  return url_str[:max(url_str.rfind('/'), url_str.rfind(os.sep), 0)]
+
+
+def _GetTaskAffinityKey(args):
+  """Returns a string shared by tasks that should run in the same process.
+
+  Tasks for objects in the same destination bucket and source prefix share a
+  key, so that a WorkStealingTaskQueue hands them to the same worker process
+  where they can reuse its connections.
+
+  Args:
+    args: The args of a Task.
+
+  Returns:
+    The affinity key, or None if args has no URLs to derive it from.
+  """
+  if isinstance(args, CopyObjectInfo):
+    return '%s|%s' % (args.exp_dst_url.bucket_name,
+                      _GetUrlStringPrefix(args.expanded_storage_url.url_string))
+  elif isinstance(args, NameExpansionResult):
+    return _GetUrlStringPrefix(args.expanded_storage_url.url_string)
+  elif isinstance(args, RsyncDiffToApply):
+    return _GetUrlStringPrefix(args.dst_url_str)
+  return None
+
+
+class WorkStealingTaskQueue(object):
+  """Task queue with a separate multiprocessing queue per worker process.
+
+  Each item is put on the queue of the worker process selected by the
+  affinity key of its (first) Task, or on the next queue in turn if it has
+  none. A worker process takes items from its own queue first, and steals
+  from the other processes' queues when its own is empty, so that a process
+  that drew a few large objects doesn't keep the others idle.
+
+  Like the queues it wraps, this is created before the worker processes are
+  forked and inherited by them.
+  """
+
+  def __init__(self, queues, affinity_func):
+    """Instantiates a WorkStealingTaskQueue.
+
+    Args:
+      queues: List of multiprocessing queues, one per worker process.
+      affinity_func: Function mapping the args of a Task to its affinity key
+          string, or None.
+    """
+    self.queues = queues
+    self.affinity_func = affinity_func
+    self.next_queue_index = 0
+
+  def _GetQueueIndex(self, item):
+    task = item.tasks[0] if isinstance(item, TaskBatch) else item
+    affinity_key = self.affinity_func(task.args)
+    if affinity_key is None:
+      self.next_queue_index = (self.next_queue_index + 1) % len(self.queues)
+      return self.next_queue_index
+    # Unlike hash(), crc32 is stable across processes.
+    return ((zlib.crc32(six.ensure_binary(affinity_key)) & 0xffffffff) %
+            len(self.queues))
+
+  def put(self, item):
+    self.queues[self._GetQueueIndex(item)].put(item)
+
+  def qsize(self):
+    return sum(queue.qsize() for queue in self.queues)
+
+  def GetForConsumer(self, consumer_index):
+    """Returns the next item for a worker process, blocking until one exists.
+
+    Args:
+      consumer_index: Index of the worker process's own queue.
+
+    Returns:
+      A Task or TaskBatch.
+    """
+    num_queues = len(self.queues)
+    while True:
+      for offset in range(num_queues):
+        queue = self.queues[(consumer_index + offset) % num_queues]
+        try:
+          return queue.get_nowait()
+        except Queue.Empty:
+          pass
+      try:
+        return self.queues[consumer_index].get(
+            timeout=WORK_STEALING_POLL_INTERVAL)
+      except Queue.Empty:
+        pass
+
+
+def _AcquireWorkerSemaphore(worker_semaphore):
+  """Acquires worker_semaphore without blocking signal handling."""
+  while not worker_semaphore.acquire(blocking=False):
+    # Because Python signal handlers are only called in between atomic
+    # instructions, if we block the main thread on an available worker
+    # thread, we won't be able to respond to signals such as a
+    # user-initiated CTRL-C until a worker thread completes a task.
+    # We poll the semaphore periodically as a compromise between
+    # efficiency and user responsiveness.
+    time.sleep(0.01)
+
+
 # TODO: Refactor the various threading code that doesn't need to depend on
 # command.py globals (ProducerThread, UIThread) to different files to aid
 # readability and reduce the size of command.py.
@@ -1990,7 +2331,11 @@ class ProducerThread(threading.Thread):
                arg_checker,
                fail_on_error,
                seek_ahead_iterator=None,
-               status_queue=None):
+               status_queue=None,
+               task_batch_size=1,
+               task_batch_min_waiting=0,
+               task_reorder_window=0,
+               lane=OBJECT_LANE):
     """Initializes the producer thread.
 
     Args:
@@ -2020,6 +2365,16 @@ class ProducerThread(threading.Thread):
           is a collection of NameExpansionResults, which is the type that gives
           us initial information about files to be processed. Otherwise,
           nothing will be added to the queue.
+      task_batch_size: Maximum number of tasks to put on task_queue as a
+          single TaskBatch. Only valid if task_queue is consumed by
+          Command._ApplyThreads, i.e., if multiple processes are used.
+      task_batch_min_waiting: Tasks are only batched while at least this many
+          tasks of their lane are waiting to start.
+      task_reorder_window: If greater than 1, tasks are collected into groups
+          of this many and each group is put on task_queue largest first, so
+          that the biggest transfers start early rather than at the tail of
+          the operation.
+      lane: Lane of the produced tasks.
     """
     super(ProducerThread, self).__init__()
     self.func = func
@@ -2037,17 +2392,90 @@ class ProducerThread(threading.Thread):
     self.iterator_exception = None
     self.seek_ahead_iterator = seek_ahead_iterator
     self.status_queue = status_queue
+    self.task_batch_size = task_batch_size
+    self.task_batch_min_waiting = task_batch_min_waiting
+    self.task_reorder_window = task_reorder_window
+    self.lane = lane
+    # Tasks produced but not yet put on the task queue. The most recent task
+    # is always held back until the loop exits (see run).
+    self.pending_tasks = []
+    self.pending_bytes = 0
+    self.pending_start_time = None
+    self.last_task_size = 0
+    # Guards the pending tasks, which the batch timer thread also puts.
+    self.pending_cond = threading.Condition()
+    self.done_producing = False
     self.start()
 
+  def _PutTasks(self, tasks):
+    if tasks[0].args != ZERO_TASKS_TO_DO_ARGUMENT:
+      task_lanes.AddWaiting(self.lane, len(tasks))
+    if len(tasks) == 1:
+      self.task_queue.put(tasks[0])
+    else:
+      self.task_queue.put(TaskBatch(tasks))
+
+  def _AddPendingTask(self, task, task_size):
+    """Adds a task to the pending batch, first putting the batch if full."""
+    with self.pending_cond:
+      if self.pending_tasks and (
+          len(self.pending_tasks) >= self.task_batch_size or
+          self.pending_bytes >= TASK_BATCH_MAX_BYTES or
+          time.time() - self.pending_start_time >= TASK_BATCH_MAX_DELAY or
+          task_lanes.GetWaiting(self.lane) < self.task_batch_min_waiting):
+        self._PutTasks(self.pending_tasks)
+        self.pending_tasks = []
+        self.pending_bytes = 0
+      if not self.pending_tasks and self.task_batch_size > 1:
+        self.pending_start_time = time.time()
+      self.pending_tasks.append(task)
+      self.pending_bytes += task_size
+      self.last_task_size = task_size
+      if len(self.pending_tasks) == 2:
+        # There are now tasks that the batch timer may put.
+        self.pending_cond.notify()
+
+  def _RunBatchTimer(self):
+    """Puts pending tasks once the first has waited TASK_BATCH_MAX_DELAY.
+
+    This keeps tasks from a slow args_iterator from waiting on the next one.
+    The most recent task is held back, as it may be the last.
+    """
+    with self.pending_cond:
+      while not self.done_producing:
+        timeout = None
+        if len(self.pending_tasks) > 1:
+          timeout = (self.pending_start_time + TASK_BATCH_MAX_DELAY -
+                     time.time())
+          if timeout <= 0:
+            self._PutTasks(self.pending_tasks[:-1])
+            self.pending_tasks = self.pending_tasks[-1:]
+            self.pending_bytes = self.last_task_size
+            self.pending_start_time = time.time()
+            continue
+        self.pending_cond.wait(timeout)
+
+  def _AddReorderedTasks(self, sized_tasks):
+    """Adds (size, task) pairs to the pending batch, largest first."""
+    # The sort is stable, so tasks of equal (e.g., unknown) size keep the
+    # order in which they were produced.
+    sized_tasks.sort(key=lambda sized_task: -sized_task[0])
+    for task_size, task in sized_tasks:
+      self._AddPendingTask(task, task_size)
+
   def run(self):
     num_tasks = 0
-    cur_task = None
-    last_task = None
+    # (size, task) pairs waiting to be reordered, if task_reorder_window > 1.
+    reorder_buffer = []
     task_estimation_threshold = None
     seek_ahead_thread = None
     seek_ahead_thread_cancel_event = None
     seek_ahead_thread_considered = False
     args = None
+    if self.task_batch_size > 1:
+      batch_timer_thread = threading.Thread(target=self._RunBatchTimer)
+      batch_timer_thread.daemon = True
+      batch_timer_thread.start()
     try:
       total_size = 0
       self.args_iterator = iter(self.args_iterator)
@@ -2073,6 +2501,10 @@ class ProducerThread(threading.Thread):
 
         if self.arg_checker(self.cls, args):
           num_tasks += 1
+          args_size = 0
+          if (self.status_queue or self.task_batch_size > 1 or
+              self.task_reorder_window > 1):
+            args_size = _GetTaskArgsSize(args)
           if self.status_queue:
             if not num_tasks % 100:
               # Time to update the total number of tasks.
@@ -2082,15 +2514,7 @@ class ProducerThread(threading.Thread):
                 PutToQueueWithTimeout(
                     self.status_queue,
                     ProducerThreadMessage(num_tasks, total_size, time.time()))
-            if (isinstance(args, NameExpansionResult) or
-                isinstance(args, CopyObjectInfo)):
-              if args.expanded_result:
-                json_expanded_result = json.loads(args.expanded_result)
-                if 'size' in json_expanded_result:
-                  total_size += int(json_expanded_result['size'])
-            elif isinstance(args, RsyncDiffToApply):
-              if args.copy_size:
-                total_size += int(args.copy_size)
+            total_size += args_size
 
           if not seek_ahead_thread_considered:
             if task_estimation_threshold is None:
@@ -2110,12 +2534,16 @@ class ProducerThread(threading.Thread):
 
               seek_ahead_thread_considered = True
 
-          last_task = cur_task
           cur_task = Task(self.func, args, self.caller_id,
                           self.exception_handler, self.should_return_results,
-                          self.arg_checker, self.fail_on_error)
-          if last_task:
-            self.task_queue.put(last_task)
+                          self.arg_checker, self.fail_on_error, self.lane)
+          if self.task_reorder_window > 1:
+            reorder_buffer.append((args_size, cur_task))
+            if len(reorder_buffer) >= self.task_reorder_window:
+              self._AddReorderedTasks(reorder_buffer)
+              reorder_buffer = []
+          else:
+            self._AddPendingTask(cur_task, args_size)
     except Exception as e:  # pylint: disable=broad-except
       # This will also catch any exception raised due to an error in the
       # iterator when fail_on_error is set, so check that we failed for some
@@ -2129,11 +2557,18 @@ class ProducerThread(threading.Thread):
       # producing all before we update total_tasks. This approach forces workers
       # to wait on the last task until after we've updated total_tasks.
       total_tasks[self.caller_id] = num_tasks
-      if not cur_task:
-        # This happens if there were zero arguments to be put in the queue.
-        cur_task = Task(None, ZERO_TASKS_TO_DO_ARGUMENT, self.caller_id, None,
-                        None, None, None)
-      self.task_queue.put(cur_task)
+      if reorder_buffer:
+        self._AddReorderedTasks(reorder_buffer)
+      with self.pending_cond:
+        if not self.pending_tasks:
+          # This happens if there were zero arguments to be put in the queue.
+          self.pending_tasks = [
+              Task(None, ZERO_TASKS_TO_DO_ARGUMENT, self.caller_id, None, None,
+                   None, None, self.lane)
+          ]
+        self._PutTasks(self.pending_tasks)
+        self.done_producing = True
+        self.pending_cond.notify()
 
       # If the seek ahead thread is still running, cancel it and wait for it
       # to exit since we've enumerated all of the tasks already. We don't want
@@ -2261,16 +2696,23 @@ class WorkerThread(threading.Thread):
     self.cached_classes = {}
     self.shared_vars_updater = _SharedVariablesUpdater()
     self.user_project = user_project
+    # Lane of the task this thread is running, if any.
+    self.running_lane = None
 
     # Note that thread_gsutil_api is not initialized in the sequential
     # case; task functions should use utils.cloud_api_helper.GetCloudApiInstance
     # to retrieve the main thread's CloudApiDelegator in that case.
     self.thread_gsutil_api = None
+    # Status messages from this thread are batched, and flushed at the latest
+    # when each task completes.
+    self.status_queue = None
+    if status_queue:
+      self.status_queue = CoalescingStatusQueue(status_queue)
     if bucket_storage_uri_class and gsutil_api_map:
       self.thread_gsutil_api = CloudApiDelegator(bucket_storage_uri_class,
                                                  gsutil_api_map,
                                                  logger,
-                                                 status_queue,
+                                                 self.status_queue,
                                                  debug=debug,
                                                  user_project=self.user_project)
 
@@ -2321,6 +2763,9 @@ class WorkerThread(threading.Thread):
               'Caught exception while handling exception for %s:\n%s', task,
               traceback.format_exc())
     finally:
+      # Post this task's status messages before reporting it as done, so they
+      # are processed before anything that waits on the task.
+      self.FlushStatusMessages()
       if self.worker_semaphore:
         self.worker_semaphore.release()
       self.shared_vars_updater.Update(caller_id, cls)
@@ -2331,6 +2776,11 @@ class WorkerThread(threading.Thread):
       num_done = caller_id_finished_count.Increment(caller_id, 1)
       _NotifyIfDone(caller_id, num_done)
 
+  def FlushStatusMessages(self):
+    """Posts any status messages buffered by this thread."""
+    if self.status_queue:
+      self.status_queue.Flush()
+
   def run(self):
     while True:
       self._StartBlockedTime()
@@ -2349,7 +2799,16 @@ class WorkerThread(threading.Thread):
         cls.logger = CreateOrGetGsutilLogger(cls.command_name)
         self.cached_classes[caller_id] = cls
 
-      self.PerformTask(task, cls)
+      while not task_lanes.TryStart(task.lane):
+        # The other lane has waiting tasks and this lane already has its share
+        # of running ones.
+        time.sleep(0.01)
+      self.running_lane = task.lane
+      try:
+        self.PerformTask(task, cls)
+      finally:
+        self.running_lane = None
+        task_lanes.Finish(task.lane)
 
 
 class _ThreadStat(object):
@@ -19,7 +19,6 @@ from __future__ import print_function
 from __future__ import division
 from __future__ import unicode_literals
 
-from apitools.base.py import encoding
 from gslib import metrics
 from gslib.cloud_api import AccessDeniedException
 from gslib.cloud_api import BadRequestException
@@ -440,8 +439,7 @@ class AclCommand(Command):
                                     fields=['acl', 'metageneration'])
       current_acl = bucket.acl
     elif url.IsObject():
-      gcs_object = encoding.JsonToMessage(apitools_messages.Object,
-                                          name_expansion_result.expanded_result)
+      gcs_object = name_expansion_result.GetExpandedObject()
       current_acl = gcs_object.acl
 
     if not current_acl:
@@ -35,7 +35,7 @@ if six.PY3:
   long = int
 
 _SYNOPSIS = """
-  gsutil cat [-h] url...
+  gsutil cat [-h] [--unordered] url...
 """
 
 _DETAILED_HELP_TEXT = ("""
@@ -52,6 +52,15 @@ _DETAILED_HELP_TEXT = ("""
 
   (The final '-' causes gsutil to stream the output to stdout.)
 
+  To stream large objects faster, you can set the "cat_parallel_reads" option
+  in the [GSUtil] section of your .boto configuration file, which makes cat
+  read several ranges of each object at once, and read ahead into the next
+  object while writing the current one. The output is the same either way.
+  The top-level -m option does the same, reading parallel_thread_count ranges
+  at once, which also speeds up cat of many small objects:
+
+    gsutil -m cat gs://bucket/logs/*.json
+
 
 <B>WARNING: DATA INTEGRITY CHECKING NOT DONE</B>
   The gsutil cat command does not compute a checksum of the downloaded data.
@@ -87,6 +96,11 @@ _DETAILED_HELP_TEXT = ("""
                 gsutil cat -r -5 gs://bucket/object
 
               returns the final 5 bytes of the object.
+
+  --unordered When reading objects in parallel, outputs each object as soon as
+              it has been read, rather than in the order they are listed. The
+              contents of each object are still output whole, without being
+              interleaved with other objects.
 """)
 
 
@@ -101,6 +115,7 @@ class CatCommand(Command):
       min_args=1,
       max_args=constants.NO_MAX,
       supported_sub_args='hr:',
+      supported_private_args=['unordered'],
       file_url_ok=False,
       provider_url_ok=False,
       urls_start_arg=0,
@@ -124,6 +139,7 @@ class CatCommand(Command):
     request_range = None
     start_byte = 0
     end_byte = None
+    unordered = False
     if self.sub_opts:
       for o, a in self.sub_opts:
         if o == '-h':
@@ -141,10 +157,13 @@ class CatCommand(Command):
             end_byte = long(range_match.group('end'))
           if range_match.group('endslice'):
             start_byte = long(range_match.group('endslice'))
+        elif o == '--unordered':
+          unordered = True
         else:
           self.RaiseInvalidArgumentException()
 
     return cat_helper.CatHelper(self).CatUrlStrings(self.args,
                                                     show_header=show_header,
                                                     start_byte=start_byte,
-                                                    end_byte=end_byte)
+                                                    end_byte=end_byte,
+                                                    unordered=unordered)
@@ -29,6 +29,10 @@ from gslib.exception import CommandException
 from gslib.storage_url import ContainsWildcard
 from gslib.storage_url import StorageUrlFromString
 from gslib.third_party.storage_apitools import storage_v1_messages as apitools_messages
+from gslib.utils.compose_util import ComposeSource
+from gslib.utils.compose_util import ComposeSourceFromObjectMetadata
+from gslib.utils.compose_util import ComposeTree
+from gslib.utils.constants import NO_MAX
 from gslib.utils.encryption_helper import GetEncryptionKeyWrapper
 from gslib.utils.translation_helper import PreconditionsFromHeaders
 
@@ -70,7 +74,12 @@ _DETAILED_HELP_TEXT = ("""
     $ gsutil rm gs://bucket/data-to-append
 
   Note that there is a limit (currently %d) to the number of components that can
-  be composed in a single operation.
+  be composed in a single compose request. If you specify more source objects
+  than that, gsutil composes them in balanced groups into temporary
+  intermediate objects, composes those (repeating as needed) into the
+  destination object, verifies the resulting CRC32C, and deletes the
+  intermediate objects. The intermediate objects of each level are composed in
+  parallel if you use the top-level gsutil -m option.
 """ % (MAX_COMPOSE_ARITY))
 
 
@@ -83,7 +92,7 @@ class ComposeCommand(Command):
       command_name_aliases=['concat'],
       usage_synopsis=_SYNOPSIS,
       min_args=1,
-      max_args=MAX_COMPOSE_ARITY + 1,
+      max_args=NO_MAX,
       supported_sub_args='',
       # Not files, just object names without gs:// prefix.
       file_url_ok=False,
@@ -128,7 +137,10 @@ class ComposeCommand(Command):
     first_src_url = None
     for src_url_str in self.args:
       if ContainsWildcard(src_url_str):
-        src_url_iter = self.WildcardIterator(src_url_str).IterObjects()
+        # Listing returns the hashes and sizes for free, allowing the composed
+        # object to be verified.
+        src_url_iter = self.WildcardIterator(src_url_str).IterObjects(
+            bucket_listing_fields=['crc32c', 'generation', 'name', 'size'])
       else:
         src_url_iter = [BucketListingObject(StorageUrlFromString(src_url_str))]
       for blr in src_url_iter:
@@ -140,17 +152,13 @@ class ComposeCommand(Command):
 
         if not first_src_url:
           first_src_url = src_url
-        src_obj_metadata = (
-            apitools_messages.ComposeRequest.SourceObjectsValueListEntry(
-                name=src_url.object_name))
+        if blr.root_object:
+          component = ComposeSourceFromObjectMetadata(blr.root_object)
+        else:
+          component = ComposeSource(src_url.object_name, None, None, None)
         if src_url.HasGeneration():
-          src_obj_metadata.generation = src_url.generation
-        components.append(src_obj_metadata)
-        # Avoid expanding too many components, and sanity check each name
-        # expansion result.
-        if len(components) > MAX_COMPOSE_ARITY:
-          raise CommandException('"compose" called with too many component '
-                                 'objects. Limit is %d.' % MAX_COMPOSE_ARITY)
+          component = component._replace(generation=src_url.generation)
+        components.append(component)
 
     if not components:
       raise CommandException('"compose" requires at least 1 component object.')
@@ -165,9 +173,12 @@ class ComposeCommand(Command):
 
     self.logger.info('Composing %s from %d component object(s).', target_url,
                      len(components))
-    self.gsutil_api.ComposeObject(
-        components,
-        dst_obj_metadata,
-        preconditions=preconditions,
-        provider=target_url.scheme,
-        encryption_tuple=GetEncryptionKeyWrapper(config))
+    ComposeTree(self,
+                self.gsutil_api,
+                components,
+                target_url,
+                dst_obj_metadata,
+                MAX_COMPOSE_ARITY,
+                self.logger,
+                preconditions=preconditions,
+                encryption_tuple=GetEncryptionKeyWrapper(config))
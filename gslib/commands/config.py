@@ -37,13 +37,18 @@ import boto
 from boto.provider import Provider
 import gslib
 from gslib.command import Command
+from gslib.command import DEFAULT_TASK_BATCH_SIZE
 from gslib.command import DEFAULT_TASK_ESTIMATION_THRESHOLD
+from gslib.command import DEFAULT_TASK_REORDER_WINDOW
+from gslib.command import DEFAULT_TASK_SCHEDULER
 from gslib.commands.compose import MAX_COMPONENT_COUNT
+from gslib.commands.compose import MAX_COMPOSE_ARITY
 from gslib.cred_types import CredTypes
 from gslib.exception import AbortException
 from gslib.exception import CommandException
 from gslib.metrics import CheckAndMaybePromptForAnalyticsEnabling
 from gslib.sig_handling import RegisterSignalHandler
+from gslib.telemetry import DEFAULT_TELEMETRY_INTERVAL
 from gslib.utils import constants
 from gslib.utils import system_util
 from gslib.utils.hashing_helper import CHECK_HASH_ALWAYS
@@ -232,16 +237,30 @@ _DETAILED_HELP_TEXT = ("""
       service_account
 
     [GSUtil]
+      cat_parallel_reads
+      cat_range_size
       check_hashes
+      circuit_breaker_threshold
+      component_task_share
       content_language
       decryption_key1 ... 100
       default_api_version
       default_project_id
       disable_analytics_prompt
       encryption_key
+      hedge_budget_percent
+      hedge_percentile
+      hedge_requests
       json_api_version
+      local_walk_threads
+      manifest_flush_interval
+      manifest_fsync
+      max_bandwidth
+      max_bucket_request_rate
+      max_retry_rate
       max_upload_compression_buffer_size
       parallel_composite_upload_component_size
+      parallel_composite_upload_max_components
       parallel_composite_upload_threshold
       sliced_object_download_component_size
       sliced_object_download_max_components
@@ -253,13 +272,20 @@ _DETAILED_HELP_TEXT = ("""
       resumable_threshold
       resumable_tracker_dir (deprecated in 4.6, use state_dir)
       rsync_buffer_lines
+      rsync_streaming_diff
       software_update_check_period
       state_dir
       tab_completion_time_logs
       tab_completion_timeout
+      task_batch_size
       task_estimation_threshold
+      task_reorder_window
+      task_scheduler
+      telemetry_file
+      telemetry_interval
       test_cmd_regional_bucket_location
       test_notification_url
+      tracker_store
       use_magicfile
 
     [OAuth2]
@@ -367,6 +393,7 @@ else:
 # revert DEFAULT_PARALLEL_COMPOSITE_UPLOAD_THRESHOLD value to '150M'.
 DEFAULT_PARALLEL_COMPOSITE_UPLOAD_THRESHOLD = '0'
 DEFAULT_PARALLEL_COMPOSITE_UPLOAD_COMPONENT_SIZE = '50M'
+DEFAULT_PARALLEL_COMPOSITE_UPLOAD_MAX_COMPONENTS = MAX_COMPOSE_ARITY
 DEFAULT_SLICED_OBJECT_DOWNLOAD_THRESHOLD = '150M'
 DEFAULT_SLICED_OBJECT_DOWNLOAD_COMPONENT_SIZE = '200M'
 DEFAULT_SLICED_OBJECT_DOWNLOAD_MAX_COMPONENTS = 4
@@ -380,6 +407,10 @@ DEFAULT_MAX_UPLOAD_COMPRESSION_BUFFER_SIZE = '2G'
 # gzip compression level. This is simply making the python stdlib default explicit.
 DEFAULT_GZIP_COMPRESSION_LEVEL = 9
 
+# Maximum number of seconds that rows of a cp -L manifest are buffered before
+# being flushed to the manifest file.
+DEFAULT_MANIFEST_FLUSH_INTERVAL = 1
+
 CONFIG_BOTO_SECTION_CONTENT = """
 [Boto]
 
@@ -467,6 +498,46 @@ CONFIG_INPUTLESS_GSUTIL_SECTION_CONTENT = """
 # operations.
 #rsync_buffer_lines = 32000
 
+# 'rsync_streaming_diff' makes rsync compare the source and destination
+# listings while they're being made, rather than first listing and sorting
+# both in full, so that copies start as soon as the first differences are
+# found. Cloud listings are already in name order, and local directories are
+# walked in name order. Deletions (rsync -d) are still only performed once both
+# listings are complete. rsync falls back to sorted listings when the order
+# can't be guaranteed, and doesn't estimate the total work to be done in this
+# mode. The default is False.
+#rsync_streaming_diff = True
+
+# 'tracker_store' specifies how gsutil stores the tracker data used to resume
+# interrupted transfers. With 'files' (the default), each upload, download,
+# download slice and rewrite gets its own file in the tracker file directory.
+# With 'sqlite', all tracker data is kept in a single SQLite database in that
+# directory, which avoids creating (and leaving behind) a very large number of
+# small files during large parallel transfers. Switching stores doesn't
+# migrate existing tracker data, so interrupted transfers restart from scratch.
+#tracker_store = files
+
+# 'manifest_flush_interval' specifies the maximum number of seconds that rows
+# of a manifest log file (see the -L option of "gsutil help cp") are buffered
+# in memory before being written out. Rows are always written out when the
+# command finishes. The default is %(manifest_flush_interval)d; 0 writes rows
+# out as soon as they are available. 'manifest_fsync' additionally forces the
+# manifest to disk (fsync) each time rows are written out, at the cost of
+# slower manifest writes. The default is False.
+#manifest_flush_interval = %(manifest_flush_interval)d
+#manifest_fsync = False
+
+# 'telemetry_file' specifies a file to which gsutil appends a JSON snapshot of
+# the progress of each command every 'telemetry_interval' seconds (default
+# %(telemetry_interval)d), one snapshot per line. Snapshots include bytes and
+# objects transferred and their rates, transfer latency histograms, retry
+# counts, the number of active workers and queue depths, so that monitoring
+# agents can track long-running commands such as "gsutil -m cp" and
+# "gsutil -m rsync". This is typically set for a single command, e.g.:
+#   gsutil -o "GSUtil:telemetry_file=/tmp/telemetry.jsonl" -m cp -r dir gs://b
+#telemetry_file = <file_path>
+#telemetry_interval = %(telemetry_interval)d
+
 # 'state_dir' specifies the base location where files that
 # need a static location are stored, such as pointers to credentials,
 # resumable transfer tracker files, and the last software update check.
@@ -500,8 +571,7 @@ CONFIG_INPUTLESS_GSUTIL_SECTION_CONTENT = """
 # into a single object.
 # The number of components will be the smaller of
 # ceil(file_size / parallel_composite_upload_component_size) and
-# MAX_COMPONENT_COUNT. The current value of MAX_COMPONENT_COUNT is
-# %(max_component_count)d.
+# 'parallel_composite_upload_max_components'.
 # If 'parallel_composite_upload_threshold' is set to 0, then automatic parallel
 # uploads will never occur.
 # Setting an extremely low threshold is unadvisable. The vast majority of
@@ -510,9 +580,15 @@ CONFIG_INPUTLESS_GSUTIL_SECTION_CONTENT = """
 # 'parallel_composite_upload_component_size' specifies the ideal size of a
 # component in bytes, which will act as an upper bound to the size of the
 # components if ceil(file_size / parallel_composite_upload_component_size) is
-# less than MAX_COMPONENT_COUNT.
+# less than 'parallel_composite_upload_max_components'.
 # Values can be provided either in bytes or as human-readable values
 # (e.g., "150M" to represent 150 mebibytes)
+# 'parallel_composite_upload_max_components' specifies the maximum number of
+# components to upload in parallel. Up to %(max_compose_arity)d components are
+# composed in a single request; larger counts are composed through a tree of
+# temporary intermediate objects, allowing smaller components and more
+# parallelism for very large files. It cannot exceed MAX_COMPONENT_COUNT, whose
+# current value is %(max_component_count)d.
 #
 # Note: At present parallel composite uploads are disabled by default, because
 # using composite objects requires a compiled crcmod (see "gsutil help crcmod"),
@@ -532,6 +608,7 @@ CONFIG_INPUTLESS_GSUTIL_SECTION_CONTENT = """
 
 #parallel_composite_upload_threshold = %(parallel_composite_upload_threshold)s
 #parallel_composite_upload_component_size = %(parallel_composite_upload_component_size)s
+#parallel_composite_upload_max_components = %(upload_max_components)d
 
 # 'sliced_object_download_threshold' and
 # 'sliced_object_download_component_size' have analogous functionality to
@@ -543,6 +620,72 @@ CONFIG_INPUTLESS_GSUTIL_SECTION_CONTENT = """
 #sliced_object_download_component_size = %(sliced_object_download_component_size)s
 #sliced_object_download_max_components = %(sliced_object_download_max_components)s
 
+# 'component_task_share' sets the share of the parallel_process_count *
+# parallel_thread_count workers used for component tasks (slices of sliced
+# object downloads and components of parallel composite uploads) while
+# whole-object tasks are waiting, and vice versa; e.g., 0.25 lets components
+# use a quarter of the workers when small files are also being copied. Either
+# kind of task can use all workers while the other has none waiting. By
+# default, the two kinds of tasks are not limited.
+#component_task_share = 0.5
+
+# 'max_bandwidth' limits the total rate at which gsutil uploads and downloads
+# file data, across all of its processes and threads, in bytes per second.
+# Values can be provided either in bytes or as human-readable values (e.g.,
+# "50M" for 50 mebibytes per second). It is not limited by default.
+#max_bandwidth = 50M
+
+# 'max_bucket_request_rate' limits the rate of object requests (reads, writes,
+# copies and deletes of objects) that gsutil sends to each bucket, in requests
+# per second, e.g., to stay under a bucket's initial request rate while its
+# capacity ramps up. It is not limited by default.
+#max_bucket_request_rate = 1000
+
+# 'circuit_breaker_threshold' makes all of gsutil's processes and threads
+# coordinate their backoff when requests to a bucket fail with 429 or 5xx
+# errors or dropped connections. Errors are counted across all workers, their
+# backoff grows with that count, and Retry-After headers are honored. Once a
+# bucket has seen this many errors in the last minute, all requests to it,
+# not only retries, wait until the shared backoff expires. Backoff is not
+# coordinated by default.
+#circuit_breaker_threshold = 10
+
+# 'max_retry_rate' limits the rate at which gsutil retries failed requests,
+# across all of its processes and threads, in retries per second, so that a
+# large parallel command doesn't add to the load on a struggling service. It
+# is not limited by default.
+#max_retry_rate = 10
+
+# 'cat_parallel_reads' makes the cat command read each object as ranges of
+# 'cat_range_size' bytes, this many at a time, writing them out in order, and
+# read ahead into the next objects matched while writing the current one. Up
+# to twice this many ranges are held in memory at once. Objects stored with
+# Content-Encoding:gzip are still read as a single stream. Ranges are not read
+# in parallel by default, unless the top-level -m option is given, in which
+# case parallel_thread_count ranges are read at a time.
+#cat_parallel_reads = 4
+#cat_range_size = %(cat_range_size)s
+
+# 'local_walk_threads' sets the number of threads that list local directories,
+# and stat the files in them, when cp, mv or rsync walk a local directory tree
+# (or rsync lists a local directory without -r). On network filesystems like
+# NFS or Lustre, where each of these requests waits on a server, walking with
+# many threads can speed up enumerating files a lot. With more than one
+# thread, files are found in no particular order.
+#local_walk_threads = 16
+
+# 'hedge_requests', if True, makes gsutil hedge object metadata requests and
+# downloads of small objects (up to 1 MiB): if a request hasn't completed
+# after the 'hedge_percentile' percentile of recent latencies of requests of
+# its kind, gsutil sends a duplicate request and uses whichever response
+# arrives first. At most 'hedge_budget_percent' percent of requests are
+# duplicated. This can cut the tail latency of commands like cat, stat, and cp
+# of many small objects, at the cost of some extra requests. Requests are not
+# hedged by default.
+#hedge_requests = False
+#hedge_percentile = %(hedge_percentile)s
+#hedge_budget_percent = %(hedge_budget_percent)s
+
 # Compressed transport encoded uploads buffer chunks of compressed data. When
 # running a composite upload and/or many uploads in parallel, compression may
 # consume more memory than available. This setting restricts the number of
@@ -566,6 +709,24 @@ CONFIG_INPUTLESS_GSUTIL_SECTION_CONTENT = """
 # listing calls; to disable it entirely, set this value to 0.
 #task_estimation_threshold=%(task_estimation_threshold)s
 
+# 'task_batch_size' controls how many tasks gsutil sends to a worker process
+# at once when multiple processes are used. Larger batches reduce the
+# overhead of handing out many small tasks (e.g., copying many small files),
+# at the cost of less even load balancing between processes. Tasks are only
+# batched while there is a backlog of them waiting to start.
+#task_batch_size=%(task_batch_size)s
+
+# 'task_scheduler' controls how tasks are distributed to worker processes when
+# multiple processes are used. With "fifo", all processes take tasks in order
+# from one shared queue. With "work_stealing", each process has its own queue:
+# tasks for objects under the same destination bucket and source prefix go to
+# the same process, a process whose queue is empty takes tasks from the
+# others, and tasks are reordered largest first within groups of
+# 'task_reorder_window' tasks, which can shorten the tail of transfers with a
+# few very large objects.
+#task_scheduler=%(task_scheduler)s
+#task_reorder_window=%(task_reorder_window)s
+
 # 'use_magicfile' specifies if the 'file --mime <filename>' command should be
 # used to guess content types instead of the default filename extension-based
 # mechanism. Available on UNIX and macOS (and possibly on Windows, if you're
@@ -669,14 +830,34 @@ content_language = en
     (DEFAULT_PARALLEL_COMPOSITE_UPLOAD_COMPONENT_SIZE),
     'sliced_object_download_max_components':
     (DEFAULT_SLICED_OBJECT_DOWNLOAD_MAX_COMPONENTS),
+    'upload_max_components':
+    (DEFAULT_PARALLEL_COMPOSITE_UPLOAD_MAX_COMPONENTS),
+    'max_compose_arity':
+    MAX_COMPOSE_ARITY,
     'max_component_count':
     MAX_COMPONENT_COUNT,
     'task_estimation_threshold':
     DEFAULT_TASK_ESTIMATION_THRESHOLD,
+    'task_batch_size':
+    DEFAULT_TASK_BATCH_SIZE,
+    'task_scheduler':
+    DEFAULT_TASK_SCHEDULER,
+    'task_reorder_window':
+    DEFAULT_TASK_REORDER_WINDOW,
     'max_upload_compression_buffer_size':
     (DEFAULT_MAX_UPLOAD_COMPRESSION_BUFFER_SIZE),
     'gzip_compression_level':
     DEFAULT_GZIP_COMPRESSION_LEVEL,
+    'manifest_flush_interval':
+    DEFAULT_MANIFEST_FLUSH_INTERVAL,
+    'telemetry_interval':
+    DEFAULT_TELEMETRY_INTERVAL,
+    'cat_range_size':
+    constants.DEFAULT_CAT_RANGE_SIZE,
+    'hedge_percentile':
+    constants.DEFAULT_HEDGE_PERCENTILE,
+    'hedge_budget_percent':
+    constants.DEFAULT_HEDGE_BUDGET_PERCENT,
 }
 
 CONFIG_OAUTH2_CONFIG_CONTENT = """
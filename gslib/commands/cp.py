@@ -23,10 +23,12 @@ from __future__ import unicode_literals
 import itertools
 import logging
 import os
+import sys
 import time
 import traceback
 
-from apitools.base.py import encoding
+import six
+
 from gslib.command import Command
 from gslib.command_argument import CommandArgument
 from gslib.commands.compose import MAX_COMPONENT_COUNT
@@ -55,6 +57,10 @@ from gslib.utils.copy_helper import ItemExistsError
 from gslib.utils.copy_helper import Manifest
 from gslib.utils.copy_helper import PARALLEL_UPLOAD_TEMP_NAMESPACE
 from gslib.utils.copy_helper import SkipUnsupportedObjectError
+from gslib.utils.no_clobber_util import GetMaxListedNames
+from gslib.utils.no_clobber_util import ListExistingObjectNames
+from gslib.utils.no_clobber_util import MAX_LISTED_NAMES
+from gslib.utils.no_clobber_util import NAMES_PER_LISTING_PAGE
 from gslib.utils.posix_util import ConvertModeToBase8
 from gslib.utils.posix_util import DeserializeFileAttributesFromObjectMetadata
 from gslib.utils.posix_util import InitializeUserGroups
@@ -420,13 +426,20 @@ _PARALLEL_COMPOSITE_UPLOADS_TEXT = """
   to perform uploads in parallel for large, local files being uploaded to Google
   Cloud Storage. If enabled (see below), a large file will be split into
   component pieces that are uploaded in parallel and then composed in the cloud
-  (and the temporary components finally deleted). A file can be broken into as
-  many as 32 component pieces; until this piece limit is reached, the maximum
-  size of each component piece is determined by the variable
-  "parallel_composite_upload_component_size," specified in the [GSUtil] section
-  of your .boto configuration file (for files that are otherwise too big,
-  components are as large as needed to fit into 32 pieces). No additional local
-  disk space is required for this operation.
+  (and the temporary components finally deleted). By default a file can be
+  broken into as many as 32 component pieces; until this piece limit is
+  reached, the maximum size of each component piece is determined by the
+  variable "parallel_composite_upload_component_size," specified in the [GSUtil]
+  section of your .boto configuration file (for files that are otherwise too
+  big, components are as large as needed to fit into 32 pieces). No additional
+  local disk space is required for this operation.
+
+  The piece limit can be raised (up to 1024) with the
+  "parallel_composite_upload_max_components" variable, which allows smaller,
+  more numerous components and therefore more upload parallelism. Because a
+  single compose request accepts at most 32 sources, more than 32 components
+  are composed through a tree of temporary intermediate objects, which are
+  deleted once the final object is composed.
 
   Using parallel composite uploads presents a tradeoff between upload
   performance and download configuration: If you enable parallel composite
@@ -661,7 +674,13 @@ _OPTIONS_TEXT = """
                  will perform an additional GET request to check if an item
                  exists before attempting to upload the data. This will save
                  retransmitting data, but the additional HTTP requests may make
-                 small object transfers slower and more expensive.
+                 small object transfers slower and more expensive. When
+                 copying many sources (multiple source URLs, wildcards, -r or
+                 -I) to a gs:// destination, gsutil instead lists the existing
+                 objects under the destination once and checks each
+                 destination against that listing; objects created after the
+                 listing are still not overwritten, because each write is
+                 conditional on the destination not existing.
 
   -p             Causes ACLs to be preserved when copying in the cloud. Note
                  that this option has performance and cost implications when
@@ -944,10 +963,7 @@ class CpCommand(Command):
       raise CommandException('Cannot specify storage class for a non-cloud '
                              'destination: %s' % dst_url)
 
-    src_obj_metadata = None
-    if copy_object_info.expanded_result:
-      src_obj_metadata = encoding.JsonToMessage(
-          apitools_messages.Object, copy_object_info.expanded_result)
+    src_obj_metadata = copy_object_info.GetExpandedObject()
 
     if src_url.IsFileUrl() and preserve_posix:
       if not src_obj_metadata:
@@ -997,7 +1013,8 @@ class CpCommand(Command):
           manifest=self.manifest,
           gzip_encoded=self.gzip_encoded,
           gzip_exts=self.gzip_exts,
-          preserve_posix=preserve_posix)
+          preserve_posix=preserve_posix,
+          existing_dst_names=self.existing_dst_names)
       if copy_helper_opts.use_manifest:
         if md5:
           self.manifest.Set(exp_src_url.url_string, 'md5', md5)
@@ -1026,7 +1043,13 @@ class CpCommand(Command):
     except Exception as e:  # pylint: disable=broad-except
       if (copy_helper_opts.no_clobber and
           copy_helper.IsNoClobberServerException(e)):
-        message = 'Rejected (noclobber): %s' % dst_url
+        if (self.existing_dst_names and
+            self.existing_dst_names.Covers(dst_url)):
+          # The object was created after the destination was listed, e.g., by
+          # the copy of another source to the same destination.
+          message = 'Skipping existing item: %s' % dst_url
+        else:
+          message = 'Rejected (noclobber): %s' % dst_url
         self.logger.info(message)
         if copy_helper_opts.use_manifest:
           self.manifest.SetResult(exp_src_url.url_string, 0, 'skip', message)
@@ -1057,6 +1080,33 @@ class CpCommand(Command):
       # transferred from StatusMessages posted by operations within PerformCopy.
       self.total_bytes_transferred += bytes_transferred
 
+  def _CountSrcsUpTo(self, src_url_strs, max_count):
+    """Counts the sources that will be copied, up to max_count.
+
+    Args:
+      src_url_strs: Source URL strings, or a StdinIteratorCls if they're read
+          from stdin.
+      max_count: Number at which to stop counting.
+
+    Returns:
+      The number of sources, or max_count if there are at least that many.
+    """
+    copy_helper_opts = copy_helper.GetCopyHelperOpts()
+    if copy_helper_opts.read_args_from_stdin:
+      # The URLs read ahead are still returned when the copy iterates stdin.
+      # Each may expand to several sources, so this is a lower bound.
+      return src_url_strs.ReadAhead(max_count)
+    return sum(1 for _ in itertools.islice(
+        SeekAheadNameExpansionIterator(
+            self.command_name,
+            self.debug,
+            self.GetSeekAheadGsutilApi(),
+            src_url_strs,
+            self.recursion_requested or copy_helper_opts.perform_mv,
+            all_versions=self.all_versions,
+            project_id=self.project_id,
+            ignore_symlinks=self.exclude_symlinks), max_count))
+
   def _ConstructNameExpansionIteratorDstTupleIterator(self, src_url_strs_iter,
                                                       dst_url_strs):
     copy_helper_opts = copy_helper.GetCopyHelperOpts()
@@ -1175,6 +1225,27 @@ class CpCommand(Command):
           project_id=self.project_id,
           ignore_symlinks=self.exclude_symlinks)
 
+    # With many sources, list the destination prefix once so that -n can check
+    # destination existence locally rather than with a GET per object. Only
+    # gs supports the ifGenerationMatch=0 precondition that protects against
+    # objects created after the listing. Each page of the listing costs a
+    # request, so it's given up after as many pages as there are sources.
+    self.existing_dst_names = None
+    if (copy_helper_opts.no_clobber and dst_url.scheme == 'gs' and
+        (dst_url.IsBucket() or dst_url.IsObject()) and
+        not dst_url.HasGeneration() and
+        not ContainsWildcard(dst_url.url_string) and
+        (copy_helper_opts.read_args_from_stdin or self.recursion_requested or
+         len(self.args) > 2 or ContainsWildcard(self.args[0]))):
+      num_srcs = self._CountSrcsUpTo(
+          src_url_strs[0], MAX_LISTED_NAMES // NAMES_PER_LISTING_PAGE)
+      if num_srcs > 1:
+        self.existing_dst_names = ListExistingObjectNames(
+            self.gsutil_api,
+            dst_url,
+            self.logger,
+            max_listed=GetMaxListedNames(num_srcs))
+
     # Use a lock to ensure accurate statistics in the face of
     # multi-threading/multi-processing.
     self.stats_lock = parallelism_framework_util.CreateLock()
@@ -1192,12 +1263,30 @@ class CpCommand(Command):
     # Perform copy requests in parallel (-m) mode, if requested, using
     # configured number of parallel processes and threads. Otherwise,
     # perform requests with sequential function calls in current process.
-    self.Apply(_CopyFuncWrapper,
-               name_expansion_iterator,
-               _CopyExceptionHandler,
-               shared_attrs,
-               fail_on_error=(not self.continue_on_error),
-               seek_ahead_iterator=seek_ahead_iterator)
+    try:
+      self.Apply(_CopyFuncWrapper,
+                 name_expansion_iterator,
+                 _CopyExceptionHandler,
+                 shared_attrs,
+                 fail_on_error=(not self.continue_on_error),
+                 seek_ahead_iterator=seek_ahead_iterator)
+    except:  # pylint: disable=bare-except
+      exc_info = sys.exc_info()
+      if self.manifest:
+        # Write out any manifest rows still buffered by the writer thread, but
+        # don't let a failure to do so replace the error from Apply.
+        try:
+          self.manifest.Close()
+        except Exception as e:  # pylint: disable=broad-except
+          self.logger.error('Failed to close manifest: %s', e)
+      six.reraise(*exc_info)
+    else:
+      if self.manifest:
+        # Write out any manifest rows still buffered by the writer thread.
+        self.manifest.Close()
+    finally:
+      if self.existing_dst_names:
+        self.existing_dst_names.Close()
     self.logger.debug('total_bytes_transferred: %d',
                       self.total_bytes_transferred)
 
@@ -57,6 +57,18 @@ _DETAILED_HELP_TEXT = ("""
   will report the total space used by all objects under gs://your-bucket/dir and
   any sub-directories.
 
+  With -s or -c, du lists all of the objects under each URL with one flat
+  listing, and derives the size of each sub-directory from the names of the
+  objects in it, so the number of listing requests doesn't depend on how many
+  sub-directories there are. Objects and sub-directories are then output in
+  name order, with each sub-directory following its contents.
+
+  The top-level -m option makes du list sub-directories in parallel, ahead of
+  the output, which speeds it up on buckets with many sub-directories. With -s
+  or -c, it instead splits the flat listing of each URL by its sub-directories
+  and lists those in parallel. Either way, the output is the same, in the same
+  order, as without -m.
+
 
 <B>OPTIONS</B>
   -0          Ends each output line with a 0 byte rather than a newline. This
@@ -90,6 +102,11 @@ _DETAILED_HELP_TEXT = ("""
 
     gsutil du gs://bucketname/prefix/*
 
+  To list the size of each sub-directory of a bucket with many of them, listing
+  sub-directories in parallel:
+
+    gsutil -m du gs://bucketname
+
   To print the total number of bytes in a bucket, in human-readable form:
 
     gsutil du -ch gs://bucketname
@@ -226,6 +243,9 @@ class DuCommand(Command):
 
     total_bytes = 0
     got_nomatch_errors = False
+    num_threads = 1
+    if self.parallel_operations:
+      _, num_threads = self._GetProcessAndThreadCount(None, None, None)
 
     def _PrintObjectLong(blr):
       return self._PrintInfoAboutBucketListingRef(blr)
@@ -255,7 +275,12 @@ class DuCommand(Command):
           all_versions=self.all_versions,
           should_recurse=True,
           exclude_patterns=self.exclude_patterns,
-          fields=bucket_listing_fields)
+          fields=bucket_listing_fields,
+          num_threads=num_threads,
+          create_gsutil_api_func=self.CreateGsutilApi,
+          # A flat listing changes the order of the output, so it's only
+          # used when a summary or a total was asked for.
+          flat_listing=self.summary_only or self.produce_total)
 
       # LsHelper expands to objects and prefixes, so perform a top-level
       # expansion first.
@@ -274,9 +299,6 @@ class DuCommand(Command):
 
       for blr in top_level_iter:
         storage_url = blr.storage_url
-        if storage_url.IsBucket() and self.summary_only:
-          storage_url = StorageUrlFromString(
-              storage_url.CreatePrefixUrl(wildcard_suffix='**'))
         _, exp_objs, exp_bytes = listing_helper.ExpandUrlAndPrint(storage_url)
         if (storage_url.IsObject() and exp_objs == 0 and
             ContainsWildcard(url_arg) and not self.exclude_patterns):
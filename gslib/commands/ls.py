@@ -121,6 +121,12 @@ _DETAILED_HELP_TEXT = ("""
 
     gsutil ls -d gs://bucket/dir
 
+  A recursive listing of a bucket with many subdirectories can be sped up with
+  the top-level -m option, which lists subdirectories in parallel, ahead of
+  the output. The output is the same, in the same order:
+
+    gsutil -m ls -r gs://bucket
+
 
 <B>LISTING OBJECT DETAILS</B>
   If you specify the -l option, gsutil will output additional information
@@ -512,6 +518,9 @@ class LsCommand(Command):
 
     total_objs = 0
     total_bytes = 0
+    num_threads = 1
+    if self.parallel_operations:
+      _, num_threads = self._GetProcessAndThreadCount(None, None, None)
 
     def MaybePrintBucketHeader(blr):
       if len(self.args) > 1:
@@ -585,7 +594,9 @@ class LsCommand(Command):
               all_versions=self.all_versions,
               print_bucket_header_func=print_bucket_header,
               should_recurse=self.recursion_requested,
-              list_subdir_contents=self.list_subdir_contents)
+              list_subdir_contents=self.list_subdir_contents,
+              num_threads=num_threads,
+              create_gsutil_api_func=self.CreateGsutilApi)
         elif listing_style == ListingStyle.LONG:
           bucket_listing_fields = [
               'name',
@@ -610,7 +621,9 @@ class LsCommand(Command):
               all_versions=self.all_versions,
               should_recurse=self.recursion_requested,
               fields=bucket_listing_fields,
-              list_subdir_contents=self.list_subdir_contents)
+              list_subdir_contents=self.list_subdir_contents,
+              num_threads=num_threads,
+              create_gsutil_api_func=self.CreateGsutilApi)
 
         elif listing_style == ListingStyle.LONG_LONG:
           # List all fields
@@ -625,7 +638,9 @@ class LsCommand(Command):
               all_versions=self.all_versions,
               should_recurse=self.recursion_requested,
               fields=bucket_listing_fields,
-              list_subdir_contents=self.list_subdir_contents)
+              list_subdir_contents=self.list_subdir_contents,
+              num_threads=num_threads,
+              create_gsutil_api_func=self.CreateGsutilApi)
         else:
           raise CommandException('Unknown listing style: %s' % listing_style)
 
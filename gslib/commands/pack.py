@@ -0,0 +1,346 @@
+# -*- coding: utf-8 -*-
+# Copyright 2026 Google Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Implementation of pack command for packing many small files."""
+
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import division
+from __future__ import unicode_literals
+
+import fnmatch
+import io
+import os
+
+from gslib import metrics
+from gslib.cloud_api import NotFoundException
+from gslib.command import Command
+from gslib.command import DummyArgChecker
+from gslib.command_argument import CommandArgument
+from gslib.cs_api_map import ApiSelector
+from gslib.exception import CommandException
+from gslib.help_provider import CreateHelpText
+from gslib.storage_url import ContainsWildcard
+from gslib.storage_url import StorageUrlFromString
+from gslib.third_party.storage_apitools import storage_v1_messages as apitools_messages
+from gslib.utils.constants import NO_MAX
+from gslib.utils.pack_util import DecodePackIndex
+from gslib.utils.pack_util import DEFAULT_PACK_SIZE
+from gslib.utils.pack_util import EncodePackIndex
+from gslib.utils.pack_util import ExtractFn
+from gslib.utils.pack_util import GetMemberPath
+from gslib.utils.pack_util import GetPackIndexName
+from gslib.utils.pack_util import GetPackObjectName
+from gslib.utils.pack_util import PackObjectFn
+from gslib.utils.pack_util import PackPlanner
+from gslib.utils.pack_util import PlanRangedReads
+from gslib.utils.text_util import print_to_fd
+from gslib.utils.unit_util import HumanReadableToBytes
+from gslib.utils.unit_util import MakeHumanReadable
+from gslib.wildcard_iterator import CreateWildcardIterator
+
+_CREATE_SYNOPSIS = """
+  gsutil pack create [-e] [-s size] dir gs://bucket/prefix
+"""
+
+_EXTRACT_SYNOPSIS = """
+  gsutil pack extract gs://bucket/prefix dir [member...]
+"""
+
+_LS_SYNOPSIS = """
+  gsutil pack ls gs://bucket/prefix
+"""
+
+_CREATE_DESCRIPTION = """
+<B>CREATE</B>
+  The "pack create" command packs all files under a local directory into pack
+  objects under the given prefix, named pack-000000.tar, pack-000001.tar and
+  so on, and writes an index object named index.json.gz once all pack objects
+  have been created. For example:
+
+    gsutil -m pack create ./dataset gs://bucket/datasets/train
+
+  creates gs://bucket/datasets/train/pack-000000.tar, ... and
+  gs://bucket/datasets/train/index.json.gz. Use the top-level -m option to
+  create pack objects in parallel.
+
+<B>CREATE OPTIONS</B>
+  -e          Exclude symlinks. When specified, symbolic links are not
+              packed. By default, the files symlinks point to are packed.
+
+  -s size     Size at which a pack object is closed and the next one started,
+              in bytes or as a human-readable value (e.g., "256M"). The
+              default is 64 MiB. Larger pack objects mean fewer requests;
+              smaller ones let more of them be created in parallel.
+"""
+
+_EXTRACT_DESCRIPTION = """
+<B>EXTRACT</B>
+  The "pack extract" command extracts members of a pack to a local directory.
+  If any member names or wildcards are given, only matching members are
+  extracted. Members that are close together in a pack object are read with a
+  single ranged read, so extracting a whole pack takes about one request per
+  pack object, and extracting a few members takes about one request per
+  member. Each member's MD5 digest is verified. For example:
+
+    gsutil -m pack extract gs://bucket/datasets/train ./dataset 'images/*.jpg'
+
+  Use the top-level -m option to perform ranged reads in parallel.
+"""
+
+_LS_DESCRIPTION = """
+<B>LS</B>
+  The "pack ls" command lists the members of a pack and their sizes.
+"""
+
+_SYNOPSIS = (_CREATE_SYNOPSIS + _EXTRACT_SYNOPSIS.lstrip('\n') +
+             _LS_SYNOPSIS.lstrip('\n') + '\n\n')
+
+_DESCRIPTION = """
+  The pack command stores many small files as members of a few large objects,
+  which is much faster than copying them as individual objects when there are
+  many of them (e.g., millions of files of a few KiB), since each object copied
+  costs at least one request. A pack consists of pack objects, which are
+  ordinary tar archives, and an index object recording where each member is
+  stored, so that members can be extracted individually.
+
+  The pack command has three sub-commands:
+""" + _CREATE_DESCRIPTION + _EXTRACT_DESCRIPTION + _LS_DESCRIPTION
+
+_DETAILED_HELP_TEXT = CreateHelpText(_SYNOPSIS, _DESCRIPTION)
+
+_create_help_text = CreateHelpText(_CREATE_SYNOPSIS, _CREATE_DESCRIPTION)
+_extract_help_text = CreateHelpText(_EXTRACT_SYNOPSIS, _EXTRACT_DESCRIPTION)
+_ls_help_text = CreateHelpText(_LS_SYNOPSIS, _LS_DESCRIPTION)
+
+
+def _PackExceptionHandler(cls, e):
+  """Simple exception handler to allow post-completion status."""
+  cls.logger.error(str(e))
+  cls.op_failure_count += 1
+
+
+class PackCommand(Command):
+  """Implementation of gsutil pack command."""
+
+  # Command specification. See base class for documentation.
+  command_spec = Command.CreateCommandSpec(
+      'pack',
+      usage_synopsis=_SYNOPSIS,
+      min_args=2,
+      max_args=NO_MAX,
+      supported_sub_args='es:',
+      file_url_ok=True,
+      provider_url_ok=False,
+      urls_start_arg=1,
+      gs_api_support=[ApiSelector.XML, ApiSelector.JSON],
+      gs_default_api=ApiSelector.JSON,
+      argparse_arguments={
+          'create': [
+              CommandArgument.MakeNFileURLsArgument(1),
+              CommandArgument.MakeNCloudURLsArgument(1),
+          ],
+          'extract': [
+              CommandArgument.MakeNCloudURLsArgument(1),
+              CommandArgument.MakeNFileURLsArgument(1),
+          ],
+          'ls': [CommandArgument.MakeNCloudURLsArgument(1),],
+      },
+  )
+  # Help specification. See help_provider.py for documentation.
+  help_spec = Command.HelpSpec(
+      help_name='pack',
+      help_name_aliases=[],
+      help_type='command_help',
+      help_one_line_summary=(
+          'Pack many small files into a few objects, and extract them.'),
+      help_text=_DETAILED_HELP_TEXT,
+      subcommand_help_text={
+          'create': _create_help_text,
+          'extract': _extract_help_text,
+          'ls': _ls_help_text,
+      },
+  )
+
+  def _GetPackPrefix(self, url_str):
+    """Returns (bucket URL, object name prefix) of the pack at url_str."""
+    url = StorageUrlFromString(url_str)
+    if not url.IsCloudUrl() or url.IsProvider() or ContainsWildcard(url_str):
+      raise CommandException(
+          'The pack %s command requires a cloud URL without wildcards, '
+          'e.g., gs://bucket/prefix.' % self.subcommand_name)
+    prefix = url.object_name if url.IsObject() else ''
+    if prefix and not prefix.endswith('/'):
+      prefix += '/'
+    return StorageUrlFromString(url.bucket_url_string), prefix
+
+  def _ReadPackIndex(self, bucket_url, prefix):
+    index_name = GetPackIndexName(prefix)
+    buf = io.BytesIO()
+    try:
+      self.gsutil_api.GetObjectMedia(bucket_url.bucket_name,
+                                     index_name,
+                                     buf,
+                                     provider=bucket_url.scheme)
+    except NotFoundException:
+      raise CommandException('No pack index found at %s%s.' %
+                             (bucket_url.url_string, index_name))
+    return DecodePackIndex(buf.getvalue())
+
+  def _IterFiles(self, src_dir):
+    """Yields (path, member name, size) for each file under src_dir."""
+    wildcard_iterator = CreateWildcardIterator(
+        os.path.join(src_dir, '**'),
+        self.gsutil_api,
+        ignore_symlinks=self.exclude_symlinks,
+        logger=self.logger)
+    for blr in wildcard_iterator.IterObjects(bucket_listing_fields=['size']):
+      path = blr.storage_url.object_name
+      name = os.path.relpath(path, src_dir).replace(os.sep, '/')
+      yield (path, name, blr.root_object.size)
+
+  def _CreatePack(self):
+    """Packs the files under a local directory into pack objects."""
+    if len(self.args) != 2:
+      self.RaiseWrongNumberOfArgumentsException()
+    src_url = StorageUrlFromString(self.args[0])
+    if not src_url.IsFileUrl() or not os.path.isdir(src_url.object_name):
+      raise CommandException('The pack create command requires a local '
+                             'directory, not %s.' % self.args[0])
+    bucket_url, prefix = self._GetPackPrefix(self.args[1])
+
+    planner = PackPlanner(
+        self._IterFiles(src_url.object_name),
+        lambda pack_num: StorageUrlFromString(
+            '%s%s' % (bucket_url.url_string, GetPackObjectName(
+                prefix, pack_num))),
+        pack_size=self.pack_size)
+    results = self.Apply(PackObjectFn,
+                         planner,
+                         _PackExceptionHandler,
+                         arg_checker=DummyArgChecker,
+                         should_return_results=True,
+                         fail_on_error=True)
+    if not planner.num_packs:
+      raise CommandException('No files found under %s.' % self.args[0])
+    if len(results) != planner.num_packs:
+      raise CommandException(
+          'Failed to create %d of %d pack object(s); the pack index was not '
+          'written.' % (planner.num_packs - len(results), planner.num_packs))
+
+    pack_sizes = []
+    members = []
+    for _, size, pack_members in sorted(results, key=lambda r: r[0]):
+      pack_sizes.append(size)
+      members.extend(pack_members)
+    index_name = GetPackIndexName(prefix)
+    index_data = EncodePackIndex(pack_sizes, members)
+    # The index is written last, so a pack is only visible to extract once all
+    # of its pack objects exist.
+    self.gsutil_api.UploadObject(io.BytesIO(index_data),
+                                 apitools_messages.Object(
+                                     name=index_name,
+                                     bucket=bucket_url.bucket_name,
+                                     contentType='application/gzip'),
+                                 size=len(index_data),
+                                 provider=bucket_url.scheme,
+                                 fields=['name'])
+    self.logger.info('Packed %d file(s) into %d pack object(s) under %s%s.',
+                     len(members), len(pack_sizes), bucket_url.url_string,
+                     prefix)
+
+  def _ExtractPack(self):
+    """Extracts members of a pack to a local directory."""
+    if len(self.args) < 2:
+      self.RaiseWrongNumberOfArgumentsException()
+    bucket_url, prefix = self._GetPackPrefix(self.args[0])
+    dst_url = StorageUrlFromString(self.args[1])
+    if not dst_url.IsFileUrl():
+      raise CommandException('The pack extract command requires a local '
+                             'directory, not %s.' % self.args[1])
+    patterns = self.args[2:]
+
+    packs, members = self._ReadPackIndex(bucket_url, prefix)
+    pack_urls = [
+        StorageUrlFromString('%s%s%s' %
+                             (bucket_url.url_string, prefix, pack['name']))
+        for pack in packs
+    ]
+    member_paths = []
+    for member in members:
+      if patterns and not any(
+          fnmatch.fnmatchcase(member.name, pattern) for pattern in patterns):
+        continue
+      member_paths.append(
+          (member, GetMemberPath(dst_url.object_name, member.name)))
+    if not member_paths:
+      raise CommandException('No members matched.')
+
+    self.Apply(ExtractFn,
+               PlanRangedReads(pack_urls, member_paths),
+               _PackExceptionHandler,
+               shared_attrs=['op_failure_count'],
+               arg_checker=DummyArgChecker,
+               fail_on_error=True)
+    if self.op_failure_count:
+      raise CommandException('Some members could not be extracted.')
+
+  def _ListPack(self):
+    """Lists the members of a pack."""
+    if len(self.args) != 1:
+      self.RaiseWrongNumberOfArgumentsException()
+    bucket_url, prefix = self._GetPackPrefix(self.args[0])
+    _, members = self._ReadPackIndex(bucket_url, prefix)
+    total_size = 0
+    for member in members:
+      print_to_fd('%10s  %s' % (member.size, member.name))
+      total_size += member.size
+    print_to_fd('TOTAL: %d members, %d bytes (%s)' %
+                (len(members), total_size, MakeHumanReadable(total_size)))
+
+  def RunCommand(self):
+    """Command entry point for the pack command."""
+    self.subcommand_name = self.args.pop(0)
+    self.ParseSubOpts(check_args=True)
+    # Commands with both suboptions and subcommands need to reparse for
+    # suboptions, so we log again.
+    metrics.LogCommandParams(sub_opts=self.sub_opts)
+    self.exclude_symlinks = False
+    self.pack_size = DEFAULT_PACK_SIZE
+    self.op_failure_count = 0
+    for o, a in self.sub_opts:
+      if self.subcommand_name != 'create':
+        raise CommandException(
+            'The %s option can only be used with the "%s create" command.' %
+            (o, self.command_name))
+      if o == '-e':
+        self.exclude_symlinks = True
+      elif o == '-s':
+        try:
+          self.pack_size = HumanReadableToBytes(a)
+        except ValueError:
+          raise CommandException('Invalid -s parameter.')
+
+    metrics.LogCommandParams(subcommands=[self.subcommand_name])
+    if self.subcommand_name == 'create':
+      self._CreatePack()
+    elif self.subcommand_name == 'extract':
+      self._ExtractPack()
+    elif self.subcommand_name == 'ls':
+      self._ListPack()
+    else:
+      raise CommandException(
+          'Invalid subcommand "%s" for the %s command.\nSee "gsutil help %s".' %
+          (self.subcommand_name, self.command_name, self.command_name))
+    return 0
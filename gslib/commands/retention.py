@@ -18,7 +18,6 @@ from __future__ import absolute_import
 
 import time
 
-from apitools.base.py import encoding
 from gslib import metrics
 from gslib.cloud_api import AccessDeniedException
 from gslib.cloud_api import Preconditions
@@ -405,8 +404,7 @@ class RetentionCommand(Command):
     exp_src_url = name_expansion_result.expanded_storage_url
     self.logger.info(log_template, exp_src_url)
 
-    cloud_obj_metadata = encoding.JsonToMessage(
-        apitools_messages.Object, name_expansion_result.expanded_result)
+    cloud_obj_metadata = name_expansion_result.GetExpandedObject()
 
     preconditions = Preconditions(
         gen_match=self.preconditions.gen_match,
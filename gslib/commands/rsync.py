@@ -24,11 +24,15 @@ import errno
 import heapq
 import io
 from itertools import islice
+import json
 import logging
 import os
 import re
+import stat
+import struct
 import tempfile
 import textwrap
+import threading
 import time
 import traceback
 import sys
@@ -56,12 +60,15 @@ from gslib.third_party.storage_apitools import storage_v1_messages as apitools_m
 from gslib.utils import constants
 from gslib.utils import copy_helper
 from gslib.utils import parallelism_framework_util
+from gslib.utils.boto_util import GetLocalWalkThreads
+from gslib.utils.boto_util import GetRsyncStreamingDiff
 from gslib.utils.boto_util import UsingCrcmodExtension
 from gslib.utils.cloud_api_helper import GetCloudApiInstance
 from gslib.utils.copy_helper import CreateCopyHelperOpts
 from gslib.utils.copy_helper import GetSourceFieldsNeededForCopy
 from gslib.utils.copy_helper import GZIP_ALL_FILES
 from gslib.utils.copy_helper import SkipUnsupportedObjectError
+from gslib.utils.exclusion_util import RegexMatchesAllStartingWith
 from gslib.utils.hashing_helper import CalculateB64EncodedCrc32cFromContents
 from gslib.utils.hashing_helper import CalculateB64EncodedMd5FromContents
 from gslib.utils.hashing_helper import SLOW_CRCMOD_RSYNC_WARNING
@@ -90,8 +97,12 @@ from gslib.utils.posix_util import WarnFutureTimestamp
 from gslib.utils.posix_util import WarnInvalidValue
 from gslib.utils.posix_util import WarnNegativeAttribute
 from gslib.utils.rsync_util import DiffAction
+from gslib.utils.rsync_util import ReadChangedObjectNames
 from gslib.utils.rsync_util import RsyncDiffToApply
 from gslib.utils.system_util import IS_WINDOWS
+from gslib.utils.system_util import ScanDir
+from gslib.utils.system_util import ScanDirTree
+from gslib.utils.system_util import StatDirEntry
 from gslib.utils.translation_helper import CopyCustomMetadata
 from gslib.utils.unit_util import CalculateThroughput
 from gslib.utils.unit_util import SECONDS_PER_DAY
@@ -438,6 +449,31 @@ _DETAILED_HELP_TEXT = ("""
                  don't compress well (e.g., that's often true of binary data),
                  this option may result in longer uploads.
 
+  -k file        Synchronizes only the objects named in the given change
+                 journal, rather than listing all of src_url and dst_url. This
+                 makes frequent incremental synchronization of a large bucket
+                 cheap when only a few objects change between runs. The source
+                 must be a bucket or bucket subdirectory. The journal is a file
+                 of Pub/Sub messages as published for a notification config
+                 (see "gsutil help notification"), either one JSON message per
+                 line or a JSON array such as the output of
+                 "gcloud pubsub subscriptions pull --format=json". Object
+                 resources as posted to an object change notification channel
+                 are also accepted. Records for other buckets are ignored.
+
+                 Each changed object is looked up at the source and the
+                 destination and then synchronized as usual, so the event
+                 types in the journal don't matter: an object deleted from the
+                 source is deleted from the destination only if -d is
+                 specified. Files and objects not named in the journal are left
+                 untouched, including destination extras. After a successful
+                 run, the journal's records can be discarded.
+
+                 The changed objects are looked up one at a time, so if the
+                 journal names more than 1000 objects, rsync lists src_url and
+                 dst_url instead, which takes fewer requests for that many
+                 names, and still synchronizes only the named objects.
+
   -n             Causes rsync to run in "dry run" mode, i.e., just outputting
                  what would be copied or deleted without actually doing any
                  copying/deleting.
@@ -507,6 +543,11 @@ _DETAILED_HELP_TEXT = ("""
 
                    gsutil rsync -x ".*\.txt$|.*\.jpg$" dir gs://my-bucket
 
+                 When the source or destination is a local directory, rsync
+                 skips walking sub-directories whose contents the pattern
+                 excludes entirely. For example, with -x "build/" (but not
+                 with -x "build/.*\.o$") rsync won't walk dir/build.
+
                  NOTE: When using this on the Windows command line, use ^ as an
                  escape character instead of \ and escape the | character.
 """)
@@ -515,6 +556,22 @@ _DETAILED_HELP_TEXT = ("""
 _NA = '-'
 _OUTPUT_BUFFER_SIZE = 64 * 1024
 _PROGRESS_REPORT_LISTING_COUNT = 10000
+# Maximum number of -k journal names to look up one by one. Beyond this, the
+# source and destination are listed and filtered to the journal's names.
+_MAX_CHANGED_NAMES_TO_LOOK_UP = 1000
+# Number of listing entries a streaming listing thread hands over at a time.
+_STREAMING_LISTING_CHUNK_SIZE = 100
+# Number of listing entries a streaming listing thread buffers ahead of the
+# diff.
+_STREAMING_LISTING_BUFFER_SIZE = 10000
+# Fixed-size start of each record in the sorted temp files: lengths of the key
+# and relative URL, size, time_created, atime, mtime, mode, uid, gid, and
+# lengths of the crc32c and md5. See _PackTmpRecord.
+_TMP_RECORD_HEADER = struct.Struct('<IIqqqqiqqBB')
+# Range of the signed 64-bit header fields, which hold values parsed from
+# user-editable object metadata.
+_MIN_TMP_RECORD_INT = -2**63
+_MAX_TMP_RECORD_INT = 2**63 - 1
 
 # Tracks files we need to clean up at end or if interrupted. Because some
 # files are passed to rsync's diff iterators, it is difficult to manage when
@@ -621,7 +678,7 @@ def _ComputeNeededFileChecksums(logger, src_url_str, src_size, src_crc32c,
 def _ListUrlRootFunc(cls, args_tuple, thread_state=None):
   """Worker function for listing files/objects under to be sync'd.
 
-  Outputs sorted list to out_file_name, formatted per _BuildTmpOutputLine. We
+  Outputs sorted list to out_file_name, as records per _PackTmpRecord. We
   sort the listed URLs because we don't want to depend on consistent sort
   order across file systems and cloud providers.
 
@@ -637,7 +694,7 @@ def _ListUrlRootFunc(cls, args_tuple, thread_state=None):
   (base_url_str, out_filename, desc) = args_tuple
   # We sort while iterating over base_url_str, allowing parallelism of batched
   # sorting with collecting the listing.
-  out_file = io.open(out_filename, mode='w', encoding=constants.UTF8)
+  out_file = open(out_filename, 'wb')
   try:
     _BatchSort(_FieldedListingIterator(cls, gsutil_api, base_url_str, desc),
                out_file)
@@ -657,7 +714,7 @@ def _ListUrlRootFunc(cls, args_tuple, thread_state=None):
   out_file.close()
 
 
-def _LocalDirIterator(base_url):
+def _LocalDirIterator(base_url, exclude_func=None, ignore_symlinks=False):
   """A generator that yields a BLR for each file in a local directory.
 
      We use this function instead of WildcardIterator for listing a local
@@ -667,57 +724,266 @@ def _LocalDirIterator(base_url):
 
   Args:
     base_url: URL for the directory over which to iterate.
+    exclude_func: Function taking a path and returning True if it should be
+                  skipped, which saves checking whether it's a file.
+    ignore_symlinks: If True, skip symlinks.
+
+  Yields:
+    BucketListingObject for each file in the directory, carrying its stat
+    result.
+  """
+
+  def _ScanBaseDir(dir_path):
+    files = []
+    for entry in ScanDir(dir_path):
+      filename = os.path.join(dir_path, entry.name)
+      if exclude_func and exclude_func(filename):
+        continue
+      if ignore_symlinks and entry.is_symlink():
+        continue
+      files.append((filename, entry))
+    return [], files
+
+  # With local_walk_threads set, the files are stat'ed in parallel.
+  for filename, entry in ScanDirTree(base_url.object_name,
+                                     _ScanBaseDir,
+                                     num_threads=GetLocalWalkThreads()):
+    stat_result = StatDirEntry(entry)
+    if stat_result and stat.S_ISREG(stat_result.st_mode):
+      yield BucketListingObject(StorageUrlFromString(filename),
+                                None,
+                                stat_result=stat_result)
+
+
+def _SortedLocalDirIterator(base_url,
+                            recursive,
+                            exclude_func=None,
+                            exclude_dir_func=None,
+                            ignore_symlinks=False):
+  """A generator that yields a BLR for each file under a directory, in order.
+
+  Files are yielded in the order of their paths relative to base_url, with '/'
+  as the separator, which is the order of a cloud listing. To do that, the
+  entries of each directory are sorted with '/' appended to the names of
+  subdirectories, so each subdirectory is walked where its files fall among
+  its siblings.
+
+  Args:
+    base_url: URL for the directory over which to iterate.
+    recursive: If True, walk subdirectories (other than symlinks to them), as
+               for a '**' wildcard.
+    exclude_func: Function taking a file path and returning True if it should
+                  be skipped.
+    exclude_dir_func: Function taking a subdirectory path and returning True
+                      if it shouldn't be walked.
+    ignore_symlinks: If True, skip symlinks.
+
+  Yields:
+    BucketListingObject for each file, carrying its stat result.
+  """
+
+  def _SortedEntries(dir_path):
+    try:
+      entries = ScanDir(dir_path)
+    except OSError:
+      # Like os.walk(), skip directories that can't be listed.
+      return iter([])
+    sorted_entries = []
+    for entry in entries:
+      path = os.path.join(dir_path, entry.name)
+      is_dir = False
+      if recursive:
+        try:
+          is_dir = entry.is_dir()
+        except OSError:
+          pass
+      if is_dir:
+        if entry.is_symlink() or (exclude_dir_func and exclude_dir_func(path)):
+          continue
+        sorted_entries.append((entry.name + '/', path, None))
+      elif not ((exclude_func and exclude_func(path)) or
+                (ignore_symlinks and entry.is_symlink())):
+        sorted_entries.append((entry.name, path, entry))
+    sorted_entries.sort(key=lambda sorted_entry: sorted_entry[0])
+    return iter(sorted_entries)
+
+  dir_iters = [_SortedEntries(base_url.object_name)]
+  while dir_iters:
+    try:
+      _, path, entry = next(dir_iters[-1])
+    except StopIteration:
+      dir_iters.pop()
+      continue
+    if entry is None:
+      dir_iters.append(_SortedEntries(path))
+      continue
+    stat_result = StatDirEntry(entry)
+    if stat_result and (not stat.S_ISDIR(stat_result.st_mode) if recursive
+                        else stat.S_ISREG(stat_result.st_mode)):
+      yield BucketListingObject(StorageUrlFromString(path),
+                                None,
+                                stat_result=stat_result)
+
+
+def _LocalPathForChangedName(base_path, name):
+  """Returns the path of a -k journal name under a local directory.
+
+  Args:
+    base_path: Path of the directory.
+    name: Object name from the change journal, relative to the source URL.
+
+  Returns:
+    The path, or None if name has empty, '.' or '..' segments or the path's
+    directory (following symlinks) isn't under base_path.
+  """
+  segments = name.split('/')
+  if any(segment in ('', '.', '..') for segment in segments):
+    return None
+  path = os.path.join(base_path, *segments)
+  real_base_path = os.path.realpath(base_path)
+  real_dir_path = os.path.realpath(os.path.dirname(path))
+  if (real_dir_path != real_base_path and
+      not real_dir_path.startswith(os.path.join(real_base_path, ''))):
+    return None
+  return path
+
+
+def _ChangedObjectsIterator(cls, gsutil_api, base_url, fields):
+  """A generator that yields a BLR for each changed file/object under base_url.
+
+  Rather than listing base_url, this looks up each of the names from the -k
+  change journal under it, so only the changed names are diffed. Names that
+  don't exist under base_url are skipped, which makes a name deleted from the
+  source a destination extra. So are names that don't map to a path under a
+  local base_url, which could otherwise make a file outside it an extra.
+
+  Args:
+    cls: Command instance.
+    gsutil_api: gsutil Cloud API instance to use for metadata lookups.
+    base_url: URL of the directory, bucket, or bucket subdirectory to look
+              names up under.
+    fields: Object metadata fields to request.
 
   Yields:
-    BucketListingObject for each file in the directory.
+    BucketListingObject for each changed name that exists under base_url.
   """
-  for filename in os.listdir(base_url.object_name):
-    filename = os.path.join(base_url.object_name, filename)
-    if os.path.isfile(filename):
-      yield BucketListingObject(StorageUrlFromString(filename), None)
+  base_url_str = base_url.url_string.rstrip('/\\')
+  for name in cls.changed_names:
+    if base_url.IsFileUrl():
+      path = _LocalPathForChangedName(base_url.object_name, name)
+      if path is None:
+        cls.logger.warn(
+            'Skipping "%s" from the change journal, which is not a path under '
+            '%s.', name, base_url.object_name)
+        continue
+      try:
+        stat_result = (os.lstat(path)
+                       if cls.exclude_symlinks else os.stat(path))
+      except OSError:
+        continue
+      if stat.S_ISREG(stat_result.st_mode):
+        yield BucketListingObject(StorageUrlFromString(path),
+                                  stat_result=stat_result)
+    else:
+      url = StorageUrlFromString('%s/%s' % (base_url_str, name))
+      try:
+        obj = gsutil_api.GetObjectMetadata(url.bucket_name,
+                                           url.object_name,
+                                           provider=url.scheme,
+                                           fields=fields)
+      except NotFoundException:
+        continue
+      yield BucketListingObject(url, root_object=obj)
 
 
-def _FieldedListingIterator(cls, gsutil_api, base_url_str, desc):
-  """Iterator over base_url_str formatting output per _BuildTmpOutputLine.
+def _FieldedListingIterator(cls, gsutil_api, base_url_str, desc,
+                            ordered=False):
+  """Iterator over base_url_str packing output per _PackTmpRecord.
 
   Args:
     cls: Command instance.
     gsutil_api: gsutil Cloud API instance to use for bucket listing.
     base_url_str: The top-level URL string over which to iterate.
     desc: 'source' or 'destination'.
+    ordered: If True, list in the order of _StreamingKey, and yield tuples per
+             _GetListingAttrs rather than records.
 
   Yields:
-    Output line formatted per _BuildTmpOutputLine.
+    (key, record) per _PackTmpRecord, or if ordered, tuple per
+    _GetListingAttrs.
   """
   base_url = StorageUrlFromString(base_url_str)
-  if base_url.scheme == 'file' and not cls.recursion_requested:
-    iterator = _LocalDirIterator(base_url)
+  base_url_len = len(base_url_str.rstrip('/\\'))
+
+  def _IsExcluded(url_str, is_dir=False):
+    str_to_check = url_str[len(base_url_str):]
+    if str_to_check.startswith(base_url.delim):
+      str_to_check = str_to_check[1:]
+    if is_dir:
+      # Everything under the directory is excluded if the pattern matches all
+      # paths under it.
+      return RegexMatchesAllStartingWith(cls.exclude_pattern,
+                                         str_to_check + base_url.delim)
+    return cls.exclude_pattern.match(str_to_check)
+
+  def _IsPathExcluded(path):
+    return _IsExcluded(StorageUrlFromString(path).url_string)
+
+  def _IsDirPathExcluded(path):
+    return _IsExcluded(StorageUrlFromString(path).url_string, is_dir=True)
+
+  exclude_func = exclude_dir_func = None
+  if cls.exclude_pattern and base_url.IsFileUrl():
+    exclude_func = _IsPathExcluded
+    exclude_dir_func = _IsDirPathExcluded
+  fields = [
+      'crc32c',
+      'md5Hash',
+      'name',
+      'size',
+      'timeCreated',
+      'metadata/%s' % MTIME_ATTR,
+  ]
+  if cls.preserve_posix_attrs:
+    fields.extend([
+        'metadata/%s' % ATIME_ATTR,
+        'metadata/%s' % MODE_ATTR,
+        'metadata/%s' % GID_ATTR,
+        'metadata/%s' % UID_ATTR,
+    ])
+  look_up_changed_names = (cls.changed_names is not None and
+                           len(cls.changed_names) <=
+                           _MAX_CHANGED_NAMES_TO_LOOK_UP)
+  changed_name_set = None
+  if cls.changed_names is not None and not look_up_changed_names:
+    # Listing takes fewer requests than looking up this many names one by one,
+    # so list and keep just the changed names.
+    changed_name_set = set(cls.changed_names)
+  if look_up_changed_names:
+    iterator = _ChangedObjectsIterator(cls, gsutil_api, base_url, fields)
+  elif base_url.scheme == 'file' and ordered:
+    # Cloud listings are already in order, but local walks aren't.
+    iterator = _SortedLocalDirIterator(base_url,
+                                       cls.recursion_requested,
+                                       exclude_func=exclude_func,
+                                       exclude_dir_func=exclude_dir_func,
+                                       ignore_symlinks=cls.exclude_symlinks)
+  elif base_url.scheme == 'file' and not cls.recursion_requested:
+    iterator = _LocalDirIterator(base_url,
+                                 exclude_func=exclude_func,
+                                 ignore_symlinks=cls.exclude_symlinks)
   else:
     if cls.recursion_requested:
       wildcard = '%s/**' % base_url_str.rstrip('/\\')
     else:
       wildcard = '%s/*' % base_url_str.rstrip('/\\')
-    fields = [
-        'crc32c',
-        'md5Hash',
-        'name',
-        'size',
-        'timeCreated',
-        'metadata/%s' % MTIME_ATTR,
-    ]
-    if cls.preserve_posix_attrs:
-      fields.extend([
-          'metadata/%s' % ATIME_ATTR,
-          'metadata/%s' % MODE_ATTR,
-          'metadata/%s' % GID_ATTR,
-          'metadata/%s' % UID_ATTR,
-      ])
     iterator = CreateWildcardIterator(
         wildcard,
         gsutil_api,
         project_id=cls.project_id,
         ignore_symlinks=cls.exclude_symlinks,
-        logger=cls.logger).IterObjects(
+        logger=cls.logger,
+        exclude_dir_func=exclude_dir_func).IterObjects(
             # Request just the needed fields, to reduce bandwidth usage.
             bucket_listing_fields=fields)
   i = 0
@@ -735,33 +1001,123 @@ def _FieldedListingIterator(cls, gsutil_api, base_url_str, desc):
       # We used to output the message 'Skipping cloud sub-directory placeholder
       # object...' but we no longer do so because it caused customer confusion.
       continue
-    if (cls.exclude_symlinks and url.IsFileUrl() and
-        os.path.islink(url.object_name)):
+    if (changed_name_set is not None and
+        _StreamingKey(url.url_string, base_url_len)[1:] not in
+        changed_name_set):
+      continue
+    if cls.exclude_pattern and _IsExcluded(url.url_string):
       continue
-    if cls.exclude_pattern:
-      str_to_check = url.url_string[len(base_url_str):]
-      if str_to_check.startswith(url.delim):
-        str_to_check = str_to_check[1:]
-      if cls.exclude_pattern.match(str_to_check):
-        continue
     i += 1
     if i % _PROGRESS_REPORT_LISTING_COUNT == 0:
       cls.logger.info('At %s listing %d...', desc, i)
-    yield _BuildTmpOutputLine(blr)
+    if ordered:
+      yield _GetListingAttrs(blr)
+    else:
+      yield _PackTmpRecord(_GetListingAttrs(blr), base_url_len)
+
+
+def _PackTmpRecord(attrs, base_url_len):
+  """Packs a listing entry into a record for the sorted temp files.
+
+  A record is a _TMP_RECORD_HEADER followed by the record's comparison key, its
+  URL relative to the base URL (omitted if identical to the key), crc32c and
+  md5, all UTF-8 encoded. The key is what the diff compares records on, and
+  sorted temp files are in key order, so comparing keys needs no parsing.
+
+  Args:
+    attrs: Tuple per _GetListingAttrs.
+    base_url_len: Length of the URL string of the directory, bucket, or bucket
+                  subdirectory being listed, without trailing slashes.
+
+  Returns:
+    (key, record), where key is the comparison key.
+  """
+  (url_str, size, time_created, atime, mtime, mode, uid, gid, crc32c,
+   md5) = attrs
+  rel_url = url_str[base_url_len:]
+  # Normalize slashes so we can compare across clouds/file systems (including
+  # Windows).
+  key = six.ensure_binary(_EncodeUrl(rel_url.replace('\\', '/')))
+  rel_url = rel_url.encode(constants.UTF8)
+  if rel_url == key:
+    rel_url = b''
+  crc32c = crc32c.encode(constants.UTF8)
+  md5 = md5.encode(constants.UTF8)
+  header = _TMP_RECORD_HEADER.pack(len(key), len(rel_url), size, time_created,
+                                   atime, mtime, mode, uid, gid, len(crc32c),
+                                   len(md5))
+  return key, b''.join((header, key, rel_url, crc32c, md5))
+
+
+def _ReadTmpRecords(fp):
+  """Reads the records packed by _PackTmpRecord from a binary file.
+
+  Args:
+    fp: The file.
+
+  Yields:
+    (key, fields, data), where fields is the unpacked _TMP_RECORD_HEADER and
+    data is the rest of the record, starting with the key.
+  """
+  read = fp.read
+  unpack = _TMP_RECORD_HEADER.unpack
+  header_size = _TMP_RECORD_HEADER.size
+  while True:
+    header = read(header_size)
+    if not header:
+      return
+    fields = unpack(header)
+    key_len = fields[0]
+    data = read(key_len + fields[1] + fields[9] + fields[10])
+    yield data[:key_len], fields, data
+
+
+def _IterTmpFileEntries(fp, base_url_str):
+  """Yields the entries of a sorted temp file, for diffing.
+
+  Args:
+    fp: The temp file, opened in binary mode.
+    base_url_str: URL string of the directory, bucket, or bucket subdirectory
+                  that was listed.
+
+  Yields:
+    (key, attrs), where key is the comparison key and attrs is a tuple per
+    _GetListingAttrs.
+  """
+  base_url_str = base_url_str.rstrip('/\\')
+  for key, fields, data in _ReadTmpRecords(fp):
+    (key_len, rel_url_len, size, time_created, atime, mtime, mode, uid, gid,
+     crc32c_len, md5_len) = fields
+    if rel_url_len:
+      rel_url = data[key_len:key_len + rel_url_len]
+    else:
+      rel_url = key
+    crc32c_start = key_len + rel_url_len
+    md5_start = crc32c_start + crc32c_len
+    yield key, (
+        base_url_str + rel_url.decode(constants.UTF8),
+        size,
+        time_created,
+        atime,
+        mtime,
+        mode,
+        uid,
+        gid,
+        data[crc32c_start:md5_start].decode(constants.UTF8),
+        data[md5_start:md5_start + md5_len].decode(constants.UTF8),
+    )
 
 
-def _BuildTmpOutputLine(blr):
-  """Builds line to output to temp file for given BucketListingRef.
+def _GetListingAttrs(blr):
+  """Gets the attributes that rsync compares for given BucketListingRef.
 
   Args:
     blr: The BucketListingRef.
 
   Returns:
-    The output line, formatted as
-    _EncodeUrl(URL)<sp>size<sp>time_created<sp>atime<sp>mtime<sp>mode<sp>uid<sp>
-    gid<sp>crc32c<sp>md5 where md5 will only be present for cloud URLs that
-    aren't composite objects. A missing field is populated with '-', or -1 in
-    the case of atime/mtime/time_created.
+    Tuple (url, size, time_created, atime, mtime, mode, uid, gid, crc32c, md5)
+    where crc32c and/or md5 can be _NA and atime/mtime/time_created can be
+    NA_TIME.
   """
   atime = NA_TIME
   crc32c = _NA
@@ -773,7 +1129,9 @@ def _BuildTmpOutputLine(blr):
   uid = NA_ID
   url = blr.storage_url
   if url.IsFileUrl():
-    mode, _, _, _, uid, gid, size, atime, mtime, _ = os.stat(url.object_name)
+    # Local iterators usually already stat'ed the file.
+    stat_result = blr.stat_result or os.stat(url.object_name)
+    mode, _, _, _, uid, gid, size, atime, mtime, _ = stat_result
     # atime/mtime can be a float, so it needs to be converted to a long.
     atime = long(atime)
     mtime = long(mtime)
@@ -792,9 +1150,12 @@ def _BuildTmpOutputLine(blr):
         # The mtime value can be changed in the online console, this performs a
         # sanity check and sets the mtime to NA_TIME if it fails.
         mtime = long(mtime_str)
-        if found_m and mtime <= NA_TIME:
+        if not _MIN_TMP_RECORD_INT <= mtime <= _MAX_TMP_RECORD_INT:
+          WarnInvalidValue('mtime', url.url_string)
+          mtime = NA_TIME
+        elif found_m and mtime <= NA_TIME:
           WarnNegativeAttribute('mtime', url.url_string)
-        if mtime > long(time.time()) + SECONDS_PER_DAY:
+        elif mtime > long(time.time()) + SECONDS_PER_DAY:
           WarnFutureTimestamp('mtime', url.url_string)
       except ValueError:
         # Since mtime is a string, catch the case where it can't be cast as a
@@ -807,6 +1168,13 @@ def _BuildTmpOutputLine(blr):
       atime = posix_attrs.atime
       uid = posix_attrs.uid
       gid = posix_attrs.gid
+      # IDs too large for a temp file record aren't valid anyway.
+      if uid > _MAX_TMP_RECORD_INT:
+        WarnInvalidValue('uid', url.url_string)
+        uid = NA_ID
+      if gid > _MAX_TMP_RECORD_INT:
+        WarnInvalidValue('gid', url.url_string)
+        gid = NA_ID
     # Sanitize the timestamp returned, and put it in UTC format. For more
     # information see the UTC class in gslib/util.py.
     time_created = ConvertDatetimeToPOSIX(blr.root_object.timeCreated)
@@ -814,20 +1182,18 @@ def _BuildTmpOutputLine(blr):
     md5 = blr.root_object.md5Hash or _NA
   else:
     raise CommandException('Got unexpected URL type (%s)' % url.scheme)
-  attrs = [
-      _EncodeUrl(url.url_string),  # binary str in py2 / unicode str py 3
-      size,  # int
-      time_created,  # int
-      atime,  # long
-      mtime,  # long
-      mode,  # int
-      uid,  # int
-      gid,  # int
-      crc32c,  # unicode
-      md5,  # unicode
-  ]
-  attrs = [six.ensure_text(str(i)) for i in attrs]
-  return ' '.join(attrs) + '\n'
+  return (
+      url.url_string,
+      int(size),
+      long(time_created),
+      long(atime),
+      long(mtime),
+      int(mode),
+      int(uid),
+      int(gid),
+      six.ensure_text(crc32c),
+      six.ensure_text(md5),
+  )
 
 
 def _EncodeUrl(url_string):
@@ -847,36 +1213,19 @@ def _EncodeUrl(url_string):
   return url
 
 
-def _DecodeUrl(enc_url_string):
-  """Inverts encoding from EncodeUrl.
-
-  Args:
-    enc_url_string: String URL to decode.
-
-  Returns:
-    decoded URL.
-  """
-  url = urllib.parse.unquote_plus(enc_url_string)
-  if six.PY2:
-    url = url.decode(constants.UTF8)
-  return url
-
-
 # pylint: disable=bare-except
 def _BatchSort(in_iter, out_file):
-  """Sorts input lines from in_iter and outputs to out_file.
+  """Sorts input records from in_iter and outputs to out_file.
 
   Sorts in batches as input arrives, so input file does not need to be loaded
   into memory all at once. Derived from Python Recipe 466302: Sorting big
   files the Python 2.4 way by Nicolas Lehuen.
 
-  Sorted format is per _BuildTmpOutputLine. We're sorting on the entire line
-  when we could just sort on the first record (URL); but the sort order is
-  identical either way.
+  Records are sorted on their keys, per _PackTmpRecord.
 
   Args:
-    in_iter: Input iterator.
-    out_file: Output file.
+    in_iter: Input iterator of (key, record).
+    out_file: Output file, opened in binary mode.
   """
   # Note: If chunk_files gets very large we can run out of open FDs. See .boto
   # file comments about rsync_buffer_lines. If increasing rsync_buffer_lines
@@ -890,14 +1239,17 @@ def _BatchSort(in_iter, out_file):
       current_chunk = sorted(islice(in_iter, buffer_size))
       if not current_chunk:
         break
-      output_chunk = io.open('%s-%06i' % (out_file.name, len(chunk_files)),
-                             mode='w+',
-                             encoding=constants.UTF8)
+      output_chunk = open('%s-%06i' % (out_file.name, len(chunk_files)),
+                          'w+b')
       chunk_files.append(output_chunk)
-      output_chunk.write(six.text_type(''.join(current_chunk)))
+      output_chunk.write(b''.join(record for _, record in current_chunk))
       output_chunk.flush()
       output_chunk.seek(0)
-    out_file.writelines(heapq.merge(*chunk_files))
+    pack = _TMP_RECORD_HEADER.pack
+    for _, fields, data in heapq.merge(
+        *[_ReadTmpRecords(chunk_file) for chunk_file in chunk_files]):
+      out_file.write(pack(*fields))
+      out_file.write(data)
   except IOError as e:
     if e.errno == errno.EMFILE:
       raise CommandException('\n'.join(
@@ -918,6 +1270,208 @@ def _BatchSort(in_iter, out_file):
             chunk_file.name, e)
 
 
+def _ShouldStreamDiff(command_obj, base_src_url, base_dst_url):
+  """Returns whether to diff listings as they're produced, in order.
+
+  Args:
+    command_obj: Command instance.
+    base_src_url: Source URL.
+    base_dst_url: Destination URL.
+
+  Returns:
+    True if rsync_streaming_diff is set and both listings can be ordered.
+  """
+  if not GetRsyncStreamingDiff():
+    return False
+  # Checking that downloaded files will remain accessible takes a pass over
+  # the whole source listing before anything is copied.
+  if (command_obj.preserve_posix_attrs and base_src_url.IsCloudUrl() and
+      base_dst_url.IsFileUrl()):
+    return False
+  # Narrow Python 2 builds compare characters outside the BMP by their UTF-16
+  # surrogates, which doesn't match the order of cloud listings.
+  return sys.maxunicode > 0xFFFF
+
+
+def _StreamingKey(url_str, base_url_len):
+  """Returns the key a streaming diff merges url_str on.
+
+  Args:
+    url_str: URL string of a listed file/object.
+    base_url_len: Length of the URL string of the directory, bucket, or bucket
+                  subdirectory being listed, without trailing slashes.
+
+  Returns:
+    The part of url_str after the base URL, with '/' as the separator.
+  """
+  key = url_str[base_url_len:]
+  if os.sep != '/' and url_str.startswith('file://'):
+    key = key.replace(os.sep, '/')
+  return key
+
+
+def _DstUrlStrConstructor(base_src_url, base_dst_url, recursion_requested):
+  """Returns a function naming the destination for each source URL string.
+
+  rsync copies every source to the path under base_dst_url matching its path
+  under base_src_url. So rather than calling copy_helper.ConstructDstUrl for
+  each source, which parses the URL (stat'ing local files) and applies cp's
+  naming rules, the destination URL string is built by replacing the source's
+  base URL prefix. The replacement prefix is taken from ConstructDstUrl's
+  result for a probe source, so that it follows the same naming rules.
+
+  Args:
+    base_src_url: Source URL.
+    base_dst_url: Destination URL.
+    recursion_requested: True if a recursive operation has been requested.
+
+  Returns:
+    Function taking the URL string of a source listed under base_src_url and
+    returning the URL string it would be copied to.
+  """
+
+  def _ConstructDstUrlStr(src_url_str):
+    return copy_helper.ConstructDstUrl(base_src_url,
+                                       StorageUrlFromString(src_url_str), True,
+                                       True, base_dst_url, False,
+                                       recursion_requested).url_string
+
+  base_src_url_str = base_src_url.url_string.rstrip('/\\')
+  src_delim = base_src_url.delim
+  dst_delim = base_dst_url.delim
+  probe_name = 'gsutil-rsync-probe'
+  probe_dst_url_str = _ConstructDstUrlStr(
+      '%s%s%s' % (base_src_url_str, src_delim, probe_name))
+  if not probe_dst_url_str.endswith(dst_delim + probe_name):
+    return _ConstructDstUrlStr
+  dst_prefix = probe_dst_url_str[:-len(probe_name)]
+  # Skip past the base URL and the delimiter following it.
+  src_prefix_len = len(base_src_url_str) + 1
+
+  def _RewriteUrlStr(src_url_str):
+    rel_url_str = src_url_str[src_prefix_len:]
+    if src_delim != dst_delim:
+      rel_url_str = rel_url_str.replace(src_delim, dst_delim)
+    return dst_prefix + rel_url_str
+
+  return _RewriteUrlStr
+
+
+def _POSIXAttributesFromListingAttrs(attrs):
+  """Returns POSIXAttributes for a tuple per _GetListingAttrs."""
+  _, _, _, atime, mtime, mode, uid, gid, _, _ = attrs
+  return POSIXAttributes(atime=atime, mtime=mtime, uid=uid, gid=gid, mode=mode)
+
+
+class _StreamingListing(object):
+  """Lists one side of a streaming diff on its own thread.
+
+  Hands listing entries to the diff in chunks, buffering at most
+  _STREAMING_LISTING_BUFFER_SIZE entries ahead of it, and checks that they're
+  in the order the diff merges them in.
+  """
+
+  def __init__(self, command_obj, base_url, desc):
+    """Starts the listing thread.
+
+    Args:
+      command_obj: Command instance.
+      base_url: URL of the directory, bucket, or bucket subdirectory to list.
+      desc: 'source' or 'destination'.
+    """
+    self.command_obj = command_obj
+    self.base_url = base_url
+    self.desc = desc
+    # Guards and signals changes to all of the following.
+    self.cond = threading.Condition()
+    self.chunks = collections.deque()
+    self.num_buffered = 0
+    self.done = False
+    self.exc_info = None
+    self.shutting_down = False
+    thread = threading.Thread(target=self._List)
+    thread.daemon = True
+    thread.start()
+
+  def _List(self):
+    try:
+      gsutil_api = self.command_obj.CreateGsutilApi()
+      chunk = []
+      for attrs in _FieldedListingIterator(self.command_obj,
+                                           gsutil_api,
+                                           self.base_url.url_string,
+                                           self.desc,
+                                           ordered=True):
+        chunk.append(attrs)
+        if len(chunk) >= _STREAMING_LISTING_CHUNK_SIZE:
+          if not self._AddChunk(chunk):
+            return
+          chunk = []
+      self._AddChunk(chunk, done=True)
+    except Exception:  # pylint: disable=broad-except
+      with self.cond:
+        self.exc_info = sys.exc_info()
+        self.done = True
+        self.cond.notify_all()
+
+  def _AddChunk(self, chunk, done=False):
+    """Buffers a chunk of the listing for the diff, once there's room.
+
+    Returns:
+      False if shutting down, else True.
+    """
+    with self.cond:
+      while (not self.shutting_down and
+             self.num_buffered >= _STREAMING_LISTING_BUFFER_SIZE):
+        self.cond.wait()
+      if self.shutting_down:
+        return False
+      if chunk:
+        self.chunks.append(chunk)
+        self.num_buffered += len(chunk)
+      self.done = done
+      self.cond.notify_all()
+      return True
+
+  def __iter__(self):
+    """Yields (key, attrs) per _StreamingKey and _GetListingAttrs, in order.
+
+    Raises:
+      CommandException if the listing turns out not to be in order.
+    """
+    base_url_len = len(self.base_url.url_string.rstrip('/\\'))
+    prev_key = None
+    while True:
+      with self.cond:
+        while not self.chunks and not self.done:
+          # Wakes up periodically so that Python 2 can handle signals.
+          self.cond.wait(1)
+        if self.chunks:
+          chunk = self.chunks.popleft()
+          self.num_buffered -= len(chunk)
+          self.cond.notify_all()
+        elif self.exc_info:
+          six.reraise(*self.exc_info)
+        else:
+          return
+      for attrs in chunk:
+        key = _StreamingKey(attrs[0], base_url_len)
+        if prev_key is not None and key < prev_key:
+          raise CommandException(
+              'The %s listing was not in name order at %s. Set '
+              'rsync_streaming_diff = False in the [GSUtil] section of your '
+              'boto config file to synchronize from sorted listings instead.' %
+              (self.desc, attrs[0]))
+        prev_key = key
+        yield key, attrs
+
+  def Shutdown(self):
+    """Stops the listing thread, abandoning the listing if in progress."""
+    with self.cond:
+      self.shutting_down = True
+      self.cond.notify_all()
+
+
 class _DiffIterator(object):
   """Iterator yielding sequence of RsyncDiffToApply objects."""
 
@@ -932,9 +1486,23 @@ class _DiffIterator(object):
     self.base_dst_url = base_dst_url
     self.preserve_posix = command_obj.preserve_posix_attrs
     self.skip_old_files = command_obj.skip_old_files
+    self.streaming = _ShouldStreamDiff(command_obj, base_src_url,
+                                       base_dst_url)
 
     self.logger.info('Building synchronization state...')
 
+    if self.streaming:
+      # List both sides concurrently, diffing the listings as they arrive.
+      self.streaming_listings = [
+          _StreamingListing(command_obj, base_src_url, 'source'),
+          _StreamingListing(command_obj, base_dst_url, 'destination'),
+      ]
+      self.sorted_src_urls_it = PluralityCheckableIterator(
+          iter(self.streaming_listings[0]))
+      self.sorted_dst_urls_it = PluralityCheckableIterator(
+          iter(self.streaming_listings[1]))
+      return
+
     # Files to track src and dst state should be created in the system's
     # preferred temp directory so that they are eventually cleaned up if our
     # cleanup callback is interrupted.
@@ -988,24 +1556,33 @@ class _DiffIterator(object):
     # Note that while this leaves 2 open file handles, we track these in a
     # global list to be closed (if not closed in the calling scope) and deleted
     # at exit time.
-    self.sorted_list_src_file = open(self.sorted_list_src_file_name, 'r')
-    self.sorted_list_dst_file = open(self.sorted_list_dst_file_name, 'r')
+    self.sorted_list_src_file = open(self.sorted_list_src_file_name, 'rb')
+    self.sorted_list_dst_file = open(self.sorted_list_dst_file_name, 'rb')
     _tmp_files.append(self.sorted_list_src_file)
     _tmp_files.append(self.sorted_list_dst_file)
 
     if (base_src_url.IsCloudUrl() and base_dst_url.IsFileUrl() and
         self.preserve_posix):
       self.sorted_src_urls_it = PluralityCheckableIterator(
-          iter(self.sorted_list_src_file))
+          _IterTmpFileEntries(self.sorted_list_src_file,
+                              self.base_src_url.url_string))
       self._ValidateObjectAccess()
       # Reset our file pointers to the beginning.
       self.sorted_list_src_file.seek(0)
 
     # Wrap iterators in PluralityCheckableIterator so we can check emptiness.
     self.sorted_src_urls_it = PluralityCheckableIterator(
-        iter(self.sorted_list_src_file))
+        _IterTmpFileEntries(self.sorted_list_src_file,
+                            self.base_src_url.url_string))
     self.sorted_dst_urls_it = PluralityCheckableIterator(
-        iter(self.sorted_list_dst_file))
+        _IterTmpFileEntries(self.sorted_list_dst_file,
+                            self.base_dst_url.url_string))
+
+  def Shutdown(self):
+    """Stops any streaming listings still in progress."""
+    if self.streaming:
+      for listing in self.streaming_listings:
+        listing.Shutdown()
 
   def _ValidateObjectAccess(self):
     """Validates that the user won't lose access to the files if copied.
@@ -1015,9 +1592,8 @@ class _DiffIterator(object):
     with an exception raised to the user.
     """
     errors = collections.deque()
-    for src_url in self.sorted_src_urls_it:
-      src_url_str, _, _, _, _, src_mode, src_uid, src_gid, _, _ = (
-          self._ParseTmpFileLine(src_url))
+    for _, src_attrs in self.sorted_src_urls_it:
+      src_url_str, _, _, _, _, src_mode, src_uid, src_gid, _, _ = src_attrs
       valid, err = ValidateFilePermissionAccess(src_url_str,
                                                 uid=src_uid,
                                                 gid=src_gid,
@@ -1030,36 +1606,6 @@ class _DiffIterator(object):
       raise CommandException('This sync will orphan file(s), please fix their '
                              'permissions before trying again.')
 
-  def _ParseTmpFileLine(self, line):
-    """Parses output from _BuildTmpOutputLine.
-
-    Parses into tuple:
-      (URL, size, time_created, atime, mtime, mode, uid, gid, crc32c, md5)
-    where crc32c and/or md5 can be _NA and atime/mtime/time_created can be
-    NA_TIME.
-
-    Args:
-      line: The line to parse.
-
-    Returns:
-      Parsed tuple: (url, size, time_created, atime, mtime, mode, uid, gid,
-                     crc32c, md5)
-    """
-    (encoded_url, size, time_created, atime, mtime, mode, uid, gid, crc32c,
-     md5) = line.split()
-    return (
-        _DecodeUrl(encoded_url),
-        int(size),
-        long(time_created),
-        long(atime),
-        long(mtime),
-        int(mode),
-        int(uid),
-        int(gid),
-        crc32c,
-        md5.strip(),
-    )
-
   def _WarnIfMissingCloudHash(self, url_str, crc32c, md5):
     """Warns if given url_str is a cloud URL and is missing both crc32c and md5.
 
@@ -1126,8 +1672,8 @@ class _DiffIterator(object):
     has_src_mtime = src_mtime > NA_TIME
     has_dst_mtime = dst_mtime > NA_TIME
     use_hashes = (self.compute_file_checksums or
-                  (StorageUrlFromString(src_url_str).IsCloudUrl() and
-                   StorageUrlFromString(dst_url_str).IsCloudUrl()))
+                  (self.base_src_url.IsCloudUrl() and
+                   self.base_dst_url.IsCloudUrl()))
     if (self.skip_old_files and has_src_mtime and has_dst_mtime and
         src_mtime < dst_mtime):
       return False, has_src_mtime, has_dst_mtime
@@ -1136,17 +1682,18 @@ class _DiffIterator(object):
               src_size != dst_size, has_src_mtime, has_dst_mtime)
     if src_size != dst_size:
       return True, has_src_mtime, has_dst_mtime
-    src_crc32c, src_md5, dst_crc32c, dst_md5 = _ComputeNeededFileChecksums(
-        self.logger,
-        src_url_str,
-        src_size,
-        src_crc32c,
-        src_md5,
-        dst_url_str,
-        dst_size,
-        dst_crc32c,
-        dst_md5,
-    )
+    if self.base_src_url.IsFileUrl() or self.base_dst_url.IsFileUrl():
+      src_crc32c, src_md5, dst_crc32c, dst_md5 = _ComputeNeededFileChecksums(
+          self.logger,
+          src_url_str,
+          src_size,
+          src_crc32c,
+          src_md5,
+          dst_url_str,
+          dst_size,
+          dst_crc32c,
+          dst_md5,
+      )
     if src_md5 != _NA and dst_md5 != _NA:
       self.logger.debug('Comparing md5 for %s and %s', src_url_str, dst_url_str)
       return src_md5 != dst_md5, has_src_mtime, has_dst_mtime
@@ -1163,14 +1710,55 @@ class _DiffIterator(object):
   def __iter__(self):
     """Iterates over src/dst URLs and produces a RsyncDiffToApply sequence.
 
+    Returns:
+      Iterator of RsyncDiffToApply.
+    """
+    if self.streaming:
+      return self._IterDiffsDeferringRemovals()
+    return self._IterDiffs()
+
+  def _IterDiffsDeferringRemovals(self):
+    """Yields the RsyncDiffToApply sequence, with all removals last.
+
+    A streaming diff starts copying before the listings are complete. Holding
+    removals back until the listings have completed, and been checked to be in
+    order, means a listing that fails or isn't ordered can't cause files or
+    objects to be deleted.
+
+    Yields:
+      The RsyncDiffToApply.
+    """
+    temp_file = tempfile.NamedTemporaryFile(prefix='gsutil-rsync-rm-',
+                                            delete=False)
+    temp_file.close()
+    removals_file = io.open(temp_file.name, mode='w+', encoding=constants.UTF8)
+    _tmp_files.append(removals_file)
+    for diff_to_apply in self._IterDiffs():
+      if diff_to_apply.diff_action == DiffAction.REMOVE:
+        # JSON-encode the URL, which may contain newlines.
+        removals_file.write(
+            six.ensure_text(json.dumps(diff_to_apply.dst_url_str)) + '\n')
+      else:
+        yield diff_to_apply
+    removals_file.seek(0)
+    for line in removals_file:
+      yield RsyncDiffToApply(None, json.loads(line), POSIXAttributes(),
+                             DiffAction.REMOVE, None)
+    removals_file.close()
+
+  def _IterDiffs(self):
+    """Yields the RsyncDiffToApply sequence.
+
     Yields:
       The RsyncDiffToApply.
     """
-    # Strip trailing slashes, if any, so we compute tail length against
-    # consistent position regardless of whether trailing slashes were included
-    # or not in URL.
-    base_src_url_len = len(self.base_src_url.url_string.rstrip('/\\'))
-    base_dst_url_len = len(self.base_dst_url.url_string.rstrip('/\\'))
+    # Destination URLs are only needed for copies to new destinations, so build
+    # them as needed.
+    construct_dst_url_str = _DstUrlStrConstructor(self.base_src_url,
+                                                  self.base_dst_url,
+                                                  self.recursion_requested)
+    src_cloud_to_dst_file = (self.base_src_url.IsCloudUrl() and
+                             self.base_dst_url.IsFileUrl())
     out_of_src_items = False
     src_url_str = dst_url_str = None
     # Invariant: After each yield, the URLs in src_url_str, dst_url_str,
@@ -1179,35 +1767,22 @@ class _DiffIterator(object):
     # populate from the respective iterator, and we reset one or the other value
     # to None after yielding an action that disposes of that URL.
     while True:
+      # Entries are never None, so None marks the end of a listing.
       if src_url_str is None:
-        if self.sorted_src_urls_it.IsEmpty():
+        src_entry = next(self.sorted_src_urls_it, None)
+        if src_entry is None:
           out_of_src_items = True
         else:
+          src_url_str_to_check, src_attrs = src_entry
           (src_url_str, src_size, src_time_created, src_atime, src_mtime,
-           src_mode, src_uid, src_gid, src_crc32c,
-           src_md5) = (self._ParseTmpFileLine(next(self.sorted_src_urls_it)))
-          posix_attrs = POSIXAttributes(atime=src_atime,
-                                        mtime=src_mtime,
-                                        uid=src_uid,
-                                        gid=src_gid,
-                                        mode=src_mode)
-          # Skip past base URL and normalize slashes so we can compare across
-          # clouds/file systems (including Windows).
-          src_url_str_to_check = _EncodeUrl(
-              src_url_str[base_src_url_len:].replace('\\', '/'))
-          dst_url_str_would_copy_to = copy_helper.ConstructDstUrl(
-              self.base_src_url, StorageUrlFromString(src_url_str), True, True,
-              self.base_dst_url, False, self.recursion_requested).url_string
+           src_mode, src_uid, src_gid, src_crc32c, src_md5) = src_attrs
       if dst_url_str is None:
-        if not self.sorted_dst_urls_it.IsEmpty():
+        dst_entry = next(self.sorted_dst_urls_it, None)
+        if dst_entry is not None:
+          dst_url_str_to_check, dst_attrs = dst_entry
           # We don't need time created at the destination.
           (dst_url_str, dst_size, _, dst_atime, dst_mtime, dst_mode, dst_uid,
-           dst_gid, dst_crc32c,
-           dst_md5) = self._ParseTmpFileLine(next(self.sorted_dst_urls_it))
-          # Skip past base URL and normalize slashes so we can compare across
-          # clouds/file systems (including Windows).
-          dst_url_str_to_check = _EncodeUrl(
-              dst_url_str[base_dst_url_len:].replace('\\', '/'))
+           dst_gid, dst_crc32c, dst_md5) = dst_attrs
       # Only break once we've attempted to populate {str,dst}_url_to_check and
       # we know we're out of src objects.
       if out_of_src_items:
@@ -1217,8 +1792,9 @@ class _DiffIterator(object):
       # be out of dst objects.
       if (dst_url_str is None or src_url_str_to_check < dst_url_str_to_check):
         # There's no dst object corresponding to src object, so copy src to dst.
-        yield RsyncDiffToApply(src_url_str, dst_url_str_would_copy_to,
-                               posix_attrs, DiffAction.COPY, src_size)
+        yield RsyncDiffToApply(src_url_str, construct_dst_url_str(src_url_str),
+                               _POSIXAttributesFromListingAttrs(src_attrs),
+                               DiffAction.COPY, src_size)
         src_url_str = None
       elif src_url_str_to_check > dst_url_str_to_check:
         # dst object without a corresponding src object, so remove dst if -d
@@ -1230,15 +1806,14 @@ class _DiffIterator(object):
       else:
         # There is a dst object corresponding to src object, so check if objects
         # match.
-        if (StorageUrlFromString(src_url_str).IsCloudUrl() and
-            StorageUrlFromString(dst_url_str).IsFileUrl() and
-            src_mtime == NA_TIME):
+        if src_cloud_to_dst_file and src_mtime == NA_TIME:
           src_mtime = src_time_created
         should_replace, has_src_mtime, has_dst_mtime = (self._CompareObjects(
             src_url_str, src_size, src_mtime, src_crc32c, src_md5, dst_url_str,
             dst_size, dst_mtime, dst_crc32c, dst_md5))
         if should_replace:
-          yield RsyncDiffToApply(src_url_str, dst_url_str, posix_attrs,
+          yield RsyncDiffToApply(src_url_str, dst_url_str,
+                                 _POSIXAttributesFromListingAttrs(src_attrs),
                                  DiffAction.COPY, src_size)
         elif self.preserve_posix:
           posix_attrs, needs_update = NeedsPOSIXAttributeUpdate(
@@ -1250,7 +1825,8 @@ class _DiffIterator(object):
         elif has_src_mtime and not has_dst_mtime:
           # File/object at destination matches source but is missing mtime
           # attribute at destination.
-          yield RsyncDiffToApply(src_url_str, dst_url_str, posix_attrs,
+          yield RsyncDiffToApply(src_url_str, dst_url_str,
+                                 _POSIXAttributesFromListingAttrs(src_attrs),
                                  DiffAction.MTIME_SRC_TO_DST, src_size)
         # else: we don't need to copy the file from src to dst since they're
         # the same files.
@@ -1265,9 +1841,8 @@ class _DiffIterator(object):
     if dst_url_str:
       yield RsyncDiffToApply(None, dst_url_str, POSIXAttributes(),
                              DiffAction.REMOVE, None)
-    for line in self.sorted_dst_urls_it:
-      (dst_url_str, _, _, _, _, _, _, _, _, _) = self._ParseTmpFileLine(line)
-      yield RsyncDiffToApply(None, dst_url_str, POSIXAttributes(),
+    for _, dst_attrs in self.sorted_dst_urls_it:
+      yield RsyncDiffToApply(None, dst_attrs[0], POSIXAttributes(),
                              DiffAction.REMOVE, None)
 
 
@@ -1309,6 +1884,7 @@ class _AvoidChecksumAndListingDiffIterator(_DiffIterator):
     # that may cause our estimate to be off.
     global _tmp_files
     self.compute_file_checksums = False
+    self.streaming = False
     self.delete_extras = initialized_diff_iterator.delete_extras
     self.recursion_requested = initialized_diff_iterator.delete_extras
     # TODO: Add a test that mocks the appropriate values in RsyncFunc and
@@ -1324,17 +1900,19 @@ class _AvoidChecksumAndListingDiffIterator(_DiffIterator):
     # global list to be closed (if not closed in the calling scope) and deleted
     # at exit time.
     self.sorted_list_src_file = open(
-        initialized_diff_iterator.sorted_list_src_file_name, 'r')
+        initialized_diff_iterator.sorted_list_src_file_name, 'rb')
     self.sorted_list_dst_file = open(
-        initialized_diff_iterator.sorted_list_dst_file_name, 'r')
+        initialized_diff_iterator.sorted_list_dst_file_name, 'rb')
     _tmp_files.append(self.sorted_list_src_file)
     _tmp_files.append(self.sorted_list_dst_file)
 
     # Wrap iterators in PluralityCheckableIterator so we can check emptiness.
     self.sorted_src_urls_it = PluralityCheckableIterator(
-        iter(self.sorted_list_src_file))
+        _IterTmpFileEntries(self.sorted_list_src_file,
+                            self.base_src_url.url_string))
     self.sorted_dst_urls_it = PluralityCheckableIterator(
-        iter(self.sorted_list_dst_file))
+        _IterTmpFileEntries(self.sorted_list_dst_file,
+                            self.base_dst_url.url_string))
 
   # pylint: enable=super-init-not-called
 
@@ -1549,7 +2127,7 @@ class RsyncCommand(Command):
       usage_synopsis=_SYNOPSIS,
       min_args=2,
       max_args=2,
-      supported_sub_args='a:cCdenpPrRuUx:j:J',
+      supported_sub_args='a:cCdek:npPrRuUx:j:J',
       file_url_ok=True,
       provider_url_ok=False,
       urls_start_arg=0,
@@ -1592,6 +2170,41 @@ class RsyncCommand(Command):
           url_str)
     return url
 
+  def _GetChangedNames(self, src_url):
+    """Reads the -k change journal for names to sync.
+
+    Args:
+      src_url: URL of the source bucket or bucket subdirectory.
+
+    Returns:
+      Sorted list of the changed object names, relative to src_url.
+
+    Raises:
+      CommandException if src_url isn't a cloud URL.
+    """
+    if not src_url.IsCloudUrl():
+      raise CommandException(
+          'The -k option requires a bucket or bucket subdirectory source URL.')
+    prefix = '' if src_url.IsBucket() else src_url.object_name.rstrip('/')
+    if prefix:
+      prefix += '/'
+    changed_names = []
+    for name in ReadChangedObjectNames(self.changes_file_name,
+                                       src_url.bucket_name):
+      if not name.startswith(prefix) or len(name) == len(prefix):
+        continue
+      name = name[len(prefix):]
+      if self.recursion_requested or '/' not in name:
+        changed_names.append(name)
+    self.logger.info('Read %d changed name%s from %s.', len(changed_names),
+                     '' if len(changed_names) == 1 else 's',
+                     self.changes_file_name)
+    if len(changed_names) > _MAX_CHANGED_NAMES_TO_LOOK_UP:
+      self.logger.info(
+          'Listing source and destination rather than looking up more than %d '
+          'changed names.', _MAX_CHANGED_NAMES_TO_LOOK_UP)
+    return sorted(changed_names)
+
   def RunCommand(self):
     """Command entry point for the rsync command."""
     self._ParseOpts()
@@ -1608,6 +2221,9 @@ class RsyncCommand(Command):
 
     src_url = self._InsistContainer(self.args[0], False)
     dst_url = self._InsistContainer(self.args[1], True)
+    self.changed_names = None
+    if self.changes_file_name:
+      self.changed_names = self._GetChangedNames(src_url)
     is_daisy_chain = (src_url.IsCloudUrl() and dst_url.IsCloudUrl() and
                       src_url.scheme != dst_url.scheme)
     LogPerformanceSummaryParams(has_file_src=src_url.IsFileUrl(),
@@ -1643,8 +2259,11 @@ class RsyncCommand(Command):
     # For estimation purposes, create a SeekAheadIterator based on the
     # source and destination files generated when creating the diff iterator.
     # This iteration should avoid expensive operations like file checksumming.
-    seek_ahead_iterator = _SeekAheadDiffIterator(
-        _AvoidChecksumAndListingDiffIterator(diff_iterator))
+    # A streaming diff has no such files to estimate from.
+    seek_ahead_iterator = None
+    if not diff_iterator.streaming:
+      seek_ahead_iterator = _SeekAheadDiffIterator(
+          _AvoidChecksumAndListingDiffIterator(diff_iterator))
 
     self.logger.info('Starting synchronization...')
     start_time = time.time()
@@ -1657,6 +2276,7 @@ class RsyncCommand(Command):
                  fail_on_error=True,
                  seek_ahead_iterator=seek_ahead_iterator)
     finally:
+      diff_iterator.Shutdown()
       CleanUpTempFiles()
 
     end_time = time.time()
@@ -1686,6 +2306,7 @@ class RsyncCommand(Command):
     self.compute_file_checksums = False
     self.dryrun = False
     self.exclude_pattern = None
+    self.changes_file_name = None
     self.skip_old_files = False
     self.skip_unsupported_objects = False
     # self.recursion_requested is initialized in command.py (so it can be
@@ -1717,6 +2338,8 @@ class RsyncCommand(Command):
           self.delete_extras = True
         elif o == '-e':
           self.exclude_symlinks = True
+        elif o == '-k':
+          self.changes_file_name = a
         elif o == '-j':
           gzip_encoded = True
           gzip_arg_exts = [x.strip() for x in a.split(',')]
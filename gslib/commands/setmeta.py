@@ -21,7 +21,6 @@ from __future__ import unicode_literals
 
 import time
 
-from apitools.base.py import encoding
 from gslib.cloud_api import AccessDeniedException
 from gslib.cloud_api import PreconditionException
 from gslib.cloud_api import Preconditions
@@ -32,7 +31,6 @@ from gslib.exception import CommandException
 from gslib.name_expansion import NameExpansionIterator
 from gslib.name_expansion import SeekAheadNameExpansionIterator
 from gslib.storage_url import StorageUrlFromString
-from gslib.third_party.storage_apitools import storage_v1_messages as apitools_messages
 from gslib.thread_message import MetadataMessage
 from gslib.utils import constants
 from gslib.utils import parallelism_framework_util
@@ -250,8 +248,7 @@ class SetMetaCommand(Command):
     exp_src_url = name_expansion_result.expanded_storage_url
     self.logger.info('Setting metadata on %s...', exp_src_url)
 
-    cloud_obj_metadata = encoding.JsonToMessage(
-        apitools_messages.Object, name_expansion_result.expanded_result)
+    cloud_obj_metadata = name_expansion_result.GetExpandedObject()
 
     preconditions = Preconditions(
         gen_match=self.preconditions.gen_match,
@@ -223,6 +223,7 @@ class MetricsCollector(object):
         ('Boto', 'num_retries'),
         ('Boto', 'max_retry_delay'),
         ('GSUtil', 'default_api_version'),
+        ('GSUtil', 'parallel_composite_upload_max_components'),
         ('GSUtil', 'sliced_object_download_max_components'),
         ('GSUtil', 'parallel_process_count'),
         ('GSUtil', 'parallel_thread_count'),
@@ -44,7 +44,91 @@ import gslib.wildcard_iterator
 from gslib.wildcard_iterator import StorageUrlFromString
 
 
-class NameExpansionResult(object):
+# Compact summary of the cloud object metadata iterated during name
+# expansion. Consumers that only need these fields (e.g., to total up the size
+# of an operation) can use it without decoding the full metadata.
+ExpandedObjectSummary = collections.namedtuple(
+    'ExpandedObjectSummary',
+    ['size', 'generation', 'md5_hash', 'crc32c', 'encryption_key_sha256'])
+
+
+def _SummarizeObjectMetadata(obj_metadata):
+  """Returns an ExpandedObjectSummary for an apitools Object."""
+  encryption_key_sha256 = None
+  if obj_metadata.customerEncryption:
+    encryption_key_sha256 = obj_metadata.customerEncryption.keySha256
+  return ExpandedObjectSummary(size=obj_metadata.size,
+                               generation=obj_metadata.generation,
+                               md5_hash=obj_metadata.md5Hash,
+                               crc32c=obj_metadata.crc32c,
+                               encryption_key_sha256=encryption_key_sha256)
+
+
+class _ExpandedResultHolder(object):
+  """Base class for results that carry iterated cloud object metadata.
+
+  Within a process, the metadata is kept as the apitools Object that was
+  iterated, so passing a result to a thread doesn't require encoding and
+  decoding it. apitools messages aren't pickleable, so the metadata is
+  converted to MessageToJson form only when the result is pickled (e.g., to
+  pass it through a multiprocessing.Queue), and decoded again at most once by
+  the receiving process.
+  """
+
+  def _InitExpandedResult(self, expanded_object):
+    self._expanded_object = expanded_object
+    self._expanded_result_json = None
+    self._object_summary = (_SummarizeObjectMetadata(expanded_object)
+                            if expanded_object else None)
+
+  def _CopyExpandedResult(self, other):
+    self._expanded_object = other._expanded_object
+    self._expanded_result_json = other._expanded_result_json
+    self._object_summary = other._object_summary
+
+  @property
+  def expanded_result(self):
+    """Cloud object metadata in MessageToJson form, or None."""
+    if self._expanded_result_json is None and self._expanded_object:
+      self._expanded_result_json = encoding.MessageToJson(
+          self._expanded_object)
+    return self._expanded_result_json
+
+  @property
+  def object_summary(self):
+    """ExpandedObjectSummary of the cloud object metadata, or None."""
+    if self._object_summary is None:
+      expanded_object = self.GetExpandedObject()
+      if expanded_object:
+        self._object_summary = _SummarizeObjectMetadata(expanded_object)
+    return self._object_summary
+
+  def GetExpandedObject(self):
+    """Returns the iterated cloud object metadata.
+
+    The same apitools Object is returned on every call, so callers that
+    modify it must not rely on this result afterward.
+
+    Returns:
+      apitools Object, or None if no cloud object metadata was iterated.
+    """
+    if self._expanded_object is None and self._expanded_result_json:
+      self._expanded_object = encoding.JsonToMessage(
+          apitools_messages.Object, self._expanded_result_json)
+    return self._expanded_object
+
+  def __getstate__(self):
+    state = self.__dict__.copy()
+    if state['_expanded_object'] is not None:
+      state['_expanded_result_json'] = self.expanded_result
+      state['_expanded_object'] = None
+    # The summary is cheap to rebuild from the metadata when needed, so it
+    # isn't worth the extra bytes in every pickled result.
+    state['_object_summary'] = None
+    return state
+
+
+class NameExpansionResult(_ExpandedResultHolder):
   """Holds one fully expanded result from iterating over NameExpansionIterator.
 
   The member data in this class need to be pickleable because
@@ -71,16 +155,16 @@ class NameExpansionResult(object):
           more than one BucketListingRef.
       names_container: Bool indicator whether src_url names a container.
       expanded_storage_url: StorageUrl that was expanded.
-      expanded_result: cloud object metadata in MessageToJson form (for
-          pickleability), if any was iterated; None otherwise.
-          Consumers must call JsonToMessage to get an apitools Object.
+      expanded_result: cloud object metadata (apitools Object), if any was
+          iterated; None otherwise. Consumers call GetExpandedObject to get
+          it back, or use object_summary if they only need its size,
+          generation, hashes or encryption key hash.
     """
     self.source_storage_url = source_storage_url
     self.is_multi_source_request = is_multi_source_request
     self.names_container = names_container
     self.expanded_storage_url = expanded_storage_url
-    self.expanded_result = encoding.MessageToJson(
-        expanded_result) if expanded_result else None
+    self._InitExpandedResult(expanded_result)
 
   def __repr__(self):
     return '%s' % self.expanded_storage_url
@@ -377,10 +461,8 @@ class SeekAheadNameExpansionIterator(object):
 
   def __iter__(self):
     for name_expansion_result in self.name_expansion_iterator:
-      if self.count_data_bytes and name_expansion_result.expanded_result:
-        iterated_metadata = encoding.JsonToMessage(
-            apitools_messages.Object, name_expansion_result.expanded_result)
-        iterated_size = iterated_metadata.size or 0
+      if self.count_data_bytes and name_expansion_result.object_summary:
+        iterated_size = name_expansion_result.object_summary.size or 0
         yield SeekAheadResult(data_bytes=iterated_size)
       else:
         yield SeekAheadResult()
@@ -576,7 +658,7 @@ class _ImplicitBucketSubdirIterator(object):
             '_ImplicitBucketSubdirIterator got a bucket reference %s' % blr)
 
 
-class CopyObjectInfo(object):
+class CopyObjectInfo(_ExpandedResultHolder):
   """Represents the information needed for copying a single object.
   """
 
@@ -594,7 +676,7 @@ class CopyObjectInfo(object):
     self.is_multi_source_request = name_expansion_result.is_multi_source_request
     self.names_container = name_expansion_result.names_container
     self.expanded_storage_url = name_expansion_result.expanded_storage_url
-    self.expanded_result = name_expansion_result.expanded_result
+    self._CopyExpandedResult(name_expansion_result)
 
     self.exp_dst_url = exp_dst_url
     self.have_existing_dst_container = have_existing_dst_container
@@ -28,7 +28,8 @@ import six
 
 import gslib
 from gslib.exception import CommandException
-from gslib.tracker_file import RaiseUnwritableTrackerFileException
+from gslib.tracker_file import ReadTrackerFile
+from gslib.tracker_file import WriteTrackerFile
 from gslib.utils.constants import UTF8
 
 ObjectFromTracker = namedtuple('ObjectFromTracker', 'object_name generation')
@@ -68,13 +69,11 @@ def ReadParallelUploadTrackerFile(tracker_file_name, logger):
   enc_key_sha256 = None
   prefix = None
   existing_components = []
-  tracker_file = None
 
   # If we already have a matching tracker file, get the serialization data
   # so that we can resume the upload.
   try:
-    tracker_file = open(tracker_file_name, 'r')
-    tracker_data = tracker_file.read()
+    tracker_data = ReadTrackerFile(tracker_file_name)
     tracker_json = json.loads(tracker_data)
     enc_key_sha256 = tracker_json[_CompositeUploadTrackerEntry.ENC_SHA256]
     prefix = tracker_json[_CompositeUploadTrackerEntry.PREFIX]
@@ -96,9 +95,6 @@ def ReadParallelUploadTrackerFile(tracker_file_name, logger):
     # Legacy format did not support user-supplied encryption.
     enc_key_sha256 = None
     (prefix, existing_components) = _ParseLegacyTrackerData(tracker_data)
-  finally:
-    if tracker_file:
-      tracker_file.close()
 
   return (enc_key_sha256, prefix, existing_components)
 
@@ -302,9 +298,4 @@ def WriteParallelUploadTrackerFile(tracker_file_name,
       _CompositeUploadTrackerEntry.ENC_SHA256: encryption_key_sha256,
       _CompositeUploadTrackerEntry.PREFIX: prefix
   }
-  try:
-    open(tracker_file_name, 'w').close()  # Clear the file.
-    with open(tracker_file_name, 'w') as fp:
-      fp.write(json.dumps(tracker_file_data))
-  except IOError as e:
-    RaiseUnwritableTrackerFileException(tracker_file_name, e.strerror)
+  WriteTrackerFile(tracker_file_name, json.dumps(tracker_file_data))
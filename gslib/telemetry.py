@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+# Copyright 2026 Google Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Machine-readable telemetry for long-running operations.
+
+If the GSUtil:telemetry_file option is set, the UIController feeds every
+status message it receives to a TelemetryRecorder, which periodically appends
+a JSON snapshot of the operation's progress to that file, one per line. Each
+snapshot contains:
+
+  time: Time the snapshot was taken (seconds since Epoch).
+  elapsed_secs: Seconds since the recorder was created.
+  bytes_transferred, objects_finished: Totals so far.
+  bytes_per_sec, objects_per_sec: Rates since the previous snapshot.
+  total_bytes, total_objects: Current estimates of the operation's size.
+  in_flight: Files, objects and components started but not yet finished.
+  active_workers: Number of distinct threads that reported status since the
+      previous snapshot.
+  retries, retries_by_type: Retryable errors encountered so far.
+  latency_secs: Per operation (e.g., "download", "component_upload"), the
+      count and sum of durations from start to finish, and a histogram of
+      them over latency_bucket_bounds_secs; the last bucket counts durations
+      above the last bound.
+  queue_depths: Number of items waiting in each tracked queue, including the
+      tasks waiting to start in each lane (object_lane, component_lane).
+"""
+
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import division
+from __future__ import unicode_literals
+
+import bisect
+import json
+import time
+
+from gslib.thread_message import FileMessage
+from gslib.thread_message import RetryableErrorMessage
+
+# Default minimum period between telemetry snapshots, in seconds.
+DEFAULT_TELEMETRY_INTERVAL = 5
+
+# Upper bounds of the latency histogram buckets, in seconds.
+LATENCY_BUCKET_BOUNDS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60,
+                         300)
+
+# Operation names reported for each FileMessage type. Types not listed here
+# (e.g., existing components) don't describe work done by this operation.
+_OPERATION_NAMES = {
+    FileMessage.FILE_DOWNLOAD: 'download',
+    FileMessage.FILE_UPLOAD: 'upload',
+    FileMessage.FILE_CLOUD_COPY: 'cloud_copy',
+    FileMessage.FILE_LOCAL_COPY: 'local_copy',
+    FileMessage.FILE_DAISY_COPY: 'daisy_copy',
+    FileMessage.FILE_REWRITE: 'rewrite',
+    FileMessage.FILE_HASH: 'hash',
+    FileMessage.COMPONENT_TO_UPLOAD: 'component_upload',
+    FileMessage.COMPONENT_TO_DOWNLOAD: 'component_download',
+}
+
+
+class _LatencyHistogram(object):
+  """Count, sum and bucketed distribution of operation durations."""
+
+  def __init__(self):
+    self.count = 0
+    self.sum = 0.0
+    self.buckets = [0] * (len(LATENCY_BUCKET_BOUNDS) + 1)
+
+  def Add(self, duration):
+    self.count += 1
+    self.sum += duration
+    self.buckets[bisect.bisect_left(LATENCY_BUCKET_BOUNDS, duration)] += 1
+
+  def ToDict(self):
+    return {'count': self.count, 'sum': self.sum, 'buckets': self.buckets}
+
+
+class TelemetryRecorder(object):
+  """Aggregates status messages and writes periodic JSON-lines snapshots."""
+
+  def __init__(self, telemetry_file, interval=DEFAULT_TELEMETRY_INTERVAL,
+               custom_time=None):
+    """Instantiates a TelemetryRecorder.
+
+    Args:
+      telemetry_file: Path of the file to append snapshots to.
+      interval: Minimum period between snapshots, in seconds. A non-positive
+          value writes a snapshot for every message.
+      custom_time: If a custom start time is desired. Used for testing.
+    """
+    self.interval = interval
+    self.start_time = custom_time if custom_time else time.time()
+    self.last_snapshot_time = self.start_time
+    self.last_bytes_transferred = 0
+    self.last_objects_finished = 0
+
+    # Maps (operation, src_url, dst_url, component_num) of each started file,
+    # object or component to its start time.
+    self.in_flight = {}
+    self.latencies = {}
+    self.retries = 0
+    self.retries_by_type = {}
+    # (process_id, thread_id) of every thread that reported since the last
+    # snapshot.
+    self.active_workers = set()
+    # Maps names to the queues whose depths are reported.
+    self.queues = {}
+    # Line buffered, so that scrapers see each snapshot once it's written.
+    self.telemetry_fp = open(telemetry_file, 'a', 1)
+
+  def TrackQueue(self, name, queue):
+    """Reports the depth of queue under name in subsequent snapshots."""
+    self.queues[name] = queue
+
+  def ProcessMessage(self, status_message):
+    """Updates the aggregated state with a status message.
+
+    Args:
+      status_message: The StatusMessage to be processed.
+    """
+    if status_message.process_id and status_message.thread_id:
+      self.active_workers.add(
+          (status_message.process_id, status_message.thread_id))
+
+    if isinstance(status_message, FileMessage):
+      operation = _OPERATION_NAMES.get(status_message.message_type)
+      if not operation:
+        return
+      key = (operation, str(status_message.src_url),
+             str(status_message.dst_url), status_message.component_num)
+      if not status_message.finished:
+        self.in_flight[key] = status_message.time
+      else:
+        start_time = self.in_flight.pop(key, None)
+        if start_time is not None:
+          if operation not in self.latencies:
+            self.latencies[operation] = _LatencyHistogram()
+          self.latencies[operation].Add(
+              max(0, status_message.time - start_time))
+
+    elif isinstance(status_message, RetryableErrorMessage):
+      self.retries += 1
+      self.retries_by_type[status_message.error_type] = (
+          self.retries_by_type.get(status_message.error_type, 0) + 1)
+
+  def _GetQueueDepths(self):
+    queue_depths = {}
+    for name, queue in self.queues.items():
+      try:
+        queue_depths[name] = queue.qsize()
+      except (NotImplementedError, IOError, EOFError):
+        # qsize isn't implemented on macOS, and the queue may already have
+        # been torn down at the end of the command.
+        pass
+    return queue_depths
+
+  def MaybeWriteSnapshot(self, manager, cur_time=None, force=False):
+    """Writes a snapshot if at least interval seconds passed since the last.
+
+    Args:
+      manager: The UIController's StatusMessageManager, or None if no manager
+          has been created yet.
+      cur_time: Current time. Defaults to time.time().
+      force: If True, write a snapshot regardless of the interval.
+    """
+    cur_time = cur_time if cur_time is not None else time.time()
+    elapsed = cur_time - self.last_snapshot_time
+    if not force and elapsed < self.interval:
+      return
+
+    bytes_transferred = objects_finished = total_bytes = total_objects = 0
+    if manager:
+      objects_finished = manager.objects_finished
+      total_objects = manager.num_objects
+      total_bytes = manager.total_size
+      # Only the DataManager tracks bytes; a MetadataManager's progress
+      # counts objects.
+      bytes_transferred = getattr(manager, 'new_progress', 0)
+
+    snapshot = {
+        'time': cur_time,
+        'elapsed_secs': cur_time - self.start_time,
+        'bytes_transferred': bytes_transferred,
+        'bytes_per_sec': ((bytes_transferred - self.last_bytes_transferred) /
+                          elapsed if elapsed > 0 else 0),
+        'objects_finished': objects_finished,
+        'objects_per_sec': ((objects_finished - self.last_objects_finished) /
+                            elapsed if elapsed > 0 else 0),
+        'total_bytes': total_bytes,
+        'total_objects': total_objects,
+        'in_flight': len(self.in_flight),
+        'active_workers': len(self.active_workers),
+        'retries': self.retries,
+        'retries_by_type': self.retries_by_type,
+        'latency_bucket_bounds_secs': LATENCY_BUCKET_BOUNDS,
+        'latency_secs': {
+            operation: histogram.ToDict()
+            for operation, histogram in self.latencies.items()
+        },
+        'queue_depths': self._GetQueueDepths(),
+    }
+    self.telemetry_fp.write(json.dumps(snapshot, sort_keys=True) + '\n')
+
+    self.last_snapshot_time = cur_time
+    self.last_bytes_transferred = bytes_transferred
+    self.last_objects_finished = objects_finished
+    self.active_workers = set()
@@ -19,6 +19,9 @@ from __future__ import print_function
 from __future__ import division
 from __future__ import unicode_literals
 
+import io
+import threading
+
 from gslib.cs_api_map import ApiSelector
 from gslib.exception import NO_URLS_MATCHED_TARGET
 import gslib.tests.testcase as testcase
@@ -29,6 +32,12 @@ from gslib.tests.util import RUN_S3_TESTS
 from gslib.tests.util import SetBotoConfigForTest
 from gslib.tests.util import TEST_ENCRYPTION_KEY1
 from gslib.tests.util import unittest
+from gslib.utils import cat_helper
+from gslib.utils.cat_helper import ParallelRangeReader
+from gslib.utils.cat_helper import SplitRange
+
+_PARALLEL_READS_CONFIG = [('GSUtil', 'cat_parallel_reads', '3'),
+                          ('GSUtil', 'cat_range_size', '4')]
 
 
 class TestCat(testcase.GsUtilIntegrationTestCase):
@@ -162,3 +171,184 @@ class TestCat(testcase.GsUtilIntegrationTestCase):
       stdout = self.RunGsUtil(
           ['cat', '-r 1-3', suri(object_uri)], return_stdout=True)
       self.assertEqual(stdout, '123')
+
+  def test_cat_parallel_reads(self):
+    """Tests cat reading ranges of objects in parallel."""
+    bucket_uri = self.CreateBucket()
+    data1 = b'0123456789'
+    data2 = b'abcdefghij'
+    obj_uri1 = self.CreateObject(bucket_uri=bucket_uri,
+                                 object_name='obj1',
+                                 contents=data1)
+    self.CreateObject(bucket_uri=bucket_uri,
+                      object_name='obj2',
+                      contents=data2)
+    self.CreateObject(bucket_uri=bucket_uri, object_name='obj3', contents=b'')
+    with SetBotoConfigForTest(_PARALLEL_READS_CONFIG):
+      stdout = self.RunGsUtil(['cat', suri(bucket_uri, 'obj*')],
+                              return_stdout=True)
+      self.assertEqual((data1 + data2).decode('ascii'), stdout)
+      stdout = self.RunGsUtil(['cat', '-r 3-8', suri(obj_uri1)],
+                              return_stdout=True)
+      self.assertEqual('345678', stdout)
+      stdout = self.RunGsUtil(['cat', '-r -7', suri(obj_uri1)],
+                              return_stdout=True)
+      self.assertEqual('3456789', stdout)
+      # Objects before a URL that matches nothing are still output.
+      stdout, stderr = self.RunGsUtil(
+          ['cat', suri(obj_uri1),
+           suri(bucket_uri, 'nonexistent')],
+          return_stdout=True,
+          return_stderr=True,
+          expected_status=1)
+      self.assertEqual(data1.decode('ascii'), stdout)
+      self.assertIn('NotFoundException', stderr)
+
+  def test_cat_parallel_many_objects(self):
+    """Tests cat -m of many objects, in order and unordered."""
+    bucket_uri = self.CreateBucket()
+    contents = {}
+    for i in range(10):
+      contents['obj%d' % i] = ('%d' % i) * (i + 1)
+      self.CreateObject(bucket_uri=bucket_uri,
+                        object_name='obj%d' % i,
+                        contents=contents['obj%d' % i].encode('ascii'))
+    stdout = self.RunGsUtil(['-m', 'cat', suri(bucket_uri, 'obj*')],
+                            return_stdout=True)
+    self.assertEqual(''.join(contents[name] for name in sorted(contents)),
+                     stdout)
+    stdout = self.RunGsUtil(
+        ['-m', 'cat', '--unordered',
+         suri(bucket_uri, 'obj*')], return_stdout=True)
+    # Objects may come in any order, but each one is output whole.
+    for data in contents.values():
+      self.assertIn(data, stdout)
+    self.assertEqual(sum(len(data) for data in contents.values()), len(stdout))
+
+
+class TestCatParallelReads(testcase.GsUtilUnitTestCase):
+  """Unit tests for reading ranges of objects in parallel."""
+
+  def testSplitRange(self):
+    self.assertEqual([(0, 3), (4, 7), (8, None)], SplitRange(0, None, 10, 4))
+    self.assertEqual([(2, 5), (6, 6)], SplitRange(2, 6, 10, 4))
+    self.assertEqual([(7, None)], SplitRange(-3, None, 10, 4))
+    self.assertEqual([(0, 3), (4, 7), (8, None)], SplitRange(-30, None, 10, 4))
+    self.assertEqual([(8, None)], SplitRange(8, 100, 10, 4))
+
+  def testSplitRangeLeavesUnsplittableRequests(self):
+    self.assertIsNone(SplitRange(0, None, 0, 4))
+    self.assertIsNone(SplitRange(10, None, 10, 4))
+    self.assertIsNone(SplitRange(5, 4, 10, 4))
+    self.assertIsNone(SplitRange(0, None, None, 4))
+
+  def testReaderWritesRangesInOrder(self):
+    release = threading.Event()
+
+    def _Fetch(data, wait, unused_gsutil_api):
+      if wait:
+        release.wait()
+      return data
+
+    reader = ParallelRangeReader(3, 4, lambda: None)
+    try:
+      out = io.BytesIO()
+      # The first range finishes last.
+      tasks = [reader.Submit(lambda api: _Fetch(b'abc', True, api), out)]
+      tasks.extend(
+          reader.Submit(lambda api, data=data: _Fetch(data, False, api), out)
+          for data in (b'def', b'ghi'))
+      release.set()
+      for task in tasks:
+        task()
+      self.assertEqual(b'abcdefghi', out.getvalue())
+    finally:
+      reader.Shutdown()
+
+  def testReaderRaisesFetchErrorsInOrder(self):
+
+    def _Fail(unused_gsutil_api):
+      raise ValueError('fetch failed')
+
+    reader = ParallelRangeReader(2, 4, lambda: None)
+    try:
+      out = io.BytesIO()
+      ok_task = reader.Submit(lambda unused_api: b'abc', out)
+      failed_task = reader.Submit(_Fail, out)
+      ok_task()
+      with self.assertRaises(ValueError):
+        failed_task()
+      self.assertEqual(b'abc', out.getvalue())
+    finally:
+      reader.Shutdown()
+
+  def testReaderThreadsHaveTheirOwnApis(self):
+    apis = []
+    apis_lock = threading.Lock()
+
+    def _CreateApi():
+      with apis_lock:
+        apis.append(object())
+        return apis[-1]
+
+    reader = ParallelRangeReader(2, 4, _CreateApi)
+    try:
+      out = io.BytesIO()
+      tasks = [
+          reader.Submit(lambda gsutil_api: b'%d' % apis.index(gsutil_api), out)
+          for _ in range(10)
+      ]
+      for task in tasks:
+        task()
+    finally:
+      reader.Shutdown()
+    self.assertLessEqual(len(apis), 2)
+
+  def _MakeTasks(self, reader, out, release):
+    """Returns tasks of objects a (2 ranges, the first one slow) and b."""
+
+    def _FetchSlowRange(unused_gsutil_api):
+      release.wait()
+      return b'a1'
+
+    slow_range = reader.Submit(_FetchSlowRange, out)
+    a2_range = reader.Submit(lambda unused_api: b'a2', out)
+    b_range = reader.Submit(lambda unused_api: b'b1', out)
+
+    def _RunB():
+      b_range()
+      release.set()
+
+    return iter([
+        cat_helper._CatTask('a', slow_range, slow_range.done),
+        cat_helper._CatTask('a', a2_range, a2_range.done),
+        cat_helper._CatTask('b', _RunB, b_range.done),
+    ])
+
+  def testTasksRunInOrder(self):
+    reader = ParallelRangeReader(3, 4, lambda: None)
+    try:
+      out = io.BytesIO()
+      release = threading.Event()
+      release.set()
+      cat_helper.CatHelper(None)._RunTasks(self._MakeTasks(reader, out,
+                                                           release),
+                                           max_pending=6,
+                                           show_header=False)
+      self.assertEqual(b'a1a2b1', out.getvalue())
+    finally:
+      reader.Shutdown()
+
+  def testUnorderedTasksRunAsObjectsAreReady(self):
+    reader = ParallelRangeReader(3, 4, lambda: None)
+    try:
+      out = io.BytesIO()
+      release = threading.Event()
+      cat_helper.CatHelper(None)._RunTasks(self._MakeTasks(reader, out,
+                                                           release),
+                                           max_pending=6,
+                                           show_header=False,
+                                           reader=reader)
+      self.assertEqual(b'b1a1a2', out.getvalue())
+    finally:
+      reader.Shutdown()
@@ -22,15 +22,22 @@ from __future__ import unicode_literals
 from six.moves import xrange
 from six.moves import range
 
+import crcmod
+
 from gslib.commands.compose import MAX_COMPOSE_ARITY
 from gslib.cs_api_map import ApiSelector
 import gslib.tests.testcase as testcase
 from gslib.tests.testcase.integration_testcase import SkipForS3
+from gslib.tests.testcase.unit_testcase import GsUtilUnitTestCase
 from gslib.tests.util import ObjectToURI as suri
 from gslib.tests.util import SetBotoConfigForTest
 from gslib.tests.util import TEST_ENCRYPTION_KEY1
 from gslib.tests.util import TEST_ENCRYPTION_KEY2
 from gslib.tests.util import unittest
+from gslib.utils.compose_util import ComposeSource
+from gslib.utils.compose_util import ExpectedComposeCrc32c
+from gslib.utils.compose_util import PartitionComposeSources
+from gslib.utils.compose_util import PlanComposeTree
 
 
 @SkipForS3('S3 does not support object composition.')
@@ -54,12 +61,9 @@ class TestCompose(testcase.GsUtilIntegrationTestCase):
     self.RunGsUtil(['compose'] + components + [composite.uri])
     self.assertEqual(composite.get_contents_as_string(), b''.join(data_list))
 
-  def test_compose_too_many_fails(self):
-    components = ['gs://b/component-obj'] * (MAX_COMPOSE_ARITY + 1)
-    stderr = self.RunGsUtil(['compose'] + components + ['gs://b/composite-obj'],
-                            expected_status=1,
-                            return_stderr=True)
-    self.assertIn('command accepts at most', stderr)
+  def test_compose_more_than_max_arity(self):
+    """Tests composing via intermediate objects."""
+    self.check_n_ary_compose(MAX_COMPOSE_ARITY + 1)
 
   def test_compose_too_few_fails(self):
     stderr = self.RunGsUtil(['compose', 'gs://b/composite-obj'],
@@ -263,3 +267,42 @@ class TestCompatibleCompose(testcase.GsUtilIntegrationTestCase):
     expected_msg = ('CommandException: "compose" called on URL with '
                     'unsupported provider (%s).\n' % 's3://b/o2')
     self.assertIn(expected_msg, stderr)
+
+
+class TestComposeTreeFuncs(GsUtilUnitTestCase):
+  """Unit tests for compose tree planning functions."""
+
+  def testPartitionComposeSourcesIsBalanced(self):
+    groups = PartitionComposeSources(100, 32)
+    self.assertEqual([(0, 25), (25, 50), (50, 75), (75, 100)], groups)
+    groups = PartitionComposeSources(33, 32)
+    self.assertEqual([(0, 17), (17, 33)], groups)
+
+  def testPlanComposeTreeSingleRequest(self):
+    self.assertEqual([], PlanComposeTree(1, 32))
+    self.assertEqual([], PlanComposeTree(32, 32))
+
+  def testPlanComposeTreeMultipleLevels(self):
+    levels = PlanComposeTree(5000, 32)
+    # 5000 sources -> 157 intermediates -> 5 intermediates -> final object.
+    self.assertEqual([157, 5], [len(level) for level in levels])
+    for level in levels:
+      sizes = [end - start for (start, end) in level]
+      self.assertLessEqual(max(sizes), 32)
+      self.assertLessEqual(max(sizes) - min(sizes), 1)
+
+  def testExpectedComposeCrc32c(self):
+    data = [b'hello ', b'composite ', b'world']
+    sources = []
+    for i, part in enumerate(data):
+      crc = crcmod.predefined.Crc('crc-32c')
+      crc.update(part)
+      sources.append(ComposeSource('o%d' % i, None, crc.crcValue, len(part)))
+    crc = crcmod.predefined.Crc('crc-32c')
+    crc.update(b''.join(data))
+    self.assertEqual(crc.crcValue, ExpectedComposeCrc32c(sources))
+
+  def testExpectedComposeCrc32cUnknown(self):
+    sources = [ComposeSource('o1', None, 1, 1), ComposeSource('o2', None, None,
+                                                               1)]
+    self.assertIsNone(ExpectedComposeCrc32c(sources))
@@ -19,6 +19,7 @@ from __future__ import print_function
 from __future__ import division
 from __future__ import unicode_literals
 
+import csv
 import datetime
 import logging
 import os
@@ -50,6 +51,7 @@ from gslib.utils.copy_helper import _SelectUploadCompressionStrategy
 from gslib.utils.copy_helper import _SetContentTypeFromFile
 from gslib.utils.copy_helper import FilterExistingComponents
 from gslib.utils.copy_helper import GZIP_ALL_FILES
+from gslib.utils.copy_helper import Manifest
 from gslib.utils.copy_helper import PerformParallelUploadFileToObjectArgs
 from gslib.utils.copy_helper import WarnIfMvEarlyDeletionChargeApplies
 
@@ -558,3 +560,61 @@ class TestCpFuncs(GsUtilUnitTestCase):
     self.assertTrue(mock_stream.close.called)
     # Ensure the lock was released.
     self.assertFalse(mock_lock.__exit__.called)
+
+  def testManifestSkipsSourcesMarkedDone(self):
+    """Tests that OK and skip rows of an existing manifest are skipped."""
+    manifest_path = self.CreateTempFile(contents=(
+        b'Source,Destination,Start,End,Md5,UploadId,Source Size,'
+        b'Bytes Transferred,Result,Description\r\n'
+        b'gs://b/ok,file://ok,,,,,1,1,OK,\r\n'
+        b'gs://b/skip,file://skip,,,,,1,0,skip,exists\r\n'
+        b'gs://b/error,file://error,,,,,1,0,error,failed\r\n'
+        b'gs://b/retried,file://retried,,,,,1,0,error,failed\r\n'
+        b'gs://b/retried,file://retried,,,,,1,1,OK,\r\n'))
+    manifest = Manifest(manifest_path)
+    try:
+      self.assertTrue(manifest.WasSuccessful('gs://b/ok'))
+      self.assertTrue(manifest.WasSuccessful('gs://b/skip'))
+      self.assertTrue(manifest.WasSuccessful('gs://b/retried'))
+      self.assertFalse(manifest.WasSuccessful('gs://b/error'))
+      self.assertFalse(manifest.WasSuccessful('gs://b/missing'))
+      self.assertEqual(3, len(manifest.manifest_filter))
+    finally:
+      manifest.Close()
+
+  def testManifestParseDropsDuplicateRows(self):
+    """Tests that repeated rows for a source are parsed into one digest."""
+    manifest_path = self.CreateTempFile(contents=(
+        b'Source,Destination,Start,End,Md5,UploadId,Source Size,'
+        b'Bytes Transferred,Result,Description\r\n' +
+        b'gs://b/o,file://o,,,,,1,0,skip,exists\r\n' * 100))
+    manifest = Manifest(manifest_path)
+    try:
+      self.assertEqual(1, len(manifest._ParseManifest()))
+    finally:
+      manifest.Close()
+
+  def testManifestWritesQueuedRowsOnClose(self):
+    """Tests that rows buffered by the manifest writer are written on Close."""
+    manifest_path = os.path.join(self.CreateTempDir(), 'manifest')
+    # A long flush interval leaves all rows buffered until Close.
+    with SetBotoConfigForTest([('GSUtil', 'manifest_flush_interval', '3600')]):
+      manifest = Manifest(manifest_path)
+    for i in range(5):
+      src = 'gs://b/o%d' % i
+      manifest.Initialize(src, 'file://o%d' % i)
+      manifest.SetResult(src, i, 'OK')
+    manifest.Close()
+    # Closing again is a no-op.
+    manifest.Close()
+
+    with open(manifest_path, 'r') as f:
+      rows = list(csv.reader(f))
+    self.assertEqual('Source', rows[0][0])
+    self.assertEqual(['gs://b/o%d' % i for i in range(5)],
+                     [row[0] for row in rows[1:]])
+    self.assertEqual(['OK'] * 5, [row[8] for row in rows[1:]])
+    self.assertEqual(manifest.items, {})
+    resumed_manifest = Manifest(manifest_path)
+    resumed_manifest.Close()
+    self.assertTrue(resumed_manifest.WasSuccessful('gs://b/o4'))
@@ -19,12 +19,16 @@ from __future__ import print_function
 from __future__ import division
 from __future__ import unicode_literals
 
+import pickle
+
 from gslib.commands.cp import DestinationInfo
+from gslib.name_expansion import CopyObjectInfo
 from gslib.name_expansion import CopyObjectsIterator
 from gslib.name_expansion import NameExpansionIteratorDestinationTuple
 from gslib.name_expansion import NameExpansionResult
 from gslib.storage_url import StorageUrlFromString
 import gslib.tests.testcase as testcase
+from gslib.third_party.storage_apitools import storage_v1_messages as apitools_messages
 
 
 def _ConstructNameExpansionIterator(src_url_strs):
@@ -113,3 +117,38 @@ class TestCopyObjectsIterator(testcase.GsUtilUnitTestCase):
     self.assertEquals(len(copy_objects_iterator.provider_types), 3)
     self.assertTrue('s3' in copy_objects_iterator.provider_types)
     self.assertTrue(copy_objects_iterator.is_daisy_chain)
+
+  def test_expanded_result_survives_pickling(self):
+    src_url = StorageUrlFromString('gs://bucket/obj')
+    obj_metadata = apitools_messages.Object(
+        bucket='bucket',
+        name='obj',
+        size=1024,
+        generation=7,
+        md5Hash='md5==',
+        crc32c='crc==',
+        customerEncryption=apitools_messages.Object.CustomerEncryptionValue(
+            encryptionAlgorithm='AES256', keySha256='sha256=='))
+    name_expansion_result = NameExpansionResult(src_url, False, False,
+                                                src_url, obj_metadata)
+    copy_object_info = CopyObjectInfo(name_expansion_result,
+                                      StorageUrlFromString('dest'), False)
+
+    # Within a process, the iterated metadata is passed along as-is.
+    self.assertIs(obj_metadata, copy_object_info.GetExpandedObject())
+
+    unpickled = pickle.loads(pickle.dumps(copy_object_info))
+    self.assertEqual(obj_metadata, unpickled.GetExpandedObject())
+    summary = unpickled.object_summary
+    self.assertEqual(1024, summary.size)
+    self.assertEqual(7, summary.generation)
+    self.assertEqual('md5==', summary.md5_hash)
+    self.assertEqual('crc==', summary.crc32c)
+    self.assertEqual('sha256==', summary.encryption_key_sha256)
+
+    no_metadata_result = NameExpansionResult(src_url, False, False, src_url,
+                                             None)
+    unpickled = pickle.loads(pickle.dumps(no_metadata_result))
+    self.assertIsNone(unpickled.GetExpandedObject())
+    self.assertIsNone(unpickled.expanded_result)
+    self.assertIsNone(unpickled.object_summary)
@@ -40,6 +40,9 @@ import six
 from six.moves import http_client
 from six.moves import xrange
 from six.moves import range
+from six import add_move, MovedModule
+add_move(MovedModule('mock', 'mock', 'unittest.mock'))
+from six.moves import mock
 
 from apitools.base.py import exceptions as apitools_exceptions
 import boto
@@ -50,8 +53,10 @@ from boto.storage_uri import BucketStorageUri
 import crcmod
 from gslib.cloud_api import ResumableUploadStartOverException
 from gslib.commands.config import DEFAULT_SLICED_OBJECT_DOWNLOAD_THRESHOLD
+from gslib.commands.cp import CpCommand
 from gslib.cs_api_map import ApiSelector
 from gslib.discard_messages_queue import DiscardMessagesQueue
+from gslib.exception import CommandException
 from gslib.gcs_json_api import GcsJsonApi
 from gslib.parallel_tracker_file import ObjectFromTracker
 from gslib.parallel_tracker_file import WriteParallelUploadTrackerFile
@@ -94,11 +99,13 @@ from gslib.utils.boto_util import UsingCrcmodExtension
 from gslib.utils.constants import START_CALLBACK_PER_BYTES
 from gslib.utils.constants import UTF8
 from gslib.utils.copy_helper import GetTrackerFilePath
+from gslib.utils.copy_helper import Manifest
 from gslib.utils.copy_helper import PARALLEL_UPLOAD_STATIC_SALT
 from gslib.utils.copy_helper import PARALLEL_UPLOAD_TEMP_NAMESPACE
 from gslib.utils.copy_helper import TrackerFileType
 from gslib.utils.hashing_helper import CalculateB64EncodedMd5FromContents
 from gslib.utils.hashing_helper import CalculateMd5FromContents
+from gslib.utils.no_clobber_util import NAMES_PER_LISTING_PAGE
 from gslib.utils.posix_util import GID_ATTR
 from gslib.utils.posix_util import MODE_ATTR
 from gslib.utils.posix_util import NA_ID
@@ -621,6 +628,38 @@ class TestCp(testcase.GsUtilIntegrationTestCase):
       self.assertIn('Skipping existing item: %s' % suri(f), stderr)
       self.assertEqual(f.read(), 'quux')
 
+  @SequentialAndParallelTransfer
+  def test_noclobber_many_sources(self):
+    bucket_uri = self.CreateBucket()
+    key_uri = self.CreateObject(bucket_uri=bucket_uri,
+                                object_name='a',
+                                contents=b'foo')
+    tmpdir = self.CreateTempDir()
+    self.CreateTempFile(tmpdir=tmpdir, file_name='a', contents=b'bar')
+    self.CreateTempFile(tmpdir=tmpdir, file_name='b', contents=b'bar')
+    stderr = self.RunGsUtil(
+        ['cp', '-n', os.path.join(tmpdir, '*'),
+         suri(bucket_uri)], return_stderr=True)
+    self.assertIn('Skipping existing item: %s' % suri(key_uri), stderr)
+    self.assertEqual(key_uri.get_contents_as_string(), b'foo')
+    self.assertEqual(
+        bucket_uri.clone_replace_name('b').get_contents_as_string(), b'bar')
+
+  def test_noclobber_many_sources_same_destination(self):
+    bucket_uri = self.CreateBucket()
+    fpath1 = self.CreateTempFile(tmpdir=self.CreateTempDir(),
+                                 file_name='a',
+                                 contents=b'foo')
+    fpath2 = self.CreateTempFile(tmpdir=self.CreateTempDir(),
+                                 file_name='a',
+                                 contents=b'bar')
+    stderr = self.RunGsUtil(['cp', '-n', fpath1, fpath2, suri(bucket_uri)],
+                            return_stderr=True)
+    # The second copy's destination didn't exist when it was listed.
+    self.assertIn('Skipping existing item: %s' % suri(bucket_uri, 'a'), stderr)
+    self.assertEqual(
+        bucket_uri.clone_replace_name('a').get_contents_as_string(), b'foo')
+
   def test_dest_bucket_not_exist(self):
     fpath = self.CreateTempFile(contents=b'foo')
     invalid_bucket_uri = ('%s://%s' %
@@ -4369,3 +4408,36 @@ class TestCpUnitTests(testcase.GsUtilUnitTestCase):
     self.assertEquals(1, len(warning_messages))
     self.assertIn('Found no hashes to validate object upload',
                   warning_messages[0])
+
+  def test_noclobber_listing_is_limited_by_number_of_sources(self):
+    bucket_uri = self.CreateBucket()
+    tmpdir = self.CreateTempDir()
+    for name in ('a', 'b', 'c'):
+      self.CreateTempFile(tmpdir=tmpdir, file_name=name, contents=b'foo')
+    with mock.patch('gslib.commands.cp.ListExistingObjectNames',
+                    return_value=None) as mock_list:
+      self.RunCommand('cp', ['-n', os.path.join(tmpdir, '*'), suri(bucket_uri)])
+    # Listing costs a request per page, and 3 sources save 3 GETs.
+    self.assertEqual(3 * NAMES_PER_LISTING_PAGE,
+                     mock_list.call_args[1]['max_listed'])
+
+  def test_manifest_close_error_does_not_replace_copy_error(self):
+    bucket_uri = self.CreateBucket()
+    fpath = self.CreateTempFile(contents=b'abcd')
+    manifest_path = os.path.join(self.CreateTempDir(), 'manifest.log')
+    original_close = Manifest.Close
+
+    def _CloseAndFail(manifest):
+      # Stop the writer thread so that only the raised error is reported.
+      original_close(manifest)
+      raise CommandException('close failed')
+
+    with mock.patch.object(CpCommand,
+                           'Apply',
+                           side_effect=ValueError('copy failed')):
+      with mock.patch.object(Manifest,
+                             'Close',
+                             autospec=True,
+                             side_effect=_CloseAndFail):
+        with self.assertRaisesRegexp(ValueError, 'copy failed'):
+          self.RunCommand('cp', ['-L', manifest_path, fpath, suri(bucket_uri)])
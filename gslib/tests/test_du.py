@@ -92,6 +92,25 @@ class TestDu(testcase.GsUtilIntegrationTestCase):
 
     _Check()
 
+  def test_subdirs_parallel(self):
+    """Tests that du -m lists subdirectories the same as du."""
+    bucket_uri, _ = self._create_nested_subdir()
+
+    # Use @Retry as hedge against bucket listing eventual consistency.
+    @Retry(AssertionError, tries=3, timeout_secs=1)
+    def _Check():
+      stdout = self.RunGsUtil(['du', suri(bucket_uri)], return_stdout=True)
+      parallel_stdout = self.RunGsUtil(['-m', 'du', suri(bucket_uri)],
+                                       return_stdout=True)
+      self.assertEqual(stdout, parallel_stdout)
+      self.assertIn('%-11s  %s/sub1材/' % (18, suri(bucket_uri)),
+                    parallel_stdout)
+      stdout = self.RunGsUtil(['-m', 'du', '-s', suri(bucket_uri)],
+                              return_stdout=True)
+      self.assertEqual('%-11s  %s\n' % (18, suri(bucket_uri)), stdout)
+
+    _Check()
+
   def test_multi_args(self):
     """Tests running du with multiple command line arguments."""
     bucket_uri = self.CreateBucket()
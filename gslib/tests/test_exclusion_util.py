@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+# Copyright 2026 Google Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Unit tests for exclude pattern matching."""
+
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import division
+from __future__ import unicode_literals
+
+import fnmatch
+import re
+
+import gslib.tests.testcase as testcase
+from gslib.utils.exclusion_util import GlobMatcher
+from gslib.utils.exclusion_util import RegexMatchesAllStartingWith
+
+
+class TestExclusionUtil(testcase.GsUtilUnitTestCase):
+  """Unit tests for exclusion_util functions."""
+
+  def testGlobMatcherMatchesLikeFnmatch(self):
+    patterns = [
+        'gs://b/literal',
+        'gs://b/prefix*',
+        'gs://b/*.bak',
+        'gs://b/dir?/[ab]*',
+        'gs://b/[!x]nd',
+        '*/sub/*',
+    ]
+    matcher = GlobMatcher(patterns)
+    for string in [
+        'gs://b/literal', 'gs://b/literal2', 'gs://b/prefix', 'gs://b/prefixes',
+        'gs://b/a.bak', 'gs://b/a.bak2', 'gs://b/dir1/a', 'gs://b/dir1/c',
+        'gs://b/and', 'gs://b/xnd', 'gs://b/sub/a', 'gs://b/sub', 'gs://b/pre'
+    ]:
+      self.assertEqual(
+          any(fnmatch.fnmatch(string, pattern) for pattern in patterns),
+          matcher.Matches(string), string)
+
+  def testGlobMatcherWithManyPatterns(self):
+    matcher = GlobMatcher(['gs://b/dir%d/*.o' % i for i in range(2000)])
+    self.assertTrue(matcher.Matches('gs://b/dir1999/a/b.o'))
+    self.assertFalse(matcher.Matches('gs://b/dir2000/b.o'))
+
+  def testRegexMatchesAllStartingWith(self):
+    self.assertTrue(RegexMatchesAllStartingWith(re.compile('build/'),
+                                                'build/'))
+    self.assertTrue(
+        RegexMatchesAllStartingWith(re.compile(r'.*\.git/'), 'src/.git/'))
+    self.assertFalse(RegexMatchesAllStartingWith(re.compile('build/'), 'src/'))
+    # These match some, but not all, paths under build/.
+    self.assertFalse(
+        RegexMatchesAllStartingWith(re.compile(r'build/.*\.o$'), 'build/'))
+    self.assertFalse(
+        RegexMatchesAllStartingWith(re.compile(r'build/(?!keep)'), 'build/'))
@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+# Copyright 2026 Google Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Unit tests for hedged requests."""
+
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import division
+from __future__ import unicode_literals
+
+import sys
+import threading
+import time
+import traceback
+
+import gslib.tests.testcase as testcase
+from gslib.tests.util import SetBotoConfigForTest
+from gslib.utils import hedging_util
+from gslib.utils.hedging_util import HedgedCall
+from gslib.utils.hedging_util import HedgePolicy
+from gslib.utils.hedging_util import MIN_HEDGE_DELAY
+
+from six import add_move, MovedModule
+
+add_move(MovedModule('mock', 'mock', 'unittest.mock'))
+from six.moves import mock
+
+_KIND = 'GetObjectMetadata'
+
+
+def _TrainedPolicy(latency=0.05, budget_percent=100):
+  policy = HedgePolicy(percentile=95, budget_percent=budget_percent)
+  for _ in range(50):
+    policy.RecordLatency(_KIND, latency)
+  return policy
+
+
+class TestHedgePolicy(testcase.GsUtilUnitTestCase):
+  """Unit tests for HedgePolicy."""
+
+  def testNoDelayUntilEnoughSamples(self):
+    policy = HedgePolicy(percentile=95, budget_percent=100)
+    for _ in range(5):
+      policy.RecordLatency(_KIND, 0.05)
+    self.assertIsNone(policy.GetHedgeDelay(_KIND))
+    self.assertIsNone(policy.GetHedgeDelay('GetObjectMedia'))
+
+  def testDelayIsPercentileOfLatencies(self):
+    policy = HedgePolicy(percentile=90, budget_percent=100)
+    for i in range(100):
+      policy.RecordLatency(_KIND, (i + 1) / 100)
+    self.assertAlmostEqual(0.91, policy.GetHedgeDelay(_KIND))
+
+  def testDelayHasFloor(self):
+    self.assertEqual(MIN_HEDGE_DELAY,
+                     _TrainedPolicy(latency=0).GetHedgeDelay(_KIND))
+
+  def testBudget(self):
+    policy = _TrainedPolicy(budget_percent=10)
+    num_hedges = 0
+    for _ in range(100):
+      policy.GetHedgeDelay(_KIND)
+      if policy.TryStartHedge():
+        num_hedges += 1
+    self.assertEqual(10, num_hedges)
+
+  def testConfig(self):
+    with SetBotoConfigForTest([('GSUtil', 'hedge_percentile', '99'),
+                               ('GSUtil', 'hedge_budget_percent', '2')]):
+      policy = HedgePolicy()
+    self.assertEqual(99, policy.percentile)
+    self.assertEqual(2, policy.budget_percent)
+
+
+class TestHedgedCall(testcase.GsUtilUnitTestCase):
+  """Unit tests for HedgedCall."""
+
+  def testFastPrimaryIsNotHedged(self):
+    hedge_called = threading.Event()
+
+    def _Hedge():
+      hedge_called.set()
+      return 'hedge'
+
+    result = HedgedCall(_TrainedPolicy(), _KIND, lambda: 'primary', _Hedge)
+    self.assertEqual(('primary', False), result)
+    self.assertFalse(hedge_called.is_set())
+
+  def testSlowPrimaryIsHedged(self):
+    release_primary = threading.Event()
+
+    def _Primary():
+      release_primary.wait()
+      return 'primary'
+
+    start_time = time.time()
+    try:
+      result = HedgedCall(_TrainedPolicy(), _KIND, _Primary, lambda: 'hedge')
+    finally:
+      release_primary.set()
+    self.assertEqual(('hedge', True), result)
+    self.assertLess(time.time() - start_time, 1)
+
+  def testSlowPrimaryIsNotHedgedOverBudget(self):
+
+    def _Primary():
+      time.sleep(0.2)
+      return 'primary'
+
+    result = HedgedCall(_TrainedPolicy(budget_percent=0), _KIND, _Primary,
+                        lambda: 'hedge')
+    self.assertEqual(('primary', False), result)
+
+  def testFailedAttemptFallsBackToOther(self):
+    release_primary = threading.Event()
+
+    def _Primary():
+      release_primary.wait()
+      return 'primary'
+
+    def _Hedge():
+      try:
+        raise ValueError('hedge failed')
+      finally:
+        release_primary.set()
+
+    result = HedgedCall(_TrainedPolicy(), _KIND, _Primary, _Hedge)
+    self.assertEqual(('primary', False), result)
+
+  def testBothAttemptsFailing(self):
+
+    def _Primary():
+      time.sleep(0.2)
+      raise ValueError('primary failed')
+
+    def _Hedge():
+      raise ValueError('hedge failed')
+
+    with self.assertRaises(ValueError):
+      HedgedCall(_TrainedPolicy(), _KIND, _Primary, _Hedge)
+
+  def testExceptionKeepsTraceback(self):
+
+    def _FailingPrimary():
+      raise ValueError('primary failed')
+
+    try:
+      HedgedCall(_TrainedPolicy(), _KIND, _FailingPrimary, lambda: None)
+    except ValueError:
+      frames = traceback.extract_tb(sys.exc_info()[2])
+      self.assertIn('_FailingPrimary', [frame[2] for frame in frames])
+    else:
+      self.fail('HedgedCall did not raise.')
+
+  @mock.patch.object(hedging_util, '_attempt_runner', None)
+  def testAttemptThreadsAreReused(self):
+    attempt_threads = set()
+
+    def _Primary():
+      attempt_threads.add(threading.current_thread())
+
+    for _ in range(10):
+      HedgedCall(_TrainedPolicy(), _KIND, _Primary, lambda: None)
+    self.assertEqual(1, len(attempt_threads))
+    self.assertNotIn(threading.current_thread(), attempt_threads)
+
+  def testLatenciesAreLearned(self):
+    policy = HedgePolicy(percentile=95, budget_percent=100)
+    for _ in range(20):
+      HedgedCall(policy, _KIND, lambda: None, lambda: None)
+    self.assertEqual(MIN_HEDGE_DELAY, policy.GetHedgeDelay(_KIND))
@@ -62,6 +62,8 @@ from gslib.tests.util import TEST_ENCRYPTION_KEY4_SHA256_B64
 from gslib.tests.util import unittest
 from gslib.third_party.storage_apitools import storage_v1_messages as apitools_messages
 from gslib.utils.constants import UTF8
+from gslib.storage_url import StorageUrlFromString
+from gslib.utils.ls_helper import LsHelper
 from gslib.utils.ls_helper import PrintFullInfoAboutObject
 from gslib.utils.retry_util import Retry
 from gslib.utils.system_util import IS_WINDOWS
@@ -76,9 +78,142 @@ BUCKET_LOCK_SKIP_MSG = ('gsutil does not support bucket lock operations for '
                         'S3 buckets or listing retention policy with XML API.')
 
 
+class _FakeListingRef(object):
+  """Minimal BucketListingRef for a fake bucket listing."""
+
+  def __init__(self, url_string, is_prefix):
+    self.url_string = url_string
+    self.storage_url = StorageUrlFromString(url_string)
+    self.is_prefix = is_prefix
+
+  def IsObject(self):
+    return not self.is_prefix
+
+  def IsPrefix(self):
+    return self.is_prefix
+
+
+class _FakeTreeIterator(object):
+  """Wildcard iterator over a tree of prefixes with 3 subdirs and 2 objects."""
+
+  def __init__(self, url_string, gsutil_api=None):
+    self.flat = url_string.endswith('**')
+    self.prefix = url_string.rstrip('*')
+    if not self.prefix.endswith('/'):
+      self.prefix += '/'
+    self.gsutil_api = gsutil_api
+
+  def _IterTree(self, prefix):
+    depth = prefix.count('/') - 3
+    for i in range(2):
+      yield _FakeListingRef('%sobj%d' % (prefix, i), False)
+    if depth < 3:
+      for i in range(3):
+        yield _FakeListingRef('%sdir%d/' % (prefix, i), True)
+
+  def _IterFlatTree(self, prefix):
+    for blr in self._IterTree(prefix):
+      if blr.IsPrefix():
+        for sub_blr in self._IterFlatTree(blr.url_string):
+          yield sub_blr
+      else:
+        yield blr
+
+  def IterAll(self, **unused_kwargs):
+    # Listings take a little time, as they would over the network.
+    time.sleep(0.005)
+    if self.flat:
+      return iter(
+          sorted(self._IterFlatTree(self.prefix), key=lambda b: b.url_string))
+    return self._IterTree(self.prefix)
+
+
 class TestLsUnit(testcase.GsUtilUnitTestCase):
   """Unit tests for ls command."""
 
+  def _ListFakeTree(self,
+                    num_threads,
+                    exclude_patterns=None,
+                    flat_listing=False,
+                    listed_url_strs=None):
+    output = []
+    gsutil_apis = []
+
+    def _IteratorFunc(url_string, all_versions=False, gsutil_api=None):
+      if num_threads > 1 and gsutil_api:
+        gsutil_apis.append(gsutil_api)
+      if listed_url_strs is not None:
+        listed_url_strs.append(url_string)
+      return _FakeTreeIterator(url_string, gsutil_api)
+
+    def _PrintObject(blr):
+      output.append(blr.url_string)
+      return (1, 3)
+
+    def _PrintDirSummary(num_bytes, blr):
+      output.append('%d %s' % (num_bytes, blr.url_string))
+
+    listing_helper = LsHelper(_IteratorFunc,
+                              self.logger,
+                              print_object_func=_PrintObject,
+                              print_dir_header_func=lambda blr: output.append(
+                                  blr.url_string),
+                              print_dir_summary_func=_PrintDirSummary,
+                              print_newline_func=lambda: output.append(''),
+                              should_recurse=True,
+                              exclude_patterns=exclude_patterns,
+                              num_threads=num_threads,
+                              create_gsutil_api_func=object,
+                              flat_listing=flat_listing)
+    totals = listing_helper.ExpandUrlAndPrint(StorageUrlFromString('gs://b'))
+    return output, totals, gsutil_apis
+
+  def test_parallel_recursive_listing_matches_sequential(self):
+    output, totals, _ = self._ListFakeTree(1)
+    # 1 + 3 + 9 + 27 directories with 2 objects of 3 bytes each.
+    self.assertEqual((0, 80, 240), totals)
+    parallel_output, parallel_totals, gsutil_apis = self._ListFakeTree(4)
+    self.assertEqual(output, parallel_output)
+    self.assertEqual(totals, parallel_totals)
+    self.assertTrue(gsutil_apis)
+
+  def test_parallel_recursive_listing_with_excludes(self):
+    exclude_patterns = ['gs://b/dir1*']
+    output, totals, _ = self._ListFakeTree(1, exclude_patterns)
+    parallel_output, parallel_totals, _ = self._ListFakeTree(
+        4, exclude_patterns)
+    self.assertEqual(output, parallel_output)
+    self.assertEqual(totals, parallel_totals)
+    self.assertFalse([line for line in output if 'gs://b/dir1' in line])
+
+  def test_flat_recursive_listing_matches_recursive(self):
+    output, totals, _ = self._ListFakeTree(1)
+    listed_url_strs = []
+    flat_output, flat_totals, _ = self._ListFakeTree(
+        1, flat_listing=True, listed_url_strs=listed_url_strs)
+    self.assertEqual(['gs://b/**'], listed_url_strs)
+    # Flat listings output entries in name order.
+    self.assertEqual(sorted(output), sorted(flat_output))
+    self.assertEqual(totals, flat_totals)
+    self.assertIn('78 gs://b/dir2/', flat_output)
+    self.assertLess(flat_output.index('gs://b/dir2/obj1'),
+                    flat_output.index('78 gs://b/dir2/'))
+
+  def test_parallel_flat_recursive_listing_matches_sequential(self):
+    exclude_patterns = ['gs://b/dir1*', '*/dir0/obj0']
+    output, totals, _ = self._ListFakeTree(1, exclude_patterns, True)
+    listed_url_strs = []
+    parallel_output, parallel_totals, gsutil_apis = self._ListFakeTree(
+        4, exclude_patterns, True, listed_url_strs)
+    self.assertEqual(['gs://b/*', 'gs://b/dir0/**', 'gs://b/dir2/**'],
+                     sorted(listed_url_strs))
+    self.assertEqual(output, parallel_output)
+    self.assertEqual(totals, parallel_totals)
+    self.assertTrue(gsutil_apis)
+    self.assertFalse([line for line in output if 'gs://b/dir1' in line])
+    self.assertNotIn('gs://b/dir0/obj0', output)
+    self.assertIn('gs://b/dir2/dir0/obj1', output)
+
   def test_one_object_with_L_storage_class_update(self):
     """Tests the JSON storage class update time field."""
     if self.test_api == ApiSelector.XML:
@@ -696,6 +831,20 @@ class TestLs(testcase.GsUtilIntegrationTestCase):
     # Make sure it still exited cleanly.
     self.assertEqual(p.returncode, 0)
 
+  def test_recursive_parallel(self):
+    """Tests that ls -m -r lists subdirectories the same as ls -r."""
+    bucket_uri = self.CreateBucket()
+    for object_name in ('foo', 'dir/foo', 'dir/sub/foo', 'dir2/foo'):
+      self.CreateObject(bucket_uri=bucket_uri,
+                        object_name=object_name,
+                        contents=b'foo')
+    self.AssertNObjectsInBucket(bucket_uri, 4)
+    stdout = self.RunGsUtil(['ls', '-r', suri(bucket_uri)], return_stdout=True)
+    parallel_stdout = self.RunGsUtil(['-m', 'ls', '-r', suri(bucket_uri)],
+                                     return_stdout=True)
+    self.assertEqual(stdout, parallel_stdout)
+    self.assertIn(suri(bucket_uri, 'dir', 'sub', 'foo'), parallel_stdout)
+
   def test_recursive_list_trailing_slash(self):
     """Tests listing an object with a trailing slash."""
     bucket_uri = self.CreateBucket()
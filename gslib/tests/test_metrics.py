@@ -243,7 +243,8 @@ class TestMetricsUnitTests(testcase.GsUtilUnitTestCase):
     int_categories = [
         'debug', 'default_api_version', 'http_socket_timeout',
         'max_retry_delay', 'num_retries', 'oauth2_refresh_retries',
-        'parallel_process_count', 'parallel_thread_count',
+        'parallel_composite_upload_max_components', 'parallel_process_count',
+        'parallel_thread_count',
         'resumable_threshold', 'rsync_buffer_lines',
         'sliced_object_download_max_components', 'software_update_check_period',
         'tab_completion_timeout', 'task_estimation_threshold'
@@ -303,6 +304,7 @@ class TestMetricsUnitTests(testcase.GsUtilUnitTestCase):
       self.assertEqual(
           'debug:1999,default_api_version:1999,http_socket_timeout:1999,'
           'max_retry_delay:1999,num_retries:1999,oauth2_refresh_retries:1999,'
+          'parallel_composite_upload_max_components:1999,'
           'parallel_process_count:1999,parallel_thread_count:1999,'
           'resumable_threshold:1999,rsync_buffer_lines:1999,'
           'sliced_object_download_max_components:1999,'
@@ -320,6 +322,7 @@ class TestMetricsUnitTests(testcase.GsUtilUnitTestCase):
           'debug:INVALID,default_api_version:INVALID,'
           'http_socket_timeout:INVALID,max_retry_delay:INVALID,'
           'num_retries:INVALID,oauth2_refresh_retries:INVALID,'
+          'parallel_composite_upload_max_components:INVALID,'
           'parallel_process_count:INVALID,parallel_thread_count:INVALID,'
           'resumable_threshold:2001,rsync_buffer_lines:2001,'
           'sliced_object_download_max_components:INVALID,'
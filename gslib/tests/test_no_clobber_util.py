@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+# Copyright 2026 Google Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Unit tests for no-clobber destination listings."""
+
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import division
+from __future__ import unicode_literals
+
+import logging
+import os
+import unittest
+
+from gslib.cloud_api import AccessDeniedException
+from gslib.cloud_api import CloudApi
+from gslib.storage_url import StorageUrlFromString
+import gslib.tests.testcase as testcase
+from gslib.third_party.storage_apitools import storage_v1_messages as apitools_messages
+from gslib.utils import no_clobber_util
+from gslib.utils.no_clobber_util import ListExistingObjectNames
+
+
+class _FakeListingApi(object):
+  """Lists a fixed set of object names."""
+
+  def __init__(self, names, exception=None):
+    self.names = names
+    self.exception = exception
+    self.list_calls = []
+
+  def ListObjects(self, bucket_name, prefix=None, provider=None, fields=None):
+    self.list_calls.append((bucket_name, prefix))
+    if self.exception:
+      raise self.exception
+    for name in sorted(self.names):
+      if name.startswith(prefix or ''):
+        yield CloudApi.CsObjectOrPrefix(
+            apitools_messages.Object(name=name),
+            CloudApi.CsObjectOrPrefixType.OBJECT)
+
+
+class TestNoClobberUtil(testcase.GsUtilUnitTestCase):
+  """Unit tests for no_clobber_util functions."""
+
+  def setUp(self):
+    super(TestNoClobberUtil, self).setUp()
+    self.test_logger = logging.getLogger('test')
+
+  def testListsDestinationPrefixOnce(self):
+    api = _FakeListingApi(['dir/a', 'dir/b', 'other/c'])
+    existing_names = ListExistingObjectNames(
+        api, StorageUrlFromString('gs://bucket/dir'), self.test_logger)
+    self.assertEqual(api.list_calls, [('bucket', 'dir')])
+    self.assertTrue(existing_names.Covers(
+        StorageUrlFromString('gs://bucket/dir/c')))
+    self.assertFalse(existing_names.Covers(
+        StorageUrlFromString('gs://bucket/other/c')))
+    self.assertFalse(existing_names.Covers(
+        StorageUrlFromString('gs://bucket2/dir/c')))
+    self.assertFalse(existing_names.Covers(
+        StorageUrlFromString('gs://bucket/dir/a#1')))
+    self.assertTrue(existing_names.Contains('dir/a'))
+    self.assertFalse(existing_names.Contains('dir/c'))
+    existing_names.Close()
+
+  @unittest.skipUnless(no_clobber_util.sqlite3,
+                       'sqlite3 module is not available')
+  def testSpillsToDisk(self):
+    names = ['obj%d' % i for i in range(25)]
+    existing_names = ListExistingObjectNames(
+        _FakeListingApi(names),
+        StorageUrlFromString('gs://bucket'),
+        self.test_logger,
+        max_in_memory=10)
+    self.assertFalse(existing_names.names)
+    self.assertTrue(os.path.exists(existing_names.db_path))
+    for name in names:
+      self.assertTrue(existing_names.Contains(name))
+    self.assertFalse(existing_names.Contains('obj25'))
+    tmp_dir = existing_names.tmp_dir
+    existing_names.Close()
+    self.assertFalse(os.path.exists(tmp_dir))
+
+  def testFallsBackWhenListingIsTooLarge(self):
+    self.assertIsNone(
+        ListExistingObjectNames(_FakeListingApi(['a', 'b', 'c']),
+                                StorageUrlFromString('gs://bucket'),
+                                self.test_logger,
+                                max_listed=2))
+
+  def testFallsBackWhenListingFails(self):
+    self.assertIsNone(
+        ListExistingObjectNames(
+            _FakeListingApi([], exception=AccessDeniedException('denied')),
+            StorageUrlFromString('gs://bucket'), self.test_logger))
+
+  def testMaxListedNamesIsLimitedByCopies(self):
+    self.assertEqual(3 * no_clobber_util.NAMES_PER_LISTING_PAGE,
+                     no_clobber_util.GetMaxListedNames(3))
+    self.assertEqual(no_clobber_util.MAX_LISTED_NAMES,
+                     no_clobber_util.GetMaxListedNames(10**9))
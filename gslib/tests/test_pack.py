@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+# Copyright 2026 Google Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests for pack command."""
+
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import division
+from __future__ import unicode_literals
+
+import os
+import tarfile
+import tempfile
+
+from gslib.exception import CommandException
+from gslib.exception import HashMismatchException
+import gslib.tests.testcase as testcase
+from gslib.tests.testcase.integration_testcase import SkipForS3
+from gslib.tests.testcase.unit_testcase import GsUtilUnitTestCase
+from gslib.tests.util import ObjectToURI as suri
+from gslib.utils import pack_util
+from gslib.utils.pack_util import DecodePackIndex
+from gslib.utils.pack_util import EncodePackIndex
+from gslib.utils.pack_util import GetMemberPath
+from gslib.utils.pack_util import MemberSplittingStream
+from gslib.utils.pack_util import PackPlanner
+from gslib.utils.pack_util import PlanRangedReads
+
+
+class TestPack(testcase.GsUtilIntegrationTestCase):
+  """Integration tests for pack command."""
+
+  def _CreateFiles(self):
+    tmpdir = self.CreateTempDir()
+    contents = {
+        'a.txt': b'a' * 1000,
+        'empty': b'',
+        'dir/b.txt': b'b' * 3000,
+        'dir/sub/c.txt': b'c' * 10,
+    }
+    for name, data in contents.items():
+      self.CreateTempFile(tmpdir=tmpdir,
+                          contents=data,
+                          file_name=tuple(name.split('/')))
+    return tmpdir, contents
+
+  @SkipForS3('Pack is only supported for gs URLs.')
+  def test_create_and_extract(self):
+    src_dir, contents = self._CreateFiles()
+    bucket_uri = self.CreateBucket()
+    pack_url = suri(bucket_uri, 'pack')
+    # A tiny pack size puts each file in its own pack object.
+    self.RunGsUtil(['pack', 'create', '-s', '1', src_dir, pack_url])
+    stdout = self.RunGsUtil(['pack', 'ls', pack_url], return_stdout=True)
+    for name in contents:
+      self.assertIn(name, stdout)
+
+    dst_dir = self.CreateTempDir()
+    self.RunGsUtil(['pack', 'extract', pack_url, dst_dir])
+    for name, data in contents.items():
+      with open(os.path.join(dst_dir, *name.split('/')), 'rb') as fp:
+        self.assertEqual(data, fp.read())
+
+  @SkipForS3('Pack is only supported for gs URLs.')
+  def test_extract_matching_members(self):
+    src_dir, contents = self._CreateFiles()
+    bucket_uri = self.CreateBucket()
+    pack_url = suri(bucket_uri, 'pack')
+    self.RunGsUtil(['pack', 'create', src_dir, pack_url])
+    dst_dir = self.CreateTempDir()
+    self.RunGsUtil(['pack', 'extract', pack_url, dst_dir, 'dir/*'])
+    with open(os.path.join(dst_dir, 'dir', 'b.txt'), 'rb') as fp:
+      self.assertEqual(contents['dir/b.txt'], fp.read())
+    self.assertFalse(os.path.exists(os.path.join(dst_dir, 'a.txt')))
+
+  def test_extract_without_index_fails(self):
+    bucket_uri = self.CreateBucket()
+    stderr = self.RunGsUtil(
+        ['pack', 'extract',
+         suri(bucket_uri, 'nopack'),
+         self.CreateTempDir()],
+        expected_status=1,
+        return_stderr=True)
+    self.assertIn('No pack index found', stderr)
+
+  def test_extract_rejects_create_options(self):
+    bucket_uri = self.CreateBucket()
+    stderr = self.RunGsUtil(
+        ['pack', 'extract', '-s', '1',
+         suri(bucket_uri, 'pack'),
+         self.CreateTempDir()],
+        expected_status=1,
+        return_stderr=True)
+    self.assertIn('can only be used with the "pack create" command', stderr)
+
+
+class TestPackFuncs(GsUtilUnitTestCase):
+  """Unit tests for pack_util functions."""
+
+  def _WriteArchive(self, contents):
+    """Returns (archive bytes, PackMembers) for a dict of member contents."""
+    src_dir = self.CreateTempDir()
+    files = []
+    for name in sorted(contents):
+      path = self.CreateTempFile(tmpdir=src_dir,
+                                 contents=contents[name],
+                                 file_name=tuple(name.split('/')))
+      files.append((path, name))
+    with tempfile.TemporaryFile() as fp:
+      members = pack_util._WritePackArchive(fp, 0, files)
+      fp.seek(0)
+      return fp.read(), members
+
+  def testPackPlanner(self):
+    files = [('/f%d' % i, 'f%d' % i, 100) for i in range(10)]
+    planner = PackPlanner(iter(files),
+                          lambda pack_num: pack_num,
+                          pack_size=1500)
+    plan = list(planner)
+    self.assertEqual(planner.num_packs, len(plan))
+    self.assertEqual(4, len(plan))
+    self.assertEqual([f[:2] for f in files],
+                     [f for args in plan for f in args.files])
+    self.assertEqual(list(range(4)), [args.pack_url for args in plan])
+
+  def testArchiveIsTarWithIndexedMembers(self):
+    contents = {'a': b'aaa', 'dir/b': b'b' * 1000, 'empty': b''}
+    data, members = self._WriteArchive(contents)
+    for member in members:
+      self.assertEqual(contents[member.name],
+                       data[member.offset:member.offset + member.size])
+    with tempfile.TemporaryFile() as fp:
+      fp.write(data)
+      fp.seek(0)
+      with tarfile.open(fileobj=fp) as archive:
+        self.assertEqual(sorted(contents), sorted(archive.getnames()))
+
+  def testIndexRoundTrip(self):
+    _, members = self._WriteArchive({'a': b'aaa', 'b': b'bb'})
+    packs, decoded_members = DecodePackIndex(EncodePackIndex([1024], members))
+    self.assertEqual([{'name': 'pack-000000.tar', 'size': 1024}], packs)
+    self.assertEqual(members, decoded_members)
+
+  def testPlanRangedReadsMergesNearbyMembers(self):
+    _, members = self._WriteArchive({'a': b'a', 'b': b'b', 'c': b'c'})
+    far_member = members[-1]._replace(offset=members[-1].offset +
+                                      2 * pack_util._MAX_READ_GAP)
+    other_pack_member = members[0]._replace(pack_num=1)
+    member_paths = [(m, m.name) for m in members + [far_member,
+                                                     other_pack_member]]
+    reads = list(PlanRangedReads(['pack0', 'pack1'], member_paths))
+    self.assertEqual([3, 1, 1], [len(read.members) for read in reads])
+    self.assertEqual(['pack0', 'pack0', 'pack1'],
+                     [read.pack_url for read in reads])
+    self.assertEqual(members[0].offset, reads[0].start_byte)
+    self.assertEqual(members[2].offset, reads[0].end_byte)
+
+  def _Extract(self, data, members):
+    dst_dir = self.CreateTempDir()
+    member_paths = [(m, GetMemberPath(dst_dir, m.name)) for m in members]
+    read = next(PlanRangedReads(['pack0'], member_paths))
+    stream = MemberSplittingStream(read.start_byte, read.members)
+    # Write in small, unaligned chunks, as downloads may.
+    chunk = data[read.start_byte:read.end_byte + 1]
+    for i in range(0, len(chunk), 7):
+      stream.write(chunk[i:i + 7])
+    stream.close()
+    return dst_dir
+
+  def testMemberSplittingStream(self):
+    contents = {'a': b'aaa', 'dir/b': b'b' * 1000, 'empty': b''}
+    data, members = self._WriteArchive(contents)
+    dst_dir = self._Extract(data, members)
+    for name, member_data in contents.items():
+      with open(os.path.join(dst_dir, *name.split('/')), 'rb') as fp:
+        self.assertEqual(member_data, fp.read())
+
+  def testMemberSplittingStreamDetectsCorruption(self):
+    data, members = self._WriteArchive({'a': b'aaa'})
+    corrupt_data = data.replace(b'aaa', b'aab')
+    with self.assertRaises(HashMismatchException):
+      self._Extract(corrupt_data, members)
+
+  def testGetMemberPathRejectsEscapes(self):
+    dst_dir = self.CreateTempDir()
+    self.assertEqual(os.path.join(dst_dir, 'dir', 'a'),
+                     GetMemberPath(dst_dir, 'dir/a'))
+    for name in ('../a', 'dir/../../a', '/etc/passwd'):
+      with self.assertRaises(CommandException):
+        GetMemberPath(dst_dir, name)
@@ -33,16 +33,25 @@ import threading
 import time
 
 import six
+from six.moves import queue as Queue
 from boto.storage_uri import BucketStorageUri
 from gslib import cs_api_map
 from gslib.command import Command
 from gslib.command import CreateOrGetGsutilLogger
 from gslib.command import DummyArgChecker
+from gslib.command import COMPONENT_LANE
+from gslib.command import OBJECT_LANE
+from gslib.command import ProducerThread
+from gslib.command import Task
+from gslib.command import TaskBatch
+from gslib.command import WorkStealingTaskQueue
 from gslib.tests.mock_cloud_api import MockCloudApi
 import gslib.tests.testcase as testcase
 from gslib.tests.testcase.base import RequiresIsolation
+from gslib.tests.util import SetBotoConfigForTest
 from gslib.tests.util import unittest
 from gslib.utils.parallelism_framework_util import CheckMultiprocessingAvailableAndInit
+from gslib.utils.parallelism_framework_util import TaskLanes
 from gslib.utils.system_util import IS_WINDOWS
 
 # Amount of time for an individual test to run before timing out. We need a
@@ -120,6 +129,31 @@ def _AdjustProcessCountIfWindows(process_count):
     return process_count
 
 
+def _ApplySlices(cls, args, thread_state=None):
+  """Calls Apply as a sliced operation would, with args[2] arguments.
+
+  The first two elements of args should be the process and thread counts,
+  respectively, to be used for the recursive call.
+
+  Args:
+    cls: The Command class to call Apply on.
+    args: Arguments to pass to Apply.
+    thread_state: Unused, required by function signature.
+
+  Returns:
+    Number of values returned by the call to Apply.
+  """
+  return_values = cls.Apply(
+      _ReturnOneValue, [()] * args[2],
+      _ExceptionHandler,
+      arg_checker=DummyArgChecker,
+      process_count=_AdjustProcessCountIfWindows(args[0]),
+      thread_count=args[1],
+      should_return_results=True,
+      parallel_operations_override=cls.ParallelOverrideReason.SLICE)
+  return sum(return_values)
+
+
 def _ReApplyWithReplicatedArguments(cls, args, thread_state=None):
   """Calls Apply with arguments repeated seven times.
 
@@ -303,6 +337,44 @@ class TestParallelismFramework(testcase.GsUtilUnitTestCase):
     results = self._RunApply(_ReturnOneValue, args, process_count, thread_count)
     self.assertEqual(len(args), len(results))
 
+  @RequiresIsolation
+  @unittest.skipIf(IS_WINDOWS, 'Multiprocessing is not supported on Windows')
+  def testTaskBatchingMultiProcessMultiThread(self):
+    self._TestTaskBatching(3, 3)
+
+  @Timeout
+  def _TestTaskBatching(self, process_count, thread_count):
+    # An argument count that isn't a multiple of the batch size leaves a
+    # partial batch at the end of the iterator.
+    args = [()] * 53
+    with SetBotoConfigForTest([('GSUtil', 'task_batch_size', '5')]):
+      results = self._RunApply(_ReturnOneValue, args, process_count,
+                               thread_count)
+      self.assertEqual(len(args), len(results))
+
+      command_inst = self.command_class(True)
+      self._RunApply(_FailureFunc,
+                     args,
+                     process_count,
+                     thread_count,
+                     command_inst=command_inst,
+                     shared_attrs=['failure_count'])
+      self.assertEqual(len(args), command_inst.failure_count)
+
+  @RequiresIsolation
+  @unittest.skipIf(IS_WINDOWS, 'Multiprocessing is not supported on Windows')
+  def testWorkStealingSchedulerMultiProcessMultiThread(self):
+    self._TestWorkStealingScheduler(3, 3)
+
+  @Timeout
+  def _TestWorkStealingScheduler(self, process_count, thread_count):
+    args = [()] * 53
+    with SetBotoConfigForTest([('GSUtil', 'task_scheduler', 'work_stealing'),
+                               ('GSUtil', 'task_reorder_window', '7')]):
+      results = self._RunApply(_ReturnOneValue, args, process_count,
+                               thread_count)
+      self.assertEqual(len(args), len(results))
+
   @RequiresIsolation
   def testNoTasksSingleProcessSingleThread(self):
     self._TestApplyWithNoTasks(1, 1)
@@ -638,6 +710,26 @@ class TestParallelismFramework(testcase.GsUtilUnitTestCase):
                              process_count, thread_count)
     self.assertEqual(7 * (sum(base_args) + len(base_args)), sum(results))
 
+  @RequiresIsolation
+  def testComponentTaskShareSingleProcessMultiThread(self):
+    self._TestComponentTaskShare(1, 3)
+
+  @RequiresIsolation
+  @unittest.skipIf(IS_WINDOWS, 'Multiprocessing is not supported on Windows')
+  def testComponentTaskShareMultiProcessMultiThread(self):
+    self._TestComponentTaskShare(3, 3)
+
+  @Timeout
+  def _TestComponentTaskShare(self, process_count, thread_count):
+    # Whole-object tasks that each wait on their own component tasks must not
+    # keep the components from running, whatever their share.
+    base_args = [3, 1, 4, 1, 5, 9, 2, 6]
+    args = [[process_count, thread_count, count] for count in base_args]
+    with SetBotoConfigForTest([('GSUtil', 'component_task_share', '0.2')]):
+      results = self._RunApply(_ApplySlices, args, process_count,
+                               thread_count)
+    self.assertEqual(sum(base_args), sum(results))
+
   @RequiresIsolation
   def testExceptionInProducerRaisesAndTerminatesSingleProcessSingleThread(self):
     self._TestExceptionInProducerRaisesAndTerminates(1, 1)
@@ -720,3 +812,102 @@ class TestParallelismFrameworkWithoutMultiprocessing(TestParallelismFramework):
   available for the sequential path is referenced before initialization).
   """
   command_class = FakeCommandWithoutMultiprocessingModule
+
+
+class TestWorkStealingTaskQueue(testcase.GsUtilUnitTestCase):
+  """Unit tests for WorkStealingTaskQueue."""
+
+  def _MakeTask(self, args):
+    return Task(None, args, 1, None, False, None, False, OBJECT_LANE)
+
+  def testItemsWithSameAffinityKeyShareQueue(self):
+    queues = [Queue.Queue() for _ in range(3)]
+    task_queue = WorkStealingTaskQueue(queues, lambda args: args)
+
+    task_queue.put(self._MakeTask('a'))
+    task_queue.put(self._MakeTask('a'))
+    # A batch is routed by the key of its first task.
+    task_queue.put(TaskBatch([self._MakeTask('a'), self._MakeTask('b')]))
+    self.assertEqual(3, task_queue.qsize())
+    self.assertEqual([3], [q.qsize() for q in queues if q.qsize()])
+
+    # Items without a key are spread across all queues.
+    for _ in range(3):
+      task_queue.put(self._MakeTask(None))
+    self.assertEqual(6, task_queue.qsize())
+    self.assertTrue(all(q.qsize() for q in queues))
+
+  def testConsumerStealsWhenOwnQueueIsEmpty(self):
+    queues = [Queue.Queue() for _ in range(3)]
+    task_queue = WorkStealingTaskQueue(queues, lambda args: None)
+    queues[1].put(self._MakeTask('own'))
+    queues[2].put(self._MakeTask('other'))
+
+    self.assertEqual('own', task_queue.GetForConsumer(1).args)
+    self.assertEqual('other', task_queue.GetForConsumer(1).args)
+    self.assertEqual(0, task_queue.qsize())
+
+
+class TestProducerThread(testcase.GsUtilUnitTestCase):
+  """Unit tests for ProducerThread."""
+
+  def testBatchIsPutWhileIteratorIsSlow(self):
+    task_queue = Queue.Queue()
+    release_iterator = threading.Event()
+
+    def _SlowArgsIterator():
+      for i in range(3):
+        yield i
+      release_iterator.wait()
+
+    producer_thread = ProducerThread(FakeCommand(True),
+                                     _SlowArgsIterator(),
+                                     -1,
+                                     _ReturnOneValue,
+                                     task_queue,
+                                     False,
+                                     _ExceptionHandler,
+                                     DummyArgChecker,
+                                     False,
+                                     task_batch_size=10)
+    try:
+      # The most recent task is held back, as it may be the last.
+      batch = task_queue.get(timeout=5)
+      self.assertEqual([0, 1], [task.args for task in batch.tasks])
+    finally:
+      release_iterator.set()
+      producer_thread.join()
+    self.assertEqual(2, task_queue.get_nowait().args)
+
+
+class TestTaskLanes(testcase.GsUtilUnitTestCase):
+  """Unit tests for TaskLanes."""
+
+  def testLaneLimitAppliesOnlyWhileOtherLaneWaits(self):
+    task_lanes = TaskLanes(False, 2)
+    task_lanes.SetLimits([2, 1])
+    task_lanes.AddWaiting(COMPONENT_LANE, 3)
+
+    # With no whole-object tasks waiting, components may use any workers.
+    self.assertTrue(task_lanes.TryStart(COMPONENT_LANE))
+    self.assertTrue(task_lanes.TryStart(COMPONENT_LANE))
+
+    task_lanes.AddWaiting(OBJECT_LANE, 3)
+    self.assertFalse(task_lanes.TryStart(COMPONENT_LANE))
+    self.assertTrue(task_lanes.TryStart(OBJECT_LANE))
+    self.assertTrue(task_lanes.TryStart(OBJECT_LANE))
+    self.assertFalse(task_lanes.TryStart(OBJECT_LANE))
+
+    # Once components drop below their share, the last one may start.
+    task_lanes.Finish(COMPONENT_LANE)
+    task_lanes.Finish(COMPONENT_LANE)
+    self.assertTrue(task_lanes.TryStart(COMPONENT_LANE))
+    self.assertEqual(0, task_lanes.GetWaiting(COMPONENT_LANE))
+    self.assertTrue(task_lanes.TryStart(OBJECT_LANE))
+
+  def testUnlimitedLanes(self):
+    task_lanes = TaskLanes(False, 2)
+    task_lanes.AddWaiting(OBJECT_LANE, 5)
+    task_lanes.AddWaiting(COMPONENT_LANE, 5)
+    for _ in range(5):
+      self.assertTrue(task_lanes.TryStart(COMPONENT_LANE))
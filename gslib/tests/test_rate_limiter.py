@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+# Copyright 2026 Google Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Unit tests for client-side bandwidth and request rate limits."""
+
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import division
+from __future__ import unicode_literals
+
+import io
+import threading
+
+import gslib.tests.testcase as testcase
+from gslib.tests.util import SetBotoConfigForTest
+from gslib.utils import rate_limiter
+from gslib.utils.rate_limiter import BandwidthLimitedStream
+from gslib.utils.rate_limiter import LimitBucketRequestRate
+from gslib.utils.rate_limiter import MaybeLimitBandwidth
+from gslib.utils.rate_limiter import TokenBuckets
+from gslib.utils.unit_util import ONE_KIB
+from gslib.utils.unit_util import ONE_MIB
+
+
+class _FakeClock(object):
+  """Clock for token buckets that records sleeps instead of sleeping."""
+
+  def __init__(self, advance_on_sleep=True):
+    """Instantiates the clock.
+
+    Args:
+      advance_on_sleep: If True, each sleep advances the clock; otherwise the
+          clock stays at its initial time.
+    """
+    self.now = 1000.0
+    self.sleeps = []
+    self._advance_on_sleep = advance_on_sleep
+    self._lock = threading.Lock()
+
+  def Time(self):
+    return self.now
+
+  def Sleep(self, secs):
+    with self._lock:
+      self.sleeps.append(secs)
+      if self._advance_on_sleep:
+        self.now += secs
+
+
+class TestRateLimiter(testcase.GsUtilUnitTestCase):
+  """Unit tests for rate_limiter."""
+
+  def setUp(self):
+    super(TestRateLimiter, self).setUp()
+    # Start each test with full token buckets.
+    rate_limiter.InitializeThreadingVariables()
+
+  def _UseClock(self, clock):
+    rate_limiter.bandwidth_token_bucket = TokenBuckets(False,
+                                                       clock=clock.Time,
+                                                       sleep=clock.Sleep)
+    rate_limiter.request_rate_token_buckets = TokenBuckets(
+        False,
+        num_slots=rate_limiter._NUM_REQUEST_RATE_SLOTS,
+        clock=clock.Time,
+        sleep=clock.Sleep)
+
+  def _ExpectedDelay(self, num_tokens, rate):
+    # The first _BURST_SECS worth of tokens are available immediately.
+    return (num_tokens - rate * rate_limiter._BURST_SECS) / rate
+
+  def testMaybeLimitBandwidth(self):
+    stream = io.BytesIO()
+    with SetBotoConfigForTest([('GSUtil', 'max_bandwidth', None)]):
+      self.assertIs(stream, MaybeLimitBandwidth(stream))
+    with SetBotoConfigForTest([('GSUtil', 'max_bandwidth', '1M')]):
+      wrapped_stream = MaybeLimitBandwidth(stream)
+      self.assertIsInstance(wrapped_stream, BandwidthLimitedStream)
+      # Other attributes are those of the wrapped stream.
+      self.assertEqual(stream.tell(), wrapped_stream.tell())
+
+  def testReadsAreShaped(self):
+    clock = _FakeClock()
+    self._UseClock(clock)
+    data = b'x' * (512 * ONE_KIB)
+    stream = BandwidthLimitedStream(io.BytesIO(data), ONE_MIB)
+    read_data = b''
+    while True:
+      chunk = stream.read(16 * ONE_KIB)
+      if not chunk:
+        break
+      read_data += chunk
+    self.assertEqual(data, read_data)
+    self.assertAlmostEqual(self._ExpectedDelay(len(data), ONE_MIB),
+                           sum(clock.sleeps))
+
+  def testWritesFromManyThreadsShareTheLimit(self):
+    # With the clock stopped, no tokens are refilled, so the last write waits
+    # for all the bytes written before it.
+    clock = _FakeClock(advance_on_sleep=False)
+    self._UseClock(clock)
+    num_threads = 4
+    bytes_per_thread = 128 * ONE_KIB
+
+    def _Write():
+      stream = BandwidthLimitedStream(io.BytesIO(), ONE_MIB)
+      for _ in range(bytes_per_thread // (8 * ONE_KIB)):
+        stream.write(b'x' * (8 * ONE_KIB))
+
+    threads = [threading.Thread(target=_Write) for _ in range(num_threads)]
+    for thread in threads:
+      thread.start()
+    for thread in threads:
+      thread.join()
+    self.assertAlmostEqual(
+        self._ExpectedDelay(num_threads * bytes_per_thread, ONE_MIB),
+        max(clock.sleeps))
+
+  def testRequestRateIsPerBucket(self):
+    clock = _FakeClock()
+    self._UseClock(clock)
+    num_requests = 30
+    for _ in range(num_requests):
+      LimitBucketRequestRate('bucket-a', 50)
+    self.assertAlmostEqual(self._ExpectedDelay(num_requests, 50),
+                           sum(clock.sleeps))
+
+    # Another bucket has its own limit.
+    del clock.sleeps[:]
+    LimitBucketRequestRate('bucket-b', 50)
+    self.assertEqual([], clock.sleeps)
+
+  def testRequestRateUnlimitedByDefault(self):
+    clock = _FakeClock()
+    self._UseClock(clock)
+    with SetBotoConfigForTest([('GSUtil', 'max_bucket_request_rate', None)]):
+      for _ in range(1000):
+        LimitBucketRequestRate('bucket-a')
+    self.assertEqual([], clock.sleeps)
@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+# Copyright 2026 Google Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Unit tests for backoff coordinated across workers."""
+
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import division
+from __future__ import unicode_literals
+
+import socket
+
+from apitools.base.py import exceptions as apitools_exceptions
+from apitools.base.py import http_wrapper
+import gslib.tests.testcase as testcase
+from gslib.utils import retry_util
+from gslib.utils.retry_util import GetBackoffKey
+from gslib.utils.retry_util import GetOverloadSignal
+from gslib.utils.retry_util import SharedBackoff
+
+from six import add_move, MovedModule
+
+add_move(MovedModule('mock', 'mock', 'unittest.mock'))
+from six.moves import mock
+
+_BUCKET_URL = 'https://storage.googleapis.com/storage/v1/b/bucket/o/obj'
+
+
+def _BadStatusCodeError(status, retry_after=None):
+  response = {'status': str(status)}
+  if retry_after is not None:
+    response['retry-after'] = str(retry_after)
+  return apitools_exceptions.BadStatusCodeError(response, b'',
+                                                'https://example.com/')
+
+
+def _RetryArgs(exc, max_retry_wait=32):
+  return http_wrapper.ExceptionRetryArgs(None, mock.Mock(url=_BUCKET_URL), exc,
+                                         1, max_retry_wait, 0)
+
+
+class TestRetryUtil(testcase.GsUtilUnitTestCase):
+  """Unit tests for coordinated backoff in retry_util."""
+
+  def testGetBackoffKey(self):
+    self.assertEqual(
+        'bucket',
+        GetBackoffKey('https://storage.googleapis.com/storage/v1/b/bucket/o/'
+                      'obj?alt=json'))
+    self.assertEqual(
+        'bucket',
+        GetBackoffKey('https://storage.googleapis.com/download/storage/v1/b/'
+                      'bucket/o/obj?alt=media'))
+    self.assertEqual(
+        'storage.googleapis.com',
+        GetBackoffKey('https://storage.googleapis.com/storage/v1/b?project=p'))
+
+  def testGetOverloadSignal(self):
+    self.assertEqual((True, None), GetOverloadSignal(_BadStatusCodeError(503)))
+    self.assertEqual((True, 7),
+                     GetOverloadSignal(_BadStatusCodeError(429, retry_after=7)))
+    self.assertEqual((True, None),
+                     GetOverloadSignal(socket.error('Connection reset')))
+    self.assertEqual((False, None), GetOverloadSignal(ValueError('bad value')))
+
+  def testCircuitOpensAtThreshold(self):
+    backoff = SharedBackoff(False)
+    for _ in range(2):
+      backoff.RecordError('bucket', 3, 32)
+    self.assertEqual(0, backoff.GetWait('bucket'))
+    delay = backoff.RecordError('bucket', 3, 32)
+    self.assertGreater(delay, 0)
+    self.assertAlmostEqual(delay, backoff.GetWait('bucket'), places=1)
+    # Other buckets are unaffected.
+    self.assertEqual(0, backoff.GetWait('other-bucket'))
+
+  def testBackoffIsCappedAndHonorsRetryAfter(self):
+    backoff = SharedBackoff(False)
+    for _ in range(20):
+      self.assertLessEqual(backoff.RecordError('bucket', 100, 4), 4)
+    self.assertAlmostEqual(
+        60, backoff.RecordError('bucket', 100, 4, retry_after=60), places=1)
+
+  def testWorkersShareTheDeadline(self):
+    backoff = SharedBackoff(False)
+    backoff.RecordError('bucket', 1, 32, retry_after=10)
+    # A later error with a shorter delay waits for the existing deadline.
+    delay = backoff.RecordError('bucket', 1, 32, retry_after=1)
+    self.assertGreater(delay, 9)
+
+
+@mock.patch.object(retry_util.time, 'sleep')
+@mock.patch.object(retry_util, 'retry_token_bucket')
+@mock.patch.object(retry_util, 'shared_backoff')
+@mock.patch.object(http_wrapper, 'HandleExceptionsAndRebuildHttpConnections')
+class TestCoordinateRetry(testcase.GsUtilUnitTestCase):
+  """Unit tests for how LogAndHandleRetries coordinates retries."""
+
+  def _GetHandler(self, circuit_breaker_threshold=0, max_retry_rate=0,
+                  is_data_transfer=False):
+    with mock.patch.object(retry_util,
+                           'GetCircuitBreakerThreshold',
+                           return_value=circuit_breaker_threshold):
+      with mock.patch.object(retry_util,
+                             'GetMaxRetryRate',
+                             return_value=max_retry_rate):
+        return retry_util.LogAndHandleRetries(
+            is_data_transfer=is_data_transfer)
+
+  def testDisabledByDefault(self, mock_default_retry, mock_backoff,
+                            mock_bucket, mock_sleep):
+    retry_args = _RetryArgs(_BadStatusCodeError(503))
+    self._GetHandler()(retry_args)
+    mock_default_retry.assert_called_once_with(retry_args)
+    self.assertFalse(mock_backoff.RecordError.called)
+    self.assertFalse(mock_bucket.Acquire.called)
+    self.assertFalse(mock_sleep.called)
+
+  def testIgnoresErrorsThatAreNotOverload(self, mock_default_retry,
+                                          mock_backoff, mock_bucket,
+                                          mock_sleep):
+    retry_args = _RetryArgs(ValueError('bad value'))
+    self._GetHandler(circuit_breaker_threshold=3, max_retry_rate=10)(retry_args)
+    mock_default_retry.assert_called_once_with(retry_args)
+    self.assertFalse(mock_backoff.RecordError.called)
+    self.assertFalse(mock_bucket.Acquire.called)
+
+  def testRetryRateAloneKeepsDefaultBackoff(self, mock_default_retry,
+                                            mock_backoff, mock_bucket,
+                                            mock_sleep):
+    retry_args = _RetryArgs(_BadStatusCodeError(503))
+    self._GetHandler(max_retry_rate=10)(retry_args)
+    mock_bucket.Acquire.assert_called_once_with(1, 10)
+    self.assertFalse(mock_backoff.RecordError.called)
+    self.assertFalse(mock_sleep.called)
+    # apitools' own backoff, capped by max_retry_delay, still applies.
+    mock_default_retry.assert_called_once_with(retry_args)
+
+  def testWaitsOutSharedBackoff(self, mock_default_retry, mock_backoff,
+                                mock_bucket, mock_sleep):
+    mock_backoff.RecordError.return_value = 10
+    self._GetHandler(circuit_breaker_threshold=3)(
+        _RetryArgs(_BadStatusCodeError(503)))
+    mock_backoff.RecordError.assert_called_once_with('bucket',
+                                                     3,
+                                                     32,
+                                                     retry_after=None)
+    # apitools waits the remaining second itself.
+    mock_sleep.assert_called_once_with(9)
+    self.assertEqual(1, mock_default_retry.call_args[0][0].max_retry_wait)
+
+  def testShortSharedBackoffKeepsDefaultBackoff(self, mock_default_retry,
+                                                mock_backoff, mock_bucket,
+                                                mock_sleep):
+    mock_backoff.RecordError.return_value = 0.5
+    retry_args = _RetryArgs(_BadStatusCodeError(503))
+    self._GetHandler(circuit_breaker_threshold=3)(retry_args)
+    self.assertFalse(mock_sleep.called)
+    mock_default_retry.assert_called_once_with(retry_args)
+
+  def testRetryAfterIsLeftToApitools(self, mock_default_retry, mock_backoff,
+                                     mock_bucket, mock_sleep):
+    mock_backoff.RecordError.return_value = 7
+    retry_args = _RetryArgs(
+        apitools_exceptions.RetryAfterError({'status': '429'},
+                                            b'',
+                                            'https://example.com/',
+                                            retry_after=7))
+    self._GetHandler(circuit_breaker_threshold=3)(retry_args)
+    self.assertEqual(7, mock_backoff.RecordError.call_args[1]['retry_after'])
+    self.assertFalse(mock_sleep.called)
+    mock_default_retry.assert_called_once_with(retry_args)
+
+  def testDataTransferRecordsErrorWithoutWaiting(self, mock_default_retry,
+                                                 mock_backoff, mock_bucket,
+                                                 mock_sleep):
+    mock_backoff.RecordError.return_value = 10
+    handler = self._GetHandler(circuit_breaker_threshold=3,
+                               max_retry_rate=10,
+                               is_data_transfer=True)
+    # gsutil's own retry loops handle the error that apitools rethrows.
+    with mock.patch.object(http_wrapper, 'RethrowExceptionHandler'):
+      handler(_RetryArgs(_BadStatusCodeError(503)))
+    self.assertTrue(mock_backoff.RecordError.called)
+    self.assertFalse(mock_bucket.Acquire.called)
+    self.assertFalse(mock_sleep.called)
@@ -19,6 +19,7 @@ from __future__ import print_function
 from __future__ import division
 from __future__ import unicode_literals
 
+import json
 import os
 
 import six
@@ -998,6 +999,81 @@ class TestRsync(testcase.GsUtilIntegrationTestCase):
           return_stderr=True)
       self.assertNotIn('Estimated work', stderr)
 
+  def test_dir_to_bucket_streaming_diff(self):
+    """Tests rsync -d -r with listings diffed as they're produced."""
+    tmpdir = self.CreateTempDir()
+    bucket_uri = self.CreateBucket()
+    self.CreateTempFile(tmpdir=tmpdir, file_name='a', contents=b'a')
+    self.CreateTempFile(tmpdir=tmpdir, file_name='a.txt', contents=b'a.txt')
+    self.CreateTempFile(tmpdir=tmpdir,
+                        file_name=('b', 'c'),
+                        contents=b'b/c')
+    self.CreateTempFile(tmpdir=tmpdir, file_name='b-c', contents=b'b-c')
+    self.CreateObject(bucket_uri=bucket_uri, object_name='a', contents=b'A')
+    self.CreateObject(bucket_uri=bucket_uri,
+                      object_name='b/extra',
+                      contents=b'b/extra')
+    self.CreateObject(bucket_uri=bucket_uri, object_name='z', contents=b'z')
+
+    # Use @Retry as hedge against bucket listing eventual consistency.
+    @Retry(AssertionError, tries=3, timeout_secs=1)
+    def _Check1():
+      """Tests that the bucket ends up matching the directory."""
+      with SetBotoConfigForTest([('GSUtil', 'rsync_streaming_diff', 'True')]):
+        self.RunGsUtil(['rsync', '-d', '-r', tmpdir, suri(bucket_uri)])
+      listing = TailSet(suri(bucket_uri), self.FlatListBucket(bucket_uri))
+      self.assertEquals(listing, set(['/a', '/a.txt', '/b/c', '/b-c']))
+      self.assertEquals(
+          'a', self.RunGsUtil(['cat', suri(bucket_uri, 'a')],
+                              return_stdout=True))
+
+    _Check1()
+
+  def test_bucket_to_dir_with_changes_file(self):
+    """Tests that rsync -k only synchronizes the changed objects."""
+    bucket_uri = self.CreateBucket()
+    tmpdir = self.CreateTempDir()
+    self.CreateObject(bucket_uri=bucket_uri,
+                      object_name='obj1',
+                      contents=b'obj1')
+    self.CreateObject(bucket_uri=bucket_uri,
+                      object_name='obj2',
+                      contents=b'obj2')
+    self.CreateObject(bucket_uri=bucket_uri,
+                      object_name='subdir/obj3',
+                      contents=b'subdir/obj3')
+    self.CreateTempFile(tmpdir=tmpdir, file_name='obj2', contents=b'OBJ2')
+    self.CreateTempFile(tmpdir=tmpdir, file_name='obj4', contents=b'obj4')
+    self.CreateTempFile(tmpdir=tmpdir, file_name='obj5', contents=b'obj5')
+    bucket_name = bucket_uri.bucket_name
+    changes = [{
+        'attributes': {
+            'bucketId': bucket_name,
+            'objectId': object_name,
+            'eventType': event_type
+        }
+    } for object_name, event_type in (('obj1', 'OBJECT_FINALIZE'),
+                                      ('subdir/obj3', 'OBJECT_FINALIZE'),
+                                      ('obj4', 'OBJECT_DELETE'))]
+    changes_file = self.CreateTempFile(contents='\n'.join(
+        json.dumps(change) for change in changes).encode('utf-8'))
+
+    # Use @Retry as hedge against bucket listing eventual consistency.
+    @Retry(AssertionError, tries=3, timeout_secs=1)
+    def _Check1():
+      """Tests that only changed objects are copied or deleted."""
+      self.RunGsUtil(
+          ['rsync', '-d', '-r', '-k', changes_file,
+           suri(bucket_uri), tmpdir])
+      listing = TailSet(tmpdir, self.FlatListDir(tmpdir))
+      # obj2 and obj5 aren't named in the changes file, so they're untouched.
+      self.assertEquals(listing,
+                        set(['/obj1', '/obj2', '/subdir/obj3', '/obj5']))
+      with open(os.path.join(tmpdir, 'obj2')) as f:
+        self.assertEquals('OBJ2', f.read())
+
+    _Check1()
+
   # Test sequential upload as well as parallel composite upload case.
   @SequentialAndParallelTransfer
   @unittest.skipUnless(UsingCrcmodExtension(crcmod),
@@ -19,14 +19,42 @@ from __future__ import print_function
 from __future__ import division
 from __future__ import unicode_literals
 
+import base64
+import datetime
+import json
 import logging
 import os
 
+from gslib.bucket_listing_ref import BucketListingObject
+from gslib.commands import rsync
+from gslib.commands.rsync import _BatchSort
+from gslib.commands.rsync import _ChangedObjectsIterator
 from gslib.commands.rsync import _ComputeNeededFileChecksums
+from gslib.commands.rsync import _DstUrlStrConstructor
+from gslib.commands.rsync import _FieldedListingIterator
+from gslib.commands.rsync import _GetListingAttrs
+from gslib.commands.rsync import _IterTmpFileEntries
 from gslib.commands.rsync import _NA
+from gslib.commands.rsync import _PackTmpRecord
+from gslib.commands.rsync import _SortedLocalDirIterator
+from gslib.exception import CommandException
+from gslib.storage_url import StorageUrlFromString
 from gslib.tests.testcase.unit_testcase import GsUtilUnitTestCase
+from gslib.third_party.storage_apitools import storage_v1_messages as apitools_messages
+from gslib.utils import copy_helper
 from gslib.utils.hashing_helper import CalculateB64EncodedCrc32cFromContents
 from gslib.utils.hashing_helper import CalculateB64EncodedMd5FromContents
+from gslib.utils.posix_util import MTIME_ATTR
+from gslib.utils.posix_util import NA_ID
+from gslib.utils.posix_util import NA_TIME
+from gslib.utils.posix_util import UID_ATTR
+from gslib.utils.rsync_util import ReadChangedObjectNames
+from gslib.utils.system_util import IS_WINDOWS
+
+from six import add_move, MovedModule
+
+add_move(MovedModule('mock', 'mock', 'unittest.mock'))
+from six.moves import mock
 
 
 class TestRsyncFuncs(GsUtilUnitTestCase):
@@ -80,3 +108,177 @@ class TestRsyncFuncs(GsUtilUnitTestCase):
     self.assertEquals(md5, src_md5)
     self.assertEquals(_NA, src_crc32c)
     self.assertEquals(md5, src_md5)
+
+  def test_read_changed_object_names(self):
+    """Tests reading change journals in each supported format."""
+    payload = base64.b64encode(
+        json.dumps({'bucket': 'bucket', 'name': 'payload'}).encode('utf-8'))
+    records = [
+        {'attributes': {'bucketId': 'bucket', 'objectId': 'published',
+                        'eventType': 'OBJECT_FINALIZE'}},
+        {'ackId': 'x',
+         'message': {'attributes': {'bucketId': 'bucket',
+                                    'objectId': 'pulled',
+                                    'eventType': 'OBJECT_DELETE'}}},
+        {'data': payload.decode('utf-8')},
+        {'kind': 'storage#object', 'bucket': 'bucket', 'name': 'resource'},
+        {'bucket': 'other-bucket', 'name': 'ignored'},
+    ]
+    expected = set(['published', 'pulled', 'payload', 'resource'])
+    lines_path = self.CreateTempFile(contents='\n'.join(
+        json.dumps(record) for record in records).encode('utf-8'))
+    self.assertEqual(expected, ReadChangedObjectNames(lines_path, 'bucket'))
+    array_path = self.CreateTempFile(
+        contents=json.dumps(records).encode('utf-8'))
+    self.assertEqual(expected, ReadChangedObjectNames(array_path, 'bucket'))
+
+  def test_read_changed_object_names_invalid(self):
+    """Tests that unrecognized change records are rejected."""
+    path = self.CreateTempFile(contents=b'{"name": "obj"}\nnot json\n')
+    with self.assertRaisesRegexp(CommandException, 'line 2'):
+      ReadChangedObjectNames(path, 'bucket')
+    path = self.CreateTempFile(contents=b'{"name": "obj"}\n')
+    with self.assertRaisesRegexp(CommandException, 'Unrecognized'):
+      ReadChangedObjectNames(path, 'bucket')
+
+  def test_sorted_local_dir_iterator(self):
+    """Tests that local files are walked in the order of a cloud listing."""
+    tmpdir = self.CreateTempDir()
+    for path in ('a', 'a.txt', 'b/c', 'b-c', 'b/c.d/e', 'b/c0', 'd/.f'):
+      self.CreateTempFile(tmpdir=tmpdir, file_name=tuple(path.split('/')))
+    os.mkdir(os.path.join(tmpdir, 'empty'))
+    base_url = StorageUrlFromString(tmpdir)
+    base_url_len = len(base_url.url_string)
+
+    def _RelativeNames(recursive):
+      return [
+          blr.storage_url.url_string[base_url_len + 1:].replace(os.sep, '/')
+          for blr in _SortedLocalDirIterator(base_url, recursive)
+      ]
+
+    names = _RelativeNames(True)
+    self.assertEqual(names, sorted(names))
+    self.assertEqual(
+        set(names), set(['a', 'a.txt', 'b/c', 'b-c', 'b/c.d/e', 'b/c0',
+                         'd/.f']))
+    self.assertEqual(_RelativeNames(False), ['a', 'a.txt', 'b-c'])
+
+  def test_changed_objects_iterator_stays_under_local_dir(self):
+    """Tests that journal names never resolve outside a local directory."""
+    tmpdir = self.CreateTempDir()
+    self.CreateTempFile(tmpdir=tmpdir, file_name='victim')
+    dst_dir = os.path.join(tmpdir, 'dst')
+    self.CreateTempFile(tmpdir=dst_dir, file_name=('a', 'b'))
+    names = [
+        '../victim', 'a/../../victim', 'a/./b', 'a//b', './a/b', 'a/b/',
+        'a/b'
+    ]
+    if not IS_WINDOWS:
+      # Symlinked directories aren't walked by a listing either.
+      os.symlink(tmpdir, os.path.join(dst_dir, 'link'))
+      names.append('link/victim')
+    cls = mock.Mock(changed_names=names, exclude_symlinks=False)
+    base_url = StorageUrlFromString(dst_dir)
+    self.assertEqual([os.path.join(dst_dir, 'a', 'b')], [
+        blr.storage_url.object_name
+        for blr in _ChangedObjectsIterator(cls, None, base_url, [])
+    ])
+    self.assertTrue(os.path.exists(os.path.join(tmpdir, 'victim')))
+
+  def test_fielded_listing_iterator_lists_many_changed_names(self):
+    """Tests that many journal names are listed rather than looked up."""
+    tmpdir = self.CreateTempDir()
+    for path in ('a', 'b', 'c/d', 'c/e'):
+      self.CreateTempFile(tmpdir=tmpdir, file_name=tuple(path.split('/')))
+    cls = mock.Mock(changed_names=['a', 'c/d', 'missing'],
+                    exclude_pattern=None,
+                    exclude_symlinks=False,
+                    preserve_posix_attrs=False,
+                    recursion_requested=True)
+    base_url_str = StorageUrlFromString(tmpdir).url_string
+
+    def _ListedPaths():
+      return [
+          attrs[0] for attrs in _FieldedListingIterator(
+              cls, None, base_url_str, 'destination', ordered=True)
+      ]
+
+    expected_paths = [
+        StorageUrlFromString(os.path.join(tmpdir, 'a')).url_string,
+        StorageUrlFromString(os.path.join(tmpdir, 'c', 'd')).url_string
+    ]
+    self.assertEqual(expected_paths, _ListedPaths())
+    with mock.patch.object(rsync, '_MAX_CHANGED_NAMES_TO_LOOK_UP', 2):
+      self.assertEqual(expected_paths, _ListedPaths())
+
+  def test_tmp_file_records(self):
+    """Tests that sorted temp file records round trip, in key order."""
+    base_url_str = 'gs://bucket/dir'
+    rel_urls = ['/b', '/a+b', '/p%41', '/\u00fc', '/a/c', '/a']
+    entries = [('%s%s' % (base_url_str, rel_url), 2**40 + i, 1600000000, -1,
+                1600000001, 644, 2**32 - 2, -1, 'AAAAAA==', _NA)
+               for i, rel_url in enumerate(rel_urls)]
+    # Values from object metadata that don't fit in a record are dropped.
+    metadata = apitools_messages.Object.MetadataValue(additionalProperties=[
+        apitools_messages.Object.MetadataValue.AdditionalProperty(
+            key=attr, value='99999999999999999999')
+        for attr in (MTIME_ATTR, UID_ATTR)
+    ])
+    obj = apitools_messages.Object(name='dir/big',
+                                   size=1,
+                                   timeCreated=datetime.datetime(2020, 1, 1),
+                                   metadata=metadata)
+    big_attrs = _GetListingAttrs(
+        BucketListingObject(StorageUrlFromString(base_url_str + '/big'),
+                            root_object=obj))
+    self.assertEqual(NA_TIME, big_attrs[4])
+    self.assertEqual(NA_ID, big_attrs[6])
+    entries.append(big_attrs)
+    out_path = os.path.join(self.CreateTempDir(), 'sorted')
+    with open(out_path, 'wb') as out_file:
+      _BatchSort(
+          iter([
+              _PackTmpRecord(entry, len(base_url_str)) for entry in entries
+          ]), out_file)
+    with open(out_path, 'rb') as fp:
+      read_entries = list(_IterTmpFileEntries(fp, base_url_str + '/'))
+    keys = [key for key, _ in read_entries]
+    self.assertEqual(keys, sorted(keys))
+    # Keys are unquoted like cloud object names, but URLs are kept as listed.
+    self.assertIn('/a b'.encode('utf-8'), keys)
+    self.assertIn('/pA'.encode('utf-8'), keys)
+    self.assertEqual(sorted(attrs for _, attrs in read_entries),
+                     sorted(entries))
+
+  def test_dst_url_str_constructor(self):
+    """Tests that destination URLs are named like copy_helper names them."""
+    # ConstructDstUrl reads the options rsync sets before naming destinations.
+    copy_helper.CreateCopyHelperOpts()
+    tmpdir = self.CreateTempDir()
+    os.mkdir(os.path.join(tmpdir, 'src'))
+    os.mkdir(os.path.join(tmpdir, 'dst'))
+    src_dir = os.path.join(tmpdir, 'src')
+    dst_dir = os.path.join(tmpdir, 'dst')
+    for base_src_url_str, base_dst_url_str in (
+        ('gs://src', 'gs://dst'),
+        ('gs://src/prefix/', 'gs://dst/prefix'),
+        ('gs://src/prefix', dst_dir),
+        (src_dir, 'gs://dst/'),
+        (src_dir + os.sep, dst_dir),
+    ):
+      base_src_url = StorageUrlFromString(base_src_url_str)
+      base_dst_url = StorageUrlFromString(base_dst_url_str)
+      for recursion_requested in (False, True):
+        construct_dst_url_str = _DstUrlStrConstructor(base_src_url,
+                                                      base_dst_url,
+                                                      recursion_requested)
+        for rel_path in ('a', 'a+b %41', 'dir/obj', 'dir//obj'):
+          src_url_str = '%s%s%s' % (base_src_url.url_string.rstrip('/\\'),
+                                    base_src_url.delim,
+                                    rel_path.replace('/', base_src_url.delim))
+          self.assertEqual(
+              copy_helper.ConstructDstUrl(base_src_url,
+                                          StorageUrlFromString(src_url_str),
+                                          True, True, base_dst_url, False,
+                                          recursion_requested).url_string,
+              construct_dst_url_str(src_url_str))
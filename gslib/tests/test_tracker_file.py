@@ -19,6 +19,8 @@ from __future__ import print_function
 from __future__ import division
 from __future__ import unicode_literals
 
+import os
+
 from gslib.exception import CommandException
 from gslib.parallel_tracker_file import ObjectFromTracker
 from gslib.parallel_tracker_file import ReadParallelUploadTrackerFile
@@ -27,13 +29,19 @@ from gslib.parallel_tracker_file import WriteComponentToParallelUploadTrackerFil
 from gslib.parallel_tracker_file import WriteParallelUploadTrackerFile
 from gslib.storage_url import StorageUrlFromString
 from gslib.tests.testcase.unit_testcase import GsUtilUnitTestCase
+from gslib.tests.util import SetBotoConfigForTest
+from gslib.tests.util import unittest
 from gslib.third_party.storage_apitools import storage_v1_messages as apitools_messages
 from gslib.tracker_file import _HashFilename
 from gslib.tracker_file import DeleteTrackerFile
 from gslib.tracker_file import GetRewriteTrackerFilePath
 from gslib.tracker_file import HashRewriteParameters
 from gslib.tracker_file import ReadRewriteTrackerFile
+from gslib.tracker_file import ReadTrackerFile
+from gslib.tracker_file import sqlite3
+from gslib.tracker_file import SQLITE_TRACKER_STORE_NAME
 from gslib.tracker_file import WriteRewriteTrackerFile
+from gslib.tracker_file import WriteTrackerFile
 from gslib.utils import parallelism_framework_util
 from gslib.utils.constants import UTF8
 
@@ -226,3 +234,60 @@ class TestTrackerFile(GsUtilUnitTestCase):
     self.assertEqual(True, command_obj.delete_called)
     self.assertEqual(None, actual_prefix)
     self.assertEqual([], actual_objects)
+
+
+@unittest.skipUnless(sqlite3, 'sqlite3 module is not available')
+class TestSqliteTrackerStore(GsUtilUnitTestCase):
+  """Unit tests for the sqlite tracker store."""
+
+  def _SqliteStoreConfig(self, tracker_dir):
+    return [('GSUtil', 'tracker_store', 'sqlite'),
+            ('GSUtil', 'resumable_tracker_dir', tracker_dir)]
+
+  def testReadWriteDeleteTrackerFile(self):
+    tracker_dir = self.CreateTempDir()
+    tracker_file_name = os.path.join(tracker_dir, 'upload_TRACKER_abc')
+    with SetBotoConfigForTest(self._SqliteStoreConfig(tracker_dir)):
+      try:
+        ReadTrackerFile(tracker_file_name)
+        self.fail('Expected IOError for a missing tracker.')
+      except IOError:
+        pass
+      WriteTrackerFile(tracker_file_name, 'data1')
+      WriteTrackerFile(tracker_file_name, 'data2')
+      self.assertEqual('data2', ReadTrackerFile(tracker_file_name))
+      DeleteTrackerFile(tracker_file_name)
+      self.assertRaises(IOError, ReadTrackerFile, tracker_file_name)
+    # Only the database (and its write-ahead log) exist on disk.
+    for file_name in os.listdir(tracker_dir):
+      self.assertTrue(file_name.startswith(SQLITE_TRACKER_STORE_NAME))
+
+  def testRewriteTrackerFile(self):
+    tracker_dir = self.CreateTempDir()
+    with SetBotoConfigForTest(self._SqliteStoreConfig(tracker_dir)):
+      tracker_file_name = GetRewriteTrackerFilePath('bk1', 'obj1', 'bk2',
+                                                    'obj2', self.test_api)
+      WriteRewriteTrackerFile(tracker_file_name, 'hash1', 'token1')
+      self.assertEqual('token1',
+                       ReadRewriteTrackerFile(tracker_file_name, 'hash1'))
+      self.assertIsNone(ReadRewriteTrackerFile(tracker_file_name, 'hash2'))
+      self.assertFalse(os.path.exists(tracker_file_name))
+
+  def testParallelUploadTrackerFile(self):
+    tracker_dir = self.CreateTempDir()
+    tracker_file_name = os.path.join(tracker_dir, 'parallel_upload_TRACKER')
+    objects = [
+        ObjectFromTracker('obj1', '42'),
+        ObjectFromTracker('obj2', '314159')
+    ]
+    with SetBotoConfigForTest(self._SqliteStoreConfig(tracker_dir)):
+      WriteParallelUploadTrackerFile(tracker_file_name,
+                                     '123',
+                                     objects,
+                                     encryption_key_sha256='456')
+      (actual_key, actual_prefix,
+       actual_objects) = ReadParallelUploadTrackerFile(tracker_file_name,
+                                                       self.logger)
+    self.assertEqual('456', actual_key)
+    self.assertEqual('123', actual_prefix)
+    self.assertEqual(objects, actual_objects)
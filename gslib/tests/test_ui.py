@@ -27,6 +27,7 @@ from __future__ import division
 from __future__ import unicode_literals
 
 from hashlib import md5
+import json
 import os
 import pickle
 
@@ -48,12 +49,15 @@ from gslib.tests.util import TailSet
 from gslib.tests.util import TEST_ENCRYPTION_KEY1
 from gslib.tests.util import TEST_ENCRYPTION_KEY2
 from gslib.tests.util import unittest
+from gslib.thread_message import CoalescingStatusQueue
 from gslib.thread_message import FileMessage
 from gslib.thread_message import FinalMessage
 from gslib.thread_message import MetadataMessage
 from gslib.thread_message import ProducerThreadMessage
 from gslib.thread_message import ProgressMessage
+from gslib.thread_message import RetryableErrorMessage
 from gslib.thread_message import SeekAheadMessage
+from gslib.thread_message import StatusMessageBatch
 from gslib.tracker_file import DeleteTrackerFile
 from gslib.tracker_file import GetSlicedDownloadTrackerFilePaths
 from gslib.tracker_file import GetTrackerFilePath
@@ -1570,3 +1574,147 @@ class TestUiUnitTests(testcase.GsUtilUnitTestCase):
     # old_spinner3.
     self.assertNotEquals(old_spinner3, current_spinner)
     self.assertNotEquals(old_spinner1, current_spinner)
+
+  def test_coalescing_status_queue(self):
+    """Tests that CoalescingStatusQueue batches and coalesces messages."""
+    status_queue = Queue.Queue()
+    coalescing_queue = CoalescingStatusQueue(status_queue,
+                                             batch_size=100,
+                                             flush_interval=3600)
+    src_url = StorageUrlFromString('gs://foo/bar')
+    start_message = FileMessage(src_url,
+                                None,
+                                self.start_time,
+                                size=30,
+                                message_type=FileMessage.FILE_UPLOAD)
+    finish_message = FileMessage(src_url,
+                                 None,
+                                 self.start_time + 4,
+                                 size=30,
+                                 finished=True,
+                                 message_type=FileMessage.FILE_UPLOAD)
+    coalescing_queue.put(start_message)
+    for i in range(1, 4):
+      coalescing_queue.put(
+          ProgressMessage(30, 10 * i, src_url, self.start_time + i))
+    coalescing_queue.put(finish_message)
+    coalescing_queue.put(
+        ProgressMessage(30, 30, src_url, self.start_time + 5))
+    # Nothing is posted until the buffer is flushed.
+    self.assertTrue(status_queue.empty())
+
+    coalescing_queue.Flush()
+    batch = status_queue.get_nowait()
+    self.assertTrue(status_queue.empty())
+    self.assertIsInstance(batch, StatusMessageBatch)
+    self.assertEqual(4, len(batch.messages))
+    self.assertIs(start_message, batch.messages[0])
+    # Only the latest of the progress messages before the finish message
+    # remains, and none is moved past it.
+    self.assertEqual(30, batch.messages[1].processed_bytes)
+    self.assertEqual(self.start_time + 3, batch.messages[1].time)
+    self.assertIs(finish_message, batch.messages[2])
+    self.assertEqual(self.start_time + 5, batch.messages[3].time)
+
+    # A single buffered message is posted as is, and a full buffer is posted
+    # without an explicit flush.
+    coalescing_queue.put(start_message)
+    coalescing_queue.Flush()
+    self.assertIs(start_message, status_queue.get_nowait())
+    coalescing_queue.batch_size = 2
+    coalescing_queue.put(start_message)
+    coalescing_queue.put(finish_message)
+    self.assertEqual(2, len(status_queue.get_nowait().messages))
+
+  def test_ui_status_message_batch(self):
+    """Tests that UIController processes every message of a batch in order."""
+    status_queue = Queue.Queue()
+    stream = six.StringIO()
+    start_time = self.start_time
+    ui_controller = UIController(0, 0, 0, 0, custom_time=start_time)
+    ui_thread = UIThread(status_queue, stream, ui_controller)
+    PutToQueueWithTimeout(
+        status_queue,
+        ProducerThreadMessage(1, UPLOAD_SIZE, start_time, finished=True))
+    fpath = self.CreateTempFile(file_name='sample-file.txt', contents=b'foo')
+    src_url = StorageUrlFromString(suri(fpath))
+    PutToQueueWithTimeout(
+        status_queue,
+        StatusMessageBatch([
+            FileMessage(src_url,
+                        None,
+                        start_time + 10,
+                        size=UPLOAD_SIZE,
+                        message_type=FileMessage.FILE_UPLOAD,
+                        finished=False),
+            ProgressMessage(UPLOAD_SIZE, UPLOAD_SIZE, src_url,
+                            start_time + 15),
+            FileMessage(src_url,
+                        None,
+                        start_time + 20,
+                        size=UPLOAD_SIZE,
+                        message_type=FileMessage.FILE_UPLOAD,
+                        finished=True),
+        ]))
+    PutToQueueWithTimeout(status_queue, FinalMessage(start_time + 50))
+    PutToQueueWithTimeout(status_queue, ZERO_TASKS_TO_DO_ARGUMENT)
+    JoinThreadAndRaiseOnTimeout(ui_thread)
+    CheckUiOutputWithMFlag(self, stream.getvalue(), 1, UPLOAD_SIZE)
+
+  def test_ui_telemetry_file(self):
+    """Tests that UIController writes JSON-lines telemetry snapshots."""
+    telemetry_path = self.CreateTempFile(contents=b'')
+    stream = six.StringIO()
+    start_time = self.start_time
+    ui_controller = UIController(0,
+                                 0,
+                                 0,
+                                 0,
+                                 custom_time=start_time,
+                                 telemetry_file=telemetry_path,
+                                 telemetry_interval=10)
+    src_url = StorageUrlFromString('gs://foo/bar')
+    ui_controller.Call(
+        FileMessage(src_url,
+                    None,
+                    start_time + 1,
+                    size=UPLOAD_SIZE,
+                    message_type=FileMessage.FILE_DOWNLOAD), stream)
+    ui_controller.Call(RetryableErrorMessage(ValueError(), start_time + 2),
+                       stream)
+    ui_controller.Call(
+        ProgressMessage(UPLOAD_SIZE, UPLOAD_SIZE // 2, src_url,
+                        start_time + 3), stream)
+    # The interval has not elapsed yet.
+    with open(telemetry_path, 'r') as f:
+      self.assertEqual('', f.read())
+    ui_controller.Call(
+        FileMessage(src_url,
+                    None,
+                    start_time + 20,
+                    size=UPLOAD_SIZE,
+                    finished=True,
+                    message_type=FileMessage.FILE_DOWNLOAD), stream)
+    ui_controller.Call(ZERO_TASKS_TO_DO_ARGUMENT, stream)
+
+    with open(telemetry_path, 'r') as f:
+      snapshots = [json.loads(line) for line in f]
+    self.assertEqual(2, len(snapshots))
+    # The first snapshot was taken when the finish message arrived, after it
+    # was processed.
+    self.assertEqual(start_time + 20, snapshots[0]['time'])
+    self.assertEqual(UPLOAD_SIZE, snapshots[0]['bytes_transferred'])
+    self.assertEqual(1, snapshots[0]['objects_finished'])
+    self.assertEqual(0, snapshots[0]['in_flight'])
+    final_snapshot = snapshots[-1]
+    self.assertEqual(1, final_snapshot['objects_finished'])
+    self.assertEqual(UPLOAD_SIZE, final_snapshot['bytes_transferred'])
+    self.assertEqual(1, final_snapshot['retries'])
+    self.assertEqual({'ValueError': 1}, final_snapshot['retries_by_type'])
+    download_latency = final_snapshot['latency_secs']['download']
+    self.assertEqual(1, download_latency['count'])
+    self.assertEqual(19, download_latency['sum'])
+    # 19 seconds falls in the bucket bounded by 30 seconds.
+    self.assertEqual(
+        1, download_latency['buckets'][
+            final_snapshot['latency_bucket_bounds_secs'].index(30)])
@@ -41,6 +41,7 @@ from gslib.utils.unit_util import DecimalShort
 from gslib.utils.unit_util import HumanReadableWithDecimalPlaces
 from gslib.utils.unit_util import PrettyTime
 import httplib2
+import six
 
 from six import add_move, MovedModule
 add_move(MovedModule('mock', 'mock', 'unittest.mock'))
@@ -353,3 +354,13 @@ class TestUtil(testcase.GsUtilUnitTestCase):
     self.assertEqual(boto_util.GetMaxConcurrentCompressedUploads(), 1)
     mock_config.return_value = -1
     self.assertEqual(boto_util.GetMaxConcurrentCompressedUploads(), 1)
+
+  def testStdinIteratorClsReadAhead(self):
+    """Tests that lines read ahead are still iterated."""
+    with mock.patch.object(system_util.sys, 'stdin',
+                           six.StringIO('a\nb\nc\n')):
+      stdin_iterator = system_util.StdinIteratorCls()
+      self.assertEqual(2, stdin_iterator.ReadAhead(2))
+      self.assertEqual('a', next(stdin_iterator))
+      self.assertEqual(2, stdin_iterator.ReadAhead(5))
+      self.assertEqual(['b', 'c'], list(stdin_iterator))
@@ -26,14 +26,17 @@ from __future__ import print_function
 from __future__ import division
 from __future__ import unicode_literals
 
+import os
 import six
 import tempfile
 
 from gslib import wildcard_iterator
 from gslib.exception import InvalidUrlError
 from gslib.storage_url import ContainsWildcard
+from gslib.storage_url import StorageUrlFromString
 import gslib.tests.testcase as testcase
 from gslib.tests.util import ObjectToURI as suri
+from gslib.tests.util import SetBotoConfigForTest
 from gslib.tests.util import SetDummyProjectForUnitTest
 
 
@@ -376,6 +379,52 @@ class FileIteratorTests(testcase.GsUtilUnitTestCase):
             expand_top_level_buckets=True))
     self.assertEqual(self.all_file_uri_strs, actual_uri_strs)
 
+  def testRecursiveWildcardSkipsExcludedDirs(self):
+    """Tests that '**' doesn't walk directories exclude_dir_func excludes."""
+    walked_dirs = []
+
+    def _ExcludeDir(path):
+      walked_dirs.append(path)
+      return path.endswith('dir1')
+
+    url = StorageUrlFromString(suri(self.test_dir, '**'))
+    actual_uri_strs = set(
+        str(u) for u in wildcard_iterator.FileWildcardIterator(
+            url, exclude_dir_func=_ExcludeDir).IterAll(
+                expand_top_level_buckets=True))
+    self.assertEqual(self.root_files_uri_strs, actual_uri_strs)
+    # dir1/dir2 was never reached.
+    self.assertEqual([os.path.join(self.test_dir, 'dir1')], walked_dirs)
+
+  def testRecursiveWildcardCarriesStat(self):
+    """Tests that '**' yields files with the stat results it got for them."""
+    uri = self._test_storage_uri(suri(self.test_dir, '**'))
+    blrs = list(
+        self._test_wildcard_iterator(uri).IterAll(
+            expand_top_level_buckets=True, bucket_listing_fields=['size']))
+    self.assertEqual(self.all_file_uri_strs, set(str(blr) for blr in blrs))
+    for blr in blrs:
+      self.assertEqual(os.stat(blr.storage_url.object_name).st_mtime,
+                       blr.stat_result.st_mtime)
+      self.assertEqual(blr.stat_result.st_size, blr.root_object.size)
+
+  def testParallelRecursiveDirectoryWildcarding(self):
+    """Tests '**' expansion walking the directory tree on threads."""
+    for i in range(150):
+      self.CreateTempFile(tmpdir=self.test_dir,
+                          file_name=('dir1', 'many', 'f%d' % i))
+    uri = self._test_storage_uri(suri(self.test_dir, '**'))
+    expected_uri_strs = set(
+        str(u) for u in self._test_wildcard_iterator(uri).IterAll(
+            expand_top_level_buckets=True))
+    self.assertEqual(len(self.all_file_uri_strs) + 150, len(expected_uri_strs))
+    with SetBotoConfigForTest([('GSUtil', 'local_walk_threads', '4')]):
+      blrs = list(
+          self._test_wildcard_iterator(uri).IterAll(
+              expand_top_level_buckets=True))
+    self.assertEqual(expected_uri_strs, set(str(blr) for blr in blrs))
+    self.assertEqual(len(expected_uri_strs), len(blrs))
+
   def testInvalidRecursiveDirectoryWildcard(self):
     """Tests that wildcard containing '***' raises exception."""
     try:
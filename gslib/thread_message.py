@@ -24,10 +24,20 @@ from __future__ import unicode_literals
 
 import os
 import threading
+import time
 
 from apitools.base.py.exceptions import Error as apitools_service_error
+from gslib.utils.parallelism_framework_util import PutToQueueWithTimeout
 from six.moves.http_client import error as six_service_error
 
+# Maximum number of messages a CoalescingStatusQueue buffers before posting
+# them to the underlying status queue.
+STATUS_MESSAGE_BATCH_SIZE = 100
+
+# Maximum time a CoalescingStatusQueue holds a buffered message, in seconds.
+# This is checked whenever a new message is added.
+STATUS_MESSAGE_FLUSH_INTERVAL = 0.5
+
 
 class StatusMessage(object):
   """General StatusMessage class.
@@ -368,3 +378,113 @@ class PerformanceSummaryMessage(StatusMessage):
     """Returns a string with a valid constructor for this message."""
     return ('%s(%s, %s)' %
             (self.__class__.__name__, self.time, self.uses_slice))
+
+
+class StatusMessageBatch(object):
+  """A sequence of status messages posted to the status queue at once.
+
+  Consumers must process the messages in order, as if each one had been
+  posted individually.
+  """
+
+  def __init__(self, messages):
+    """Creates a StatusMessageBatch.
+
+    Args:
+      messages: List of StatusMessages, in the order they were produced.
+    """
+    self.messages = messages
+
+  def __str__(self):
+    """Returns a string with a valid constructor for this message."""
+    return '%s([%s])' % (self.__class__.__name__, ', '.join(
+        str(message) for message in self.messages))
+
+
+class CoalescingStatusQueue(object):
+  """Buffers status messages and posts them to a status queue in batches.
+
+  Each put to a multiprocessing status queue pickles the message and makes a
+  round trip to the manager process, and each message wakes the UI thread. A
+  worker thread wraps its status queue in this class so that messages are
+  instead buffered and posted as a single StatusMessageBatch once
+  STATUS_MESSAGE_BATCH_SIZE messages are buffered, once the oldest one is
+  STATUS_MESSAGE_FLUSH_INTERVAL seconds old, or when Flush is called.
+
+  ProgressMessages for the same file or component that are not separated by
+  any other kind of message are coalesced, keeping only the latest one, since
+  each carries the cumulative progress.
+  Messages are otherwise posted in the order they were put, so consumers see
+  the same sequence of events; callers must Flush before handing work off to
+  another thread whose messages depend on the buffered ones.
+  """
+
+  def __init__(self, status_queue, batch_size=STATUS_MESSAGE_BATCH_SIZE,
+               flush_interval=STATUS_MESSAGE_FLUSH_INTERVAL):
+    """Instantiates a CoalescingStatusQueue.
+
+    Args:
+      status_queue: Underlying queue to post messages to.
+      batch_size: Maximum number of messages to buffer.
+      flush_interval: Maximum time to hold a buffered message, in seconds.
+    """
+    self.status_queue = status_queue
+    self.batch_size = batch_size
+    self.flush_interval = flush_interval
+    # Several threads may report through the same queue (e.g., the download
+    # and upload sides of a daisy chain copy).
+    self._lock = threading.Lock()
+    self._messages = []
+    self._first_message_time = None
+    # Maps a ProgressMessage key to the index in self._messages of the latest
+    # ProgressMessage for it. Cleared whenever any other kind of message is
+    # buffered, so that no ProgressMessage is moved across it.
+    self._progress_indexes = {}
+
+  # pylint: disable=invalid-name, unused-argument
+  def put(self, status_message, timeout=None):
+    """Buffers a status message, posting the buffer if it is due.
+
+    Args:
+      status_message: Message to buffer.
+      timeout: Unused; present for compatibility with Queue.put.
+    """
+    with self._lock:
+      if isinstance(status_message, ProgressMessage):
+        key = (status_message.src_url, status_message.dst_url,
+               status_message.component_num, status_message.operation_name)
+        index = self._progress_indexes.get(key)
+        if index is None:
+          self._progress_indexes[key] = len(self._messages)
+          self._messages.append(status_message)
+        else:
+          self._messages[index] = status_message
+      else:
+        self._progress_indexes.clear()
+        self._messages.append(status_message)
+
+      cur_time = time.time()
+      if self._first_message_time is None:
+        self._first_message_time = cur_time
+      if (len(self._messages) >= self.batch_size or
+          cur_time - self._first_message_time >= self.flush_interval):
+        self._FlushLocked()
+
+  # pylint: enable=invalid-name, unused-argument
+
+  def Flush(self):
+    """Posts all buffered messages to the underlying status queue."""
+    with self._lock:
+      self._FlushLocked()
+
+  def _FlushLocked(self):
+    if not self._messages:
+      return
+    if len(self._messages) == 1:
+      message = self._messages[0]
+    else:
+      message = StatusMessageBatch(self._messages)
+    self._messages = []
+    self._progress_indexes = {}
+    self._first_message_time = None
+    PutToQueueWithTimeout(self.status_queue, message)
@@ -25,6 +25,7 @@ import json
 import os
 import re
 import sys
+import threading
 import six
 
 from boto import config
@@ -34,6 +35,15 @@ from gslib.utils.boto_util import ResumableThreshold
 from gslib.utils.constants import UTF8
 from gslib.utils.system_util import CreateDirIfNeeded
 
+# pylint: disable=g-import-not-at-top
+try:
+  # Not all Python builds include sqlite3; without it, only the 'files'
+  # tracker store is available.
+  import sqlite3
+except ImportError:
+  sqlite3 = None
+# pylint: enable=g-import-not-at-top
+
 # The maximum length of a file name can vary wildly between different
 # operating systems, so we always ensure that tracker files are less
 # than 100 characters in order to avoid any such issues.
@@ -47,6 +57,17 @@ TRACKER_FILE_UNWRITABLE_EXCEPTION_TEXT = (
 ENCRYPTION_UPLOAD_TRACKER_ENTRY = 'encryption_key_sha256'
 SERIALIZATION_UPLOAD_TRACKER_ENTRY = 'serialization_data'
 
+# Values for the GSUtil:tracker_store config option.
+TRACKER_STORE_FILES = 'files'
+TRACKER_STORE_SQLITE = 'sqlite'
+
+# Name of the single database file used by the sqlite tracker store, within
+# the tracker file directory.
+SQLITE_TRACKER_STORE_NAME = 'tracker_store.sqlite3'
+
+# Seconds to wait on a tracker store lock held by another process or thread.
+SQLITE_TRACKER_STORE_TIMEOUT = 60
+
 
 class TrackerFileType(object):
   UPLOAD = 'upload'
@@ -215,15 +236,11 @@ def GetSlicedDownloadTrackerFilePaths(dst_url,
 
   # If we don't know the number of components, check the tracker file.
   if num_components is None:
-    tracker_file = None
     try:
-      tracker_file = open(parallel_tracker_file_path, 'r')
-      num_components = json.load(tracker_file)['num_components']
+      num_components = json.loads(
+          ReadTrackerFile(parallel_tracker_file_path))['num_components']
     except (IOError, ValueError):
       return tracker_file_paths
-    finally:
-      if tracker_file:
-        tracker_file.close()
 
   for i in range(num_components):
     tracker_file_paths.append(
@@ -255,9 +272,147 @@ def _HashAndReturnPath(res_tracker_file_name, tracker_file_type):
   return tracker_file_path
 
 
+class _FileTrackerStore(object):
+  """Tracker store that keeps each tracker in its own file.
+
+  This is the default store. Tracker names are file paths.
+  """
+
+  def Read(self, tracker_file_name):
+    with open(tracker_file_name, 'r') as tracker_file:
+      return tracker_file.read()
+
+  def Write(self, tracker_file_name, data):
+    with os.fdopen(
+        os.open(tracker_file_name, os.O_WRONLY | os.O_CREAT | os.O_TRUNC,
+                0o600), 'w') as tf:
+      tf.write(data)
+
+  def Delete(self, tracker_file_name):
+    if os.path.exists(tracker_file_name):
+      os.unlink(tracker_file_name)
+
+
+class _SqliteTrackerStore(object):
+  """Tracker store that keeps all trackers in a single SQLite database.
+
+  Large parallel transfers can create millions of tracker files, paying an
+  open/write/close plus directory metadata updates for each, and leaving a
+  huge tracker directory behind. This store keeps every tracker as a row in
+  one database keyed by the tracker file path, so reads are index lookups and
+  writes are appends to the database's write-ahead log. The WAL is run with
+  synchronous=NORMAL, so commits are not fsynced individually; SQLite
+  checkpoints (compacts) the log into the database periodically. A tracker
+  lost to a machine crash only causes a transfer to restart from an earlier
+  point, as with a missing tracker file.
+
+  SQLite connections may not be shared across threads or forked processes, so
+  a connection is kept per (process, thread).
+  """
+
+  def __init__(self, db_path):
+    self.db_path = db_path
+    self._local = threading.local()
+
+  def _GetConnection(self):
+    conn = getattr(self._local, 'conn', None)
+    if conn is None or self._local.pid != os.getpid():
+      conn = sqlite3.connect(self.db_path,
+                             timeout=SQLITE_TRACKER_STORE_TIMEOUT,
+                             isolation_level=None)
+      conn.execute('PRAGMA journal_mode=WAL')
+      conn.execute('PRAGMA synchronous=NORMAL')
+      conn.execute('CREATE TABLE IF NOT EXISTS trackers '
+                   '(name TEXT PRIMARY KEY, data TEXT NOT NULL)')
+      self._local.conn = conn
+      self._local.pid = os.getpid()
+    return conn
+
+  def Read(self, tracker_file_name):
+    try:
+      row = self._GetConnection().execute(
+          'SELECT data FROM trackers WHERE name = ?',
+          (tracker_file_name,)).fetchone()
+    except sqlite3.Error as e:
+      raise IOError(errno.EIO, str(e), tracker_file_name)
+    if row is None:
+      raise IOError(errno.ENOENT, os.strerror(errno.ENOENT), tracker_file_name)
+    return row[0]
+
+  def Write(self, tracker_file_name, data):
+    try:
+      self._GetConnection().execute(
+          'INSERT OR REPLACE INTO trackers (name, data) VALUES (?, ?)',
+          (tracker_file_name, data))
+    except sqlite3.Error as e:
+      raise IOError(errno.EIO, str(e), tracker_file_name)
+
+  def Delete(self, tracker_file_name):
+    try:
+      self._GetConnection().execute('DELETE FROM trackers WHERE name = ?',
+                                    (tracker_file_name,))
+    except sqlite3.Error as e:
+      raise IOError(errno.EIO, str(e), tracker_file_name)
+
+
+_tracker_stores = {}
+_tracker_stores_lock = threading.Lock()
+
+
+def _GetTrackerStore():
+  """Returns the tracker store selected by the GSUtil:tracker_store option."""
+  store_type = config.get('GSUtil', 'tracker_store', TRACKER_STORE_FILES)
+  if store_type == TRACKER_STORE_SQLITE and sqlite3 is not None:
+    db_path = os.path.join(CreateTrackerDirIfNeeded(),
+                           SQLITE_TRACKER_STORE_NAME)
+  elif store_type in (TRACKER_STORE_FILES, TRACKER_STORE_SQLITE):
+    db_path = None
+  else:
+    raise CommandException(
+        'Invalid tracker_store value (%s) in boto config; must be one of %s.' %
+        (store_type, ', '.join((TRACKER_STORE_FILES, TRACKER_STORE_SQLITE))))
+  with _tracker_stores_lock:
+    if db_path not in _tracker_stores:
+      _tracker_stores[db_path] = (_SqliteTrackerStore(db_path)
+                                  if db_path else _FileTrackerStore())
+    return _tracker_stores[db_path]
+
+
+def ReadTrackerFile(tracker_file_name):
+  """Reads the contents of a tracker file from the configured tracker store.
+
+  Args:
+    tracker_file_name: Tracker file path string.
+
+  Raises:
+    IOError if the tracker could not be read; errno is ENOENT if it doesn't
+    exist.
+
+  Returns:
+    The tracker data as a string.
+  """
+  return _GetTrackerStore().Read(tracker_file_name)
+
+
+def WriteTrackerFile(tracker_file_name, data):
+  """Creates or replaces a tracker file, storing the input data.
+
+  Args:
+    tracker_file_name: Tracker file path string.
+    data: String data to store.
+
+  Raises:
+    CommandException if the tracker could not be written.
+  """
+  try:
+    _GetTrackerStore().Write(tracker_file_name, data)
+  except (IOError, OSError) as e:
+    RaiseUnwritableTrackerFileException(tracker_file_name, e.strerror)
+
+
 def DeleteTrackerFile(tracker_file_name):
-  if tracker_file_name and os.path.exists(tracker_file_name):
-    os.unlink(tracker_file_name)
+  if tracker_file_name:
+    _GetTrackerStore().Delete(tracker_file_name)
 
 
 def HashRewriteParameters(src_obj_metadata,
@@ -340,24 +495,20 @@ def ReadRewriteTrackerFile(tracker_file_name, rewrite_params_hash):
     file exists, None otherwise (which will result in starting a new rewrite).
   """
   # Check to see if we already have a matching tracker file.
-  tracker_file = None
   if not rewrite_params_hash:
     return
   try:
-    tracker_file = open(tracker_file_name, 'r')
-    existing_hash = tracker_file.readline().rstrip('\n')
-    if existing_hash == rewrite_params_hash:
+    tracker_lines = ReadTrackerFile(tracker_file_name).split('\n')
+    existing_hash = tracker_lines[0]
+    if existing_hash == rewrite_params_hash and len(tracker_lines) > 1:
       # Next line is the rewrite token.
-      return tracker_file.readline().rstrip('\n')
+      return tracker_lines[1]
   except IOError as e:
     # Ignore non-existent file (happens first time a rewrite is attempted.
     if e.errno != errno.ENOENT:
       sys.stderr.write(
           ('Couldn\'t read Copy tracker file (%s): %s. Restarting copy '
            'from scratch.' % (tracker_file_name, e.strerror)))
-  finally:
-    if tracker_file:
-      tracker_file.close()
 
 
 def WriteRewriteTrackerFile(tracker_file_name, rewrite_params_hash,
@@ -370,8 +521,8 @@ def WriteRewriteTrackerFile(tracker_file_name, rewrite_params_hash,
         by HashRewriteParameters.
     rewrite_token: Rewrite token string returned by the service.
   """
-  _WriteTrackerFile(tracker_file_name,
-                    '%s\n%s\n' % (rewrite_params_hash, rewrite_token))
+  WriteTrackerFile(tracker_file_name,
+                   '%s\n%s\n' % (rewrite_params_hash, rewrite_token))
 
 
 def ReadOrCreateDownloadTrackerFile(src_obj_metadata,
@@ -426,16 +577,15 @@ def ReadOrCreateDownloadTrackerFile(src_obj_metadata,
                                          tracker_file_type,
                                          api_selector,
                                          component_num=component_num)
-  tracker_file = None
   # Check to see if we already have a matching tracker file.
   try:
-    tracker_file = open(tracker_file_name, 'r')
+    tracker_data = ReadTrackerFile(tracker_file_name)
     if tracker_file_type is TrackerFileType.DOWNLOAD:
-      etag_value = tracker_file.readline().rstrip('\n')
+      etag_value = tracker_data.split('\n', 1)[0]
       if etag_value == src_obj_metadata.etag:
         return tracker_file_name, existing_file_size
     elif tracker_file_type is TrackerFileType.DOWNLOAD_COMPONENT:
-      component_data = json.loads(tracker_file.read())
+      component_data = json.loads(tracker_data)
       if (component_data['etag'] == src_obj_metadata.etag and
           component_data['generation'] == src_obj_metadata.generation):
         return tracker_file_name, component_data['download_start_byte']
@@ -449,14 +599,11 @@ def ReadOrCreateDownloadTrackerFile(src_obj_metadata,
     if isinstance(e, ValueError) or e.errno != errno.ENOENT:
       logger.warn('Couldn\'t read download tracker file (%s): %s. Restarting '
                   'download from scratch.' % (tracker_file_name, str(e)))
-  finally:
-    if tracker_file:
-      tracker_file.close()
 
   # There wasn't a matching tracker file, so create one and then start the
   # download from scratch.
   if tracker_file_type is TrackerFileType.DOWNLOAD:
-    _WriteTrackerFile(tracker_file_name, '%s\n' % src_obj_metadata.etag)
+    WriteTrackerFile(tracker_file_name, '%s\n' % src_obj_metadata.etag)
   elif tracker_file_type is TrackerFileType.DOWNLOAD_COMPONENT:
     WriteDownloadComponentTrackerFile(tracker_file_name, src_obj_metadata,
                                       start_byte)
@@ -506,16 +653,15 @@ def GetDownloadStartByte(src_obj_metadata,
                                          tracker_file_type,
                                          api_selector,
                                          component_num=component_num)
-  tracker_file = None
   # Check to see if we already have a matching tracker file.
   try:
-    tracker_file = open(tracker_file_name, 'r')
+    tracker_data = ReadTrackerFile(tracker_file_name)
     if tracker_file_type is TrackerFileType.DOWNLOAD:
-      etag_value = tracker_file.readline().rstrip('\n')
+      etag_value = tracker_data.split('\n', 1)[0]
       if etag_value == src_obj_metadata.etag:
         return existing_file_size
     elif tracker_file_type is TrackerFileType.DOWNLOAD_COMPONENT:
-      component_data = json.loads(tracker_file.read())
+      component_data = json.loads(tracker_data)
       if (component_data['etag'] == src_obj_metadata.etag and
           component_data['generation'] == src_obj_metadata.generation):
         return component_data['download_start_byte']
@@ -524,10 +670,6 @@ def GetDownloadStartByte(src_obj_metadata,
     # If the file does not exist, there is not much we can do at this point.
     pass
 
-  finally:
-    if tracker_file:
-      tracker_file.close()
-
   # There wasn't a matching tracker file, which means our starting point is
   # start_byte.
   return start_byte
@@ -548,18 +690,7 @@ def WriteDownloadComponentTrackerFile(tracker_file_name, src_obj_metadata,
       'download_start_byte': current_file_pos,
   }
 
-  _WriteTrackerFile(tracker_file_name, json.dumps(component_data))
-
-
-def _WriteTrackerFile(tracker_file_name, data):
-  """Creates a tracker file, storing the input data."""
-  try:
-    with os.fdopen(os.open(tracker_file_name, os.O_WRONLY | os.O_CREAT, 0o600),
-                   'w') as tf:
-      tf.write(data)
-    return False
-  except (IOError, OSError) as e:
-    raise RaiseUnwritableTrackerFileException(tracker_file_name, e.strerror)
+  WriteTrackerFile(tracker_file_name, json.dumps(component_data))
 
 
 def GetUploadTrackerData(tracker_file_name, logger, encryption_key_sha256=None):
@@ -577,15 +708,13 @@ def GetUploadTrackerData(tracker_file_name, logger, encryption_key_sha256=None):
     Serialization data if the tracker file already exists (resume existing
     upload), None otherwise.
   """
-  tracker_file = None
   remove_tracker_file = False
   encryption_restart = False
 
   # If we already have a matching tracker file, get the serialization data
   # so that we can resume the upload.
   try:
-    tracker_file = open(tracker_file_name, 'r')
-    tracker_data = tracker_file.read()
+    tracker_data = ReadTrackerFile(tracker_file_name)
     tracker_json = json.loads(tracker_data)
     if tracker_json[ENCRYPTION_UPLOAD_TRACKER_ENTRY] != encryption_key_sha256:
       encryption_restart = True
@@ -610,8 +739,6 @@ def GetUploadTrackerData(tracker_file_name, logger, encryption_key_sha256=None):
       # If encryption key is still None, we can resume using the old format.
       return tracker_data
   finally:
-    if tracker_file:
-      tracker_file.close()
     if encryption_restart:
       logger.warn(
           'Upload tracker file (%s) does not match current encryption '
@@ -28,6 +28,8 @@ from six.moves import queue as Queue
 
 from gslib.metrics import LogPerformanceSummaryParams
 from gslib.metrics import LogRetryableError
+from gslib.telemetry import DEFAULT_TELEMETRY_INTERVAL
+from gslib.telemetry import TelemetryRecorder
 from gslib.thread_message import FileMessage
 from gslib.thread_message import FinalMessage
 from gslib.thread_message import MetadataMessage
@@ -37,6 +39,7 @@ from gslib.thread_message import ProgressMessage
 from gslib.thread_message import RetryableErrorMessage
 from gslib.thread_message import SeekAheadMessage
 from gslib.thread_message import StatusMessage
+from gslib.thread_message import StatusMessageBatch
 from gslib.utils import parallelism_framework_util
 from gslib.utils.unit_util import DecimalShort
 from gslib.utils.unit_util import HumanReadableWithDecimalPlaces
@@ -922,7 +925,9 @@ class UIController(object):
                quiet_mode=False,
                custom_time=None,
                verbose=False,
-               dump_status_messages_file=None):
+               dump_status_messages_file=None,
+               telemetry_file=None,
+               telemetry_interval=DEFAULT_TELEMETRY_INTERVAL):
     """Instantiates a UIController.
 
     Args:
@@ -944,6 +949,10 @@ class UIController(object):
       verbose: Tells whether or not the operation is on verbose mode.
       dump_status_messages_file: File path for logging all received status
           messages, for debugging purposes.
+      telemetry_file: File path for appending periodic JSON-lines telemetry
+          snapshots (see gslib.telemetry), or None to disable telemetry.
+      telemetry_interval: Minimum period between telemetry snapshots, in
+          seconds.
     """
     self.verbose = verbose
     self.update_message_period = update_message_period
@@ -962,6 +971,28 @@ class UIController(object):
     self.dump_status_message_fp = None
     if dump_status_messages_file:
       self.dump_status_message_fp = open(dump_status_messages_file, 'ab')
+    self.telemetry = None
+    if telemetry_file:
+      self.telemetry = TelemetryRecorder(telemetry_file,
+                                         interval=telemetry_interval,
+                                         custom_time=custom_time)
+
+  def TrackQueueDepth(self, name, queue):
+    """Reports the depth of queue in telemetry snapshots, if enabled."""
+    if self.telemetry:
+      self.telemetry.TrackQueue(name, queue)
+
+  def MaybeWriteTelemetry(self, cur_time=None, force=False):
+    """Writes a telemetry snapshot if telemetry is enabled and one is due.
+
+    Args:
+      cur_time: Current time. Defaults to time.time().
+      force: If True, write a snapshot regardless of the telemetry interval.
+    """
+    if self.telemetry:
+      self.telemetry.MaybeWriteSnapshot(self.manager,
+                                        cur_time=cur_time,
+                                        force=force)
 
   def _HandleMessage(self, status_message, stream, cur_time=None):
     """Processes a message, updates throughput and prints progress.
@@ -1001,7 +1032,14 @@ class UIController(object):
       cur_time: Message time. Used to determine if it is time to refresh
                 output, or calculate throughput.
     """
+    if isinstance(status_message, StatusMessageBatch):
+      for batched_message in status_message.messages:
+        self.Call(batched_message, stream, cur_time=cur_time)
+      return
     if not isinstance(status_message, StatusMessage):
+      if status_message == _ZERO_TASKS_TO_DO_ARGUMENT:
+        # Make the state at the end of each Apply call visible right away.
+        self.MaybeWriteTelemetry(force=True)
       if status_message == _ZERO_TASKS_TO_DO_ARGUMENT and not self.manager:
         # Create a manager to handle early estimation messages before returning.
         self.manager = (DataManager(
@@ -1026,6 +1064,23 @@ class UIController(object):
       self.dump_status_message_fp.write('\n')
     if not cur_time:
       cur_time = status_message.time
+    self._RouteMessage(status_message, stream, cur_time)
+    if self.telemetry:
+      # Record the message once it has been handled, so that the snapshot
+      # reflects it.
+      self.telemetry.ProcessMessage(status_message)
+      self.MaybeWriteTelemetry(cur_time)
+
+  def _RouteMessage(self, status_message, stream, cur_time):
+    """Creates the appropriate manager if needed and has it handle a message.
+
+    Args:
+      status_message: StatusMessage to be processed.
+      stream: Stream to print messages. Usually sys.stderr, but customizable
+              for testing.
+      cur_time: Message time. Used to determine if it is time to refresh
+                output, or calculate throughput.
+    """
     if not self.manager:
       if (isinstance(status_message, SeekAheadMessage) or
           isinstance(status_message, ProducerThreadMessage)):
@@ -1144,6 +1199,7 @@ class UIThread(threading.Thread):
     self.stream = stream
     self.timeout = timeout
     self.ui_controller = ui_controller
+    self.ui_controller.TrackQueueDepth('status_queue', status_queue)
     self.start()
 
   def run(self):
@@ -1153,6 +1209,9 @@ class UIThread(threading.Thread):
           status_message = self.status_queue.get(timeout=self.timeout)
         except Queue.Empty:
           status_message = None
+          # Keep telemetry flowing while no status is reported, e.g., during
+          # long listings or stalled transfers.
+          self.ui_controller.MaybeWriteTelemetry()
           continue
         self.ui_controller.Call(status_message, self.stream)
         if status_message == _ZERO_TASKS_TO_DO_ARGUMENT:
@@ -40,8 +40,11 @@ from boto.pyami.config import BotoConfigLocations
 import gslib
 from gslib.exception import CommandException
 from gslib.utils import system_util
+from gslib.utils.constants import DEFAULT_CAT_RANGE_SIZE
 from gslib.utils.constants import DEFAULT_GCS_JSON_API_VERSION
 from gslib.utils.constants import DEFAULT_GSUTIL_STATE_DIR
+from gslib.utils.constants import DEFAULT_HEDGE_BUDGET_PERCENT
+from gslib.utils.constants import DEFAULT_HEDGE_PERCENTILE
 from gslib.utils.constants import SSL_TIMEOUT_SEC
 from gslib.utils.constants import UTF8
 from gslib.utils.unit_util import HumanReadableToBytes
@@ -131,10 +134,26 @@ def ConfigureNoOpAuthIfNeeded():
       from gslib import no_op_auth_plugin  # pylint: disable=unused-variable
 
 
+def GetCatParallelReads():
+  """Returns the number of ranges cat reads concurrently, or 0."""
+  return config.getint('GSUtil', 'cat_parallel_reads', 0)
+
+
+def GetCatRangeSize():
+  """Returns the size of the ranges cat reads concurrently, in bytes."""
+  return HumanReadableToBytes(
+      config.get('GSUtil', 'cat_range_size', str(DEFAULT_CAT_RANGE_SIZE)))
+
+
 def GetCertsFile():
   return configured_certs_file
 
 
+def GetCircuitBreakerThreshold():
+  """Returns the recent error count that opens a bucket's circuit, or 0."""
+  return config.getint('GSUtil', 'circuit_breaker_threshold', 0)
+
+
 def GetCleanupFiles():
   """Returns a list of temp files to delete (if possible) when program exits."""
   return [temp_certs_file] if temp_certs_file else []
@@ -209,6 +228,23 @@ def GetGcsJsonApiVersion():
   return config.get('GSUtil', 'json_api_version', DEFAULT_GCS_JSON_API_VERSION)
 
 
+def GetHedgeBudgetPercent():
+  """Returns the maximum percentage of requests that may be hedged."""
+  return config.getfloat('GSUtil', 'hedge_budget_percent',
+                         DEFAULT_HEDGE_BUDGET_PERCENT)
+
+
+def GetHedgePercentile():
+  """Returns the latency percentile after which requests are hedged."""
+  return config.getfloat('GSUtil', 'hedge_percentile',
+                         DEFAULT_HEDGE_PERCENTILE)
+
+
+def GetHedgeRequests():
+  """Returns whether slow small object requests should be hedged."""
+  return config.getbool('GSUtil', 'hedge_requests', False)
+
+
 # Resumable downloads and uploads make one HTTP call per chunk (and must be
 # in multiples of 256KiB). Overridable for testing.
 def GetJsonResumableChunkSize():
@@ -225,6 +261,11 @@ def GetLastCheckedForGsutilUpdateTimestampFile():
   return os.path.join(GetGsutilStateDir(), '.last_software_update_check')
 
 
+def GetLocalWalkThreads():
+  """Returns the number of threads walking local directory trees."""
+  return config.getint('GSUtil', 'local_walk_threads', 1)
+
+
 def GetMaxConcurrentCompressedUploads():
   """Gets the max concurrent transport compressed uploads allowed in parallel.
 
@@ -244,10 +285,25 @@ def GetMaxConcurrentCompressedUploads():
   return max_concurrent_uploads
 
 
+def GetMaxBandwidth():
+  """Returns the limit on transfer bandwidth in bytes per second, or 0."""
+  return HumanReadableToBytes(config.get('GSUtil', 'max_bandwidth', '0'))
+
+
+def GetMaxBucketRequestRate():
+  """Returns the limit on object requests per second to a bucket, or 0."""
+  return config.getfloat('GSUtil', 'max_bucket_request_rate', 0)
+
+
 def GetMaxRetryDelay():
   return config.getint('Boto', 'max_retry_delay', 32)
 
 
+def GetMaxRetryRate():
+  """Returns the limit on retries per second across all workers, or 0."""
+  return config.getfloat('GSUtil', 'max_retry_rate', 0)
+
+
 def GetMaxUploadCompressionBufferSize():
   """Get the max amount of memory compressed transport uploads may buffer."""
   return HumanReadableToBytes(
@@ -301,6 +357,11 @@ def GetNumRetries():
   return config.getint('Boto', 'num_retries', 23)
 
 
+def GetRsyncStreamingDiff():
+  """Returns whether rsync diffs listings as they're produced."""
+  return config.getbool('GSUtil', 'rsync_streaming_diff', False)
+
+
 def GetTabCompletionLogFilename():
   return os.path.join(GetGsutilStateDir(), 'tab-completion-logs')
 
@@ -19,15 +19,22 @@ from __future__ import print_function
 from __future__ import division
 from __future__ import unicode_literals
 
+import collections
+import functools
 import io
 import sys
+import threading
 
+import six
 from boto import config
 
 from gslib.cloud_api import EncryptionException
+from gslib.commands.config import DEFAULT_PARALLEL_THREAD_COUNT
 from gslib.exception import CommandException
 from gslib.exception import NO_URLS_MATCHED_TARGET
 from gslib.storage_url import StorageUrlFromString
+from gslib.utils.boto_util import GetCatParallelReads
+from gslib.utils.boto_util import GetCatRangeSize
 from gslib.utils.encryption_helper import CryptoKeyWrapperFromKey
 from gslib.utils.encryption_helper import FindMatchingCSEKInBotoConfig
 from gslib.utils.metadata_util import ObjectIsGzipEncoded
@@ -73,14 +80,166 @@ class CatHelper(object):
         break
       text_util.write_to_fd(dst_fd, buf)
 
+  def _IterCatTasks(self, url_strings, start_byte, end_byte, cat_out_fd,
+                    reader):
+    """Yields the tasks that write the output of cat, in order.
+
+    Listing and reading objects happens lazily as tasks are yielded and run.
+    With a reader, ranges of objects are submitted to it as their tasks are
+    yielded, so that they're fetched while earlier tasks are still running.
+
+    Args:
+      url_strings: See CatUrlStrings.
+      start_byte: See CatUrlStrings.
+      end_byte: See CatUrlStrings.
+      cat_out_fd: File descriptor to which output should be written.
+      reader: ParallelRangeReader for fetching ranges, or None to stream each
+          object when its task runs.
+
+    Yields:
+      _CatTasks; the tasks of each object are yielded consecutively.
+
+    Raises:
+      CommandException if no URLs can be found.
+    """
+    for url_str in url_strings:
+      did_some_work = False
+      # TODO: Get only the needed fields here.
+      for blr in self.command_obj.WildcardIterator(url_str).IterObjects(
+          bucket_listing_fields=_CAT_BUCKET_LISTING_FIELDS):
+        decryption_keywrapper = None
+        if (blr.root_object and blr.root_object.customerEncryption and
+            blr.root_object.customerEncryption.keySha256):
+          decryption_key = FindMatchingCSEKInBotoConfig(
+              blr.root_object.customerEncryption.keySha256, config)
+          if not decryption_key:
+            raise EncryptionException(
+                'Missing decryption key with SHA256 hash %s. No decryption '
+                'key matches object %s' %
+                (blr.root_object.customerEncryption.keySha256, blr.url_string))
+          decryption_keywrapper = CryptoKeyWrapperFromKey(decryption_key)
+
+        did_some_work = True
+        cat_object = blr.root_object
+        storage_url = StorageUrlFromString(blr.url_string)
+        if storage_url.IsCloudUrl():
+          compressed_encoding = ObjectIsGzipEncoded(cat_object)
+          ranges = None
+          if reader and not compressed_encoding:
+            ranges = SplitRange(start_byte, end_byte, cat_object.size,
+                                reader.range_size)
+          if ranges:
+            generation = storage_url.generation
+            if not generation and storage_url.scheme == 'gs':
+              # Pin the generation, so that all ranges are read from the same
+              # object even if it is overwritten while being read.
+              generation = cat_object.generation
+            for range_start, range_end in ranges:
+              prefetched_range = reader.Submit(
+                  functools.partial(_FetchRange,
+                                    cat_object.bucket,
+                                    cat_object.name,
+                                    range_start,
+                                    range_end,
+                                    cat_object.size,
+                                    generation,
+                                    decryption_keywrapper,
+                                    storage_url.scheme), cat_out_fd)
+              yield _CatTask(blr, prefetched_range, prefetched_range.done)
+          else:
+            yield _CatTask(
+                blr,
+                functools.partial(self.command_obj.gsutil_api.GetObjectMedia,
+                                  cat_object.bucket,
+                                  cat_object.name,
+                                  cat_out_fd,
+                                  compressed_encoding=compressed_encoding,
+                                  start_byte=start_byte,
+                                  end_byte=end_byte,
+                                  object_size=cat_object.size,
+                                  generation=storage_url.generation,
+                                  decryption_tuple=decryption_keywrapper,
+                                  provider=storage_url.scheme), None)
+        else:
+          yield _CatTask(
+              blr,
+              functools.partial(self._WriteLocalFile, storage_url.object_name,
+                                cat_out_fd), None)
+      if not did_some_work:
+        raise CommandException(NO_URLS_MATCHED_TARGET % url_str)
+
+  def _WriteLocalFile(self, file_name, dst_fd):
+    with open(file_name, 'rb') as f:
+      self._WriteBytesBufferedFileToFile(f, dst_fd)
+
+  def _RunTasks(self, tasks, max_pending, show_header, reader=None):
+    """Runs tasks, pulling up to max_pending tasks ahead.
+
+    Tasks run in order unless a reader is given, in which case the objects
+    whose first tasks are ready run first. The tasks of an object always run
+    consecutively, in order, so objects' output is never interleaved.
+
+    If pulling a task fails, for instance because a URL matched nothing, the
+    tasks pulled before it are run before the failure is raised, as they would
+    be when running tasks one at a time.
+
+    Args:
+      tasks: Iterator of _CatTasks from _IterCatTasks.
+      max_pending: Maximum number of tasks pulled but not yet run.
+      show_header: If true, print a header before each object's output.
+      reader: ParallelRangeReader fetching the tasks' ranges, if they should
+          run in the order their objects are ready rather than in order.
+    """
+    pending = []
+    # The object whose tasks are running, and whether a header was printed.
+    state = {'blr': None, 'printed_one': False}
+
+    def _Run(task):
+      if show_header and task.blr is not state['blr']:
+        _PrintHeader(task.blr, state['printed_one'])
+        state['printed_one'] = True
+      state['blr'] = task.blr
+      task.run()
+
+    exhausted = False
+    while True:
+      while not exhausted and len(pending) < max_pending:
+        try:
+          pending.append(next(tasks))
+        except StopIteration:
+          exhausted = True
+        except Exception:  # pylint: disable=broad-except
+          exc_info = sys.exc_info()
+          for task in pending:
+            _Run(task)
+          six.reraise(*exc_info)
+      if not pending:
+        break
+      if reader:
+        with reader.fetched:
+          index = _GetReadyTaskIndex(pending, state['blr'], exhausted)
+          while index is None:
+            # Wakes up periodically so that Python 2 can handle signals.
+            reader.fetched.wait(1)
+            index = _GetReadyTaskIndex(pending, state['blr'], exhausted)
+      else:
+        index = 0
+      _Run(pending.pop(index))
+
   def CatUrlStrings(self,
                     url_strings,
                     show_header=False,
                     start_byte=0,
                     end_byte=None,
-                    cat_out_fd=None):
+                    cat_out_fd=None,
+                    unordered=False):
     """Prints each of the url strings to stdout.
 
+    If the cat_parallel_reads boto config value is set, or the top-level -m
+    option was given, cloud objects are read as ranges of cat_range_size
+    bytes, several at a time, and the ranges of the next objects are
+    prefetched while the current one is written.
+
     Args:
       url_strings: String iterable.
       show_header: If true, print a header per file.
@@ -91,13 +250,14 @@ class CatHelper(object):
                 and end range is sent over HTTP (such as range: bytes -9)
       cat_out_fd: File descriptor to which output should be written. Defaults to
                  stdout if no file descriptor is supplied.
+      unordered: If true and objects are read in parallel, output each object
+                 as soon as it's ready, rather than in the order listed.
     Returns:
       0 on success.
 
     Raises:
       CommandException if no URLs can be found.
     """
-    printed_one = False
     # This should refer to whatever sys.stdin refers to when this method is
     # run, not when this method is defined, so we do the initialization here
     # rather than define sys.stdin as the cat_out_fd parameter's default value.
@@ -107,55 +267,232 @@ class CatHelper(object):
     # contents go to stderr.
     old_stdout = sys.stdout
     sys.stdout = sys.stderr
+    reader = None
     try:
       if url_strings and url_strings[0] in ('-', 'file://-'):
         self._WriteBytesBufferedFileToFile(sys.stdin, cat_out_fd)
       else:
-        for url_str in url_strings:
-          did_some_work = False
-          # TODO: Get only the needed fields here.
-          for blr in self.command_obj.WildcardIterator(url_str).IterObjects(
-              bucket_listing_fields=_CAT_BUCKET_LISTING_FIELDS):
-            decryption_keywrapper = None
-            if (blr.root_object and blr.root_object.customerEncryption and
-                blr.root_object.customerEncryption.keySha256):
-              decryption_key = FindMatchingCSEKInBotoConfig(
-                  blr.root_object.customerEncryption.keySha256, config)
-              if not decryption_key:
-                raise EncryptionException(
-                    'Missing decryption key with SHA256 hash %s. No decryption '
-                    'key matches object %s' %
-                    (blr.root_object.customerEncryption.keySha256,
-                     blr.url_string))
-              decryption_keywrapper = CryptoKeyWrapperFromKey(decryption_key)
-
-            did_some_work = True
-            if show_header:
-              if printed_one:
-                print()
-              print('==> %s <==' % blr)
-              printed_one = True
-            cat_object = blr.root_object
-            storage_url = StorageUrlFromString(blr.url_string)
-            if storage_url.IsCloudUrl():
-              compressed_encoding = ObjectIsGzipEncoded(cat_object)
-              self.command_obj.gsutil_api.GetObjectMedia(
-                  cat_object.bucket,
-                  cat_object.name,
-                  cat_out_fd,
-                  compressed_encoding=compressed_encoding,
-                  start_byte=start_byte,
-                  end_byte=end_byte,
-                  object_size=cat_object.size,
-                  generation=storage_url.generation,
-                  decryption_tuple=decryption_keywrapper,
-                  provider=storage_url.scheme)
-            else:
-              with open(storage_url.object_name, 'rb') as f:
-                self._WriteBytesBufferedFileToFile(f, cat_out_fd)
-          if not did_some_work:
-            raise CommandException(NO_URLS_MATCHED_TARGET % url_str)
+        num_readers = GetCatParallelReads()
+        if not num_readers and self.command_obj.parallel_operations:
+          num_readers = config.getint('GSUtil', 'parallel_thread_count',
+                                      DEFAULT_PARALLEL_THREAD_COUNT)
+        if num_readers > 1:
+          reader = ParallelRangeReader(num_readers, GetCatRangeSize(),
+                                       self.command_obj.CreateGsutilApi)
+          # Ranges being fetched, plus as many fetched ones waiting their
+          # turn, bound the memory used to 2 * num_readers * range size.
+          max_pending = 2 * num_readers
+        else:
+          max_pending = 1
+        self._RunTasks(self._IterCatTasks(url_strings, start_byte, end_byte,
+                                          cat_out_fd, reader),
+                       max_pending,
+                       show_header,
+                       reader=reader if unordered else None)
     finally:
+      if reader:
+        reader.Shutdown()
       sys.stdout = old_stdout
 
     return 0
+
+
+_CatTask = collections.namedtuple(
+    '_CatTask',
+    [
+        # BucketListingRef of the object the task writes part of.
+        'blr',
+        # Function taking no arguments, which writes the output.
+        'run',
+        # threading.Event set once the task's range is fetched, or None if the
+        # task reads its data as it runs.
+        'fetched',
+    ])
+
+
+def _GetReadyTaskIndex(pending, current_blr, exhausted):
+  """Returns the index of the pending task to run next in unordered output.
+
+  Tasks of the object being written come first. Otherwise, the first object
+  whose first task is ready is started, so long as all of its tasks have been
+  pulled, which is the case if tasks of another object were pulled after them.
+  Since an object can't be interleaved with others, an object whose tasks
+  haven't all been pulled is only started when it's the only object pending.
+
+  Args:
+    pending: List of pending _CatTasks, in the order they were pulled.
+    current_blr: BucketListingRef of the object being written, if any.
+    exhausted: True if all tasks have been pulled.
+
+  Returns:
+    Index into pending of the task to run next, or None if no task is ready.
+  """
+  last_blr = pending[-1].blr
+  only_object = pending[0].blr is last_blr
+  seen_blrs = set()
+  for index, task in enumerate(pending):
+    if task.blr is current_blr:
+      return index
+    if id(task.blr) in seen_blrs:
+      continue
+    seen_blrs.add(id(task.blr))
+    if task.blr is last_blr and not (exhausted or only_object):
+      continue
+    if task.fetched is None or task.fetched.is_set():
+      return index
+  if only_object:
+    # The object is waited for however long it takes.
+    return 0
+  return None
+
+
+def _PrintHeader(blr, printed_one):
+  if printed_one:
+    print()
+  print('==> %s <==' % blr)
+
+
+def _FetchRange(bucket_name, object_name, start_byte, end_byte, object_size,
+                generation, decryption_tuple, provider, gsutil_api):
+  """Returns the bytes of a range of an object."""
+  buf = io.BytesIO()
+  gsutil_api.GetObjectMedia(bucket_name,
+                            object_name,
+                            buf,
+                            start_byte=start_byte,
+                            end_byte=end_byte,
+                            object_size=object_size,
+                            generation=generation,
+                            decryption_tuple=decryption_tuple,
+                            provider=provider)
+  return buf.getvalue()
+
+
+def SplitRange(start_byte, end_byte, object_size, range_size):
+  """Splits the requested bytes of an object into ranges to read in parallel.
+
+  Args:
+    start_byte: Starting byte to read, or a negative number of bytes to read
+        from the end of the object, as for CatUrlStrings.
+    end_byte: Ending byte to read (inclusive), or None to read to the end.
+    object_size: Size of the object.
+    range_size: Size of each range.
+
+  Returns:
+    List of (start_byte, end_byte) tuples, with end_byte None for the range
+    reaching the end of the object, or None if the requested bytes can't be
+    split, e.g. for an empty object, in which case it should be read with the
+    original request so that it fails or succeeds the same way.
+  """
+  if object_size is None or range_size <= 0:
+    return None
+  if start_byte < 0:
+    start_byte = max(0, object_size + start_byte)
+  last_byte = object_size - 1
+  if end_byte is not None:
+    last_byte = min(end_byte, last_byte)
+  if start_byte > last_byte:
+    return None
+  ranges = []
+  for range_start in range(start_byte, last_byte + 1, range_size):
+    range_end = min(range_start + range_size - 1, last_byte)
+    if range_end == object_size - 1:
+      range_end = None
+    ranges.append((range_start, range_end))
+  return ranges
+
+
+class _PrefetchedRange(object):
+  """A range being fetched by a ParallelRangeReader."""
+
+  def __init__(self, fetch_func, dst_fd):
+    self.fetch_func = fetch_func
+    self.dst_fd = dst_fd
+    self.data = None
+    self.exception_info = None
+    self.done = threading.Event()
+
+  def __call__(self):
+    """Waits for the range to be fetched, then writes it to dst_fd."""
+    self.done.wait()
+    if self.exception_info:
+      six.reraise(*self.exception_info)
+    data = self.data
+    # Don't keep the data alive once it's written.
+    self.data = None
+    text_util.write_to_fd(self.dst_fd, data)
+
+
+class ParallelRangeReader(object):
+  """Fetches ranges of objects on a pool of threads.
+
+  Each thread has its own gsutil Cloud API instance, as instances can't be
+  shared between threads. Ranges are fetched in the order they're submitted;
+  the caller writes them out in that order, and bounds how many it submits
+  ahead of writing, since fetched ranges are held in memory.
+  """
+
+  def __init__(self, num_threads, range_size, create_api_func):
+    """Starts the reader threads.
+
+    Args:
+      num_threads: Number of ranges to fetch concurrently.
+      range_size: Size of the ranges the caller should submit.
+      create_api_func: Function returning a new gsutil Cloud API instance.
+    """
+    self.range_size = range_size
+    self.create_api_func = create_api_func
+    self.range_queue = six.moves.queue.Queue()
+    # Notified whenever a range is fetched.
+    self.fetched = threading.Condition()
+    self.threads = []
+    for _ in range(num_threads):
+      thread = threading.Thread(target=self._ReadRanges)
+      thread.daemon = True
+      thread.start()
+      self.threads.append(thread)
+
+  def _ReadRanges(self):
+    gsutil_api = None
+    while True:
+      prefetched_range = self.range_queue.get()
+      if prefetched_range is None:
+        return
+      try:
+        if gsutil_api is None:
+          gsutil_api = self.create_api_func()
+        prefetched_range.data = prefetched_range.fetch_func(gsutil_api)
+      except Exception:  # pylint: disable=broad-except
+        prefetched_range.exception_info = sys.exc_info()
+      with self.fetched:
+        prefetched_range.done.set()
+        self.fetched.notify_all()
+
+  def Submit(self, fetch_func, dst_fd):
+    """Queues a range to be fetched.
+
+    Args:
+      fetch_func: Function taking a gsutil Cloud API instance and returning
+          the bytes of the range.
+      dst_fd: File descriptor to which the range should be written.
+
+    Returns:
+      A function that waits for the range to be fetched and writes it to
+      dst_fd, re-raising any exception raised while fetching it.
+    """
+    prefetched_range = _PrefetchedRange(fetch_func, dst_fd)
+    self.range_queue.put(prefetched_range)
+    return prefetched_range
+
+  def Shutdown(self):
+    """Stops the reader threads once they finish the ranges they're reading.
+
+    Ranges that haven't been started yet are dropped.
+    """
+    while True:
+      try:
+        self.range_queue.get_nowait()
+      except six.moves.queue.Empty:
+        break
+    for _ in self.threads:
+      self.range_queue.put(None)
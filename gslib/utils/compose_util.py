@@ -0,0 +1,389 @@
+# -*- coding: utf-8 -*-
+# Copyright 2019 Google Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Helper functions for composing more sources than one request allows.
+
+A single compose request accepts a limited number of source objects. To
+compose more sources than that, the sources are split into balanced groups,
+each group is composed into a temporary intermediate object, and the
+intermediate objects are in turn composed until a single request suffices.
+All compose requests within one level of this tree are independent, so they
+are issued in parallel via Command.Apply.
+"""
+
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import division
+from __future__ import unicode_literals
+
+from collections import namedtuple
+from hashlib import md5
+
+import six
+
+from boto import config
+
+import gslib
+from gslib.cloud_api import NotFoundException
+from gslib.exception import CommandException
+from gslib.exception import HashMismatchException
+from gslib.parallel_tracker_file import GenerateComponentObjectPrefix
+from gslib.storage_url import StorageUrlFromString
+from gslib.third_party.storage_apitools import storage_v1_messages as apitools_messages
+from gslib.utils.cloud_api_helper import GetCloudApiInstance
+from gslib.utils.encryption_helper import GetEncryptionKeyWrapper
+from gslib.utils.hashing_helper import Base64ToHexHash
+from gslib.utils.hashing_helper import ConcatCrc32c
+from gslib.utils.unit_util import DivideAndCeil
+
+if six.PY3:
+  long = int
+
+COMPOSE_TEMP_NAMESPACE = (
+    '/gsutil/tmp/compose/for_details_see/gsutil_help_compose/')
+
+COMPOSE_STATIC_SALT = u"""
+COMPOSE_SALT_TO_PREVENT_COLLISIONS.
+Intermediate objects created while composing more than MAX_COMPOSE_ARITY
+sources are named using a hash of this salt and the destination object name,
+prefixed by a random number and COMPOSE_TEMP_NAMESPACE.
+"""
+
+# Fields requested for each intermediate and final composite object. The
+# crc32c and size are needed to verify the next level of the tree.
+COMPOSE_RETURN_FIELDS = ['crc32c', 'generation', 'size']
+
+# Describes one source of a compose request. Everything but object_name may
+# be None; crc32c is an integer (not the base64 string returned by the API) so
+# that it can be combined with ConcatCrc32c.
+ComposeSource = namedtuple('ComposeSource',
+                           'object_name generation crc32c size')
+
+# This tuple is used only to encapsulate the arguments needed for
+# command.Apply() when composing one intermediate object. Note that
+# content_type is used instead of a full apitools Object() because apitools
+# objects are not picklable.
+# index: Position of the intermediate object within its level.
+# bucket_url: CloudUrl for the bucket containing all of the objects.
+# dst_object_name: Name of the intermediate object to create.
+# sources: List of ComposeSource tuples to compose, in order.
+# content_type: Content type for the intermediate object.
+ComposeTreeNodeArgs = namedtuple(
+    'ComposeTreeNodeArgs',
+    'index bucket_url dst_object_name sources content_type')
+
+
+def PartitionComposeSources(num_sources, max_arity):
+  """Splits a list of sources into balanced groups for one compose level.
+
+  Args:
+    num_sources: (int) Number of sources at this level.
+    max_arity: (int) Maximum number of sources in a single compose request.
+
+  Returns:
+    List of (start, end) index tuples, one per group, covering
+    range(num_sources) in order. Group sizes differ by at most one.
+  """
+  num_groups = DivideAndCeil(num_sources, max_arity)
+  base_size, remainder = divmod(num_sources, num_groups)
+  groups = []
+  start = 0
+  for i in range(num_groups):
+    end = start + base_size + (1 if i < remainder else 0)
+    groups.append((start, end))
+    start = end
+  return groups
+
+
+def PlanComposeTree(num_sources, max_arity):
+  """Returns the shape of the compose tree for num_sources sources.
+
+  Args:
+    num_sources: (int) Number of leaf sources to be composed.
+    max_arity: (int) Maximum number of sources in a single compose request.
+
+  Returns:
+    List with one entry per intermediate level, each a list of (start, end)
+    groups as returned by PartitionComposeSources. The final compose into the
+    destination object is not included, so an empty list means that a single
+    compose request suffices.
+  """
+  if max_arity < 2:
+    raise CommandException('Compose arity must be at least 2.')
+  levels = []
+  while num_sources > max_arity:
+    groups = PartitionComposeSources(num_sources, max_arity)
+    levels.append(groups)
+    num_sources = len(groups)
+  return levels
+
+
+def Crc32cFromObjectMetadata(obj_metadata):
+  """Returns the integer CRC32C of an apitools Object, or None if absent."""
+  if obj_metadata is None or not obj_metadata.crc32c:
+    return None
+  return int(Base64ToHexHash(obj_metadata.crc32c), 16)
+
+
+def ComposeSourceFromObjectMetadata(obj_metadata):
+  """Creates a ComposeSource from a (possibly partial) apitools Object."""
+  return ComposeSource(obj_metadata.name, obj_metadata.generation,
+                       Crc32cFromObjectMetadata(obj_metadata),
+                       obj_metadata.size)
+
+
+def ExpectedComposeCrc32c(sources):
+  """Computes the CRC32C of the concatenation of sources.
+
+  Args:
+    sources: Iterable of ComposeSource tuples.
+
+  Returns:
+    Integer CRC32C, or None if any source lacks a CRC32C or size.
+  """
+  crc32c = None
+  for source in sources:
+    if source.crc32c is None or source.size is None:
+      return None
+    if crc32c is None:
+      crc32c = source.crc32c
+    else:
+      crc32c = ConcatCrc32c(crc32c, source.crc32c, long(source.size))
+  return crc32c
+
+
+def _CheckComposedCrc32c(sources, composed_object, dst_object_name):
+  """Raises HashMismatchException if composed_object doesn't match sources."""
+  expected_crc32c = ExpectedComposeCrc32c(sources)
+  actual_crc32c = Crc32cFromObjectMetadata(composed_object)
+  if expected_crc32c is None or actual_crc32c is None:
+    return
+  if expected_crc32c != actual_crc32c:
+    raise HashMismatchException(
+        'CRC32C mismatch for composed object %s: expected %08x, got %08x.' %
+        (dst_object_name, expected_crc32c, actual_crc32c))
+
+
+def _SourceObjectsFromComposeSources(sources):
+  """Converts ComposeSources into ComposeRequest source object entries."""
+  src_objs_metadata = []
+  for source in sources:
+    src_obj_metadata = (
+        apitools_messages.ComposeRequest.SourceObjectsValueListEntry(
+            name=source.object_name))
+    if source.generation:
+      src_obj_metadata.generation = long(source.generation)
+    src_objs_metadata.append(src_obj_metadata)
+  return src_objs_metadata
+
+
+def GenerateIntermediateObjectPrefix(dst_object_name,
+                                     encryption_key_sha256=None):
+  """Generates a collision-resistant name prefix for intermediate objects.
+
+  Args:
+    dst_object_name: Name of the final composite object.
+    encryption_key_sha256: Encryption key SHA256 used for the compose, if any.
+
+  Returns:
+    String prefix; intermediate objects are named prefix + level + '_' + index.
+  """
+  content_md5 = md5()
+  content_md5.update(six.ensure_binary(COMPOSE_STATIC_SALT + dst_object_name))
+  return (GenerateComponentObjectPrefix(
+      encryption_key_sha256=encryption_key_sha256) + COMPOSE_TEMP_NAMESPACE +
+          content_md5.hexdigest() + '_')
+
+
+def _ComposeTreeNodeFn(cls, args, thread_state=None):
+  """Function argument to Apply for composing one intermediate object.
+
+  Args:
+    cls: Calling Command class.
+    args: ComposeTreeNodeArgs tuple describing the intermediate object.
+    thread_state: gsutil Cloud API instance to use for the operation.
+
+  Returns:
+    (index, ComposeSource) for the newly-created intermediate object.
+  """
+  gsutil_api = GetCloudApiInstance(cls, thread_state=thread_state)
+  dst_obj_metadata = apitools_messages.Object(
+      name=args.dst_object_name,
+      bucket=args.bucket_url.bucket_name,
+      contentType=args.content_type)
+  # Intermediate names include a random prefix, so collisions are effectively
+  # impossible; as with parallel composite upload components, preconditions
+  # would only cause retries of a successful request to fail.
+  composed_object = gsutil_api.ComposeObject(
+      _SourceObjectsFromComposeSources(args.sources),
+      dst_obj_metadata,
+      provider=args.bucket_url.scheme,
+      fields=COMPOSE_RETURN_FIELDS,
+      encryption_tuple=GetEncryptionKeyWrapper(config))
+  intermediate = ComposeSource(args.dst_object_name,
+                               composed_object.generation,
+                               Crc32cFromObjectMetadata(composed_object),
+                               composed_object.size)
+  try:
+    _CheckComposedCrc32c(args.sources, composed_object, args.dst_object_name)
+  except HashMismatchException:
+    _DeleteComposeSourceObject(gsutil_api, args.bucket_url, intermediate)
+    raise
+  return (args.index, intermediate)
+
+
+def _DeleteComposeSourceObject(gsutil_api, bucket_url, source):
+  try:
+    gsutil_api.DeleteObject(bucket_url.bucket_name,
+                            source.object_name,
+                            generation=source.generation,
+                            provider=bucket_url.scheme)
+  except NotFoundException:
+    # The object could already be gone if a retry was issued at a lower layer
+    # but the original request succeeded.
+    pass
+
+
+def _DeleteIntermediateObjectFn(cls, args, thread_state=None):
+  """Wrapper func to be used with command.Apply to delete intermediates.
+
+  Args:
+    cls: Calling Command class.
+    args: (bucket_url, ComposeSource) tuple for the object to delete.
+    thread_state: gsutil Cloud API instance to use for the operation.
+  """
+  gsutil_api = GetCloudApiInstance(cls, thread_state=thread_state)
+  (bucket_url, source) = args
+  _DeleteComposeSourceObject(gsutil_api, bucket_url, source)
+
+
+def _ComposeExceptionHandler(cls, e):
+  """Simple exception handler to allow post-completion status."""
+  cls.logger.error(str(e))
+
+
+def _DeleteIntermediateObjects(command_obj, bucket_url, intermediates, logger,
+                               parallel_operations_override):
+  """Deletes intermediate objects, reducing any failures to a warning."""
+  if not intermediates:
+    return
+  try:
+    command_obj.Apply(_DeleteIntermediateObjectFn,
+                      [(bucket_url, source) for source in intermediates],
+                      _ComposeExceptionHandler,
+                      arg_checker=gslib.command.DummyArgChecker,
+                      parallel_operations_override=parallel_operations_override)
+  except Exception:  # pylint: disable=broad-except
+    logger.warn('Failed to delete some of the following temporary objects:\n' +
+                '\n'.join(source.object_name for source in intermediates))
+
+
+def ComposeTree(command_obj,
+                gsutil_api,
+                sources,
+                dst_url,
+                dst_obj_metadata,
+                max_arity,
+                logger,
+                intermediate_prefix=None,
+                preconditions=None,
+                encryption_tuple=None,
+                fields=None,
+                parallel_operations_override=None):
+  """Composes an arbitrary number of sources into dst_url.
+
+  If there are at most max_arity sources, this is a single compose request.
+  Otherwise, the sources are composed level by level into balanced groups of
+  intermediate objects (see PlanComposeTree), running all of the composes of a
+  level in parallel. Each intermediate object's CRC32C is verified against the
+  CRC32Cs of its sources, when known, using ConcatCrc32c, and all intermediate
+  objects are deleted once the final object is composed (or on failure).
+
+  Args:
+    command_obj: Command object (for calling Apply).
+    gsutil_api: gsutil Cloud API instance to use for the final compose.
+    sources: List of ComposeSource tuples, in composition order.
+    dst_url: CloudUrl of the final composite object.
+    dst_obj_metadata: apitools Object describing the final composite object.
+    max_arity: Maximum number of sources in a single compose request.
+    logger: logging.Logger for outputting log messages.
+    intermediate_prefix: Name prefix for intermediate objects. If None, one is
+        generated with GenerateIntermediateObjectPrefix.
+    preconditions: Cloud API Preconditions for the final object.
+    encryption_tuple: CryptoKeyWrapper for the final compose, if any.
+    fields: If present, return only these Object metadata fields of the final
+        object. crc32c and size are always requested.
+    parallel_operations_override: Passed to Apply for each level of
+        intermediate composes.
+
+  Raises:
+    CommandException if any intermediate compose failed.
+    HashMismatchException if the final object's CRC32C is not the CRC32C of
+    the concatenated sources.
+
+  Returns:
+    Composed object metadata for dst_url.
+  """
+  bucket_url = StorageUrlFromString(dst_url.bucket_url_string)
+  if intermediate_prefix is None:
+    intermediate_prefix = GenerateIntermediateObjectPrefix(
+        dst_url.object_name,
+        encryption_key_sha256=(encryption_tuple.crypto_key_sha256
+                               if encryption_tuple else None))
+  levels = PlanComposeTree(len(sources), max_arity)
+  if levels:
+    logger.info(
+        'Composing %d objects using %d level(s) of intermediate objects.',
+        len(sources), len(levels))
+
+  intermediates = []
+  current_level = sources
+  try:
+    for level_num, groups in enumerate(levels):
+      level_args = []
+      for index, (start, end) in enumerate(groups):
+        level_args.append(
+            ComposeTreeNodeArgs(
+                index, bucket_url,
+                '%s%d_%d' % (intermediate_prefix, level_num, index),
+                current_level[start:end], dst_obj_metadata.contentType))
+      results = command_obj.Apply(
+          _ComposeTreeNodeFn,
+          level_args,
+          _ComposeExceptionHandler,
+          arg_checker=gslib.command.DummyArgChecker,
+          parallel_operations_override=parallel_operations_override,
+          should_return_results=True)
+      intermediates.extend(result[1] for result in results)
+      if len(results) != len(level_args):
+        raise CommandException(
+            'Some intermediate compose operations for %s failed. Please retry '
+            'this compose.' % dst_url)
+      current_level = [result[1] for result in sorted(results)]
+
+    requested_fields = None
+    if fields:
+      requested_fields = list(set(fields) | set(['crc32c', 'size']))
+    composed_object = gsutil_api.ComposeObject(
+        _SourceObjectsFromComposeSources(current_level),
+        dst_obj_metadata,
+        preconditions=preconditions,
+        provider=dst_url.scheme,
+        fields=requested_fields,
+        encryption_tuple=encryption_tuple)
+    _CheckComposedCrc32c(current_level, composed_object, dst_url.object_name)
+  finally:
+    _DeleteIntermediateObjects(command_obj, bucket_url, intermediates, logger,
+                               parallel_operations_override)
+  return composed_object
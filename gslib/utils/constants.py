@@ -42,12 +42,18 @@ from gslib.utils.unit_util import ONE_MIB
 DEBUGLEVEL_DUMP_REQUESTS = 3
 DEBUGLEVEL_DUMP_REQUESTS_AND_PAYLOADS = 4
 
+DEFAULT_CAT_RANGE_SIZE = 8 * ONE_MIB
+
 DEFAULT_FILE_BUFFER_SIZE = 8 * ONE_KIB
 
 DEFAULT_GCS_JSON_API_VERSION = 'v1'
 
 DEFAULT_GSUTIL_STATE_DIR = os.path.expanduser(os.path.join('~', '.gsutil'))
 
+DEFAULT_HEDGE_BUDGET_PERCENT = 5
+
+DEFAULT_HEDGE_PERCENTILE = 95
+
 GSUTIL_PUB_TARBALL = 'gs://pub/gsutil.tar.gz'
 
 # Number of seconds to wait before printing a long retry warning message.
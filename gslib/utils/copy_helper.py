@@ -41,11 +41,13 @@ import stat
 import subprocess
 import tempfile
 import textwrap
+import threading
 import time
 import traceback
 
 import six
 from six.moves import xrange
+from six.moves import queue as Queue
 from six.moves import range
 
 from apitools.base.protorpclite import protojson
@@ -67,13 +69,17 @@ from gslib.cloud_api import ResumableUploadAbortException
 from gslib.cloud_api import ResumableUploadException
 from gslib.cloud_api import ResumableUploadStartOverException
 from gslib.cloud_api import ServiceException
+from gslib.commands.compose import MAX_COMPONENT_COUNT
 from gslib.commands.compose import MAX_COMPOSE_ARITY
 from gslib.commands.config import DEFAULT_PARALLEL_COMPOSITE_UPLOAD_COMPONENT_SIZE
+from gslib.commands.config import (
+    DEFAULT_PARALLEL_COMPOSITE_UPLOAD_MAX_COMPONENTS)
 from gslib.commands.config import DEFAULT_PARALLEL_COMPOSITE_UPLOAD_THRESHOLD
 from gslib.commands.config import DEFAULT_SLICED_OBJECT_DOWNLOAD_COMPONENT_SIZE
 from gslib.commands.config import DEFAULT_SLICED_OBJECT_DOWNLOAD_MAX_COMPONENTS
 from gslib.commands.config import DEFAULT_SLICED_OBJECT_DOWNLOAD_THRESHOLD
 from gslib.commands.config import DEFAULT_GZIP_COMPRESSION_LEVEL
+from gslib.commands.config import DEFAULT_MANIFEST_FLUSH_INTERVAL
 from gslib.cs_api_map import ApiSelector
 from gslib.daisy_chain_wrapper import DaisyChainWrapper
 from gslib.exception import CommandException
@@ -100,11 +106,12 @@ from gslib.tracker_file import ENCRYPTION_UPLOAD_TRACKER_ENTRY
 from gslib.tracker_file import GetDownloadStartByte
 from gslib.tracker_file import GetTrackerFilePath
 from gslib.tracker_file import GetUploadTrackerData
-from gslib.tracker_file import RaiseUnwritableTrackerFileException
 from gslib.tracker_file import ReadOrCreateDownloadTrackerFile
+from gslib.tracker_file import ReadTrackerFile
 from gslib.tracker_file import SERIALIZATION_UPLOAD_TRACKER_ENTRY
 from gslib.tracker_file import TrackerFileType
 from gslib.tracker_file import WriteDownloadComponentTrackerFile
+from gslib.tracker_file import WriteTrackerFile
 from gslib.utils import parallelism_framework_util
 from gslib.utils import text_util
 from gslib.utils.boto_util import GetJsonResumableChunkSize
@@ -114,6 +121,8 @@ from gslib.utils.boto_util import ResumableThreshold
 from gslib.utils.boto_util import UsingCrcmodExtension
 from gslib.utils.cloud_api_helper import GetCloudApiInstance
 from gslib.utils.cloud_api_helper import GetDownloadSerializationData
+from gslib.utils.compose_util import ComposeSource
+from gslib.utils.compose_util import ComposeTree
 from gslib.utils.constants import DEFAULT_FILE_BUFFER_SIZE
 from gslib.utils.constants import MIN_SIZE_COMPUTE_LOGGING
 from gslib.utils.constants import UTF8
@@ -141,6 +150,7 @@ from gslib.utils.posix_util import MODE_ATTR
 from gslib.utils.posix_util import MTIME_ATTR
 from gslib.utils.posix_util import ParseAndSetPOSIXAttributes
 from gslib.utils.posix_util import UID_ATTR
+from gslib.utils.rate_limiter import MaybeLimitBandwidth
 from gslib.utils.system_util import CheckFreeSpace
 from gslib.utils.system_util import GetFileSize
 from gslib.utils.system_util import GetStreamFromFileUrl
@@ -994,8 +1004,14 @@ def _PartitionFile(fp,
   parallel_composite_upload_component_size = HumanReadableToBytes(
       config.get('GSUtil', 'parallel_composite_upload_component_size',
                  DEFAULT_PARALLEL_COMPOSITE_UPLOAD_COMPONENT_SIZE))
+  # Components beyond MAX_COMPOSE_ARITY are composed through intermediate
+  # objects, trading a few extra compose requests for more upload parallelism.
+  max_components = min(
+      config.getint('GSUtil', 'parallel_composite_upload_max_components',
+                    DEFAULT_PARALLEL_COMPOSITE_UPLOAD_MAX_COMPONENTS),
+      MAX_COMPONENT_COUNT)
   (num_components, component_size) = _GetPartitionInfo(
-      file_size, MAX_COMPOSE_ARITY, parallel_composite_upload_component_size)
+      file_size, max_components, parallel_composite_upload_component_size)
 
   dst_args = {}  # Arguments to create commands and pass to subprocesses.
   file_names = []  # Used for the 2-step process of forming dst_args.
@@ -1194,22 +1210,28 @@ def _DoParallelCompositeUpload(fp,
     # Sort the components so that they will be composed in the correct order.
     components = sorted(components, key=_GetComponentNumber)
 
-    request_components = []
+    compose_sources = []
     for component_url in components:
-      src_obj_metadata = (
-          apitools_messages.ComposeRequest.SourceObjectsValueListEntry(
-              name=component_url.object_name))
-      if component_url.HasGeneration():
-        src_obj_metadata.generation = long(component_url.generation)
-      request_components.append(src_obj_metadata)
-
-    composed_object = gsutil_api.ComposeObject(
-        request_components,
+      compose_sources.append(
+          ComposeSource(
+              component_url.object_name, component_url.generation, None,
+              components_info.get(component_url.versionless_url_string,
+                                  (None, None))[1]))
+
+    # More than MAX_COMPOSE_ARITY components are composed via intermediate
+    # objects; otherwise this is a single compose request.
+    composed_object = ComposeTree(
+        command_obj,
+        gsutil_api,
+        compose_sources,
+        dst_url,
         dst_obj_metadata,
+        MAX_COMPOSE_ARITY,
+        logger,
         preconditions=preconditions,
-        provider=dst_url.scheme,
+        encryption_tuple=encryption_keywrapper,
         fields=['crc32c', 'generation', 'size'],
-        encryption_tuple=encryption_keywrapper)
+        parallel_operations_override=command_obj.ParallelOverrideReason.SLICE)
 
     try:
       # Make sure only to delete things that we know were successfully
@@ -1775,19 +1797,11 @@ def _UploadFileToObjectResumable(src_url,
     Args:
       serialization_data: Serialization data used in resuming the upload.
     """
-    tracker_file = None
-    try:
-      tracker_file = open(tracker_file_name, 'w')
-      tracker_data = {
-          ENCRYPTION_UPLOAD_TRACKER_ENTRY: encryption_key_sha256,
-          SERIALIZATION_UPLOAD_TRACKER_ENTRY: str(serialization_data)
-      }
-      tracker_file.write(json.dumps(tracker_data))
-    except IOError as e:
-      RaiseUnwritableTrackerFileException(tracker_file_name, e.strerror)
-    finally:
-      if tracker_file:
-        tracker_file.close()
+    tracker_data = {
+        ENCRYPTION_UPLOAD_TRACKER_ENTRY: encryption_key_sha256,
+        SERIALIZATION_UPLOAD_TRACKER_ENTRY: str(serialization_data)
+    }
+    WriteTrackerFile(tracker_file_name, json.dumps(tracker_data))
 
   # This contains the upload URL, which will uniquely identify the
   # destination object.
@@ -2169,6 +2183,10 @@ def _UploadFileToObject(src_url,
                                                   hash_algs, upload_url, logger)
   else:
     wrapped_filestream = upload_stream
+  if not parallel_composite_upload:
+    # Likewise, the components of a parallel composite upload are limited in
+    # the calls to this function that upload them.
+    wrapped_filestream = MaybeLimitBandwidth(wrapped_filestream)
 
   def CallParallelCompositeUpload():
     return _DoParallelCompositeUpload(upload_stream,
@@ -2444,7 +2462,6 @@ def _MaintainSlicedDownloadTrackerFiles(src_obj_metadata, dst_url,
     num_components: The number of components to perform this download with.
   """
   assert src_obj_metadata.etag
-  tracker_file = None
 
   # Only can happen if the resumable threshold is set higher than the
   # parallel transfer threshold.
@@ -2463,14 +2480,12 @@ def _MaintainSlicedDownloadTrackerFiles(src_obj_metadata, dst_url,
     # A parallel resumption should be attempted only if the destination file
     # size is exactly the same as the source size and the tracker file matches.
     if existing_file_size == src_obj_metadata.size:
-      tracker_file = open(tracker_file_name, 'r')
-      tracker_file_data = json.load(tracker_file)
+      tracker_file_data = json.loads(ReadTrackerFile(tracker_file_name))
       if (tracker_file_data['etag'] == src_obj_metadata.etag and
           tracker_file_data['generation'] == src_obj_metadata.generation and
           tracker_file_data['num_components'] == num_components):
         return
       else:
-        tracker_file.close()
         logger.warn('Sliced download tracker file doesn\'t match for '
                     'download of %s. Restarting download from scratch.' %
                     dst_url.object_name)
@@ -2485,23 +2500,17 @@ def _MaintainSlicedDownloadTrackerFiles(src_obj_metadata, dst_url,
   finally:
     if fp:
       fp.close()
-    if tracker_file:
-      tracker_file.close()
 
   # Delete component tracker files to guarantee download starts from scratch.
   DeleteDownloadTrackerFiles(dst_url, api_selector)
 
   # Create a new sliced download tracker file to represent this download.
-  try:
-    with open(tracker_file_name, 'w') as tracker_file:
-      tracker_file_data = {
-          'etag': src_obj_metadata.etag,
-          'generation': src_obj_metadata.generation,
-          'num_components': num_components,
-      }
-      tracker_file.write(json.dumps(tracker_file_data))
-  except IOError as e:
-    RaiseUnwritableTrackerFileException(tracker_file_name, e.strerror)
+  tracker_file_data = {
+      'etag': src_obj_metadata.etag,
+      'generation': src_obj_metadata.generation,
+      'num_components': num_components,
+  }
+  WriteTrackerFile(tracker_file_name, json.dumps(tracker_file_data))
 
 
 class SlicedDownloadFileWrapper(object):
@@ -2882,7 +2891,7 @@ def _DownloadObjectToFileResumable(src_url,
       server_encoding = gsutil_api.GetObjectMedia(
           src_url.bucket_name,
           src_url.object_name,
-          fp,
+          MaybeLimitBandwidth(fp),
           start_byte=download_start_byte,
           end_byte=end_byte,
           compressed_encoding=compressed_encoding,
@@ -2955,7 +2964,7 @@ def _DownloadObjectToFileNonResumable(src_url,
     server_encoding = gsutil_api.GetObjectMedia(
         src_url.bucket_name,
         src_url.object_name,
-        fp,
+        MaybeLimitBandwidth(fp),
         generation=src_url.generation,
         object_size=src_obj_metadata.size,
         download_strategy=CloudApi.DownloadStrategy.ONE_SHOT,
@@ -3661,7 +3670,8 @@ def PerformCopy(logger,
                 gzip_exts=None,
                 is_rsync=False,
                 preserve_posix=False,
-                gzip_encoded=False):
+                gzip_encoded=False,
+                existing_dst_names=None):
   """Performs copy from src_url to dst_url, handling various special cases.
 
   Args:
@@ -3687,6 +3697,9 @@ def PerformCopy(logger,
     gzip_encoded: Whether to use gzip transport encoding for the upload. Used
         in conjunction with gzip_exts. Streaming files compressed is only
         supported on the JSON GCS API.
+    existing_dst_names: Optional no_clobber_util.ExistingObjectNames listing
+        the destination prefix, used instead of a metadata GET to check
+        whether the destination exists when no_clobber is set.
 
   Returns:
     (elapsed_time, bytes_transferred, version-specific dst_url) excluding
@@ -3802,13 +3815,19 @@ def PerformCopy(logger,
     if dst_url.IsFileUrl() and os.path.exists(dst_url.object_name):
       raise ItemExistsError()
     elif dst_url.IsCloudUrl():
-      try:
-        dst_object = gsutil_api.GetObjectMetadata(dst_url.bucket_name,
-                                                  dst_url.object_name,
-                                                  provider=dst_url.scheme)
-      except NotFoundException:
-        dst_object = None
-      if dst_object:
+      if existing_dst_names and existing_dst_names.Covers(dst_url):
+        # The destination prefix was listed up front; objects created since
+        # then are caught by the generation precondition above.
+        dst_exists = existing_dst_names.Contains(dst_url.object_name)
+      else:
+        try:
+          dst_exists = bool(
+              gsutil_api.GetObjectMetadata(dst_url.bucket_name,
+                                           dst_url.object_name,
+                                           provider=dst_url.scheme))
+        except NotFoundException:
+          dst_exists = False
+      if dst_exists:
         raise ItemExistsError()
 
   if dst_url.IsCloudUrl():
@@ -3934,25 +3953,208 @@ def PerformCopy(logger,
       return result
 
 
+# Sentinel put on a manifest's row queue to tell its writer thread to exit.
+_MANIFEST_WRITER_EXIT = 'MANIFEST_WRITER_EXIT'
+
+# Maximum number of rows the manifest writer thread hands to a single
+# writerows call.
+_MANIFEST_WRITER_MAX_BATCH = 1000
+
+# How long the manifest writer thread waits for new rows before checking
+# whether buffered rows are due to be flushed, in seconds.
+_MANIFEST_WRITER_POLL_SECS = 1
+
+_MANIFEST_HEADER_ROW = [
+    'Source',
+    'Destination',
+    'Start',
+    'End',
+    'Md5',
+    'UploadId',
+    'Source Size',
+    'Bytes Transferred',
+    'Result',
+    'Description',
+]
+
+
+def _ManifestSourceDigest(url_string):
+  """Returns the fixed-width digest used to index a manifest source URL."""
+  return md5(six.ensure_binary(url_string, UTF8)).digest()
+
+
+def _OpenManifestFileForAppend(manifest_path):
+  if IS_WINDOWS and six.PY3:
+    return open(manifest_path, 'a', newline='')
+  return open(manifest_path, 'a')
+
+
+class _ManifestSourceIndex(object):
+  """Sorted, packed set of source URLs that a manifest marks as done.
+
+  Resuming from a manifest only needs membership tests, so rather than keeping
+  every source URL string in memory (and pickling all of them to each worker
+  process), this stores one MD5 digest per URL in a single sorted byte string
+  and binary searches it.
+  """
+
+  _DIGEST_LENGTH = 16
+
+  def __init__(self, digests):
+    """Instantiates the index.
+
+    Args:
+      digests: Set of digests, as returned by _ManifestSourceDigest.
+    """
+    self._packed = b''.join(sorted(digests))
+    self._count = len(self._packed) // self._DIGEST_LENGTH
+
+  def __len__(self):
+    return self._count
+
+  def __contains__(self, url_string):
+    target = _ManifestSourceDigest(url_string)
+    low = 0
+    high = self._count
+    while low < high:
+      mid = (low + high) // 2
+      start = mid * self._DIGEST_LENGTH
+      probe = self._packed[start:start + self._DIGEST_LENGTH]
+      if probe < target:
+        low = mid + 1
+      elif probe > target:
+        high = mid
+      else:
+        return True
+    return False
+
+
+class _ManifestWriterThread(threading.Thread):
+  """Appends queued manifest rows to the manifest file in batches.
+
+  Rows are written through a single open file handle and flushed (and
+  optionally fsync'd) at most once per flush interval, instead of reopening
+  the file under a cross-process lock for every row.
+  """
+
+  def __init__(self, row_queue, manifest_path, flush_interval, fsync):
+    """Instantiates the thread.
+
+    Args:
+      row_queue: Queue of manifest rows (lists of strings) to write, terminated
+          by _MANIFEST_WRITER_EXIT.
+      manifest_path: Path of the manifest file to append to.
+      flush_interval: Minimum number of seconds between flushes of buffered
+          rows. 0 flushes after every batch.
+      fsync: If True, fsync the manifest file after each flush.
+    """
+    super(_ManifestWriterThread, self).__init__()
+    self.daemon = True
+    self.row_queue = row_queue
+    self.manifest_path = manifest_path
+    self.flush_interval = flush_interval
+    self.fsync = fsync
+    self.exception = None
+
+  def run(self):
+    try:
+      f = _OpenManifestFileForAppend(self.manifest_path)
+    except IOError as e:
+      self.exception = e
+      self._DiscardRows()
+      return
+
+    writer = csv.writer(f)
+    last_flush_time = time.time()
+    unflushed_rows = False
+    done = False
+    try:
+      while not done:
+        rows = []
+        try:
+          row = self.row_queue.get(timeout=_MANIFEST_WRITER_POLL_SECS)
+          while True:
+            if row == _MANIFEST_WRITER_EXIT:
+              done = True
+              break
+            rows.append(row)
+            if len(rows) >= _MANIFEST_WRITER_MAX_BATCH:
+              break
+            row = self.row_queue.get_nowait()
+        except Queue.Empty:
+          pass
+
+        if rows:
+          writer.writerows(rows)
+          unflushed_rows = True
+        if unflushed_rows and (
+            done or time.time() - last_flush_time >= self.flush_interval):
+          f.flush()
+          if self.fsync:
+            os.fsync(f.fileno())
+          last_flush_time = time.time()
+          unflushed_rows = False
+    except (IOError, OSError) as e:
+      self.exception = e
+      if not done:
+        self._DiscardRows()
+    finally:
+      f.close()
+
+  def _DiscardRows(self):
+    """Drains the queue after a failure so that producers never block."""
+    while self.row_queue.get() != _MANIFEST_WRITER_EXIT:
+      pass
+
+
 class Manifest(object):
-  """Stores the manifest items for the CpCommand class."""
+  """Stores the manifest items for the CpCommand class.
+
+  Workers (threads or processes) report finished items with SetResult, which
+  puts the row on a queue; a writer thread in the process that created the
+  manifest appends the rows to the file. Close must be called once all items
+  have been reported to flush the remaining rows.
+  """
 
   def __init__(self, path):
     # self.items contains a dictionary of rows
     self.items = {}
-    self.manifest_filter = {}
-    self.lock = parallelism_framework_util.CreateLock()
 
     self.manifest_path = os.path.expanduser(path)
-    self._ParseManifest()
+    self.manifest_filter = _ManifestSourceIndex(self._ParseManifest())
     self._CreateManifestFile()
 
+    if CheckMultiprocessingAvailableAndInit().is_available:
+      self.row_queue = parallelism_framework_util.top_level_manager.Queue()
+    else:
+      self.row_queue = Queue.Queue()
+    self._writer_thread = _ManifestWriterThread(
+        self.row_queue,
+        self.manifest_path,
+        config.getint('GSUtil', 'manifest_flush_interval',
+                      DEFAULT_MANIFEST_FLUSH_INTERVAL),
+        config.getbool('GSUtil', 'manifest_fsync', False))
+    self._writer_thread.start()
+
+  def __getstate__(self):
+    # The writer thread only exists in the creating process; copies sent to
+    # worker processes just put rows on the (manager-backed) queue.
+    state = self.__dict__.copy()
+    state['_writer_thread'] = None
+    return state
+
   def _ParseManifest(self):
     """Load and parse a manifest file.
 
     This information will be used to skip any files that have a skip or OK
     status.
+
+    Returns:
+      Set of digests of the source URLs with a skip or OK status.
     """
+    # Duplicates are dropped as rows are read, so memory use depends on the
+    # number of distinct sources rather than the number of rows.
+    digests = set()
     try:
       if os.path.exists(self.manifest_path):
         # Note: we can't use io.open here or CSV reader will become upset
@@ -3973,18 +4175,19 @@ class Manifest(object):
             source = row[source_index]
             result = row[result_index]
             if result in ['OK', 'skip']:
-              # We're always guaranteed to take the last result of a specific
-              # source url.
-              self.manifest_filter[source] = result
+              # A source is skipped if any of its rows succeeded, so
+              # duplicates collapse into a single entry in the index.
+              digests.add(_ManifestSourceDigest(source))
     except IOError:
       raise CommandException('Could not parse %s' % self.manifest_path)
+    return digests
 
   def WasSuccessful(self, src):
     """Returns whether the specified src url was marked as successful."""
     return src in self.manifest_filter
 
   def _CreateManifestFile(self):
-    """Opens the manifest file and assigns it to the file pointer."""
+    """Creates the manifest file and writes its header row, if needed."""
     try:
       if ((not os.path.exists(self.manifest_path)) or
           (os.stat(self.manifest_path).st_size == 0)):
@@ -3992,33 +4195,11 @@ class Manifest(object):
         if six.PY3:
           with open(self.manifest_path, 'w', newline='') as f:
             writer = csv.writer(f)
-            writer.writerow([
-                'Source',
-                'Destination',
-                'Start',
-                'End',
-                'Md5',
-                'UploadId',
-                'Source Size',
-                'Bytes Transferred',
-                'Result',
-                'Description',
-            ])
+            writer.writerow(_MANIFEST_HEADER_ROW)
         else:
           with open(self.manifest_path, 'wb', 1) as f:
             writer = csv.writer(f)
-            writer.writerow([
-                'Source',
-                'Destination',
-                'Start',
-                'End',
-                'Md5',
-                'UploadId',
-                'Source Size',
-                'Bytes Transferred',
-                'Result',
-                'Description',
-            ])
+            writer.writerow(_MANIFEST_HEADER_ROW)
     except IOError:
       raise CommandException('Could not create manifest file.')
 
@@ -4047,8 +4228,27 @@ class Manifest(object):
     self._WriteRowToManifestFile(source_url)
     self._RemoveItemFromManifest(source_url)
 
+  def Close(self):
+    """Writes out all queued rows and stops the writer thread.
+
+    This is a no-op outside of the process that created the manifest, and on
+    repeated calls.
+
+    Raises:
+      CommandException if any row could not be written.
+    """
+    if not self._writer_thread:
+      return
+    self.row_queue.put(_MANIFEST_WRITER_EXIT)
+    self._writer_thread.join()
+    exception = self._writer_thread.exception
+    self._writer_thread = None
+    if exception:
+      raise CommandException('Could not write to manifest file %s: %s' %
+                             (self.manifest_path, exception))
+
   def _WriteRowToManifestFile(self, url):
-    """Writes a manifest entry to the manifest file for the url argument."""
+    """Queues a manifest entry for the url argument to be written."""
     row_item = self.items[url]
     data = [
         row_item['source_uri'],
@@ -4065,16 +4265,9 @@ class Manifest(object):
 
     data = [six.ensure_str(value) for value in data]
 
-    # Aquire a lock to prevent multiple threads writing to the same file at
-    # the same time. This would cause a garbled mess in the manifest file.
-    with self.lock:
-      if IS_WINDOWS and six.PY3:
-        f = open(self.manifest_path, 'a', 1, newline='')
-      else:
-        f = open(self.manifest_path, 'a', 1)  # 1 == line buffered
-      writer = csv.writer(f)
-      writer.writerow(data)
-      f.close()
+    # A single writer thread owns the file, so rows from concurrent workers
+    # can't interleave.
+    self.row_queue.put(data)
 
   def _RemoveItemFromManifest(self, url):
     # Remove the item from the dictionary since we're done with it and
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+# Copyright 2026 Google Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Utility functions for matching names against exclude patterns."""
+
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import division
+from __future__ import unicode_literals
+
+import fnmatch
+import os
+import re
+
+import six
+
+_GLOB_SPECIAL_CHARS = re.compile(r'[*?[]')
+
+# Regex constructs that can make whether a regex matches the start of a string
+# depend on characters past the end of the match.
+_LOOKAHEAD_REGEX = re.compile(r'\$|\\[ZbB]|\(\?[=!]')
+
+
+class GlobMatcher(object):
+  """Matches strings against many glob patterns at once.
+
+  Matches the same strings as calling fnmatch.fnmatch with each pattern, but
+  looks literal patterns and literal prefixes followed by '*' up in sets, and
+  combines all other patterns into a single regex, rather than trying the
+  patterns one at a time.
+  """
+
+  def __init__(self, patterns):
+    """Compiles the patterns.
+
+    Args:
+      patterns: Iterable of glob patterns, as for fnmatch.
+    """
+    self.literals = set()
+    self.prefixes = set()
+    regexes = []
+    for pattern in patterns:
+      pattern = os.path.normcase(six.ensure_text(pattern))
+      if not _GLOB_SPECIAL_CHARS.search(pattern):
+        self.literals.add(pattern)
+      elif (pattern.endswith('*') and
+            not _GLOB_SPECIAL_CHARS.search(pattern[:-1])):
+        self.prefixes.add(pattern[:-1])
+      else:
+        regex = fnmatch.translate(pattern)
+        # Python 2 puts the flags at the end, where they can't be combined.
+        if regex.endswith('(?ms)'):
+          regex = regex[:-len('(?ms)')]
+        regexes.append('(?:%s)' % regex)
+    self.prefix_lengths = sorted(set(len(prefix) for prefix in self.prefixes))
+    self.regex = re.compile('|'.join(regexes), re.S) if regexes else None
+
+  def Matches(self, string):
+    """Returns True if string matches any of the patterns."""
+    string = os.path.normcase(six.ensure_text(string))
+    if string in self.literals:
+      return True
+    for length in self.prefix_lengths:
+      if length > len(string):
+        break
+      if string[:length] in self.prefixes:
+        return True
+    return bool(self.regex and self.regex.match(string))
+
+
+def RegexMatchesAllStartingWith(regex, prefix):
+  """Returns True if regex.match succeeds on every string starting with prefix.
+
+  This is used to skip listing a directory whose contents would all be
+  excluded. It's conservative: for a regex that can look past the end of its
+  match, such as with '$', it returns False.
+
+  Args:
+    regex: Compiled regex.
+    prefix: String to check.
+
+  Returns:
+    True if regex matches every string starting with prefix.
+  """
+  if _LOOKAHEAD_REGEX.search(regex.pattern):
+    return False
+  return bool(regex.match(prefix))
@@ -0,0 +1,252 @@
+# -*- coding: utf-8 -*-
+# Copyright 2026 Google Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Hedged requests, to cut the tail latency of small idempotent requests.
+
+A hedged call starts a request and, if it hasn't completed after a delay,
+starts a duplicate of it, returning whichever completes first. The delay is
+a high percentile of the latencies recently observed for the same kind of
+request, so only the slowest requests are duplicated, and the fraction of
+requests that may be duplicated is capped by a budget.
+
+Requests that are already in flight can't be cancelled, so the slower
+request's thread is left to finish on its own and its result is discarded.
+Requests are made on reusable threads, so that a hedged call only has to start
+a thread when all of those are busy, such as when a hedge is issued.
+"""
+
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import division
+from __future__ import unicode_literals
+
+import collections
+import os
+import sys
+import threading
+import time
+
+import six
+from six.moves import queue as Queue
+
+from gslib.utils.boto_util import GetHedgeBudgetPercent
+from gslib.utils.boto_util import GetHedgePercentile
+from gslib.utils.unit_util import ONE_MIB
+
+# Largest object whose download may be hedged. Each attempt buffers the whole
+# object in memory, and for larger objects transfer time, rather than server
+# latency, dominates.
+MAX_HEDGED_DOWNLOAD_SIZE = ONE_MIB
+
+# Number of recent latencies per kind of request that the hedge delay is
+# computed from.
+_LATENCY_WINDOW_SIZE = 200
+
+# Requests aren't hedged until this many latencies of their kind have been
+# observed, since a percentile of fewer isn't meaningful.
+_MIN_LATENCY_SAMPLES = 20
+
+# Lower bound on the hedge delay, in seconds, so that a burst of fast
+# responses can't make every request look slow.
+MIN_HEDGE_DELAY = 0.01
+
+# Per-process HedgePolicy; see GetHedgePolicy.
+_hedge_policy = None
+_hedge_policy_lock = threading.Lock()
+
+# Per-process _AttemptRunner, and the ID of the process it belongs to; see
+# _GetAttemptRunner.
+_attempt_runner = None
+_attempt_runner_pid = None
+
+
+class HedgePolicy(object):
+  """Thread-safe hedge delays learned from latencies, and a hedging budget.
+
+  A single HedgePolicy is shared by all threads of a process, so that each
+  learns from the latencies the others observe.
+  """
+
+  def __init__(self, percentile=None, budget_percent=None):
+    """Instantiates a HedgePolicy.
+
+    Args:
+      percentile: Percentile of the recent latencies of a kind of request
+          after which a hedge is started. Defaults to
+          GSUtil:hedge_percentile.
+      budget_percent: Maximum percentage of requests that may be hedged.
+          Defaults to GSUtil:hedge_budget_percent.
+    """
+    self.percentile = (percentile
+                       if percentile is not None else GetHedgePercentile())
+    self.budget_percent = (budget_percent if budget_percent is not None else
+                           GetHedgeBudgetPercent())
+    self.lock = threading.Lock()
+    # Maps each kind of request to a deque of its recent latencies.
+    self.latencies = {}
+    self.num_requests = 0
+    self.num_hedges = 0
+
+  def RecordLatency(self, kind, latency):
+    with self.lock:
+      if kind not in self.latencies:
+        self.latencies[kind] = collections.deque(maxlen=_LATENCY_WINDOW_SIZE)
+      self.latencies[kind].append(latency)
+
+  def GetHedgeDelay(self, kind):
+    """Returns seconds to wait before hedging a request, or None to not hedge.
+
+    Also counts the request against the hedging budget.
+
+    Args:
+      kind: Kind of the request, e.g., the name of the API method.
+    """
+    with self.lock:
+      self.num_requests += 1
+      latencies = self.latencies.get(kind)
+      if not latencies or len(latencies) < _MIN_LATENCY_SAMPLES:
+        return None
+      sorted_latencies = sorted(latencies)
+      index = min(
+          len(sorted_latencies) - 1,
+          int(len(sorted_latencies) * self.percentile / 100))
+      return max(MIN_HEDGE_DELAY, sorted_latencies[index])
+
+  def TryStartHedge(self):
+    """Returns True, and charges the budget, if a hedge is within budget."""
+    with self.lock:
+      if (self.num_hedges + 1) * 100 > self.budget_percent * self.num_requests:
+        return False
+      self.num_hedges += 1
+      return True
+
+
+class _AttemptRunner(object):
+  """Runs the attempts of hedged calls on reusable daemon threads.
+
+  A thread that finishes an attempt waits for the next one rather than
+  exiting, and a new thread is only started when every existing one is busy.
+  A thread counts as idle again before it reports its attempt's outcome, so
+  that the next call made after that outcome arrives can reuse it.
+  """
+
+  def __init__(self):
+    self.lock = threading.Lock()
+    self.num_idle = 0
+    self.attempts = Queue.Queue()
+
+  def Run(self, func, callback):
+    """Calls func on an idle thread, starting a new one if none is idle.
+
+    Args:
+      func: Function to call. It must not raise.
+      callback: Function called on the same thread with func's return value.
+    """
+    with self.lock:
+      start_thread = not self.num_idle
+      if not start_thread:
+        self.num_idle -= 1
+    self.attempts.put((func, callback))
+    if start_thread:
+      thread = threading.Thread(target=self._Work)
+      thread.daemon = True
+      thread.start()
+
+  def _Work(self):
+    while True:
+      func, callback = self.attempts.get()
+      outcome = func()
+      with self.lock:
+        self.num_idle += 1
+      callback(outcome)
+
+
+def _GetAttemptRunner():
+  """Returns the _AttemptRunner shared by all threads of this process."""
+  # pylint: disable=global-statement
+  global _attempt_runner, _attempt_runner_pid
+  with _hedge_policy_lock:
+    # Threads don't survive a fork, so a child process needs its own runner.
+    if _attempt_runner is None or _attempt_runner_pid != os.getpid():
+      _attempt_runner = _AttemptRunner()
+      _attempt_runner_pid = os.getpid()
+    return _attempt_runner
+
+
+def GetHedgePolicy():
+  """Returns the HedgePolicy shared by all threads of this process."""
+  global _hedge_policy  # pylint: disable=global-statement
+  with _hedge_policy_lock:
+    if _hedge_policy is None:
+      _hedge_policy = HedgePolicy()
+    return _hedge_policy
+
+
+def HedgedCall(policy, kind, primary_func, hedge_func):
+  """Calls primary_func, and hedge_func if the primary call is slow.
+
+  Args:
+    policy: HedgePolicy to take the hedge delay and budget from.
+    kind: Kind of the request, e.g., the name of the API method.
+    primary_func: Function making the request.
+    hedge_func: Function making a duplicate of the request. It must not share
+        any state with primary_func that's unsafe to use from two threads.
+
+  Returns:
+    (result, hedge_won): The result of the first call to complete
+    successfully, and whether that was the hedge. If both calls fail, the
+    first exception is raised.
+  """
+  delay = policy.GetHedgeDelay(kind)
+  results = Queue.Queue()
+
+  def _Call(func, is_hedge):
+    start_time = time.time()
+    try:
+      result = func()
+    except Exception:  # pylint: disable=broad-except
+      return is_hedge, False, sys.exc_info()
+    policy.RecordLatency(kind, time.time() - start_time)
+    return is_hedge, True, result
+
+  if delay is None:
+    # Nothing to learn the delay from yet; call synchronously.
+    start_time = time.time()
+    result = primary_func()
+    policy.RecordLatency(kind, time.time() - start_time)
+    return result, False
+
+  runner = _GetAttemptRunner()
+  runner.Run(lambda: _Call(primary_func, False), results.put)
+
+  num_started = 1
+  try:
+    first = results.get(timeout=delay)
+  except Queue.Empty:
+    first = None
+  if first is None:
+    if policy.TryStartHedge():
+      runner.Run(lambda: _Call(hedge_func, True), results.put)
+      num_started = 2
+    first = results.get()
+
+  is_hedge, succeeded, value = first
+  if succeeded:
+    return value, is_hedge
+  if num_started == 2:
+    is_hedge, succeeded, second_value = results.get()
+    if succeeded:
+      return second_value, is_hedge
+  # Raise the first exception with its original traceback.
+  six.reraise(*value)
@@ -19,23 +19,36 @@ from __future__ import print_function
 from __future__ import division
 from __future__ import unicode_literals
 
-import fnmatch
+import collections
+import heapq
+import itertools
 import sys
+import threading
 
 import six
+from gslib.bucket_listing_ref import BucketListingPrefix
 from gslib.cloud_api import EncryptionException
 from gslib.exception import CommandException
 from gslib.plurality_checkable_iterator import PluralityCheckableIterator
+from gslib.storage_url import ContainsWildcard
 from gslib.storage_url import GenerationFromUrlAndString
 from gslib.utils.constants import S3_ACL_MARKER_GUID
 from gslib.utils.constants import S3_DELETE_MARKER_GUID
 from gslib.utils.constants import S3_MARKER_GUIDS
 from gslib.utils.constants import UTF8
+from gslib.utils.exclusion_util import GlobMatcher
 from gslib.utils.system_util import IS_WINDOWS
 from gslib.utils.translation_helper import AclTranslation
 from gslib.utils import text_util
 from gslib.wildcard_iterator import StorageUrlFromString
 
+# Maximum number of entries of a prefix listing fetched ahead of the traversal;
+# larger prefixes are listed by the traversal itself, as it reaches them.
+MAX_PREFETCHED_LISTING_SIZE = 5000
+
+# Number of entries a flat listing shard hands to the traversal at a time.
+_FLAT_LISTING_CHUNK_SIZE = 100
+
 ENCRYPTED_FIELDS = [
     'md5Hash',
     'crc32c',
@@ -302,7 +315,10 @@ class LsHelper(object):
                should_recurse=False,
                exclude_patterns=None,
                fields=('name',),
-               list_subdir_contents=True):
+               list_subdir_contents=True,
+               num_threads=1,
+               create_gsutil_api_func=None,
+               flat_listing=False):
     """Initializes the helper class to prepare for listing.
 
     Args:
@@ -332,6 +348,20 @@ class LsHelper(object):
                          listing fields.
       list_subdir_contents: If true, return the directory and any contents,
                             otherwise return only the directory itself.
+      num_threads:       Number of threads listing prefixes ahead of the
+                         recursive traversal. Output is the same regardless.
+      create_gsutil_api_func: Function returning a new gsutil Cloud API
+                              instance, for each listing thread to pass to
+                              iterator_func as its gsutil_api argument.
+                              Required if num_threads > 1.
+      flat_listing:      If true, recursively list each prefix with a single
+                         flat listing of the objects under it, deriving
+                         subdirectories from object names, rather than with
+                         one delimited listing per subdirectory. Entries are
+                         then output in object name order, with each
+                         directory's summary following its contents. With
+                         num_threads > 1, the flat listing is split by
+                         subdirectory, and the parts listed in parallel.
     """
     self._iterator_func = iterator_func
     self.logger = logger
@@ -344,8 +374,14 @@ class LsHelper(object):
     self.all_versions = all_versions
     self.should_recurse = should_recurse
     self.exclude_patterns = exclude_patterns
+    self._exclude_matcher = (GlobMatcher(exclude_patterns)
+                             if exclude_patterns else None)
     self.bucket_listing_fields = fields
     self.list_subdir_contents = list_subdir_contents
+    self.num_threads = num_threads
+    self.create_gsutil_api_func = create_gsutil_api_func
+    self.flat_listing = flat_listing
+    self._prefetcher = None
 
   def ExpandUrlAndPrint(self, url):
     """Iterates over the given URL and calls print functions.
@@ -365,8 +401,17 @@ class LsHelper(object):
       # IsBucket() implies a top-level listing.
       if url.IsBucket():
         self._print_bucket_header_func(url)
-      return self._RecurseExpandUrlAndPrint(url.url_string,
-                                            print_initial_newline=False)
+      if (self.should_recurse and self.num_threads > 1 and
+          not self.flat_listing):
+        self._prefetcher = _ListingPrefetcher(self, self.num_threads)
+        self._prefetcher.Schedule(url.url_string, ())
+      try:
+        return self._RecurseExpandUrlAndPrint(url.url_string,
+                                              print_initial_newline=False)
+      finally:
+        if self._prefetcher:
+          self._prefetcher.Shutdown()
+          self._prefetcher = None
     else:
       # User provided a prefix or object URL, but it's impossible to tell
       # which until we do a listing and see what matches.
@@ -422,7 +467,29 @@ class LsHelper(object):
         num_bytes += nb
       return num_dirs, num_objects, num_bytes
 
-  def _RecurseExpandUrlAndPrint(self, url_str, print_initial_newline=True):
+  def _IterListing(self, url_str, gsutil_api=None):
+    """Yields the BucketListingRefs of a listing of url_str."""
+    if gsutil_api:
+      iterator = self._iterator_func('%s' % url_str,
+                                     all_versions=self.all_versions,
+                                     gsutil_api=gsutil_api)
+    else:
+      iterator = self._iterator_func('%s' % url_str,
+                                     all_versions=self.all_versions)
+    return iterator.IterAll(expand_top_level_buckets=True,
+                            bucket_listing_fields=self.bucket_listing_fields)
+
+  def _IterSubdirUrls(self, blrs):
+    """Yields the URL strings that recursion expands prefixes of blrs to."""
+    for blr in blrs:
+      if blr.IsPrefix() and not self._MatchesExcludedPattern(blr):
+        yield StorageUrlFromString(
+            blr.url_string).CreatePrefixUrl(wildcard_suffix='*')
+
+  def _RecurseExpandUrlAndPrint(self,
+                                url_str,
+                                print_initial_newline=True,
+                                listing_key=()):
     """Iterates over the given URL string and calls print functions.
 
     Args:
@@ -430,17 +497,29 @@ class LsHelper(object):
                Must be of depth one or higher.
       print_initial_newline: If true, print a newline before recursively
                              expanded prefixes.
+      listing_key: Tuple of the indices of the prefixes leading to url_str in
+                   their parents' listings, which orders listings the way the
+                   traversal reaches them.
 
     Returns:
       (num_objects, num_bytes) total number of objects and bytes iterated.
     """
+    if self.should_recurse and self.flat_listing:
+      url = StorageUrlFromString(url_str)
+      if url.IsBucket() or (url.IsObject() and
+                            url.object_name.endswith('/*') and
+                            not ContainsWildcard(url.object_name[:-1])):
+        return self._FlatExpandUrlAndPrint(url, print_initial_newline)
+
     num_objects = 0
     num_dirs = 0
     num_bytes = 0
-    for blr in self._iterator_func(
-        '%s' % url_str, all_versions=self.all_versions).IterAll(
-            expand_top_level_buckets=True,
-            bucket_listing_fields=self.bucket_listing_fields):
+    if self._prefetcher:
+      listing = self._prefetcher.GetListing(url_str, listing_key)
+    else:
+      listing = self._IterListing(url_str)
+    num_subdirs = 0
+    for blr in listing:
       if self._MatchesExcludedPattern(blr):
         continue
 
@@ -457,7 +536,9 @@ class LsHelper(object):
           expansion_url_str = StorageUrlFromString(
               blr.url_string).CreatePrefixUrl(wildcard_suffix='*')
 
-          nd, no, nb = self._RecurseExpandUrlAndPrint(expansion_url_str)
+          nd, no, nb = self._RecurseExpandUrlAndPrint(
+              expansion_url_str, listing_key=listing_key + (num_subdirs,))
+          num_subdirs += 1
           self._print_dir_summary_func(nb, blr)
         else:
           nd, no, nb = 1, 0, 0
@@ -472,6 +553,107 @@ class LsHelper(object):
 
     return num_dirs, num_objects, num_bytes
 
+  def _FlatExpandUrlAndPrint(self, url, print_initial_newline=True):
+    """Like _RecurseExpandUrlAndPrint, but with a single flat listing.
+
+    Args:
+      url: StorageUrl of a bucket, or of a prefix followed by '/*'.
+      print_initial_newline: If true, print a newline before the first
+                             subdirectory.
+
+    Returns:
+      (num_dirs, num_objects, num_bytes) total number of directories, objects
+      and bytes iterated.
+    """
+    prefix = '' if url.IsBucket() else url.object_name[:-1]
+    # Directories whose contents are being listed, innermost last.
+    open_dirs = [_FlatListingDir(prefix, None, print_initial_newline)]
+    excluded_dir_name = None
+    for blr in self._IterFlatListing(url.bucket_url_string, prefix):
+      name = blr.storage_url.object_name
+      if excluded_dir_name is not None:
+        if name.startswith(excluded_dir_name):
+          continue
+        excluded_dir_name = None
+      while not name.startswith(open_dirs[-1].name):
+        self._CloseFlatListingDir(open_dirs)
+      dir_end = name.find('/', len(open_dirs[-1].name))
+      while dir_end != -1:
+        dir_name = name[:dir_end + 1]
+        dir_blr = BucketListingPrefix(StorageUrlFromString(
+            url.bucket_url_string + dir_name),
+                                      root_object=dir_name)
+        if self._MatchesExcludedPattern(dir_blr):
+          excluded_dir_name = dir_name
+          break
+        if open_dirs[-1].print_newline:
+          self._print_newline_func()
+        else:
+          open_dirs[-1].print_newline = True
+        self._print_dir_header_func(dir_blr)
+        open_dirs.append(_FlatListingDir(dir_name, dir_blr))
+        dir_end = name.find('/', dir_end + 1)
+      if excluded_dir_name is not None or self._MatchesExcludedPattern(blr):
+        continue
+      no, nb = self._print_object_func(blr)
+      open_dirs[-1].num_objects += no
+      open_dirs[-1].num_bytes += nb
+    while len(open_dirs) > 1:
+      self._CloseFlatListingDir(open_dirs)
+    return 0, open_dirs[0].num_objects, open_dirs[0].num_bytes
+
+  def _CloseFlatListingDir(self, open_dirs):
+    """Prints the summary of the innermost open directory and closes it."""
+    closed_dir = open_dirs.pop()
+    self._print_dir_summary_func(closed_dir.num_bytes, closed_dir.blr)
+    open_dirs[-1].num_objects += closed_dir.num_objects
+    open_dirs[-1].num_bytes += closed_dir.num_bytes
+
+  def _IterFlatListing(self, bucket_url_str, prefix):
+    """Yields the objects under prefix in name order.
+
+    With num_threads > 1, the objects directly under prefix are listed
+    first, and the objects under each of its subdirectories are listed on a
+    pool of threads. If prefix has too many entries to sort, or no
+    subdirectories, it's listed with a single flat listing instead.
+
+    Args:
+      bucket_url_str: URL string of the bucket to list.
+      prefix: Object name prefix to list the objects under.
+
+    Yields:
+      BucketListingRefs of the objects.
+    """
+    if self.num_threads <= 1:
+      for blr in self._IterListing(bucket_url_str + prefix + '**'):
+        yield blr
+      return
+    entries = list(
+        itertools.islice(self._IterListing(bucket_url_str + prefix + '*'),
+                         MAX_PREFETCHED_LISTING_SIZE + 1))
+    if (len(entries) > MAX_PREFETCHED_LISTING_SIZE or
+        not any(blr.IsPrefix() for blr in entries)):
+      for blr in self._IterListing(bucket_url_str + prefix + '**'):
+        yield blr
+      return
+    # Delimited listings return each page's objects before its prefixes.
+    entries.sort(key=lambda blr: blr.storage_url.object_name)
+    shard_url_strs = [
+        bucket_url_str + blr.storage_url.object_name + '**'
+        for blr in entries
+        if blr.IsPrefix() and not self._MatchesExcludedPattern(blr)
+    ]
+    shards = _FlatListingShards(self, shard_url_strs, self.num_threads)
+    try:
+      for blr in entries:
+        if blr.IsObject():
+          yield blr
+        elif not self._MatchesExcludedPattern(blr):
+          for shard_blr in shards.IterNextShard():
+            yield shard_blr
+    finally:
+      shards.Shutdown()
+
   def _MatchesExcludedPattern(self, blr):
     """Checks bucket listing reference against patterns to exclude.
 
@@ -481,9 +663,322 @@ class LsHelper(object):
     Returns:
       True if reference matches a pattern and should be excluded.
     """
-    if self.exclude_patterns:
-      tomatch = six.ensure_str(blr.url_string)
-      for pattern in self.exclude_patterns:
-        if fnmatch.fnmatch(tomatch, six.ensure_str(pattern)):
-          return True
+    if self._exclude_matcher:
+      return self._exclude_matcher.Matches(blr.url_string)
     return False
+
+
+class _FlatListingDir(object):
+  """A directory of a flat listing whose contents are being listed."""
+
+  def __init__(self, name, blr, print_newline=True):
+    self.name = name
+    self.blr = blr
+    self.print_newline = print_newline
+    self.num_objects = 0
+    self.num_bytes = 0
+
+
+class _FlatListingShard(object):
+  """A part of a flat listing, listed by a _FlatListingShards thread."""
+
+  def __init__(self, url_str):
+    self.url_str = url_str
+    # Chunks of BucketListingRefs listed but not yet taken by the traversal.
+    self.chunks = collections.deque()
+    self.num_buffered = 0
+    self.done = False
+    self.exc_info = None
+
+
+class _FlatListingShards(object):
+  """Lists the parts of a flat listing on a pool of threads.
+
+  The traversal takes the parts in order. Threads list the parts in the
+  same order, at most num_threads parts ahead of the traversal, each
+  buffering at most MAX_PREFETCHED_LISTING_SIZE entries for it.
+  """
+
+  def __init__(self, ls_helper, url_strs, num_threads):
+    """Starts the listing threads.
+
+    Args:
+      ls_helper: LsHelper whose traversal to list for.
+      url_strs: URL strings of the parts of the listing, in order.
+      num_threads: Number of listing threads.
+    """
+    self.ls_helper = ls_helper
+    self.shards = [_FlatListingShard(url_str) for url_str in url_strs]
+    self.num_threads = num_threads
+    # Guards and signals changes to all of the following.
+    self.cond = threading.Condition()
+    # Index of the next shard to list.
+    self.next_shard = 0
+    # Number of shards the traversal has finished taking.
+    self.num_taken = 0
+    self.shutting_down = False
+    for _ in range(min(num_threads, len(self.shards))):
+      thread = threading.Thread(target=self._ListShards)
+      thread.daemon = True
+      thread.start()
+
+  def _ListShards(self):
+    gsutil_api = None
+    while True:
+      with self.cond:
+        while (not self.shutting_down and
+               self.next_shard < len(self.shards) and
+               self.next_shard >= self.num_taken + self.num_threads):
+          self.cond.wait()
+        if self.shutting_down or self.next_shard >= len(self.shards):
+          return
+        shard = self.shards[self.next_shard]
+        self.next_shard += 1
+      try:
+        if gsutil_api is None:
+          gsutil_api = self.ls_helper.create_gsutil_api_func()
+        chunk = []
+        for blr in self.ls_helper._IterListing(shard.url_str, gsutil_api):
+          chunk.append(blr)
+          if len(chunk) >= _FLAT_LISTING_CHUNK_SIZE:
+            if not self._AddChunk(shard, chunk):
+              return
+            chunk = []
+        if not self._AddChunk(shard, chunk, done=True):
+          return
+      except Exception:  # pylint: disable=broad-except
+        with self.cond:
+          shard.exc_info = sys.exc_info()
+          shard.done = True
+          self.cond.notify_all()
+
+  def _AddChunk(self, shard, chunk, done=False):
+    """Buffers a chunk of shard for the traversal, once there's room.
+
+    Returns:
+      False if shutting down, else True.
+    """
+    with self.cond:
+      while (not self.shutting_down and
+             shard.num_buffered >= MAX_PREFETCHED_LISTING_SIZE):
+        self.cond.wait()
+      if self.shutting_down:
+        return False
+      if chunk:
+        shard.chunks.append(chunk)
+        shard.num_buffered += len(chunk)
+      shard.done = done
+      self.cond.notify_all()
+      return True
+
+  def IterNextShard(self):
+    """Yields the BucketListingRefs of the next part of the listing."""
+    shard = self.shards[self.num_taken]
+    while True:
+      with self.cond:
+        while not shard.chunks and not shard.done:
+          # Wakes up periodically so that Python 2 can handle signals.
+          self.cond.wait(1)
+        if shard.chunks:
+          chunk = shard.chunks.popleft()
+          shard.num_buffered -= len(chunk)
+          self.cond.notify_all()
+        elif shard.exc_info:
+          six.reraise(*shard.exc_info)
+        else:
+          self.num_taken += 1
+          self.cond.notify_all()
+          return
+      for blr in chunk:
+        yield blr
+
+  def Shutdown(self):
+    """Stops the listing threads, abandoning any listings in progress."""
+    with self.cond:
+      self.shutting_down = True
+      self.cond.notify_all()
+
+
+class _PrefetchedListing(object):
+  """A prefix listing scheduled by a _ListingPrefetcher."""
+
+  QUEUED = 'queued'
+  LISTING = 'listing'
+  DONE = 'done'
+  # Dropped for being too large or failing; the traversal lists it itself.
+  DROPPED = 'dropped'
+  # Taken by the traversal before a thread started listing it.
+  TAKEN = 'taken'
+
+  def __init__(self, url_str, key):
+    self.url_str = url_str
+    self.key = key
+    self.state = self.QUEUED
+    self.blrs = None
+
+
+class _ListingPrefetcher(object):
+  """Lists prefixes on a pool of threads ahead of LsHelper's traversal.
+
+  The traversal itself stays sequential, so output order and totals are
+  unchanged; it just finds most listings already fetched when it reaches
+  them. Each listing that a thread fetches schedules the listings of its
+  subdirectories, and threads fetch scheduled listings in the order the
+  traversal will reach them. At most 2 * num_threads listings are being
+  fetched or waiting to be used at once, each holding at most
+  MAX_PREFETCHED_LISTING_SIZE entries.
+  """
+
+  def __init__(self, ls_helper, num_threads):
+    """Starts the listing threads.
+
+    Args:
+      ls_helper: LsHelper whose traversal to list prefixes for.
+      num_threads: Number of listing threads.
+    """
+    self.ls_helper = ls_helper
+    self.max_active = 2 * num_threads
+    # Guards and signals changes to all of the following.
+    self.cond = threading.Condition()
+    # Maps URL strings to their scheduled _PrefetchedListings.
+    self.listings = {}
+    # Heap of (key, url_str) of queued listings.
+    self.queue = []
+    # Number of listings being fetched or waiting to be used.
+    self.num_active = 0
+    self.shutting_down = False
+    self.threads = []
+    for _ in range(num_threads):
+      thread = threading.Thread(target=self._ListPrefixes)
+      thread.daemon = True
+      thread.start()
+      self.threads.append(thread)
+
+  def Schedule(self, url_str, key):
+    """Queues a listing of url_str.
+
+    Args:
+      url_str: URL string to list.
+      key: Listing key of url_str, as for _RecurseExpandUrlAndPrint.
+    """
+    with self.cond:
+      if url_str not in self.listings:
+        self.listings[url_str] = _PrefetchedListing(url_str, key)
+        heapq.heappush(self.queue, (key, url_str))
+        self.cond.notify_all()
+
+  def _ListPrefixes(self):
+    gsutil_api = None
+    while True:
+      with self.cond:
+        listing = None
+        while not self.shutting_down:
+          if self.queue and self.num_active < self.max_active:
+            _, url_str = heapq.heappop(self.queue)
+            listing = self.listings.get(url_str)
+            if listing and listing.state == _PrefetchedListing.QUEUED:
+              break
+            listing = None
+          else:
+            self.cond.wait()
+        if not listing:
+          return
+        listing.state = _PrefetchedListing.LISTING
+        self.num_active += 1
+      blrs = []
+      try:
+        if gsutil_api is None:
+          gsutil_api = self.ls_helper.create_gsutil_api_func()
+        for blr in self.ls_helper._IterListing(listing.url_str, gsutil_api):
+          if len(blrs) >= MAX_PREFETCHED_LISTING_SIZE:
+            blrs = None
+            break
+          blrs.append(blr)
+      except Exception:  # pylint: disable=broad-except
+        # The traversal lists the prefix again itself, raising the error
+        # there if it recurs.
+        blrs = None
+      with self.cond:
+        if blrs is None:
+          listing.state = _PrefetchedListing.DROPPED
+        else:
+          listing.state = _PrefetchedListing.DONE
+          listing.blrs = blrs
+          self._ScheduleSubdirs(blrs, listing.key)
+        self.cond.notify_all()
+
+  def GetListing(self, url_str, key):
+    """Returns the entries of a listing of url_str, for the traversal.
+
+    Args:
+      url_str: URL string to list.
+      key: Listing key of url_str, as for _RecurseExpandUrlAndPrint.
+
+    Returns:
+      Iterable of BucketListingRefs. If url_str wasn't fetched ahead, it's
+      listed here, as it's iterated.
+    """
+    with self.cond:
+      listing = self.listings.get(url_str)
+      if listing and listing.state == _PrefetchedListing.QUEUED:
+        # Don't wait for a thread to free up; list it here instead.
+        listing.state = _PrefetchedListing.TAKEN
+      while listing and listing.state == _PrefetchedListing.LISTING:
+        # Wakes up periodically so that Python 2 can handle signals.
+        self.cond.wait(1)
+      self.listings.pop(url_str, None)
+      if listing and listing.state in (_PrefetchedListing.DONE,
+                                       _PrefetchedListing.DROPPED):
+        self.num_active -= 1
+        self.cond.notify_all()
+      if listing and listing.state == _PrefetchedListing.DONE:
+        return listing.blrs
+    return self._IterAndScheduleSubdirs(url_str, key)
+
+  def _ScheduleSubdirs(self, blrs, key, first_index=0):
+    """Schedules the listings of the subdirectories of blrs.
+
+    Args:
+      blrs: Iterable of BucketListingRefs from a listing.
+      key: Listing key of the listing.
+      first_index: Index of the first subdirectory of blrs in the listing.
+
+    Returns:
+      Index of the next subdirectory in the listing.
+    """
+    index = first_index
+    if self.ls_helper.should_recurse:
+      for subdir_url_str in self.ls_helper._IterSubdirUrls(blrs):
+        self.Schedule(subdir_url_str, key + (index,))
+        index += 1
+    return index
+
+  def _IterAndScheduleSubdirs(self, url_str, key):
+    """Lists url_str on this thread, scheduling the listings of subdirectories.
+
+    Like the listing threads, this fetches the start of the listing before
+    yielding anything, so that the first subdirectories' siblings are listed
+    while the traversal descends into them; the rest of a large listing is
+    yielded as it's fetched.
+
+    Args:
+      url_str: URL string to list.
+      key: Listing key of url_str.
+
+    Yields:
+      BucketListingRefs of the listing.
+    """
+    listing_iter = iter(self.ls_helper._IterListing(url_str))
+    blrs = list(itertools.islice(listing_iter, MAX_PREFETCHED_LISTING_SIZE))
+    subdir_index = self._ScheduleSubdirs(blrs, key)
+    for blr in blrs:
+      yield blr
+    for blr in listing_iter:
+      subdir_index = self._ScheduleSubdirs([blr], key, subdir_index)
+      yield blr
+
+  def Shutdown(self):
+    """Stops the listing threads once they finish their current listings."""
+    with self.cond:
+      self.shutting_down = True
+      self.cond.notify_all()
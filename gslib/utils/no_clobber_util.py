@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+# Copyright 2026 Google Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Helpers for checking destination existence for no-clobber copies."""
+
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import division
+from __future__ import unicode_literals
+
+import os
+import shutil
+import tempfile
+import threading
+
+import six
+
+from gslib.cloud_api import CloudApi
+from gslib.cloud_api import ServiceException
+from gslib.storage_url import StorageUrlFromString
+
+# pylint: disable=g-import-not-at-top
+try:
+  # Not all Python builds include sqlite3; without it, listings that don't fit
+  # in memory are abandoned and existence is checked per object.
+  import sqlite3
+except ImportError:
+  sqlite3 = None
+# pylint: enable=g-import-not-at-top
+
+# Number of object names held in memory before the names are moved to a
+# temporary database on disk.
+MAX_IN_MEMORY_NAMES = 100000
+
+# Number of object names per page of a listing. Listing costs one request per
+# page, and each copy that the listing answers existence for saves a metadata
+# GET, so a listing is only worth as many pages as there are copies.
+NAMES_PER_LISTING_PAGE = 1000
+
+# Number of object names listed before giving up on the listing, however many
+# copies there are.
+MAX_LISTED_NAMES = 10000000
+
+# Number of names inserted into the database per transaction.
+_SPILL_BATCH_SIZE = 10000
+
+
+class _ListingTooLargeError(Exception):
+  """Raised when a destination listing exceeds MAX_LISTED_NAMES."""
+
+
+class ExistingObjectNames(object):
+  """Names of the existing objects under a destination prefix.
+
+  Names are kept in a set until there are more than max_in_memory of them,
+  after which all names are moved into a temporary SQLite database. SQLite
+  connections may not be shared across threads or forked processes, so a
+  connection is opened per (process, thread) for lookups.
+  """
+
+  def __init__(self, bucket_url, prefix, max_in_memory=MAX_IN_MEMORY_NAMES):
+    """Creates an empty set of names.
+
+    Args:
+      bucket_url: StorageUrl of the bucket that was listed.
+      prefix: Object name prefix that was listed.
+      max_in_memory: Number of names to hold in memory before spilling to disk.
+    """
+    self.bucket_url = bucket_url
+    self.prefix = prefix
+    self.max_in_memory = max_in_memory
+    self.names = set()
+    self.tmp_dir = None
+    self.db_path = None
+    self._local = threading.local()
+    self._owner_pid = os.getpid()
+
+  def AddAll(self, names):
+    """Adds names from an iterable.
+
+    Args:
+      names: Iterable of object names.
+
+    Returns:
+      False if the names had to be abandoned to stay within the memory bound.
+    """
+    for name in names:
+      self.names.add(name)
+      if len(self.names) > self.max_in_memory:
+        if sqlite3 is None:
+          return False
+        self._Spill()
+    if self.db_path:
+      self._Spill()
+    return True
+
+  def _Spill(self):
+    """Moves the names held in memory to the database."""
+    conn = self._GetConnection()
+    names = sorted(self.names)
+    self.names = set()
+    with conn:
+      for i in range(0, len(names), _SPILL_BATCH_SIZE):
+        conn.executemany('INSERT OR IGNORE INTO names (name) VALUES (?)',
+                         ((name,) for name in names[i:i + _SPILL_BATCH_SIZE]))
+
+  def _GetConnection(self):
+    conn = getattr(self._local, 'conn', None)
+    if conn is None or self._local.pid != os.getpid():
+      if not self.db_path:
+        self.tmp_dir = tempfile.mkdtemp(prefix='gsutil-noclobber-')
+        self.db_path = os.path.join(self.tmp_dir, 'names.sqlite3')
+      conn = sqlite3.connect(self.db_path)
+      conn.execute('PRAGMA journal_mode=OFF')
+      conn.execute('PRAGMA synchronous=OFF')
+      conn.execute('CREATE TABLE IF NOT EXISTS names (name TEXT PRIMARY KEY)')
+      self._local.conn = conn
+      self._local.pid = os.getpid()
+    return conn
+
+  def Covers(self, url):
+    """Returns True if url's existence can be answered from this listing."""
+    return (url.IsCloudUrl() and url.scheme == self.bucket_url.scheme and
+            url.bucket_name == self.bucket_url.bucket_name and
+            not url.HasGeneration() and url.object_name.startswith(self.prefix))
+
+  def Contains(self, name):
+    """Returns True if an object with this name existed when listed."""
+    if not self.db_path:
+      return name in self.names
+    return self._GetConnection().execute(
+        'SELECT 1 FROM names WHERE name = ?', (name,)).fetchone() is not None
+
+  def Close(self):
+    """Deletes the temporary database, if any."""
+    if self.tmp_dir and os.getpid() == self._owner_pid:
+      conn = getattr(self._local, 'conn', None)
+      if conn is not None:
+        conn.close()
+        self._local.conn = None
+      shutil.rmtree(self.tmp_dir, ignore_errors=True)
+      self.tmp_dir = None
+
+
+def GetMaxListedNames(num_copies):
+  """Returns how many names are worth listing to check num_copies copies."""
+  return min(MAX_LISTED_NAMES, num_copies * NAMES_PER_LISTING_PAGE)
+
+
+def ListExistingObjectNames(gsutil_api,
+                            dst_url,
+                            logger,
+                            max_in_memory=MAX_IN_MEMORY_NAMES,
+                            max_listed=MAX_LISTED_NAMES):
+  """Lists the names of the objects under a destination prefix.
+
+  Used by cp -n and mv -n with many sources, so that destination existence can
+  be checked locally rather than with a metadata GET per object. Objects
+  created after the listing are still protected by the ifGenerationMatch=0
+  precondition sent with each write.
+
+  Args:
+    gsutil_api: gsutil Cloud API instance to list with.
+    dst_url: Destination StorageUrl; objects whose names start with its object
+        name are listed.
+    logger: logging.Logger for debug messages.
+    max_in_memory: Number of names to hold in memory before spilling to disk.
+    max_listed: Number of names past which the listing is abandoned.
+
+  Returns:
+    ExistingObjectNames, or None if the listing failed or was abandoned, in
+    which case existence should be checked per object.
+  """
+  bucket_url = StorageUrlFromString(dst_url.bucket_url_string)
+  prefix = '' if dst_url.IsBucket() else dst_url.object_name
+  existing_names = ExistingObjectNames(bucket_url,
+                                       prefix,
+                                       max_in_memory=max_in_memory)
+
+  def _IterNames():
+    for i, obj_or_prefix in enumerate(
+        gsutil_api.ListObjects(dst_url.bucket_name,
+                               prefix=prefix or None,
+                               provider=dst_url.scheme,
+                               fields=['items/name'])):
+      if i >= max_listed:
+        raise _ListingTooLargeError()
+      if obj_or_prefix.datatype == CloudApi.CsObjectOrPrefixType.OBJECT:
+        yield six.ensure_text(obj_or_prefix.data.name)
+
+  try:
+    if existing_names.AddAll(_IterNames()):
+      logger.debug('Listed existing objects under %s for no-clobber checks.',
+                   dst_url)
+      return existing_names
+    logger.debug(
+        'Too many existing objects under %s to hold in memory; checking '
+        'no-clobber destinations individually.', dst_url)
+  except _ListingTooLargeError:
+    logger.debug(
+        'More than %d existing objects under %s; checking no-clobber '
+        'destinations individually.', max_listed, dst_url)
+  except ServiceException as e:
+    logger.debug(
+        'Failed to list %s (%s); checking no-clobber destinations '
+        'individually.', dst_url, e)
+  existing_names.Close()
+  return None
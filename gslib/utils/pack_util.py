@@ -0,0 +1,420 @@
+# -*- coding: utf-8 -*-
+# Copyright 2026 Google Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Helper functions for packing many small files into a few large objects.
+
+Copying many small files costs a request per file. A pack instead stores them
+as members of a few large tar archives ("pack objects"), next to an index
+object that records the pack object, offset and size of each member. Members
+can then be extracted individually with ranged reads, and members that are
+close together in a pack object with a single ranged read. Each pack object
+is an ordinary tar archive, so it can also be extracted by other tools.
+"""
+
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import division
+from __future__ import unicode_literals
+
+from collections import namedtuple
+import gzip
+from hashlib import md5
+import io
+import json
+import os
+import tarfile
+import tempfile
+
+import six
+
+from gslib.exception import CommandException
+from gslib.exception import HashMismatchException
+from gslib.third_party.storage_apitools import storage_v1_messages as apitools_messages
+from gslib.utils.cloud_api_helper import GetCloudApiInstance
+from gslib.utils.constants import UTF8
+from gslib.utils.hashing_helper import Base64EncodeHash
+from gslib.utils.hashing_helper import CalculateB64EncodedMd5FromContents
+from gslib.utils.unit_util import DivideAndCeil
+from gslib.utils.unit_util import ONE_MIB
+
+PACK_INDEX_NAME = 'index.json.gz'
+PACK_OBJECT_NAME_FORMAT = 'pack-%06d.tar'
+PACK_INDEX_VERSION = 1
+
+DEFAULT_PACK_SIZE = 64 * ONE_MIB
+
+# Members of a pack object are read with a single ranged read as long as the
+# gap between them is at most _MAX_READ_GAP bytes, up to _MAX_READ_SIZE bytes
+# per read; reading a small gap costs less than an extra request.
+_MAX_READ_GAP = ONE_MIB
+_MAX_READ_SIZE = 64 * ONE_MIB
+
+# Suffix of the temporary files members are extracted to, as for downloads.
+_TEMP_FILE_SUFFIX = '_.gstmp'
+
+# A member of a pack: its name (a relative path, '/'-separated), the number
+# of the pack object holding it, the offset of its data in that object, its
+# size, its modification time and its base64-encoded MD5 digest.
+PackMember = namedtuple('PackMember',
+                        ['name', 'pack_num', 'offset', 'size', 'mtime', 'md5'])
+
+# Describes a pack object to create from files, a list of (path, member name)
+# tuples.
+PackObjectArgs = namedtuple('PackObjectArgs', ['pack_url', 'pack_num', 'files'])
+
+# Describes a ranged read of bytes start_byte through end_byte of a pack
+# object, and the members it extracts: a list of (PackMember, path) tuples
+# sorted by offset.
+ExtractArgs = namedtuple('ExtractArgs',
+                         ['pack_url', 'start_byte', 'end_byte', 'members'])
+
+
+def GetPackObjectName(prefix, pack_num):
+  return prefix + PACK_OBJECT_NAME_FORMAT % pack_num
+
+
+def GetPackIndexName(prefix):
+  return prefix + PACK_INDEX_NAME
+
+
+class PackPlanner(object):
+  """Iterates over PackObjectArgs grouping files into pack objects."""
+
+  def __init__(self, file_iterator, pack_url_func, pack_size=DEFAULT_PACK_SIZE):
+    """Instantiates a PackPlanner.
+
+    Args:
+      file_iterator: Iterator over (path, member name, size) tuples.
+      pack_url_func: Function returning the StorageUrl of a pack object given
+          its number.
+      pack_size: Size at which a pack object is closed. A pack object may be
+          larger if a single file is.
+    """
+    self.file_iterator = file_iterator
+    self.pack_url_func = pack_url_func
+    self.pack_size = pack_size
+    self.num_packs = 0
+
+  def _MakeArgs(self, files):
+    args = PackObjectArgs(self.pack_url_func(self.num_packs), self.num_packs,
+                          files)
+    self.num_packs += 1
+    return args
+
+  def __iter__(self):
+    files = []
+    size = 0
+    for path, name, file_size in self.file_iterator:
+      if files and size + file_size > self.pack_size:
+        yield self._MakeArgs(files)
+        files = []
+        size = 0
+      files.append((path, name))
+      # Tar headers and padding take about one block per member.
+      size += file_size + tarfile.BLOCKSIZE
+    if files:
+      yield self._MakeArgs(files)
+
+
+class _HashingReader(object):
+  """Wraps a file, updating a digester with the data read from it."""
+
+  def __init__(self, fp, digester):
+    self._fp = fp
+    self._digester = digester
+
+  def read(self, size=-1):  # pylint: disable=invalid-name
+    data = self._fp.read(size)
+    self._digester.update(data)
+    return data
+
+
+def _WritePackArchive(fp, pack_num, files):
+  """Writes a tar archive of files to fp.
+
+  Args:
+    fp: Seekable file object to write the archive to.
+    pack_num: Number of the pack object the archive is for.
+    files: List of (path, member name) tuples.
+
+  Returns:
+    List of PackMembers describing the archive's members.
+  """
+  members = []
+  # Like cp, follow symlinks rather than archiving them.
+  archive = tarfile.open(fileobj=fp,
+                         mode='w',
+                         format=tarfile.PAX_FORMAT,
+                         dereference=True)
+  try:
+    for path, name in files:
+      tarinfo = archive.gettarinfo(path, arcname=name)
+      tarinfo.uid = tarinfo.gid = 0
+      tarinfo.uname = tarinfo.gname = ''
+      tarinfo.mtime = int(tarinfo.mtime)
+      digester = md5()
+      with open(path, 'rb') as member_fp:
+        archive.addfile(tarinfo, _HashingReader(member_fp, digester))
+      # A member's data directly precedes the archive's current offset,
+      # followed only by padding to a whole number of blocks.
+      offset = archive.offset - DivideAndCeil(
+          tarinfo.size, tarfile.BLOCKSIZE) * tarfile.BLOCKSIZE
+      members.append(
+          PackMember(name, pack_num, offset, tarinfo.size, tarinfo.mtime,
+                     Base64EncodeHash(digester.hexdigest())))
+  finally:
+    archive.close()
+  return members
+
+
+def PackObjectFn(cls, args, thread_state=None):
+  """Function argument to Apply for creating one pack object.
+
+  Args:
+    cls: Calling Command class.
+    args: PackObjectArgs describing the pack object.
+    thread_state: gsutil Cloud API instance to use for the operation.
+
+  Returns:
+    (pack_num, pack object size, list of PackMembers).
+  """
+  gsutil_api = GetCloudApiInstance(cls, thread_state=thread_state)
+  # Building the archive in a temporary file gives the upload a known size
+  # and MD5, which the service validates.
+  with tempfile.TemporaryFile() as fp:
+    members = _WritePackArchive(fp, args.pack_num, args.files)
+    size = fp.tell()
+    dst_obj_metadata = apitools_messages.Object(
+        name=args.pack_url.object_name,
+        bucket=args.pack_url.bucket_name,
+        contentType='application/x-tar',
+        md5Hash=CalculateB64EncodedMd5FromContents(fp))
+    gsutil_api.UploadObject(fp,
+                            dst_obj_metadata,
+                            size=size,
+                            provider=args.pack_url.scheme,
+                            fields=['name'])
+  cls.logger.info('Created %s with %d member(s).', args.pack_url, len(members))
+  return (args.pack_num, size, members)
+
+
+def EncodePackIndex(pack_sizes, members):
+  """Returns the contents of an index object.
+
+  Args:
+    pack_sizes: Sizes of the pack objects, by pack number.
+    members: PackMembers of all pack objects.
+  """
+  index = {
+      'version': PACK_INDEX_VERSION,
+      # Pack objects are named relative to the index, so that a pack can be
+      # copied or moved as a whole.
+      'packs': [{
+          'name': PACK_OBJECT_NAME_FORMAT % pack_num,
+          'size': size
+      } for pack_num, size in enumerate(pack_sizes)],
+      # Members are stored as lists, since the index of millions of members
+      # would otherwise be dominated by repeated keys.
+      'members': [list(member) for member in members],
+  }
+  buf = io.BytesIO()
+  with gzip.GzipFile(fileobj=buf, mode='wb') as gzip_fp:
+    gzip_fp.write(json.dumps(index, separators=(',', ':')).encode(UTF8))
+  return buf.getvalue()
+
+
+def DecodePackIndex(data):
+  """Parses the contents of an index object.
+
+  Args:
+    data: Bytes of the index object.
+
+  Raises:
+    CommandException if the index is not of a supported version.
+
+  Returns:
+    (packs, members): List of dicts describing the pack objects, by pack
+    number, with name (relative to the index's prefix) and size keys, and list
+    of PackMembers.
+  """
+  with gzip.GzipFile(fileobj=io.BytesIO(data), mode='rb') as gzip_fp:
+    index = json.loads(gzip_fp.read().decode(UTF8))
+  if index.get('version') != PACK_INDEX_VERSION:
+    raise CommandException('Unsupported pack index version %s.' %
+                           index.get('version'))
+  return (index['packs'], [PackMember(*member) for member in index['members']])
+
+
+def GetMemberPath(dst_dir, member_name):
+  """Returns the path to extract a member to, or raises CommandException.
+
+  Args:
+    dst_dir: Directory the pack is extracted to.
+    member_name: Name of the member.
+  """
+  dst_dir = os.path.abspath(dst_dir)
+  path = os.path.abspath(os.path.join(dst_dir, *member_name.split('/')))
+  if os.path.isabs(member_name) or not path.startswith(dst_dir + os.sep):
+    raise CommandException(
+        'Refusing to extract member "%s" outside of %s.' % (member_name,
+                                                            dst_dir))
+  return path
+
+
+def PlanRangedReads(pack_urls, member_paths):
+  """Groups members into ranged reads of their pack objects.
+
+  Args:
+    pack_urls: StorageUrls of the pack objects, by pack number.
+    member_paths: List of (PackMember, path) tuples to extract.
+
+  Yields:
+    ExtractArgs, each covering members of a single pack object.
+  """
+  group = []
+  for member, path in sorted(member_paths,
+                             key=lambda mp: (mp[0].pack_num, mp[0].offset)):
+    if group:
+      first = group[0][0]
+      last = group[-1][0]
+      if (member.pack_num != first.pack_num or
+          member.offset - (last.offset + last.size) > _MAX_READ_GAP or
+          member.offset + member.size - first.offset > _MAX_READ_SIZE):
+        yield _MakeExtractArgs(pack_urls, group)
+        group = []
+    group.append((member, path))
+  if group:
+    yield _MakeExtractArgs(pack_urls, group)
+
+
+def _MakeExtractArgs(pack_urls, group):
+  first = group[0][0]
+  last = group[-1][0]
+  return ExtractArgs(pack_urls[first.pack_num], first.offset,
+                     last.offset + last.size - 1, group)
+
+
+class MemberSplittingStream(object):
+  """Writes the data of a ranged read of a pack object to member files.
+
+  Each member is written to a temporary file, which is renamed into place once
+  the member is complete and its MD5 digest verified.
+  """
+
+  def __init__(self, start_byte, members):
+    """Instantiates a MemberSplittingStream.
+
+    Args:
+      start_byte: Offset in the pack object of the first byte written.
+      members: List of (PackMember, path) tuples sorted by offset.
+    """
+    self.position = start_byte
+    self.members = members
+    self.member_index = 0
+    self.fp = None
+    self.digester = None
+    self._SkipEmptyMembers()
+
+  def _OpenMember(self, path):
+    dst_dir = os.path.dirname(path)
+    if dst_dir and not os.path.isdir(dst_dir):
+      try:
+        os.makedirs(dst_dir)
+      except OSError:
+        # Another thread may have created it concurrently.
+        if not os.path.isdir(dst_dir):
+          raise
+    self.fp = open(path + _TEMP_FILE_SUFFIX, 'wb')
+    self.digester = md5()
+
+  def _FinishMember(self):
+    member, path = self.members[self.member_index]
+    if self.fp is None:
+      self._OpenMember(path)
+    self.fp.close()
+    self.fp = None
+    actual_md5 = Base64EncodeHash(self.digester.hexdigest())
+    if actual_md5 != member.md5:
+      os.unlink(path + _TEMP_FILE_SUFFIX)
+      raise HashMismatchException(
+          'MD5 mismatch for member %s: expected %s, got %s.' %
+          (member.name, member.md5, actual_md5))
+    if os.path.exists(path):
+      os.unlink(path)
+    os.rename(path + _TEMP_FILE_SUFFIX, path)
+    os.utime(path, (member.mtime, member.mtime))
+    self.member_index += 1
+
+  def _SkipEmptyMembers(self):
+    while (self.member_index < len(self.members) and
+           not self.members[self.member_index][0].size):
+      self._FinishMember()
+
+  def write(self, data):  # pylint: disable=invalid-name
+    """Writes data to the members it belongs to, skipping gaps."""
+    data = six.ensure_binary(data)
+    while data and self.member_index < len(self.members):
+      member, path = self.members[self.member_index]
+      if self.position < member.offset:
+        num_bytes = min(len(data), member.offset - self.position)
+      else:
+        if self.fp is None:
+          self._OpenMember(path)
+        num_bytes = min(len(data), member.offset + member.size - self.position)
+        self.fp.write(data[:num_bytes])
+        self.digester.update(data[:num_bytes])
+      data = data[num_bytes:]
+      self.position += num_bytes
+      if self.position == member.offset + member.size:
+        self._FinishMember()
+        self._SkipEmptyMembers()
+
+  def close(self):  # pylint: disable=invalid-name
+    """Closes the stream, removing the temporary file of a partial member."""
+    if self.fp is not None:
+      self.fp.close()
+      self.fp = None
+      member, path = self.members[self.member_index]
+      os.unlink(path + _TEMP_FILE_SUFFIX)
+
+
+def ExtractFn(cls, args, thread_state=None):
+  """Function argument to Apply for extracting members with a ranged read.
+
+  Args:
+    cls: Calling Command class.
+    args: ExtractArgs describing the ranged read.
+    thread_state: gsutil Cloud API instance to use for the operation.
+
+  Raises:
+    CommandException if the read ended before the end of the last member.
+  """
+  gsutil_api = GetCloudApiInstance(cls, thread_state=thread_state)
+  stream = MemberSplittingStream(args.start_byte, args.members)
+  try:
+    if args.end_byte >= args.start_byte:
+      gsutil_api.GetObjectMedia(args.pack_url.bucket_name,
+                                args.pack_url.object_name,
+                                stream,
+                                start_byte=args.start_byte,
+                                end_byte=args.end_byte,
+                                provider=args.pack_url.scheme)
+  finally:
+    stream.close()
+  if stream.member_index < len(args.members):
+    raise CommandException('Read of %s ended before the end of member %s.' %
+                           (args.pack_url,
+                            args.members[stream.member_index][0].name))
+  cls.logger.info('Extracted %d member(s) from %s.', len(args.members),
+                  args.pack_url)
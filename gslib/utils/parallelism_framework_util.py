@@ -183,6 +183,83 @@ class ProcessAndThreadSafeInt(object):
         return self.value
 
 
+class TaskLanes(object):
+  """Process and thread-safe fair-share admission of tasks in several lanes.
+
+  Each lane has a limit on the number of its tasks that run at once. A lane
+  may exceed its limit only while no other lane has tasks waiting to start,
+  so no lane is left idle, but a busy lane can't take over all of the
+  workers while another lane has work. A limit of 0 means the lane is
+  unlimited.
+
+  Like ProcessAndThreadSafeInt, this is backed by shared memory if
+  multiprocessing is available, so it must be created before worker
+  processes are forked.
+  """
+
+  def __init__(self, multiprocessing_is_available, num_lanes):
+    self.num_lanes = num_lanes
+    if multiprocessing_is_available:
+      self.lock = multiprocessing.Lock()
+      self.limits = multiprocessing.Array('i', num_lanes, lock=False)
+      self.running = multiprocessing.Array('i', num_lanes, lock=False)
+      self.waiting = multiprocessing.Array('i', num_lanes, lock=False)
+    else:
+      self.lock = threading.Lock()
+      self.limits = [0] * num_lanes
+      self.running = [0] * num_lanes
+      self.waiting = [0] * num_lanes
+
+  def SetLimits(self, limits):
+    with self.lock:
+      for lane, limit in enumerate(limits):
+        self.limits[lane] = limit
+
+  def AddWaiting(self, lane, count=1):
+    """Records that count tasks in lane were queued."""
+    with self.lock:
+      self.waiting[lane] += count
+
+  def TryStart(self, lane):
+    """Starts a waiting task in lane if the lane's share allows it.
+
+    Args:
+      lane: Lane of the task.
+
+    Returns:
+      True if the task may run now, in which case the caller must call Finish
+      once it completes.
+    """
+    with self.lock:
+      if (self.limits[lane] and self.running[lane] >= self.limits[lane] and
+          any(self.waiting[other_lane]
+              for other_lane in range(self.num_lanes)
+              if other_lane != lane)):
+        return False
+      self.waiting[lane] -= 1
+      self.running[lane] += 1
+      return True
+
+  def Finish(self, lane):
+    with self.lock:
+      self.running[lane] -= 1
+
+  def Resume(self, lane):
+    """Counts a task that stopped running (see Finish) as running again.
+
+    This doesn't wait for the lane's share, since the task is already in
+    progress, e.g., returning from a nested call to Apply.
+
+    Args:
+      lane: Lane of the task.
+    """
+    with self.lock:
+      self.running[lane] += 1
+
+  def GetWaiting(self, lane):
+    return self.waiting[lane]
+
+
 def _IncreaseSoftLimitForResource(resource_name, fallback_value):
   """Sets a new soft limit for the maximum number of open files.
 
@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+# Copyright 2026 Google Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Client-side bandwidth and request rate limits.
+
+The limits are enforced with token buckets whose state is shared by all
+threads and, if multiprocessing is available, all processes of a gsutil
+invocation, so GSUtil:max_bandwidth caps the total transfer rate of a
+"gsutil -m" command rather than that of each worker.
+"""
+
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import division
+from __future__ import unicode_literals
+
+import multiprocessing
+import threading
+import time
+import zlib
+
+import six
+
+from gslib.utils.boto_util import GetMaxBandwidth
+from gslib.utils.boto_util import GetMaxBucketRequestRate
+
+# A token bucket holds at most this many seconds' worth of tokens, which
+# bounds the burst allowed after a period of inactivity.
+_BURST_SECS = 0.1
+
+# Number of token buckets used for per-bucket request rate limits. Cloud
+# buckets are mapped to them by hash, since they can't be created on demand in
+# memory shared with processes that are already running; buckets that share a
+# slot also share a limit.
+_NUM_REQUEST_RATE_SLOTS = 64
+
+# Module-level token buckets; see InitializeMultiprocessingVariables.
+# pylint: disable=global-at-module-level
+global bandwidth_token_bucket, request_rate_token_buckets
+bandwidth_token_bucket = None
+request_rate_token_buckets = None
+
+
+class TokenBuckets(object):
+  """Process and thread-safe token buckets.
+
+  Tokens are taken before they are available, so callers are charged for each
+  request up front and then sleep off any deficit; concurrent callers queue up
+  behind one another's deficits, which holds their total rate to the limit.
+  """
+
+  def __init__(self,
+               multiprocessing_is_available,
+               num_slots=1,
+               clock=time.time,
+               sleep=time.sleep):
+    """Instantiates num_slots independent token buckets.
+
+    Args:
+      multiprocessing_is_available: If True, the buckets are kept in shared
+          memory, so they must be created before worker processes are forked.
+      num_slots: Number of token buckets.
+      clock: Function returning the current time in seconds.
+      sleep: Function sleeping for a given number of seconds.
+    """
+    self._clock = clock
+    self._sleep = sleep
+    if multiprocessing_is_available:
+      self.lock = multiprocessing.Lock()
+      self.tokens = multiprocessing.Array('d', num_slots, lock=False)
+      self.last_refill_times = multiprocessing.Array('d',
+                                                     num_slots,
+                                                     lock=False)
+    else:
+      self.lock = threading.Lock()
+      self.tokens = [0.0] * num_slots
+      self.last_refill_times = [0.0] * num_slots
+
+  def Acquire(self, amount, rate, slot=0):
+    """Takes amount tokens from a bucket, sleeping to stay under rate.
+
+    Args:
+      amount: Number of tokens to take, e.g., bytes or requests.
+      rate: Tokens added to the bucket per second.
+      slot: Index of the bucket.
+    """
+    capacity = rate * _BURST_SECS
+    with self.lock:
+      now = self._clock()
+      if self.last_refill_times[slot]:
+        tokens = min(
+            capacity, self.tokens[slot] +
+            (now - self.last_refill_times[slot]) * rate)
+      else:
+        tokens = capacity
+      self.tokens[slot] = tokens - amount
+      self.last_refill_times[slot] = now
+      deficit = amount - tokens
+    if deficit > 0:
+      self._sleep(deficit / rate)
+
+
+def InitializeMultiprocessingVariables():  # pylint: disable=invalid-name
+  """Perform necessary initialization for multiprocessing.
+
+    See gslib.command.InitializeMultiprocessingVariables for an explanation
+    of why this is necessary.
+  """
+  # pylint: disable=global-variable-undefined
+  global bandwidth_token_bucket, request_rate_token_buckets
+  bandwidth_token_bucket = TokenBuckets(True)
+  request_rate_token_buckets = TokenBuckets(True,
+                                            num_slots=_NUM_REQUEST_RATE_SLOTS)
+
+
+def InitializeThreadingVariables():  # pylint: disable=invalid-name
+  """Thread-safe analog to InitializeMultiprocessingVariables."""
+  # pylint: disable=global-variable-undefined
+  global bandwidth_token_bucket, request_rate_token_buckets
+  bandwidth_token_bucket = TokenBuckets(False)
+  request_rate_token_buckets = TokenBuckets(False,
+                                            num_slots=_NUM_REQUEST_RATE_SLOTS)
+
+
+def _EnsureInitialized():
+  # Neither initializer has run if gslib is used without gslib.__main__,
+  # e.g., in unit tests, in which case per-process limits are all we need.
+  if bandwidth_token_bucket is None:
+    InitializeThreadingVariables()
+
+
+class BandwidthLimitedStream(object):
+  """Wraps a stream, limiting the rate at which it's read from or written to.
+
+  All other attributes are those of the wrapped stream.
+  """
+
+  def __init__(self, stream, max_bandwidth):
+    """Initializes the wrapper.
+
+    Args:
+      stream: Stream to wrap.
+      max_bandwidth: Limit on the total rate of all BandwidthLimitedStreams,
+          in bytes per second.
+    """
+    _EnsureInitialized()
+    self._stream = stream
+    self._max_bandwidth = max_bandwidth
+
+  def read(self, size=-1):  # pylint: disable=invalid-name
+    data = self._stream.read(size)
+    if data:
+      bandwidth_token_bucket.Acquire(len(data), self._max_bandwidth)
+    return data
+
+  def write(self, data):  # pylint: disable=invalid-name
+    if data:
+      bandwidth_token_bucket.Acquire(len(data), self._max_bandwidth)
+    return self._stream.write(data)
+
+  def __getattr__(self, name):
+    return getattr(self._stream, name)
+
+
+def MaybeLimitBandwidth(stream):
+  """Returns stream, wrapped in a BandwidthLimitedStream if a limit is set.
+
+  Args:
+    stream: Stream that an upload reads from or a download writes to.
+
+  Returns:
+    stream or a BandwidthLimitedStream wrapping it.
+  """
+  max_bandwidth = GetMaxBandwidth()
+  if max_bandwidth:
+    return BandwidthLimitedStream(stream, max_bandwidth)
+  return stream
+
+
+def LimitBucketRequestRate(bucket_name, max_request_rate=None):
+  """Waits as needed to keep requests to bucket_name under a rate limit.
+
+  Args:
+    bucket_name: Name of the bucket the caller is about to make a request to.
+    max_request_rate: Limit on the rate of requests to each bucket, in
+        requests per second. Defaults to GSUtil:max_bucket_request_rate; if 0,
+        requests are not limited.
+  """
+  if max_request_rate is None:
+    max_request_rate = GetMaxBucketRequestRate()
+  if not max_request_rate or not bucket_name:
+    return
+  _EnsureInitialized()
+  # Unlike hash(), crc32 is stable across processes.
+  slot = ((zlib.crc32(six.ensure_binary(bucket_name)) & 0xffffffff) %
+          _NUM_REQUEST_RATE_SLOTS)
+  request_rate_token_buckets.Acquire(1, max_request_rate, slot=slot)
@@ -20,15 +20,197 @@ from __future__ import division
 from __future__ import unicode_literals
 
 import logging
+import multiprocessing
+import random
+import re
+import socket
+import threading
 import time
+import zlib
 
+import six
+from six.moves import urllib
+
+from apitools.base.py import exceptions as apitools_exceptions
 from apitools.base.py import http_wrapper
 from gslib import thread_message
 from gslib.utils import constants
+from gslib.utils.boto_util import GetCircuitBreakerThreshold
+from gslib.utils.boto_util import GetMaxRetryRate
+from gslib.utils.rate_limiter import TokenBuckets
 from retry_decorator import retry_decorator
 
 Retry = retry_decorator.retry  # pylint: disable=invalid-name
 
+# Number of slots that buckets (or, for requests not addressed to a bucket,
+# endpoints) are hashed to for shared backoff. As with request rate limits,
+# they can't be created on demand in memory shared with running processes.
+_NUM_BACKOFF_SLOTS = 64
+
+# Errors for a slot older than this many seconds are forgotten, which lets its
+# circuit close once requests to it stop failing.
+_ERROR_WINDOW_SECS = 60
+
+# Extracts the bucket name from a JSON API URL.
+_BUCKET_IN_URL_REGEX = re.compile(r'/b/([^/?]+)')
+
+# Module-level shared backoff state; see InitializeMultiprocessingVariables.
+# pylint: disable=global-at-module-level
+global shared_backoff, retry_token_bucket
+shared_backoff = None
+retry_token_bucket = None
+
+
+class SharedBackoff(object):
+  """Process and thread-safe retryable error counts and backoff deadlines.
+
+  Errors are counted per slot across all workers, so backoff grows with the
+  error rate of the whole command rather than that of each thread. Once a
+  slot has seen circuit_breaker_threshold errors within _ERROR_WINDOW_SECS,
+  its circuit opens: every worker holds off requests to it until a shared
+  deadline, and the first request after the deadline that fails reopens it.
+  """
+
+  def __init__(self, multiprocessing_is_available,
+               num_slots=_NUM_BACKOFF_SLOTS):
+    """Instantiates SharedBackoff.
+
+    Args:
+      multiprocessing_is_available: If True, the state is kept in shared
+          memory, so it must be created before worker processes are forked.
+      num_slots: Number of slots that keys are hashed to.
+    """
+    self.num_slots = num_slots
+    if multiprocessing_is_available:
+      self.lock = multiprocessing.Lock()
+      self.error_counts = multiprocessing.Array('i', num_slots, lock=False)
+      self.last_error_times = multiprocessing.Array('d', num_slots, lock=False)
+      self.backoff_deadlines = multiprocessing.Array('d',
+                                                     num_slots,
+                                                     lock=False)
+    else:
+      self.lock = threading.Lock()
+      self.error_counts = [0] * num_slots
+      self.last_error_times = [0.0] * num_slots
+      self.backoff_deadlines = [0.0] * num_slots
+
+  def _GetSlot(self, key):
+    # Unlike hash(), crc32 is stable across processes.
+    return (zlib.crc32(six.ensure_binary(key)) & 0xffffffff) % self.num_slots
+
+  def RecordError(self, key, threshold, max_delay, retry_after=None):
+    """Records a retryable error for key.
+
+    Args:
+      key: Bucket name or endpoint that the failed request was sent to.
+      threshold: Number of recent errors at which key's circuit opens.
+      max_delay: Maximum delay, in seconds, unless the server asked for more.
+      retry_after: Delay the server asked for in a Retry-After header, if any.
+
+    Returns:
+      Seconds the caller should wait before retrying.
+    """
+    slot = self._GetSlot(key)
+    with self.lock:
+      now = time.time()
+      if now - self.last_error_times[slot] > _ERROR_WINDOW_SECS:
+        self.error_counts[slot] = 0
+      self.error_counts[slot] += 1
+      self.last_error_times[slot] = now
+      num_errors = self.error_counts[slot]
+      if retry_after:
+        delay = retry_after
+      else:
+        # Exponential backoff in the number of errors seen by all workers,
+        # with jitter so that they don't retry in lockstep.
+        delay = min(max_delay, 2**min(num_errors, 16))
+        delay = delay / 2 + random.uniform(0, delay / 2)
+      if num_errors >= threshold:
+        self.backoff_deadlines[slot] = max(self.backoff_deadlines[slot],
+                                           now + delay)
+        delay = self.backoff_deadlines[slot] - now
+    return delay
+
+  def GetWait(self, key):
+    """Returns seconds until key's circuit closes, or 0 if it's closed."""
+    slot = self._GetSlot(key)
+    with self.lock:
+      return max(0, self.backoff_deadlines[slot] - time.time())
+
+
+def InitializeMultiprocessingVariables():  # pylint: disable=invalid-name
+  """Perform necessary initialization for multiprocessing.
+
+    See gslib.command.InitializeMultiprocessingVariables for an explanation
+    of why this is necessary.
+  """
+  # pylint: disable=global-variable-undefined
+  global shared_backoff, retry_token_bucket
+  shared_backoff = SharedBackoff(True)
+  retry_token_bucket = TokenBuckets(True)
+
+
+def InitializeThreadingVariables():  # pylint: disable=invalid-name
+  """Thread-safe analog to InitializeMultiprocessingVariables."""
+  # pylint: disable=global-variable-undefined
+  global shared_backoff, retry_token_bucket
+  shared_backoff = SharedBackoff(False)
+  retry_token_bucket = TokenBuckets(False)
+
+
+def _EnsureInitialized():
+  # Neither initializer has run if gslib is used without gslib.__main__,
+  # e.g., in unit tests, in which case per-process state is all we need.
+  if shared_backoff is None:
+    InitializeThreadingVariables()
+
+
+def GetBackoffKey(url):
+  """Returns the bucket name in a JSON API URL, or else its endpoint."""
+  match = _BUCKET_IN_URL_REGEX.search(url)
+  if match:
+    return urllib.parse.unquote(match.group(1))
+  return urllib.parse.urlparse(url).netloc
+
+
+def _ParseRetryAfter(value):
+  # Retry-After may also be an HTTP date, which servers rarely send; those
+  # fall back to exponential backoff.
+  try:
+    return max(0, int(value))
+  except (TypeError, ValueError):
+    return None
+
+
+def GetOverloadSignal(exc):
+  """Checks whether a request failed because of server overload or outage.
+
+  Args:
+    exc: Exception raised by the request.
+
+  Returns:
+    (is_overload, retry_after): Whether exc signals overload (429, 5xx or a
+    connection error), and the delay the server asked for, if any.
+  """
+  if isinstance(exc, apitools_exceptions.RetryAfterError):
+    return True, exc.retry_after
+  if isinstance(exc, apitools_exceptions.BadStatusCodeError):
+    if exc.status_code == 429 or exc.status_code >= 500:
+      return True, _ParseRetryAfter((exc.response or {}).get('retry-after'))
+    return False, None
+  return isinstance(exc, socket.error), None
+
+
+def WaitForBucketBackoff(bucket_name):
+  """Waits while the circuit for requests to bucket_name is open."""
+  if not bucket_name:
+    return
+  _EnsureInitialized()
+  wait = shared_backoff.GetWait(bucket_name)
+  if wait:
+    # Spread out the workers released when the circuit closes.
+    time.sleep(wait + random.uniform(0, wait / 10))
+
 
 def LogAndHandleRetries(is_data_transfer=False, status_queue=None):
   """Higher-order function allowing retry handler to access global status queue.
@@ -40,6 +222,55 @@ def LogAndHandleRetries(is_data_transfer=False, status_queue=None):
   Returns:
     A retry function for retryable errors in apitools.
   """
+  circuit_breaker_threshold = GetCircuitBreakerThreshold()
+  max_retry_rate = GetMaxRetryRate()
+
+  def _CoordinateRetry(retry_args):
+    """Records an overload error with the state shared by all workers.
+
+    If the error counts toward a circuit breaker or retry budget, waits out the
+    shared backoff and budget, since apitools' own backoff only accounts for
+    this thread's retries.
+
+    Args:
+      retry_args: An apitools ExceptionRetryArgs tuple.
+
+    Returns:
+      retry_args, adjusted so that apitools' own wait is minimal if this
+      function already waited.
+    """
+    if not circuit_breaker_threshold and not max_retry_rate:
+      return retry_args
+    is_overload, retry_after = GetOverloadSignal(retry_args.exc)
+    if not is_overload:
+      return retry_args
+    _EnsureInitialized()
+    delay = 0
+    if circuit_breaker_threshold:
+      delay = shared_backoff.RecordError(
+          GetBackoffKey(retry_args.http_request.url),
+          circuit_breaker_threshold,
+          retry_args.max_retry_wait,
+          retry_after=retry_after)
+    if is_data_transfer:
+      # gsutil's own retry loops handle these retries.
+      return retry_args
+    if max_retry_rate:
+      retry_token_bucket.Acquire(1, max_retry_rate)
+    # apitools sleeps for a Retry-After delay, or for at least a second.
+    is_retry_after = isinstance(retry_args.exc,
+                                apitools_exceptions.RetryAfterError)
+    if is_retry_after:
+      delay -= retry_args.exc.retry_after or 0
+    else:
+      delay -= 1
+    if delay > 0:
+      time.sleep(delay)
+      if not is_retry_after:
+        # The shared backoff has been waited out, so keep apitools' own wait
+        # to its minimum.
+        retry_args = retry_args._replace(max_retry_wait=1)
+    return retry_args
 
   def WarnAfterManyRetriesHandler(retry_args):
     """Exception handler for http failures in apitools.
@@ -62,7 +293,8 @@ def LogAndHandleRetries(is_data_transfer=False, status_queue=None):
               time.time(),
               num_retries=retry_args.num_retries,
               total_wait_sec=retry_args.total_wait_sec))
-    http_wrapper.HandleExceptionsAndRebuildHttpConnections(retry_args)
+    http_wrapper.HandleExceptionsAndRebuildHttpConnections(
+        _CoordinateRetry(retry_args))
 
   def RetriesInDataTransferHandler(retry_args):
     """Exception handler that disables retries in apitools data transfers.
@@ -81,6 +313,7 @@ def LogAndHandleRetries(is_data_transfer=False, status_queue=None):
               time.time(),
               num_retries=retry_args.num_retries,
               total_wait_sec=retry_args.total_wait_sec))
+    _CoordinateRetry(retry_args)
     http_wrapper.RethrowExceptionHandler(retry_args)
 
   if is_data_transfer:
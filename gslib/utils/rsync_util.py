@@ -19,6 +19,13 @@ from __future__ import print_function
 from __future__ import division
 from __future__ import unicode_literals
 
+import base64
+import io
+import json
+
+from gslib.exception import CommandException
+from gslib.utils import constants
+
 
 class DiffAction(object):
   """Enum class representing possible actions to take for an rsync diff."""
@@ -49,3 +56,90 @@ class RsyncDiffToApply(object):
     self.src_posix_attrs = src_posix_attrs
     self.diff_action = diff_action
     self.copy_size = copy_size
+
+
+def _ChangedObjectFromRecord(record):
+  """Returns (bucket_name, object_name) for a change record, or None.
+
+  Args:
+    record: Decoded JSON change record. This may be a Pub/Sub message as
+        published for a notification config (with bucketId and objectId
+        attributes and, for the JSON_API_V1 payload format, the object
+        resource as base64-encoded data), a message as returned by a Pub/Sub
+        pull (wrapping the message in a "message" field), or an object
+        resource as posted by an object change notification channel.
+
+  Returns:
+    (bucket_name, object_name) of the changed object, or None if the record
+    isn't recognized.
+  """
+  if not isinstance(record, dict):
+    return None
+  if isinstance(record.get('message'), dict):
+    record = record['message']
+  attributes = record.get('attributes')
+  if (isinstance(attributes, dict) and 'bucketId' in attributes and
+      'objectId' in attributes):
+    return attributes['bucketId'], attributes['objectId']
+  if 'data' in record:
+    try:
+      record = json.loads(
+          base64.b64decode(record['data']).decode(constants.UTF8))
+    except (TypeError, ValueError):
+      return None
+    if not isinstance(record, dict):
+      return None
+  if 'bucket' in record and 'name' in record:
+    return record['bucket'], record['name']
+  return None
+
+
+def ReadChangedObjectNames(changes_file_name, bucket_name):
+  """Reads the names of changed objects in a bucket from a change journal.
+
+  The journal is either a JSON array of change records or a file with one
+  JSON change record per line, in any of the formats accepted by
+  _ChangedObjectFromRecord. Records for other buckets are ignored.
+
+  Args:
+    changes_file_name: Path of the change journal.
+    bucket_name: Name of the bucket whose changed objects to return.
+
+  Returns:
+    Set of names of the objects in bucket_name that changed.
+
+  Raises:
+    CommandException: if the journal can't be read or contains unrecognized
+        records.
+  """
+  try:
+    with io.open(changes_file_name, 'r', encoding=constants.UTF8) as fp:
+      contents = fp.read()
+  except (IOError, OSError) as e:
+    raise CommandException('Could not read changes file %s: %s' %
+                           (changes_file_name, e))
+  try:
+    records = json.loads(contents)
+    if not isinstance(records, list):
+      records = [records]
+    numbered_records = [(None, record) for record in records]
+  except ValueError:
+    numbered_records = []
+    for line_num, line in enumerate(contents.splitlines(), 1):
+      if not line.strip():
+        continue
+      try:
+        numbered_records.append((line_num, json.loads(line)))
+      except ValueError:
+        raise CommandException('Invalid JSON on line %d of changes file %s' %
+                               (line_num, changes_file_name))
+  changed_names = set()
+  for line_num, record in numbered_records:
+    changed_object = _ChangedObjectFromRecord(record)
+    if changed_object is None:
+      raise CommandException(
+          'Unrecognized change record %sin changes file %s' %
+          ('on line %d ' % line_num if line_num else '', changes_file_name))
+    if changed_object[0] == bucket_name:
+      changed_names.add(changed_object[1])
+  return changed_names
@@ -24,11 +24,14 @@ from __future__ import print_function
 from __future__ import division
 from __future__ import unicode_literals
 
+import collections
 import errno
+import heapq
 import locale
 import os
 import struct
 import sys
+import threading
 
 import six
 
@@ -283,6 +286,179 @@ def _MonkeyPatchHttpForPython_3x():
   http.client.HTTPResponse.begin = PatchedBegin
 
 
+class _ListedDirEntry(object):
+  """Stands in for os.DirEntry where os.scandir isn't available."""
+
+  def __init__(self, dir_path, name):
+    self.name = name
+    self.path = os.path.join(dir_path, name)
+    self._stat_result = None
+
+  def is_dir(self):  # pylint: disable=invalid-name
+    return os.path.isdir(self.path)
+
+  def is_symlink(self):  # pylint: disable=invalid-name
+    return os.path.islink(self.path)
+
+  def stat(self):
+    if self._stat_result is None:
+      self._stat_result = os.stat(self.path)
+    return self._stat_result
+
+
+def ScanDir(path):
+  """Returns the entries of a directory, like os.scandir.
+
+  Where os.scandir is available (Python 3.5+), the entries cache what the
+  directory listing says about them, so checking whether an entry is a
+  directory or a symlink usually doesn't need a system call, and an entry is
+  stat'ed at most once.
+
+  Args:
+    path: Path (text or bytes) of the directory to list.
+
+  Returns:
+    List of os.DirEntry-like objects, with name and path attributes and
+    is_dir, is_symlink and stat methods.
+  """
+  if hasattr(os, 'scandir'):
+    return list(os.scandir(path))
+  return [_ListedDirEntry(path, name) for name in os.listdir(path)]
+
+
+def ScanDirTree(top, scan_func, num_threads=1):
+  """Yields the items scan_func returns for top and the directories under it.
+
+  With num_threads > 1, directories are scanned, and the entries of the items
+  stat'ed, on a pool of threads, which helps on filesystems with high
+  per-request latency, such as NFS. Items are then yielded as they're ready,
+  in no particular order; otherwise they're yielded in the order os.walk()
+  would find them.
+
+  Args:
+    top: Path of the directory to walk.
+    scan_func: Function taking the path of a directory, and returning
+               (subdir_paths, items): the paths of its subdirectories to walk,
+               and a list of the items to yield for it, each a tuple ending in
+               a ScanDir entry. Called on the walking threads.
+    num_threads: Number of walking threads.
+
+  Returns:
+    Iterator of items.
+  """
+  if num_threads > 1:
+    return _ParallelDirTreeScanner(scan_func, num_threads).Scan(top)
+  return _ScanDirTreeSequentially(top, scan_func)
+
+
+def _ScanDirTreeSequentially(top, scan_func):
+  dir_paths = [top]
+  while dir_paths:
+    subdir_paths, items = scan_func(dir_paths.pop())
+    dir_paths.extend(reversed(subdir_paths))
+    for item in items:
+      yield item
+
+
+class _ParallelDirTreeScanner(object):
+  """Scans a directory tree on a pool of threads for ScanDirTree.
+
+  Threads take tasks depth-first, which keeps the number of directories
+  waiting to be scanned close to what a sequential walk would hold. At most
+  2 * num_threads chunks of stat'ed items wait for the caller at once.
+  """
+
+  # Number of items each thread stats per task.
+  _CHUNK_SIZE = 100
+
+  def __init__(self, scan_func, num_threads):
+    self.scan_func = scan_func
+    self.num_threads = num_threads
+    # Guards and signals changes to all of the following.
+    self.cond = threading.Condition()
+    # Heap of (key, is_scan, arg) tasks, where key orders tasks depth-first
+    # and arg is a directory path to scan or a chunk of items to stat.
+    self.tasks = []
+    self.num_running = 0
+    # Chunks of stat'ed items, or exc_info tuples of errors.
+    self.results = collections.deque()
+    self.max_results = 2 * num_threads
+    self.shutting_down = False
+
+  def Scan(self, top):
+    """Yields the items of the tree under top."""
+    self.tasks.append(((), True, top))
+    for _ in range(self.num_threads):
+      thread = threading.Thread(target=self._RunTasks)
+      thread.daemon = True
+      thread.start()
+    try:
+      while True:
+        with self.cond:
+          while not self.results and (self.tasks or self.num_running):
+            # Wakes up periodically so that Python 2 can handle signals.
+            self.cond.wait(1)
+          if not self.results:
+            return
+          result = self.results.popleft()
+          self.cond.notify_all()
+        if isinstance(result, tuple):
+          six.reraise(*result)
+        for item in result:
+          yield item
+    finally:
+      with self.cond:
+        self.shutting_down = True
+        self.cond.notify_all()
+
+  def _RunTasks(self):
+    while True:
+      with self.cond:
+        while not self.shutting_down and not self.tasks:
+          self.cond.wait()
+        if self.shutting_down:
+          return
+        key, is_scan, arg = heapq.heappop(self.tasks)
+        self.num_running += 1
+      new_tasks = []
+      result = None
+      try:
+        if is_scan:
+          subdir_paths, items = self.scan_func(arg)
+          for i in range(0, len(items), self._CHUNK_SIZE):
+            new_tasks.append(
+                (key + (0, i), False, items[i:i + self._CHUNK_SIZE]))
+          for i, subdir_path in enumerate(subdir_paths):
+            new_tasks.append((key + (1, i), True, subdir_path))
+        else:
+          for item in arg:
+            # Entries cache their stat results.
+            StatDirEntry(item[-1])
+          result = arg
+      except Exception:  # pylint: disable=broad-except
+        result = sys.exc_info()
+      with self.cond:
+        for task in new_tasks:
+          heapq.heappush(self.tasks, task)
+        if result is not None:
+          while (not self.shutting_down and
+                 len(self.results) >= self.max_results):
+            self.cond.wait()
+          self.results.append(result)
+        self.num_running -= 1
+        self.cond.notify_all()
+
+
+def StatDirEntry(dir_entry):
+  """Returns the os.stat result for a ScanDir entry, or None if it fails."""
+  try:
+    return dir_entry.stat()
+  except OSError:
+    # For example, a broken symlink. Callers stat the path again themselves,
+    # raising the error where they would have without the entry.
+    return None
+
+
 def StdinIterator():
   """A generator function that returns lines from stdin."""
   for line in sys.stdin:
@@ -296,11 +472,34 @@ class StdinIteratorCls(six.Iterator):
      generator version above.
   """
 
+  def __init__(self):
+    # Lines read by ReadAhead that haven't been returned yet.
+    self.read_ahead_lines = collections.deque()
+
   def __iter__(self):
     return self
 
   def __next__(self):
+    if self.read_ahead_lines:
+      return self.read_ahead_lines.popleft()
     line = sys.stdin.readline()
     if not line:
       raise StopIteration()
     return line.rstrip()
+
+  def ReadAhead(self, max_lines):
+    """Reads lines ahead of iteration, e.g., to count them.
+
+    Args:
+      max_lines: Maximum number of lines to hold.
+
+    Returns:
+      The number of lines held, which is less than max_lines only if stdin
+      has no more lines.
+    """
+    while len(self.read_ahead_lines) < max_lines:
+      line = sys.stdin.readline()
+      if not line:
+        break
+      self.read_ahead_lines.append(line.rstrip())
+    return len(self.read_ahead_lines)
@@ -42,7 +42,11 @@ from gslib.storage_url import StorageUrlFromString
 from gslib.storage_url import StripOneSlash
 from gslib.storage_url import WILDCARD_REGEX
 from gslib.third_party.storage_apitools import storage_v1_messages as apitools_messages
+from gslib.utils.boto_util import GetLocalWalkThreads
 from gslib.utils.constants import UTF8
+from gslib.utils.system_util import ScanDir
+from gslib.utils.system_util import ScanDirTree
+from gslib.utils.system_util import StatDirEntry
 from gslib.utils.text_util import FixWindowsEncodingIfNeeded
 from gslib.utils.text_util import PrintableStr
 
@@ -513,7 +517,7 @@ class CloudWildcardIterator(WildcardIterator):
         yield blr
 
 
-def _GetFileObject(filepath):
+def _GetFileObject(filepath, stat_result=None):
   """Returns an apitools Object class with supported file attributes.
 
   To provide size estimates for local to cloud file copies, we need to retrieve
@@ -521,12 +525,13 @@ def _GetFileObject(filepath):
 
   Args:
     filepath: Path to the file.
+    stat_result: os.stat result for the file, if already available.
 
   Returns:
     apitools Object that with file name and size attributes filled-in.
   """
-  # TODO: If we are preserving POSIX attributes, we could instead call
-  # os.stat() here.
+  if stat_result:
+    return apitools_messages.Object(size=stat_result.st_size)
   return apitools_messages.Object(size=os.path.getsize(filepath))
 
 
@@ -540,7 +545,11 @@ class FileWildcardIterator(WildcardIterator):
   files in any subdirectory named 'abc').
   """
 
-  def __init__(self, wildcard_url, ignore_symlinks=False, logger=None):
+  def __init__(self,
+               wildcard_url,
+               ignore_symlinks=False,
+               logger=None,
+               exclude_dir_func=None):
     """Instantiates an iterator over BucketListingRefs matching wildcard URL.
 
     Args:
@@ -548,10 +557,15 @@ class FileWildcardIterator(WildcardIterator):
       ignore_symlinks: If True, ignore symlinks during iteration.
       logger: logging.Logger used for outputting debug messages during
               iteration. If None, the root logger will be used.
+      exclude_dir_func: Function taking the path of a directory found while
+                        expanding a recursive wildcard, and returning True if
+                        the directory and everything under it should be
+                        skipped rather than walked.
     """
     self.wildcard_url = wildcard_url
     self.ignore_symlinks = ignore_symlinks
     self.logger = logger or logging.getLogger()
+    self.exclude_dir_func = exclude_dir_func
 
   def __iter__(self, bucket_listing_fields=None):
     """Iterator that gets called when iterating over the file wildcard.
@@ -596,19 +610,24 @@ class FileWildcardIterator(WildcardIterator):
       filepaths = self._IterDir(base_dir, remaining_wildcard)
     else:
       # Not a recursive wildcarding request.
-      filepaths = glob.iglob(wildcard)
-    for filepath in filepaths:
+      filepaths = ((filepath, None) for filepath in glob.iglob(wildcard))
+    for filepath, dir_entry in filepaths:
       expanded_url = StorageUrlFromString(filepath)
       try:
-        if self.ignore_symlinks and os.path.islink(filepath):
+        if self.ignore_symlinks and (dir_entry.is_symlink() if dir_entry else
+                                     os.path.islink(filepath)):
           if self.logger:
             self.logger.info('Skipping symbolic link %s...', filepath)
           continue
-        if os.path.isdir(filepath):
+        if not dir_entry and os.path.isdir(filepath):
           yield BucketListingPrefix(expanded_url)
         else:
-          blr_object = _GetFileObject(filepath) if include_size else None
-          yield BucketListingObject(expanded_url, root_object=blr_object)
+          stat_result = StatDirEntry(dir_entry) if dir_entry else None
+          blr_object = (_GetFileObject(filepath, stat_result)
+                        if include_size else None)
+          yield BucketListingObject(expanded_url,
+                                    root_object=blr_object,
+                                    stat_result=stat_result)
       except UnicodeEncodeError:
         raise CommandException('\n'.join(
             textwrap.wrap(_UNICODE_EXCEPTION_TEXT % repr(filepath))))
@@ -622,8 +641,8 @@ class FileWildcardIterator(WildcardIterator):
           matching.
 
     Yields:
-      (str) A string containing the path to a file somewhere under the directory
-      hierarchy of `directory`.
+      (str, DirEntry) The path to a file somewhere under the directory
+      hierarchy of `directory`, and its ScanDir entry.
 
     Raises:
       ComandException: If this method encounters a file path that it cannot
@@ -638,53 +657,80 @@ class FileWildcardIterator(WildcardIterator):
       # the resulting joined path looks like 'c:\\foo'.
       directory += '\\'
 
-    # UTF8-encode directory before passing it to os.walk() so if there are
-    # non-valid UTF8 chars in the file name (e.g., that can happen if the file
-    # originated on Windows) os.walk() will not attempt to decode and then die
-    # with a "codec can't decode byte" error, and instead we can catch the error
-    # at yield time and print a more informative error message.
-    for dirpath, dirnames, filenames in os.walk(directory.encode(UTF8)):
-      dirpath = dirpath.decode(UTF8)
-      dirnames = [dn.decode(UTF8) for dn in dirnames]
-      filenames = [fn.decode(UTF8) for fn in filenames]
-      if self.logger:
-        for dirname in dirnames:
-          full_dir_path = os.path.join(dirpath, dirname)
-          if os.path.islink(full_dir_path):
-            self.logger.info('Skipping symlink directory "%s"', full_dir_path)
-      for f in fnmatch.filter(filenames, wildcard):
+    # UTF8-encode directory before listing it so if there are non-valid UTF8
+    # chars in the file name (e.g., that can happen if the file originated on
+    # Windows) listing will not attempt to decode and then die with a "codec
+    # can't decode byte" error, and instead we can catch the error at yield
+    # time and print a more informative error message.
+    #
+    # This walks the tree like os.walk(), but keeps the ScanDir entries of
+    # files, which carry what the directory listing already said about them.
+    def _ScanWalkedDir(dir_path):
+      """Returns (subdir_paths, (dirpath, f, entry) for matching files)."""
+      try:
+        entries = ScanDir(dir_path)
+      except OSError:
+        # Like os.walk(), skip directories that can't be listed.
+        return [], []
+      dirpath = dir_path.decode(UTF8)
+      subdir_paths = []
+      matches = []
+      for entry in entries:
         try:
-          yield os.path.join(dirpath, FixWindowsEncodingIfNeeded(f))
-        except UnicodeDecodeError:
-          # Note: We considered several ways to deal with this, but each had
-          # problems:
-          # 1. Raise an exception and try to catch in a higher layer (the
-          #    gsutil cp command), so we can properly support the gsutil cp -c
-          #    option. That doesn't work because raising an exception during
-          #    iteration terminates the generator.
-          # 2. Accumulate a list of bad filenames and skip processing each
-          #    during iteration, then raise at the end, with exception text
-          #    printing the bad paths. That doesn't work because iteration is
-          #    wrapped in PluralityCheckableIterator, so it's possible there
-          #    are not-yet-performed copy operations at the time we reach the
-          #    end of the iteration and raise the exception - which would cause
-          #    us to skip copying validly named files. Moreover, the gsutil
-          #    cp command loops over argv, so if you run the command gsutil cp
-          #    -rc dir1 dir2 gs://bucket, an invalid unicode name inside dir1
-          #    would cause dir2 never to be visited.
-          # 3. Print the invalid pathname and skip it during iteration. That
-          #    would work but would mean gsutil cp could exit with status 0
-          #    even though some files weren't copied.
-          # 4. Change the WildcardIterator to include an error status along with
-          #    the result. That would solve the problem but would be a
-          #    substantial change (WildcardIterator is used in many parts of
-          #    gsutil), and we didn't feel that magnitude of change was
-          #    warranted by this relatively uncommon corner case.
-          # Instead we chose to abort when one such file is encountered, and
-          # require the user to remove or rename the files and try again.
-          raise CommandException('\n'.join(
-              textwrap.wrap(_UNICODE_EXCEPTION_TEXT %
-                            repr(os.path.join(dirpath, f)))))
+          is_dir = entry.is_dir()
+        except OSError:
+          is_dir = False
+        if not is_dir:
+          f = entry.name.decode(UTF8)
+          if fnmatch.fnmatch(f, wildcard):
+            matches.append((dirpath, f, entry))
+          continue
+        full_dir_path = os.path.join(dirpath, entry.name.decode(UTF8))
+        if self.exclude_dir_func and self.exclude_dir_func(full_dir_path):
+          continue
+        if entry.is_symlink():
+          # Like os.walk(), don't follow symlinks to directories.
+          if self.logger:
+            self.logger.info('Skipping symlink directory "%s"', full_dir_path)
+          continue
+        subdir_paths.append(entry.path)
+      return subdir_paths, matches
+
+    for dirpath, f, entry in ScanDirTree(directory.encode(UTF8),
+                                         _ScanWalkedDir,
+                                         num_threads=GetLocalWalkThreads()):
+      try:
+        yield os.path.join(dirpath, FixWindowsEncodingIfNeeded(f)), entry
+      except UnicodeDecodeError:
+        # Note: We considered several ways to deal with this, but each had
+        # problems:
+        # 1. Raise an exception and try to catch in a higher layer (the
+        #    gsutil cp command), so we can properly support the gsutil cp -c
+        #    option. That doesn't work because raising an exception during
+        #    iteration terminates the generator.
+        # 2. Accumulate a list of bad filenames and skip processing each
+        #    during iteration, then raise at the end, with exception text
+        #    printing the bad paths. That doesn't work because iteration is
+        #    wrapped in PluralityCheckableIterator, so it's possible there
+        #    are not-yet-performed copy operations at the time we reach the
+        #    end of the iteration and raise the exception - which would cause
+        #    us to skip copying validly named files. Moreover, the gsutil
+        #    cp command loops over argv, so if you run the command gsutil cp
+        #    -rc dir1 dir2 gs://bucket, an invalid unicode name inside dir1
+        #    would cause dir2 never to be visited.
+        # 3. Print the invalid pathname and skip it during iteration. That
+        #    would work but would mean gsutil cp could exit with status 0
+        #    even though some files weren't copied.
+        # 4. Change the WildcardIterator to include an error status along with
+        #    the result. That would solve the problem but would be a
+        #    substantial change (WildcardIterator is used in many parts of
+        #    gsutil), and we didn't feel that magnitude of change was
+        #    warranted by this relatively uncommon corner case.
+        # Instead we chose to abort when one such file is encountered, and
+        # require the user to remove or rename the files and try again.
+        raise CommandException('\n'.join(
+            textwrap.wrap(_UNICODE_EXCEPTION_TEXT %
+                          repr(os.path.join(dirpath, f)))))
 
   # pylint: disable=unused-argument
   def IterObjects(self, bucket_listing_fields=None):
@@ -755,7 +801,8 @@ def CreateWildcardIterator(url_str,
                            all_versions=False,
                            project_id=None,
                            ignore_symlinks=False,
-                           logger=None):
+                           logger=None,
+                           exclude_dir_func=None):
   """Instantiate a WildcardIterator for the given URL string.
 
   Args:
@@ -769,6 +816,8 @@ def CreateWildcardIterator(url_str,
     ignore_symlinks: For FileUrls, ignore symlinks during iteration if true.
     logger: logging.Logger used for outputting debug messages during iteration.
             If None, the root logger will be used.
+    exclude_dir_func: For FileUrls, function taking a directory path and
+                      returning True if recursive wildcards should skip it.
 
   Returns:
     A WildcardIterator that handles the requested iteration.
@@ -779,7 +828,8 @@ def CreateWildcardIterator(url_str,
   if url.IsFileUrl():
     return FileWildcardIterator(url,
                                 ignore_symlinks=ignore_symlinks,
-                                logger=logger)
+                                logger=logger,
+                                exclude_dir_func=exclude_dir_func)
   else:  # Cloud URL
     return CloudWildcardIterator(url,
                                  gsutil_api,